@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-# Preload HL7 components to avoid circular imports
-from .utils.hl7_preload import validate_hl7_preload
-validate_hl7_preload()
+# HL7 components are no longer preloaded here: `app.utils.hl7_preload.load_hl7apy`
+# loads them on first use, in the order that avoids circular imports, and
+# `create_app` loads them (with the other lazy imports) at startup if EAGER_IMPORTS is set
 
-# Now import other modules
 __all__ = [
     # Core modules
     'config',
@@ -21,34 +20,57 @@ __all__ = [
     'validators',
     
     # API modules
+    'admin_api',
     'auth_api',
+    'batch_api',
     'metadata_api',
+    'metrics_api',
     'operational_data_api',
     'patient_api',
     'vital_signs_api',
     
     # Service modules
     'auth_service',
+    'batch_service',
     'patient_service',
+    'subscription_service',
     'vital_signs_service',
+    'vitals_export_service',
+    'vitals_rendering_service',
+    'vitals_stats_service',
     
     # Validator modules
     'patient_validators',
+    'request_validator',
     
     # Utility modules
+    'admission_control',
     'auth_decorators',
     'date_and_time_utils',
+    'date_range',
+    'downsampling',
     'fhir_formatter',
     'form_field_validations',
     'hl7_formatter',
     'hl7_preload',
     'init_staff_table',
+    'instrumentation',
     'introspection_utils',
     'jwt_handler',
+    'lazy_import',
     'loinc_mappings',
+    'memory_profiler',
+    'metrics',
     'password_handler',
+    'query_budget',
+    'query_deadline',
+    'response_compression',
+    'sampling_profiler',
+    'single_flight',
+    'slow_query_log',
     'string_handler',
     'time_formatters',
+    'watermark',
     
     # Constant modules
     'error_messages',
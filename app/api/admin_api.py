@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#----------------#
+# Import modules #
+#----------------#
+
+from flask import Response, request
+from flask_restx import Resource, Namespace
+
+#------------------------#
+# Import project modules #
+#------------------------#
+
+from app.utils.auth_decorators import token_required
+from app.utils.memory_profiler import MEMORY_PROFILER
+from app.utils.sampling_profiler import SAMPLING_PROFILER
+from app.utils.slow_query_log import SLOW_QUERY_LOG
+
+#------------#
+# Operations #
+#------------#
+
+# Define namespaces #
+#-------------------#
+
+admin_ns = Namespace('admin', description='Service diagnostics (admin only)')
+
+# Define routes #
+#---------------#
+
+# Slow Queries Endpoint (/admin/slow_queries)
+"""
+Purpose: Lists the table sets of the slowest statements, with the last statement of each,
+         its redacted parameters and its EXPLAIN (ANALYZE, BUFFERS) plan if one was captured
+Access: Administrators only (requires authentication)
+Response: Slow query threshold and the top offenders
+"""
+@admin_ns.route('/slow_queries')
+@admin_ns.param('limit', 'Number of table sets returned (default: 20)', _in='query', required=False)
+@admin_ns.param('order_by', 'Ranking: total_ms (default), max_ms, mean_ms or count', _in='query', required=False)
+class SlowQueries(Resource):
+    """Resource for inspecting the slow query log."""
+
+    @admin_ns.doc('get_slow_queries')
+    @admin_ns.response(200, 'Success')
+    @admin_ns.response(400, 'Validation Error')
+    @admin_ns.response(403, 'Forbidden')
+    @token_required
+    def get(self):
+        """Return the table sets of the slow statements, slowest first (admin only)."""
+        user = request.user
+        if user['role'] != 'admin':
+            return {'message': 'Insufficient permissions. Only admins can access service diagnostics.'}, 403
+
+        order_by = request.args.get('order_by', 'total_ms')
+        if order_by not in SLOW_QUERY_ORDERINGS:
+            return {'field': 'order_by', 'error': f"must be one of {', '.join(SLOW_QUERY_ORDERINGS)}"}, 400
+        try:
+            limit = int(request.args.get('limit', DEFAULT_SLOW_QUERY_LIMIT))
+        except ValueError:
+            return {'field': 'limit', 'error': 'must be an integer'}, 400
+
+        return {
+            'threshold_ms': SLOW_QUERY_LOG.threshold * 1000,
+            'explain_sample_rate': SLOW_QUERY_LOG.explain_sample_rate,
+            'offenders': SLOW_QUERY_LOG.top_offenders(max(limit, 0), order_by)
+        }, 200
+
+# Memory Profiling Endpoint (/admin/memory_profiling)
+"""
+Purpose: Arms the memory profiler for the next requests of the service, optionally for one
+         endpoint only (a single request can also be profiled with the X-Memory-Profile header)
+Access: Administrators only (requires authentication)
+Response: Requests the profiler is armed for
+"""
+@admin_ns.route('/memory_profiling')
+class MemoryProfiling(Resource):
+    """Resource for arming the memory profiler."""
+
+    @admin_ns.doc('get_memory_profiling')
+    @admin_ns.response(200, 'Success')
+    @admin_ns.response(403, 'Forbidden')
+    @token_required
+    def get(self):
+        """Return the requests the memory profiler is armed for (admin only)."""
+        user = request.user
+        if user['role'] != 'admin':
+            return {'message': 'Insufficient permissions. Only admins can access service diagnostics.'}, 403
+        return MEMORY_PROFILER.state(), 200
+
+    @admin_ns.doc('arm_memory_profiling')
+    @admin_ns.response(200, 'Success')
+    @admin_ns.response(400, 'Validation Error')
+    @admin_ns.response(403, 'Forbidden')
+    @token_required
+    def post(self):
+        """Profile the next requests, e.g. {"requests": 5, "endpoint": "/api/vital_signs"} (admin only)."""
+        user = request.user
+        if user['role'] != 'admin':
+            return {'message': 'Insufficient permissions. Only admins can access service diagnostics.'}, 403
+
+        data = request.get_json(silent=True) or {}
+        requests_profiled = data.get('requests', 1)
+        if not isinstance(requests_profiled, int) or isinstance(requests_profiled, bool) or requests_profiled < 0:
+            return {'field': 'requests', 'error': 'must be a non-negative integer'}, 400
+        if requests_profiled > MAX_ARMED_REQUESTS:
+            return {'field': 'requests', 'error': f"must be at most {MAX_ARMED_REQUESTS}"}, 400
+        endpoint = data.get('endpoint')
+        if endpoint is not None and not isinstance(endpoint, str):
+            return {'field': 'endpoint', 'error': 'must be a string'}, 400
+
+        return MEMORY_PROFILER.arm(requests_profiled, endpoint), 200
+
+# Memory Profiles Endpoint (/admin/memory_profiles)
+"""
+Purpose: Lists the memory profiles kept in memory, most recent first
+Access: Administrators only (requires authentication)
+Response: Peak and retained bytes of each profiled request
+"""
+@admin_ns.route('/memory_profiles')
+class MemoryProfiles(Resource):
+    """Resource for listing the memory profiles."""
+
+    @admin_ns.doc('get_memory_profiles')
+    @admin_ns.response(200, 'Success')
+    @admin_ns.response(403, 'Forbidden')
+    @token_required
+    def get(self):
+        """Return the summaries of the memory profiles (admin only)."""
+        user = request.user
+        if user['role'] != 'admin':
+            return {'message': 'Insufficient permissions. Only admins can access service diagnostics.'}, 403
+        return {'profiles': MEMORY_PROFILER.summaries()}, 200
+
+# Memory Profile Endpoint (/admin/memory_profiles/<profile_id>)
+"""
+Purpose: Returns a memory profile by ID (as returned in the X-Memory-Profile response header)
+Access: Administrators only (requires authentication)
+Response: Peak and retained bytes of the request and of each pipeline stage, with the top
+          allocation sites of each stage
+"""
+@admin_ns.route('/memory_profiles/<string:profile_id>')
+@admin_ns.param('profile_id', 'Memory profile ID')
+class MemoryProfile(Resource):
+    """Resource for retrieving a memory profile."""
+
+    @admin_ns.doc('get_memory_profile')
+    @admin_ns.response(200, 'Success')
+    @admin_ns.response(403, 'Forbidden')
+    @admin_ns.response(404, 'Not Found')
+    @token_required
+    def get(self, profile_id):
+        """Return a memory profile (admin only)."""
+        user = request.user
+        if user['role'] != 'admin':
+            return {'message': 'Insufficient permissions. Only admins can access service diagnostics.'}, 403
+        report = MEMORY_PROFILER.get(profile_id)
+        if report is None:
+            return {'message': 'Memory profile not found.'}, 404
+        return report, 200
+
+# Sampling Profiler Endpoint (/admin/sampling_profiler)
+"""
+Purpose: Switches the sampling profiler on or off and selects the requests it profiles:
+         a fraction of the requests, optionally of one endpoint or role only
+Access: Administrators only (requires authentication)
+Response: Settings of the sampling profiler
+"""
+@admin_ns.route('/sampling_profiler')
+class SamplingProfilerSettings(Resource):
+    """Resource for configuring the sampling profiler."""
+
+    @admin_ns.doc('get_sampling_profiler')
+    @admin_ns.response(200, 'Success')
+    @admin_ns.response(403, 'Forbidden')
+    @token_required
+    def get(self):
+        """Return the settings of the sampling profiler (admin only)."""
+        user = request.user
+        if user['role'] != 'admin':
+            return {'message': 'Insufficient permissions. Only admins can access service diagnostics.'}, 403
+        return SAMPLING_PROFILER.state(), 200
+
+    @admin_ns.doc('configure_sampling_profiler')
+    @admin_ns.response(200, 'Success')
+    @admin_ns.response(400, 'Validation Error')
+    @admin_ns.response(403, 'Forbidden')
+    @token_required
+    def post(self):
+        """Configure the profiler, e.g. {"enabled": true, "sample_rate": 0.05, "role": "medical"} (admin only)."""
+        user = request.user
+        if user['role'] != 'admin':
+            return {'message': 'Insufficient permissions. Only admins can access service diagnostics.'}, 403
+
+        data = request.get_json(silent=True) or {}
+        enabled = data.get('enabled')
+        if enabled is not None and not isinstance(enabled, bool):
+            return {'field': 'enabled', 'error': 'must be a boolean'}, 400
+        sample_rate = data.get('sample_rate')
+        if sample_rate is not None and (
+            isinstance(sample_rate, bool) or not isinstance(sample_rate, (int, float)) or not 0 <= sample_rate <= 1
+        ):
+            return {'field': 'sample_rate', 'error': 'must be a number between 0 and 1'}, 400
+        for field in ('endpoint', 'role'):
+            if data.get(field) is not None and not isinstance(data[field], str):
+                return {'field': field, 'error': "must be a string ('' for all)"}, 400
+
+        return SAMPLING_PROFILER.configure(
+            enabled=enabled,
+            sample_rate=float(sample_rate) if sample_rate is not None else None,
+            endpoint=data.get('endpoint'),
+            role=data.get('role')
+        ), 200
+
+# Sampled Profiles Endpoint (/admin/sampling_profiles)
+"""
+Purpose: Lists the endpoints profiled by the sampling profiler with their request and sample
+         counts, or discards the merged profiles (DELETE)
+Access: Administrators only (requires authentication)
+Response: Profiled requests and samples per endpoint
+"""
+@admin_ns.route('/sampling_profiles')
+class SamplingProfiles(Resource):
+    """Resource for listing the sampled profiles."""
+
+    @admin_ns.doc('get_sampling_profiles')
+    @admin_ns.response(200, 'Success')
+    @admin_ns.response(403, 'Forbidden')
+    @token_required
+    def get(self):
+        """Return the profiled requests and samples per endpoint (admin only)."""
+        user = request.user
+        if user['role'] != 'admin':
+            return {'message': 'Insufficient permissions. Only admins can access service diagnostics.'}, 403
+        return {'endpoints': SAMPLING_PROFILER.summaries()}, 200
+
+    @admin_ns.doc('reset_sampling_profiles')
+    @admin_ns.response(204, 'Profiles discarded')
+    @admin_ns.response(403, 'Forbidden')
+    @token_required
+    def delete(self):
+        """Discard the merged profiles; the collapsed stack files are kept (admin only)."""
+        user = request.user
+        if user['role'] != 'admin':
+            return {'message': 'Insufficient permissions. Only admins can access service diagnostics.'}, 403
+        SAMPLING_PROFILER.reset()
+        return '', 204
+
+# Collapsed Stacks Endpoint (/admin/sampling_profiles/collapsed)
+"""
+Purpose: Downloads the merged profile of an endpoint (or of all endpoints, each rooted in a
+         frame named after it) in the collapsed stack format, for flamegraph.pl or speedscope
+Access: Administrators only (requires authentication)
+Response: text/plain file of "frame;frame;...;frame count" lines
+"""
+@admin_ns.route('/sampling_profiles/collapsed')
+@admin_ns.param('endpoint', 'Endpoint (URL rule) whose profile is returned (default: all)', _in='query', required=False)
+class CollapsedStacks(Resource):
+    """Resource for downloading the sampled profiles."""
+
+    @admin_ns.doc('get_collapsed_stacks')
+    @admin_ns.produces(['text/plain'])
+    @admin_ns.response(200, 'Collapsed stacks')
+    @admin_ns.response(403, 'Forbidden')
+    @token_required
+    def get(self):
+        """Return the merged collapsed stacks (admin only)."""
+        user = request.user
+        if user['role'] != 'admin':
+            return {'message': 'Insufficient permissions. Only admins can access service diagnostics.'}, 403
+        return Response(
+            response=SAMPLING_PROFILER.collapsed(request.args.get('endpoint')),
+            status=200,
+            content_type='text/plain; charset=utf-8',
+            headers={'Content-Disposition': 'attachment; filename=profile.folded'}
+        )
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Rankings of the slow query table sets
+SLOW_QUERY_ORDERINGS = ['total_ms', 'max_ms', 'mean_ms', 'count']
+
+# Table sets returned by default
+DEFAULT_SLOW_QUERY_LIMIT = 20
+
+# Requests the memory profiler may be armed for at once
+MAX_ARMED_REQUESTS = 100
@@ -14,7 +14,7 @@ from sqlalchemy.orm import Session
 #------------------------#
 
 from app.config import DATABASE_CREDENTIALS
-from app.db import init_db
+from app.db import get_session_factory
 from app.services.auth_service import AuthService
 from app.utils.jwt_handler import generate_token
 from app.utils.time_formatters import _format_arbitrary_dt
@@ -83,7 +83,7 @@ class AuthResource(Resource):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.auth_service = AuthService()
-        self.engine, self.Session = init_db(DATABASE_CREDENTIALS)
+        self.Session = get_session_factory(DATABASE_CREDENTIALS)
 
     @auth_ns.doc('post_auth')
     @auth_ns.expect(auth_query_model)
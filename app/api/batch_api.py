@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#----------------#
+# Import modules #
+#----------------#
+
+from flask import request
+from flask_restx import Resource, Namespace, fields
+
+#------------------------#
+# Import project modules #
+#------------------------#
+
+from app.config import DATABASE_CREDENTIALS
+from app.db import get_session_factory
+from app.exceptions import ValidationError
+from app.services.batch_service import BATCH_RESOURCE_ROLES, BatchService
+from app.utils.admission_control import admission_controlled
+from app.utils.auth_decorators import role_required, token_required
+from app.utils.query_deadline import query_deadline
+
+#------------#
+# Operations #
+#------------#
+
+# Define namespaces #
+#-------------------#
+
+batch_ns = Namespace('batch', description='FHIR batch operations')
+
+# Response to the users who cannot access any batch resource, checked before admission
+BATCH_FORBIDDEN = {'field': 'authorization', 'error': 'Insufficient permissions to access any batch resource.'}
+
+# Request model
+batch_request_model = batch_ns.model('BatchBundle', {
+    'resourceType': fields.String(required=True, description='Resource type', example='Bundle'),
+    'type': fields.String(required=True, description='Bundle type', example='batch'),
+    'entry': fields.List(fields.Raw, required=True, description='Search requests', example=[
+        {"request": {"method": "GET", "url": "vital_signs/0000021561/2025-02-13 10:00/2025-02-13 10:50"}},
+        {"request": {"method": "GET", "url": "vital_signs?id_patient=0000021562&min_date=2025-02-13&max_date=2025-02-14"}}
+    ])
+})
+
+# Define models for responses #
+#-----------------------------#
+
+batch_success_response_model = batch_ns.model('BatchSuccessResponse', {
+    'resourceType': fields.String(description='Resource type', example='Bundle'),
+    'type': fields.String(description='Bundle type', example='batch-response'),
+    'entry': fields.List(fields.Raw, description='One response per request entry', example=[
+        {
+            "resource": {"resourceType": "Bundle", "type": "searchset", "total": 0, "entry": []},
+            "response": {"status": "200 OK"}
+        },
+        {
+            "response": {
+                "status": "403 Forbidden",
+                "outcome": {
+                    "resourceType": "OperationOutcome",
+                    "issue": [{
+                        "severity": "error",
+                        "code": "forbidden",
+                        "diagnostics": "Insufficient permissions to access operational_data data"
+                    }]
+                }
+            }
+        }
+    ])
+})
+
+batch_validation_error_model = batch_ns.model('BatchValidationError', {
+    'field': fields.String(description='Field with error', example='validation'),
+    'error': fields.String(description='Error message', example="Only Bundles of type 'batch' are supported")
+})
+
+batch_server_error_model = batch_ns.model('BatchServerError', {
+    'field': fields.String(description='Field with error', example='server'),
+    'error': fields.String(description='Error message', example='An unexpected error occurred')
+})
+
+# Define routes #
+#---------------#
+
+# FHIR Batch Endpoint (/batch)
+"""
+Purpose: Runs several vital signs and operational data searches in one HTTP request
+Access: Authenticated users; every entry is checked against the user's role
+Response: FHIR batch-response Bundle with one entry per search request
+"""
+@batch_ns.route('')
+class Batch(Resource):
+    @batch_ns.doc('post_batch')
+    @batch_ns.expect(batch_request_model)
+    @batch_ns.response(200, 'Success', batch_success_response_model)
+    @batch_ns.response(400, 'Validation Error', batch_validation_error_model, example={
+        "field": "validation",
+        "error": "Only Bundles of type 'batch' are supported"
+    })
+    @batch_ns.response(403, 'Forbidden', batch_validation_error_model, example=BATCH_FORBIDDEN)
+    @batch_ns.response(500, 'Server Error', batch_server_error_model, example={
+        "field": "server",
+        "error": "An unexpected error occurred"
+    })
+    @batch_ns.response(429, 'Too Many Requests (see the Retry-After header)')
+    @token_required
+    @role_required(*BATCH_RESOURCE_ROLES.values(), error=BATCH_FORBIDDEN)
+    @admission_controlled('batch')
+    @query_deadline('batch')
+    def post(self):
+        """Process a FHIR batch Bundle of search requests on a single database connection."""
+        user = request.user  # Contains 'username' and 'role'
+        session = None
+        try:
+            session = get_session_factory(DATABASE_CREDENTIALS)()
+            batch_service = BatchService(session)
+            result = batch_service.process_batch(request.get_json(), user['role'])
+            return result, 200
+        except ValidationError as e:
+            return {'field': 'validation', 'error': str(e)}, 400
+        except Exception as e:
+            return {'field': 'server', 'error': str(e)}, 500
+        finally:
+            if session is not None:
+                session.close()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#----------------#
+# Import modules #
+#----------------#
+
+from flask import Response
+from flask_restx import Resource, Namespace
+
+#------------------------#
+# Import project modules #
+#------------------------#
+
+from app.utils.metrics import render_prometheus
+
+#------------#
+# Operations #
+#------------#
+
+# Define namespaces #
+#-------------------#
+
+metrics_ns = Namespace('metrics', description='Service metrics in Prometheus format')
+
+# Define routes #
+#---------------#
+
+# Metrics Endpoint (/metrics)
+"""
+Purpose: Exposes the in-process metrics (latency histograms per endpoint, stage and table,
+         admission control, coalescing, subscriptions, query cancellations)
+Access: Public, for the Prometheus scraper
+Response: Prometheus text exposition format
+"""
+@metrics_ns.route('')
+class Metrics(Resource):
+    """Resource for scraping the service metrics."""
+
+    @metrics_ns.doc('get_metrics')
+    @metrics_ns.produces(['text/plain'])
+    @metrics_ns.response(200, 'Metrics in Prometheus text format')
+    def get(self):
+        """Return every registered metric in the Prometheus text exposition format."""
+        return Response(
+            response=render_prometheus(),
+            status=200,
+            content_type=PROMETHEUS_CONTENT_TYPE
+        )
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
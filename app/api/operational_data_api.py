@@ -14,11 +14,13 @@ from flask_restx import Resource, fields, Namespace
 
 from app.config import DATABASE_CREDENTIALS
 from app.constants.operational_tables import OPERATIONAL_TABLES
-from app.db import init_db
-from app.exceptions import ValidationError
+from app.db import request_session
+from app.exceptions import RequestTimeoutError, ValidationError
 from app.services.patient_service import PatientService
-from app.utils.auth_decorators import token_required
-from app.validators.patient_validators import PatientDataValidator
+from app.utils.admission_control import admission_controlled
+from app.utils.auth_decorators import role_required, token_required
+from app.utils.query_deadline import query_deadline
+from app.validators.request_validator import RequestValidator
 
 #------------#
 # Operations #
@@ -32,13 +34,17 @@ api = Namespace(
     description='Operational data retrieval operations (admin only).'
 )
 
+# Response to the users other than admins, checked before admission
+OPERATIONAL_DATA_FORBIDDEN = {'message': 'Insufficient permissions. Only admins can access operational data.'}
+
 # Request model
 operational_query_model = api.model('OperationalQuery', {
     'id_patient': fields.String(required=True, description='ID value for the patient', example='0000021561'),
     'date_range': fields.Nested(api.model('DateRange', {
         'min_date': fields.String(description='Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM)', example='2025-02-13 10:00'),
         'max_date': fields.String(description='End date (YYYY-MM-DD or YYYY-MM-DD HH:MM)', example='2025-02-13 10:50')
-    }), required=True)
+    }), required=True),
+    '_since': fields.String(required=False, description='Watermark from a previous response (Bundle meta.tag) or ISO 8601 timestamp. Only resources added or modified at or after it are returned.')
 })
 
 # Response model (generic, as columns vary)
@@ -102,11 +108,11 @@ Response: FHIR Bundle containing operational data observations
 @api.param('id_value', 'ID value for the patient')
 @api.param('min_date', 'Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM). If only date is provided, time defaults to 00:00')
 @api.param('max_date', 'End date (YYYY-MM-DD or YYYY-MM-DD HH:MM). If only date is provided, time defaults to 23:59')
+@api.param('_since', 'Watermark from a previous response (Bundle meta.tag) or ISO 8601 timestamp. Only resources added or modified at or after it are returned.', _in='query', required=False)
 class OperationalData(Resource):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        _, Session = init_db(DATABASE_CREDENTIALS)
-        session = Session()
+        session = request_session(DATABASE_CREDENTIALS)
         self.service = PatientService(session)
 
     @api.doc('get_operational_data')
@@ -145,14 +151,15 @@ class OperationalData(Resource):
         "field": "server",
         "error": "An unexpected error occurred"
     })
+    @api.response(429, 'Too Many Requests (see the Retry-After header)')
     @token_required
+    @role_required('admin', error=OPERATIONAL_DATA_FORBIDDEN)
+    @admission_controlled('operational_data')
+    @query_deadline('operational_data')
     def get(self, id_value, min_date, max_date):
         """
         Retrieve operational data for a patient within a date range (admin only).
         """
-        user = request.user
-        if user['role'] != 'admin':
-            return {'message': 'Insufficient permissions. Only admins can access operational data.'}, 403
         try:
             # Validate required fields
             if not id_value:
@@ -160,28 +167,20 @@ class OperationalData(Resource):
             if not min_date or not max_date:
                 return {'field': 'date_range', 'error': 'Missing or invalid date range. Both min_date and max_date are required.'}, 400
 
-            date_range = {
-                'min_date': min_date,
-                'max_date': max_date
-            }
-
-            # Validate data for each operational table
-            for table_name in OPERATIONAL_TABLES:
-                id_field, date_field = PatientDataValidator.get_field_mappings(table_name)
-                validation_data = {
-                    id_field: id_value,
-                    date_field: date_range
-                }
-                validation_response = PatientDataValidator.validate_request_data(validation_data, id_field, date_field)
-                if validation_response:
-                    return validation_response, 400
+            # Validate ID and date values once for all operational tables
+            query, validation_error = RequestValidator.validate(
+                id_value, min_date, max_date, since=request.args.get('_since')
+            )
+            if validation_error:
+                return validation_error, 400
 
             # Retrieve data from all operational tables
             result = self.service.get_patient_data_across_tables(
                 patient_id=id_value,
                 table_names=OPERATIONAL_TABLES,
                 start_date=min_date,
-                end_date=max_date
+                end_date=max_date,
+                query=query
             )
             
             if not result:
@@ -194,6 +193,8 @@ class OperationalData(Resource):
 
             # Return the FHIR bundle directly
             return result, 200
+        except RequestTimeoutError as e:
+            return {'field': 'timeout', 'error': str(e)}, 504
         except ValidationError as e:
             return {'field': 'validation', 'error': str(e)}, 400
         except Exception as e:
@@ -209,8 +210,7 @@ Response: FHIR Bundle containing operational data observations
 class OperationalDataQuery(Resource):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        _, Session = init_db(DATABASE_CREDENTIALS)
-        session = Session()
+        session = request_session(DATABASE_CREDENTIALS)
         self.service = PatientService(session)
 
     @api.doc('post_operational_data')
@@ -250,7 +250,11 @@ class OperationalDataQuery(Resource):
         "field": "server",
         "error": "An unexpected error occurred"
     })
+    @api.response(429, 'Too Many Requests (see the Retry-After header)')
     @token_required
+    @role_required('admin', error=OPERATIONAL_DATA_FORBIDDEN)
+    @admission_controlled('operational_data')
+    @query_deadline('operational_data')
     def post(self):
         """
         Query operational data for a patient (admin only).
@@ -279,9 +283,6 @@ class OperationalDataQuery(Resource):
         - tarjeta: idtarjeta, None
         - fotos_hospwin: id_paciente, f_actual
         """
-        user = request.user
-        if user['role'] != 'admin':
-            return {'message': 'Insufficient permissions. Only admins can access operational data.'}, 403
         try:
             request_data = request.get_json()
             patient_id = request_data.get('id_patient')
@@ -291,22 +292,19 @@ class OperationalDataQuery(Resource):
                 return {'field': 'id_patient', 'error': 'Missing ID value for the patient'}, 400
             if not date_range or 'min_date' not in date_range or 'max_date' not in date_range:
                 return {'field': 'date_range', 'error': 'Missing or invalid date range. Both min_date and max_date are required.'}, 400
-            # Validate data for each operational table
-            for table_name in OPERATIONAL_TABLES:
-                id_field, date_field = PatientDataValidator.get_field_mappings(table_name)
-                validation_data = {
-                    id_field: patient_id,
-                    date_field: date_range
-                }
-                validation_response = PatientDataValidator.validate_request_data(validation_data, id_field, date_field)
-                if validation_response:
-                    return validation_response, 400
+            # Validate ID and date values once for all operational tables
+            query, validation_error = RequestValidator.validate(
+                patient_id, date_range['min_date'], date_range['max_date'], since=request_data.get('_since')
+            )
+            if validation_error:
+                return validation_error, 400
             # Retrieve data from all operational tables
             result = self.service.get_patient_data_across_tables(
                 patient_id=patient_id,
                 table_names=OPERATIONAL_TABLES,
                 start_date=date_range['min_date'],
-                end_date=date_range['max_date']
+                end_date=date_range['max_date'],
+                query=query
             )
             
             if not result:
@@ -319,6 +317,8 @@ class OperationalDataQuery(Resource):
 
             # Return the FHIR bundle directly
             return result, 200
+        except RequestTimeoutError as e:
+            return {'field': 'timeout', 'error': str(e)}, 504
         except ValidationError as e:
             return {'field': 'validation', 'error': str(e)}, 400
         except Exception as e:
@@ -5,7 +5,7 @@
 # Import modules #
 #----------------#
 
-from flask import Response, request
+from flask import Response, request, stream_with_context
 from flask_restx import Resource, Namespace, fields
 import json
 
@@ -15,12 +15,24 @@ import json
 
 from app.services.patient_service import PatientService
 from app.services.vital_signs_service import VitalSignsService
-from app.db import init_db
-from app.config import DATABASE_CREDENTIALS
-from app.exceptions import ValidationError
-from app.validators.patient_validators import PatientDataValidator
-from app.constants.vital_signs_tables import VITAL_SIGNS_TABLES
-from app.utils.auth_decorators import token_required
+from app.services.vitals_rendering_service import VitalsRenderingService
+from app.services.vitals_stats_service import STATS_BUCKETS, VitalsStatsService
+from app.services.vitals_export_service import (
+    EXPORT_FILE_EXTENSIONS,
+    EXPORT_FORMATS,
+    VitalsExportService,
+    require_pyarrow
+)
+from app.db import request_session
+from app.config import DATABASE_CREDENTIALS, FHIR_RENDERING_ENGINE
+from app.exceptions import ExportUnavailableError, RequestTimeoutError, ValidationError
+from app.services.subscription_service import ObservationBroker
+from app.validators.request_validator import RequestValidator
+from app.utils.admission_control import admission_controlled
+from app.utils.auth_decorators import role_required, token_required
+from app.utils.instrumentation import STAGE_JSON_ENCODE, stage
+from app.utils.query_deadline import query_deadline
+from app.utils.watermark import decode_watermark
 
 #------------#
 # Operations #
@@ -31,6 +43,15 @@ from app.utils.auth_decorators import token_required
 
 vital_signs_ns = Namespace('vital_signs', description='Vital signs data retrieval operations')
 
+# Response to the users other than medical professionals, checked before admission
+VITAL_SIGNS_FORBIDDEN = {
+    'field': 'authorization',
+    'error': 'Insufficient permissions. Only medical professionals can access vital signs data.'
+}
+
+# Process-wide fan-out of new vital signs to the live subscriptions
+observation_broker = ObservationBroker(DATABASE_CREDENTIALS)
+
 # Define models for POST /vital_signs/query #
 #-----------------------------------------#
 
@@ -39,9 +60,59 @@ vital_signs_query_model = vital_signs_ns.model('VitalSignsQuery', {
     'date_range': fields.Nested(vital_signs_ns.model('DateRange', {
         'min_date': fields.String(description='Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM)', example='2025-02-13 10:00'),
         'max_date': fields.String(description='End date (YYYY-MM-DD or YYYY-MM-DD HH:MM)', example='2025-02-13 10:50')
+    }), required=True),
+    '_since': fields.String(required=False, description='Watermark from a previous response (Bundle meta.tag) or ISO 8601 timestamp. Only resources added or modified at or after it are returned.'),
+    '_downsample': fields.Integer(required=False, description='Maximum number of Observations per vital sign, selected with LTTB to keep the peaks and dips of each series (for charts)', example=200)
+})
+
+# Define models for POST /vital_signs/batch #
+#------------------------------------------#
+
+vital_signs_batch_query_model = vital_signs_ns.model('VitalSignsBatchQuery', {
+    'id_patients': fields.List(
+        fields.String,
+        required=True,
+        description='ID values for the patients',
+        example=['0000021561', '0000021562']
+    ),
+    'date_range': fields.Nested(vital_signs_ns.model('BatchDateRange', {
+        'min_date': fields.String(description='Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM)', example='2025-02-13 10:00'),
+        'max_date': fields.String(description='End date (YYYY-MM-DD or YYYY-MM-DD HH:MM)', example='2025-02-13 10:50')
     }), required=True)
 })
 
+vital_signs_batch_response_model = vital_signs_ns.model('VitalSignsBatchResponse', {
+    'resourceType': fields.String(description='Resource type', example='Bundle'),
+    'type': fields.String(description='Bundle type', example='batch-response'),
+    'entry': fields.List(fields.Raw, description='One searchset Bundle per patient', example=[{
+        "resource": {
+            "resourceType": "Bundle",
+            "type": "searchset",
+            "total": 0,
+            "entry": [],
+            "link": [{"relation": "self", "url": "vital_signs/0000021561/2025-02-13 10:00/2025-02-13 10:50"}]
+        },
+        "response": {"status": "200 OK"}
+    }])
+})
+
+# Define models for POST /vital_signs/export #
+#-------------------------------------------#
+
+vital_signs_export_query_model = vital_signs_ns.model('VitalSignsExportQuery', {
+    'id_patients': fields.List(
+        fields.String,
+        required=True,
+        description='ID values for the patients',
+        example=['0000021561', '0000021562']
+    ),
+    'date_range': fields.Nested(vital_signs_ns.model('ExportDateRange', {
+        'min_date': fields.String(description='Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM)', example='2025-02-13 10:00'),
+        'max_date': fields.String(description='End date (YYYY-MM-DD or YYYY-MM-DD HH:MM)', example='2025-02-13 10:50')
+    }), required=True),
+    'format': fields.String(required=False, description="'arrow' (Arrow IPC stream, default) or 'parquet'", example='arrow')
+})
+
 vital_signs_response_model = vital_signs_ns.model('VitalSignsResponse', {
     'resourceType': fields.String(description='Resource type', example='Bundle'),
     'type': fields.String(description='Bundle type', example='searchset'),
@@ -103,14 +174,15 @@ Response: FHIR Bundle containing vital signs observations
 @vital_signs_ns.param('id_value', 'ID value for the patient')
 @vital_signs_ns.param('min_date', 'Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM). If only date is provided, time defaults to 00:00')
 @vital_signs_ns.param('max_date', 'End date (YYYY-MM-DD or YYYY-MM-DD HH:MM). If only date is provided, time defaults to 23:59')
+@vital_signs_ns.param('_since', 'Watermark from a previous response (Bundle meta.tag) or ISO 8601 timestamp. Only resources added or modified at or after it are returned.', _in='query', required=False)
+@vital_signs_ns.param('_downsample', 'Maximum number of Observations per vital sign, selected with LTTB to keep the peaks and dips of each series (for charts)', _in='query', required=False)
 class VitalSignsData(Resource):
     """Resource for retrieving vital signs data across multiple tables using an optimised UNION ALL query."""
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Initialise database session and services
-        _, Session = init_db(DATABASE_CREDENTIALS)
-        session = Session()
+        session = request_session(DATABASE_CREDENTIALS)
         self.patient_service = PatientService(session)
         self.vital_signs_service = VitalSignsService(self.patient_service)
 
@@ -151,19 +223,13 @@ class VitalSignsData(Resource):
         "field": "server",
         "error": "An unexpected error occurred"
     })
+    @vital_signs_ns.response(429, 'Too Many Requests (see the Retry-After header)')
     @token_required
+    @role_required('medical', error=VITAL_SIGNS_FORBIDDEN)
+    @admission_controlled('vital_signs')
+    @query_deadline('vital_signs')
     def get(self, id_value, min_date, max_date):
         """Retrieve all vital signs data for a patient within a date range using an optimised UNION ALL query for better performance."""
-        user = request.user  # Contains 'username' and 'role'
-        if user['role'] != 'medical':
-            return Response(
-                response=json.dumps({
-                    'field': 'authorization',
-                    'error': 'Insufficient permissions. Only medical professionals can access vital signs data.'
-                }),
-                status=403,
-                mimetype='application/json'
-            )
         try:
             # Basic validation for required fields
             if not id_value:
@@ -186,37 +252,53 @@ class VitalSignsData(Resource):
                     mimetype='application/json'
                 )
             
-            # Validate ID value
-            any_table = VITAL_SIGNS_TABLES[0]  # Get any vital signs table for validation
-            id_field, date_field = PatientDataValidator.get_field_mappings(any_table)
-            
-            # Validate ID and date values
-            validation_data = {
-                id_field: id_value,
-                date_field: {
-                    "min_date": min_date,
-                    "max_date": max_date
-                }
-            }
-            
-            validation_response = PatientDataValidator.validate_request_data(
-                validation_data, id_field, date_field
+            # Validate ID and date values once for all vital signs tables
+            query, validation_error = RequestValidator.validate(
+                id_value,
+                min_date,
+                max_date,
+                since=request.args.get('_since'),
+                downsample=request.args.get('_downsample')
             )
-            if validation_response:
-                return validation_response
+            if validation_error:
+                return Response(
+                    response=json.dumps(validation_error),
+                    status=400,
+                    mimetype='application/json'
+                )
+
+            # Stream the Observations rendered by the database into the Bundle
+            if FHIR_RENDERING_ENGINE == 'sql':
+                return Response(
+                    response=VitalsRenderingService(self.patient_service).render_vital_signs(query),
+                    status=200,
+                    mimetype='application/json'
+                )
 
             # Retrieve all vital signs data
             result = self.vital_signs_service.retrieve_all_vital_signs(
                 patient_id=id_value,
                 start_date=min_date,
-                end_date=max_date
+                end_date=max_date,
+                query=query
             )
             
+            with stage(STAGE_JSON_ENCODE):
+                response_body = json.dumps(result)
             return Response(
-                response=json.dumps(result),
+                response=response_body,
                 status=200,
                 mimetype='application/json'
             )
+        except RequestTimeoutError as e:
+            return Response(
+                response=json.dumps({
+                    'field': 'timeout',
+                    'error': str(e)
+                }),
+                status=504,
+                mimetype='application/json'
+            )
         except ValidationError as e:
             return Response(
                 response=json.dumps({
@@ -236,6 +318,59 @@ class VitalSignsData(Resource):
                 mimetype='application/json'
             ) 
 
+# Vital Signs Statistics Endpoint (/vital_signs/<id_value>/<min_date>/<max_date>/$stats)
+"""
+Purpose: Computes statistics of the vital signs of a patient per time bucket within a date range
+Access: Medical professionals only (requires authentication)
+Response: FHIR Bundle with one Observation per vital sign and bucket, the statistics as components
+"""
+@vital_signs_ns.route('/<id_value>/<min_date>/<max_date>/$stats')
+@vital_signs_ns.param('id_value', 'ID value for the patient')
+@vital_signs_ns.param('min_date', 'Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM). If only date is provided, time defaults to 00:00')
+@vital_signs_ns.param('max_date', 'End date (YYYY-MM-DD or YYYY-MM-DD HH:MM). If only date is provided, time defaults to 23:59')
+@vital_signs_ns.param('bucket', "Time bucket of the statistics: 'hour' (default), 'shift' or 'day'", _in='query', required=False)
+class VitalSignsStats(Resource):
+    """Resource for computing count, minimum, maximum, mean and quartiles of the vital signs per time bucket in the database."""
+    
+    @vital_signs_ns.doc('get_vital_signs_stats')
+    @vital_signs_ns.response(200, 'Success', vital_signs_response_model)
+    @vital_signs_ns.response(400, 'Validation Error', vital_signs_validation_error_model, example={
+        "field": "bucket",
+        "error": "Unsupported bucket. Use one of: hour, shift, day"
+    })
+    @vital_signs_ns.response(403, 'Forbidden', vital_signs_forbidden_model, example={
+        "field": "authorization",
+        "error": "Insufficient permissions. Only medical professionals can access vital signs data."
+    })
+    @vital_signs_ns.response(500, 'Server Error', vital_signs_server_error_model, example={
+        "field": "server",
+        "error": "An unexpected error occurred"
+    })
+    @vital_signs_ns.response(429, 'Too Many Requests (see the Retry-After header)')
+    @token_required
+    @role_required('medical', error=VITAL_SIGNS_FORBIDDEN)
+    @admission_controlled('vital_signs')
+    @query_deadline('vital_signs')
+    def get(self, id_value, min_date, max_date):
+        """Compute statistics of the vital signs of a patient per hour, shift or day."""
+        try:
+            bucket = request.args.get('bucket', 'hour')
+            if bucket not in STATS_BUCKETS:
+                return {'field': 'bucket', 'error': f"Unsupported bucket. Use one of: {', '.join(STATS_BUCKETS)}"}, 400
+            # Validate ID and date values once for all vital signs tables
+            query, validation_error = RequestValidator.validate(id_value, min_date, max_date)
+            if validation_error:
+                return validation_error, 400
+            # Aggregate every table in the database with a single query
+            stats_service = VitalsStatsService(PatientService(request_session(DATABASE_CREDENTIALS)))
+            return stats_service.retrieve_stats(query, bucket), 200
+        except RequestTimeoutError as e:
+            return {'field': 'timeout', 'error': str(e)}, 504
+        except ValidationError as e:
+            return {'field': 'validation', 'error': str(e)}, 400
+        except Exception as e:
+            return {'field': 'server', 'error': str(e)}, 500
+
 # Vital Signs Query Endpoint (/vital_signs/query)
 """
 Purpose: Query vital signs data using JSON request body
@@ -282,15 +417,13 @@ class VitalSignsQuery(Resource):
         "field": "server",
         "error": "An unexpected error occurred"
     })
+    @vital_signs_ns.response(429, 'Too Many Requests (see the Retry-After header)')
     @token_required
+    @role_required('medical', error=VITAL_SIGNS_FORBIDDEN)
+    @admission_controlled('vital_signs')
+    @query_deadline('vital_signs')
     def post(self):
         """Query patient vital signs data for all vital sign tables using JSON request body."""
-        user = request.user  # Contains 'username' and 'role'
-        if user['role'] != 'medical':
-            return {
-                'field': 'authorization',
-                'error': 'Insufficient permissions. Only medical professionals can access vital signs data.'
-            }, 403
         try:
             request_data = request.get_json()
             patient_id = request_data.get('id_patient')
@@ -300,28 +433,215 @@ class VitalSignsQuery(Resource):
                 return {'field': 'id_patient', 'error': 'Missing ID value for the patient'}, 400
             if not date_range or 'min_date' not in date_range or 'max_date' not in date_range:
                 return {'field': 'date_range', 'error': 'Missing or invalid date range. Both min_date and max_date are required.'}, 400
-            # Validate ID and date values
-            any_table = VITAL_SIGNS_TABLES[0]
-            id_field, date_field = PatientDataValidator.get_field_mappings(any_table)
-            validation_data = {
-                id_field: patient_id,
-                date_field: date_range
-            }
-            validation_response = PatientDataValidator.validate_request_data(validation_data, id_field, date_field)
-            if validation_response:
-                return validation_response, 400
+            # Validate ID and date values once for all vital signs tables
+            query, validation_error = RequestValidator.validate(
+                patient_id,
+                date_range['min_date'],
+                date_range['max_date'],
+                since=request_data.get('_since'),
+                downsample=request_data.get('_downsample')
+            )
+            if validation_error:
+                return validation_error, 400
             # Retrieve all vital signs data
-            _, Session = init_db(DATABASE_CREDENTIALS)
-            session = Session()
+            session = request_session(DATABASE_CREDENTIALS)
             patient_service = PatientService(session)
+            if FHIR_RENDERING_ENGINE == 'sql':
+                return Response(
+                    response=VitalsRenderingService(patient_service).render_vital_signs(query),
+                    status=200,
+                    mimetype='application/json'
+                )
             vital_signs_service = VitalSignsService(patient_service)
             result = vital_signs_service.retrieve_all_vital_signs(
                 patient_id=patient_id,
                 start_date=date_range['min_date'],
-                end_date=date_range['max_date']
+                end_date=date_range['max_date'],
+                query=query
             )
             return result, 200
+        except RequestTimeoutError as e:
+            return {'field': 'timeout', 'error': str(e)}, 504
         except ValidationError as e:
             return {'field': 'validation', 'error': str(e)}, 400
         except Exception as e:
-            return {'field': 'server', 'error': str(e)}, 500 
\ No newline at end of file
+            return {'field': 'server', 'error': str(e)}, 500
+
+# Vital Signs Batch Endpoint (/vital_signs/batch)
+"""
+Purpose: Retrieves vital signs data for several patients within a date range
+Access: Medical professionals only (requires authentication)
+Response: FHIR batch-response Bundle with one searchset Bundle per patient
+"""
+@vital_signs_ns.route('/batch')
+class VitalSignsBatch(Resource):
+    """Resource for retrieving vital signs data of several patients with a single set-based query."""
+    
+    @vital_signs_ns.doc('post_vital_signs_batch')
+    @vital_signs_ns.expect(vital_signs_batch_query_model)
+    @vital_signs_ns.response(200, 'Success', vital_signs_batch_response_model)
+    @vital_signs_ns.response(400, 'Validation Error', vital_signs_validation_error_model, example={
+        "field": "id_patients[1]",
+        "error": "ID must be a 10 character string containing only digits"
+    })
+    @vital_signs_ns.response(403, 'Forbidden', vital_signs_forbidden_model, example={
+        "field": "authorization",
+        "error": "Insufficient permissions. Only medical professionals can access vital signs data."
+    })
+    @vital_signs_ns.response(500, 'Server Error', vital_signs_server_error_model, example={
+        "field": "server",
+        "error": "An unexpected error occurred"
+    })
+    @vital_signs_ns.response(429, 'Too Many Requests (see the Retry-After header)')
+    @token_required
+    @role_required('medical', error=VITAL_SIGNS_FORBIDDEN)
+    @admission_controlled('vital_signs_batch')
+    @query_deadline('vital_signs_batch')
+    def post(self):
+        """Query vital signs data for a list of patients sharing the same date range."""
+        try:
+            request_data = request.get_json()
+            date_range = request_data.get('date_range', {})
+            if not date_range or 'min_date' not in date_range or 'max_date' not in date_range:
+                return {'field': 'date_range', 'error': 'Missing or invalid date range. Both min_date and max_date are required.'}, 400
+            # Validate the whole ID list and the date range at once
+            query, validation_error = RequestValidator.validate_many(
+                request_data.get('id_patients'), date_range['min_date'], date_range['max_date']
+            )
+            if validation_error:
+                return validation_error, 400
+            # Retrieve the vital signs of every patient in a single query
+            session = request_session(DATABASE_CREDENTIALS)
+            patient_service = PatientService(session)
+            vital_signs_service = VitalSignsService(patient_service)
+            result = vital_signs_service.retrieve_vital_signs_batch(query)
+            return result, 200
+        except RequestTimeoutError as e:
+            return {'field': 'timeout', 'error': str(e)}, 504
+        except ValidationError as e:
+            return {'field': 'validation', 'error': str(e)}, 400
+        except Exception as e:
+            return {'field': 'server', 'error': str(e)}, 500
+
+# Vital Signs Export Endpoint (/vital_signs/export)
+"""
+Purpose: Exports the raw vital signs of several patients within a date range as columnar data
+Access: Medical professionals only (requires authentication)
+Response: Arrow IPC stream or Parquet file with one record batch (row group) per vital signs table
+"""
+@vital_signs_ns.route('/export')
+class VitalSignsExport(Resource):
+    """Resource for exporting vital signs as Apache Arrow or Parquet data, without going through HL7 or FHIR."""
+    
+    @vital_signs_ns.doc('post_vital_signs_export')
+    @vital_signs_ns.expect(vital_signs_export_query_model)
+    @vital_signs_ns.produces(list(EXPORT_FORMATS.values()))
+    @vital_signs_ns.response(200, 'Arrow IPC stream or Parquet file')
+    @vital_signs_ns.response(400, 'Validation Error', vital_signs_validation_error_model, example={
+        "field": "format",
+        "error": "Unsupported export format. Use one of: arrow, parquet"
+    })
+    @vital_signs_ns.response(403, 'Forbidden', vital_signs_forbidden_model, example={
+        "field": "authorization",
+        "error": "Insufficient permissions. Only medical professionals can access vital signs data."
+    })
+    @vital_signs_ns.response(500, 'Server Error', vital_signs_server_error_model, example={
+        "field": "server",
+        "error": "An unexpected error occurred"
+    })
+    @vital_signs_ns.response(501, 'Export unavailable (pyarrow is not installed)', vital_signs_server_error_model, example={
+        "field": "format",
+        "error": "Arrow and Parquet exports require the optional 'pyarrow' dependency"
+    })
+    @vital_signs_ns.response(429, 'Too Many Requests (see the Retry-After header)')
+    @token_required
+    @role_required('medical', error=VITAL_SIGNS_FORBIDDEN)
+    @admission_controlled('vital_signs_export')
+    @query_deadline('vital_signs_export')
+    def post(self):
+        """Export the vital signs of a list of patients sharing the same date range as an Arrow IPC stream or a Parquet file."""
+        try:
+            request_data = request.get_json()
+            export_format = request_data.get('format', 'arrow')
+            if export_format not in EXPORT_FORMATS:
+                return {'field': 'format', 'error': f"Unsupported export format. Use one of: {', '.join(EXPORT_FORMATS)}"}, 400
+            require_pyarrow()
+            date_range = request_data.get('date_range', {})
+            if not date_range or 'min_date' not in date_range or 'max_date' not in date_range:
+                return {'field': 'date_range', 'error': 'Missing or invalid date range. Both min_date and max_date are required.'}, 400
+            # Validate the whole ID list and the date range at once
+            query, validation_error = RequestValidator.validate_many(
+                request_data.get('id_patients'), date_range['min_date'], date_range['max_date']
+            )
+            if validation_error:
+                return validation_error, 400
+            # Read the rows of every table straight into columnar batches
+            export_service = VitalsExportService(request_session(DATABASE_CREDENTIALS))
+            body = export_service.export(query, export_format)
+            return Response(
+                response=body,
+                status=200,
+                mimetype=EXPORT_FORMATS[export_format],
+                headers={
+                    'Content-Disposition': f"attachment; filename=vital_signs.{EXPORT_FILE_EXTENSIONS[export_format]}"
+                }
+            )
+        except ExportUnavailableError as e:
+            return {'field': 'format', 'error': str(e)}, 501
+        except RequestTimeoutError as e:
+            return {'field': 'timeout', 'error': str(e)}, 504
+        except ValidationError as e:
+            return {'field': 'validation', 'error': str(e)}, 400
+        except Exception as e:
+            return {'field': 'server', 'error': str(e)}, 500
+
+# Vital Signs Subscription Endpoint (/vital_signs/<id_value>/subscribe)
+"""
+Purpose: Pushes the vital signs of a patient as they are recorded
+Access: Medical professionals only (requires authentication)
+Response: Server-Sent Events stream of FHIR subscription-notification Bundles
+"""
+@vital_signs_ns.route('/<id_value>/subscribe')
+@vital_signs_ns.param('id_value', 'ID value for the patient')
+@vital_signs_ns.param('_since', 'Watermark of the last notification received (its event ID). Resources added or modified at or after it are sent first. The Last-Event-ID header is used if absent.', _in='query', required=False)
+class VitalSignsSubscription(Resource):
+    """Resource for receiving new vital signs of a patient as Server-Sent Events."""
+    
+    @vital_signs_ns.doc('subscribe_vital_signs')
+    @vital_signs_ns.produces(['text/event-stream'])
+    @vital_signs_ns.response(200, 'Event stream')
+    @vital_signs_ns.response(400, 'Validation Error', vital_signs_validation_error_model, example={
+        "field": "_since",
+        "error": "'_since' must be a watermark token returned by a previous response or an ISO 8601 timestamp"
+    })
+    @vital_signs_ns.response(403, 'Forbidden', vital_signs_forbidden_model, example={
+        "field": "authorization",
+        "error": "Insufficient permissions. Only medical professionals can access vital signs data."
+    })
+    @vital_signs_ns.response(500, 'Server Error', vital_signs_server_error_model, example={
+        "field": "server",
+        "error": "An unexpected error occurred"
+    })
+    @token_required
+    @role_required('medical', error=VITAL_SIGNS_FORBIDDEN)
+    def get(self, id_value):
+        """Subscribe to the new vital signs of a patient (Server-Sent Events)."""
+        id_error = RequestValidator.validate_id(id_value)
+        if id_error:
+            return {'field': 'id_field', 'error': id_error}, 400
+        since = request.args.get('_since') or request.headers.get('Last-Event-ID')
+        try:
+            since = decode_watermark(since) if since else None
+        except ValueError as e:
+            return {'field': '_since', 'error': str(e)}, 400
+        try:
+            # Queue what the client missed before streaming new rows
+            subscription = observation_broker.subscribe(id_value, since)
+        except Exception as e:
+            return {'field': 'server', 'error': str(e)}, 500
+        return Response(
+            stream_with_context(observation_broker.stream(subscription)),
+            status=200,
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
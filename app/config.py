@@ -40,4 +40,191 @@ DATABASE_ERROR_CODES = {
     "08001": "Unable to establish connection/wrong host name",
     "08006": "Connection failure/connection terminated",
     "42501": "Insufficient privileges"
-}
\ No newline at end of file
+}
+
+# %% 3. ADMISSION CONTROL
+
+# Concurrency budgets per role and endpoint. For each budget:
+# - 'max_concurrent': requests running at once
+# - 'max_queue': requests allowed to wait for a free slot
+# - 'max_wait': seconds a request may wait before being rejected with 429
+# The budgets of all endpoints should fit in the database connection pool
+# (5 connections plus 10 overflow by default), so admins pulling large
+# operational histories cannot starve the vital signs requests.
+ADMISSION_LIMITS = {
+    'medical': {
+        'vital_signs': {'max_concurrent': 8, 'max_queue': 32, 'max_wait': 5.0},
+        'vital_signs_batch': {'max_concurrent': 2, 'max_queue': 8, 'max_wait': 10.0},
+        'vital_signs_export': {'max_concurrent': 2, 'max_queue': 4, 'max_wait': 10.0},
+        'batch': {'max_concurrent': 2, 'max_queue': 8, 'max_wait': 10.0},
+    },
+    'admin': {
+        'operational_data': {'max_concurrent': 2, 'max_queue': 4, 'max_wait': 10.0},
+        'batch': {'max_concurrent': 1, 'max_queue': 2, 'max_wait': 10.0},
+    },
+}
+
+# Budget of any other role and endpoint combination
+DEFAULT_ADMISSION_LIMIT = {'max_concurrent': 1, 'max_queue': 2, 'max_wait': 5.0}
+
+
+# %% 4. QUERY DEADLINES
+
+# Seconds the database queries of a request may run, per endpoint. The value
+# is applied as the Postgres statement_timeout of the request's transactions,
+# and the backend query is cancelled once the whole request has run for that
+# long (plus QUERY_DEADLINE_GRACE) or as soon as the client disconnects.
+QUERY_TIMEOUTS = {
+    'vital_signs': 10.0,
+    'vital_signs_batch': 20.0,
+    'vital_signs_export': 60.0,
+    'operational_data': 30.0,
+    'batch': 30.0,
+}
+
+# Timeout of any other endpoint
+DEFAULT_QUERY_TIMEOUT = 30.0
+
+# Extra seconds before a request past its timeout is cancelled from the
+# service, so that a single slow statement is normally stopped by Postgres
+QUERY_DEADLINE_GRACE = 1.0
+
+
+# %% 5. SLOW QUERY LOG
+
+# Statements running longer than this many seconds are logged, with their
+# bound parameters (patient IDs redacted)
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', '0.5'))
+
+# Fraction of the slow SELECT statements re-run with EXPLAIN (ANALYZE, BUFFERS)
+# to capture their plan, in a background thread
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', '0.1'))
+
+# Seconds an EXPLAIN ANALYZE may run before it is abandoned
+SLOW_QUERY_EXPLAIN_TIMEOUT = 30.0
+
+# Slow statements kept in memory for the admin endpoint
+SLOW_QUERY_LOG_SIZE = 500
+
+# JSON lines file the slow statements are also appended to (disabled if empty)
+SLOW_QUERY_LOG_PATH = os.getenv('SLOW_QUERY_LOG_PATH', '')
+
+
+# %% 6. MEMORY PROFILING
+
+# Frames kept per traced allocation while a request is profiled; more frames
+# attribute the allocations better but slow the profiled request down
+MEMORY_PROFILE_FRAMES = 10
+
+# Invocations of each stage, per profiled request, bracketed by snapshots to
+# find the top allocation sites (peak and retained bytes cover every invocation)
+MEMORY_PROFILE_SITE_SAMPLES = 3
+
+# Allocation sites reported per stage
+MEMORY_PROFILE_TOP_SITES = 10
+
+# Profiles kept in memory for the admin endpoint
+MEMORY_PROFILE_HISTORY = 20
+
+# Directory the profiles are also written to, one JSON file each (disabled if empty)
+MEMORY_PROFILE_DIR = os.getenv('MEMORY_PROFILE_DIR', '')
+
+
+# %% 7. STARTUP
+
+# Import the heavy dependencies (FHIR models, hl7apy, argon2, numpy) when the
+# application is created instead of on first use. Useful with a preforking
+# server that loads the application once before forking its workers
+EAGER_IMPORTS = os.getenv('EAGER_IMPORTS', '0').lower() in ('1', 'true', 'yes')
+
+
+# %% 8. SAMPLING PROFILER
+
+# Sample the call stacks of a fraction of the requests (the profiler can also
+# be switched on and off, and the fraction changed, from the admin endpoint)
+SAMPLING_PROFILER_ENABLED = os.getenv('SAMPLING_PROFILER_ENABLED', '0').lower() in ('1', 'true', 'yes')
+
+# Fraction of the requests profiled
+SAMPLING_PROFILER_RATE = float(os.getenv('SAMPLING_PROFILER_RATE', '0.01'))
+
+# Seconds between two samples of the stack of a profiled request
+SAMPLING_PROFILER_INTERVAL = 0.005
+
+# Directory of the collapsed stack files, one per endpoint (disabled if empty)
+SAMPLING_PROFILER_DIR = os.getenv('SAMPLING_PROFILER_DIR', '')
+
+# Size at which a collapsed stack file is rotated, and rotated files kept
+SAMPLING_PROFILER_MAX_FILE_BYTES = 10 * 1024 * 1024
+SAMPLING_PROFILER_BACKUPS = 5
+
+
+# %% 9. QUERY BUDGETS
+
+# Database work a request may do, by endpoint (longest matching URL rule
+# prefix): SQL statements issued, rows returned and bytes of JSON rows
+# received (None for no limit). Requests over budget are logged with their
+# statements and counted in query_budget_exceeded_total; they are not rejected.
+# A retrieval is one statement_timeout setup plus one consolidated query, and
+# a downsampled one (_downsample) one series query before it
+QUERY_BUDGETS = {
+    '/api/vital_signs/<id_value>/subscribe': None,  # Long-lived stream, not checked
+    # Exports read typed columns, never JSON rows
+    '/api/vital_signs/export': {'statements': 2, 'rows': 5000000, 'bytes': 0},
+    '/api/vital_signs/batch': {'statements': 2, 'rows': 1000000, 'bytes': 1024 * 1024 * 1024},
+    '/api/vital_signs': {'statements': 3, 'rows': 200000, 'bytes': 256 * 1024 * 1024},
+    '/api/operational_data': {'statements': 2, 'rows': 200000, 'bytes': 256 * 1024 * 1024},
+    # One query per merged date range or entry, at most MAX_BATCH_ENTRIES (100)
+    '/api/batch': {'statements': 101, 'rows': 1000000, 'bytes': 1024 * 1024 * 1024},
+    '/api/auth': {'statements': 1, 'rows': 1, 'bytes': None},
+    '/api/metadata': {'statements': 0, 'rows': 0, 'bytes': 0},
+    '/api/metrics': {'statements': 0, 'rows': 0, 'bytes': 0},
+    '/api/admin': {'statements': 0, 'rows': 0, 'bytes': 0},
+}
+
+# Budget of any other endpoint
+DEFAULT_QUERY_BUDGET = {'statements': 10, 'rows': 100000, 'bytes': 128 * 1024 * 1024}
+
+
+# %% 10. VITAL SIGNS STATISTICS
+
+# Shifts of the `$stats` operation: hour the first shift of the day starts
+# at, and length of a shift in hours (e.g. 6 and 8 for shifts starting at
+# 06:00, 14:00 and 22:00)
+STATS_SHIFT_START_HOUR = 7
+STATS_SHIFT_HOURS = 8
+
+
+# %% 11. RESPONSE COMPRESSION
+
+# Compression levels of the responses, by endpoint (longest matching URL rule
+# prefix) and content coding: gzip (1-9), br (0-11, with the optional brotli
+# package) and zstd (1-22, with the optional zstandard package). The client's
+# Accept-Encoding header picks the coding; None disables the compression of
+# an endpoint. Streamed responses are compressed and flushed event by event
+COMPRESSION_LEVELS = {
+    # Small events that must not wait for a buffer to fill: fastest levels
+    '/api/vital_signs/<id_value>/subscribe': {'gzip': 1, 'br': 1, 'zstd': 1},
+    # Large Bundles sent to a few clients: smaller bodies are worth more CPU
+    '/api/vital_signs/batch': {'gzip': 6, 'br': 6, 'zstd': 6},
+    '/api/batch': {'gzip': 6, 'br': 6, 'zstd': 6},
+}
+
+# Levels of any other endpoint
+DEFAULT_COMPRESSION_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_BYTES = 1024
+
+# Bytes of compressed bodies kept, by content, so that identical responses
+# (e.g. coalesced requests or metadata) are compressed only once (0 disables
+# the cache)
+COMPRESSION_CACHE_BYTES = int(os.getenv('COMPRESSION_CACHE_BYTES', str(64 * 1024 * 1024)))
+
+
+# %% 12. FHIR RENDERING
+
+# Engine rendering the vital signs Bundles: 'python' builds each Observation
+# from the row's HL7 v2 message; 'sql' has PostgreSQL render the final
+# Observations as JSON text (json_build_object), which are streamed into the
+# Bundle without being parsed
+FHIR_RENDERING_ENGINE = os.getenv('FHIR_RENDERING_ENGINE', 'python').lower()
@@ -14,6 +14,22 @@ INVALID_DATE_RANGE_ERROR = "'min_date' must be less than or equal to 'max_date'"
 INVALID_DATE_RANGE_FORMAT_ERROR = "date range filtering requires a dictionary with 'min_date' and 'max_date' keys"
 MISSING_DATE_VALUES_ERROR = "both 'min_date' and 'max_date' are required for date range filtering"
 
+INVALID_WATERMARK_ERROR = "'_since' must be a watermark token returned by a previous response or an ISO 8601 timestamp"
+
+# Downsampling errors
+INVALID_DOWNSAMPLE_ERROR = "'_downsample' must be the maximum number of points per vital sign"
+
 # Field validation errors
 INVALID_ID_FORMAT_ERROR = "ID must be a 10 character string containing only digits"
-INVALID_ID_TYPE_ERROR = "ID must be a string with numeric characters" 
\ No newline at end of file
+INVALID_ID_TYPE_ERROR = "ID must be a string with numeric characters"
+
+# Batch request errors
+INVALID_ID_LIST_ERROR = "'id_patients' must be a non-empty list of patient IDs"
+BATCH_SIZE_EXCEEDED_ERROR = "too many patient IDs in a single batch request"
+
+# Admission control errors
+ADMISSION_QUEUE_FULL_ERROR = "too many requests waiting for this endpoint. Retry after the number of seconds given in the Retry-After header"
+ADMISSION_TIMEOUT_ERROR = "the request waited too long for a free slot. Retry after the number of seconds given in the Retry-After header"
+
+# Query deadline errors
+QUERY_TIMEOUT_ERROR = "the database query took longer than this endpoint allows and was cancelled. Narrow the date range or retry later"
@@ -5,7 +5,8 @@
 Operational Tables module.
 
 This module defines which tables are considered operational data
-for combined data retrieval operations.
+for combined data retrieval operations, and how each of them is
+queried by the consolidated UNION ALL query.
 """
 
 # Import project modules #
@@ -53,4 +54,51 @@ OPERATIONAL_TABLES = [
     MONITORES_ACTIVOS,
     TARJETA,
     FOTOS_HOSPWIN
-] 
\ No newline at end of file
+]
+
+# Query plan strategies #
+#-----------------------#
+
+# Filter on the patient ID and the date range
+QUERY_PLAN_PATIENT_AND_DATE = 'patient_and_date'
+# Filter on the patient ID only (the table has no date field)
+QUERY_PLAN_PATIENT = 'patient'
+# Rows are keyed on another ID, resolved for the patient through a link table
+QUERY_PLAN_LINKED = 'linked'
+# The table is not patient-scoped and is never part of a patient query
+QUERY_PLAN_EXCLUDED = 'excluded'
+
+# Explicit query plan for each operational table
+OPERATIONAL_QUERY_PLANS = {
+    DIURESIS: {'strategy': QUERY_PLAN_PATIENT_AND_DATE},
+    DEPOSICIONES: {'strategy': QUERY_PLAN_PATIENT_AND_DATE},
+    ELECTROCARDIOGRAMA: {'strategy': QUERY_PLAN_PATIENT_AND_DATE},
+    MEDICACION: {'strategy': QUERY_PLAN_PATIENT_AND_DATE},
+    CIERRE_ULCERA: {'strategy': QUERY_PLAN_PATIENT_AND_DATE},
+    TRATAMIENTO_ULCERA: {'strategy': QUERY_PLAN_PATIENT_AND_DATE},
+    ULCERAS: {'strategy': QUERY_PLAN_PATIENT_AND_DATE},
+    CONTENCION: {'strategy': QUERY_PLAN_PATIENT_AND_DATE},
+    TIPO_SONDA: {'strategy': QUERY_PLAN_PATIENT_AND_DATE},
+    CUIDADO_ULCERA: {'strategy': QUERY_PLAN_PATIENT_AND_DATE},
+    MENSTRUACION: {'strategy': QUERY_PLAN_PATIENT_AND_DATE},
+    PACIENTES_HOSPWIN: {'strategy': QUERY_PLAN_PATIENT},
+    USUARIO_HOSPWIN: {
+        'strategy': QUERY_PLAN_EXCLUDED,
+        'reason': 'staff user accounts, keyed on the user ID'
+    },
+    GRUPOUSU_HOSPWIN: {
+        'strategy': QUERY_PLAN_EXCLUDED,
+        'reason': 'staff user groups, keyed on the user ID'
+    },
+    MONITOR: {
+        'strategy': QUERY_PLAN_LINKED,
+        'link_table': MONITORES_ACTIVOS,
+        'link_field': 'id_monitor'
+    },
+    MONITORES_ACTIVOS: {'strategy': QUERY_PLAN_PATIENT_AND_DATE},
+    TARJETA: {
+        'strategy': QUERY_PLAN_EXCLUDED,
+        'reason': 'staff cards, keyed on the card and user IDs'
+    },
+    FOTOS_HOSPWIN: {'strategy': QUERY_PLAN_PATIENT_AND_DATE}
+}
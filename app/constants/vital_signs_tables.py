@@ -35,4 +35,44 @@ VITAL_SIGNS_TABLES = [
     GLUCOSA,
     PESO,
     TALLA
-] 
\ No newline at end of file
+] 
+
+# Value columns of the vital signs tables, with their component name (empty if
+# the table records a single value). `constantes` only links the other tables.
+VITAL_SIGNS_VALUE_FIELDS = {
+    FRECUENCIA_CARDIACA: (('', 'valor_fc'),),
+    FRECUENCIA_RESPIRATORIA: (('', 'valor_fr'),),
+    GLUCOSA: (('', 'valor'),),
+    PESO: (('', 'valor'),),
+    PRESION_ARTERIAL: (('systolic', 'sistolica_pa'), ('diastolic', 'diastolica_pa')),
+    SATURACION_OXIGENO: (('', 'valor_so'),),
+    TALLA: (('', 'valor'),),
+    TEMPERATURA: (('', 'valor_temp'),)
+}
+
+# Time of the measurement, per table (the date field of `TABLE_FIELD_MAPPING`
+# is the time it was recorded)
+VITAL_SIGNS_MEASURED_FIELDS = {
+    FRECUENCIA_CARDIACA: 'fecha_medicion_fc',
+    FRECUENCIA_RESPIRATORIA: 'fecha_medicion_fr',
+    GLUCOSA: 'fecha_medicion',
+    PESO: 'fecha_medicion',
+    PRESION_ARTERIAL: 'fecha_medicion_pa',
+    SATURACION_OXIGENO: 'fecha_medicion_so',
+    TALLA: 'fecha_medicion',
+    TEMPERATURA: 'fecha_medicion_temp'
+}
+
+# LOINC codes of the value components
+VITAL_SIGNS_COMPONENT_CODES = {
+    'systolic': ('8480-6', 'Systolic blood pressure'),
+    'diastolic': ('8462-4', 'Diastolic blood pressure')
+}
+
+# Unit column of the tables recording the unit of each row (the others are in
+# the unit of their `LOINC_MAPPINGS` entry)
+VITAL_SIGNS_UNIT_FIELDS = {
+    GLUCOSA: 'escala',
+    PESO: 'escala',
+    TEMPERATURA: 'escala_temp'
+}
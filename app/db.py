@@ -5,22 +5,36 @@
 # Import modules #
 #----------------#
 
-from sqlalchemy import create_engine, text, select, union_all
+from flask import g, has_app_context
+from sqlalchemy import Float, String, any_, bindparam, create_engine, event, func, text, select, union_all
 from sqlalchemy.sql.expression import cast, literal_column
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from datetime import datetime
+import time
+from operator import itemgetter
+from types import FunctionType
 from urllib.parse import quote_plus
-from typing import Dict
+from typing import Dict, Optional
 
 #------------------------#
 # Import project modules #
 #------------------------#
 
-from app.utils.time_formatters import parse_dt_string
-from app.constants.error_messages import (
-    INVALID_DATE_FORMAT_ERROR,
-    INVALID_DATE_RANGE_ERROR
+from app.constants.operational_tables import (
+    OPERATIONAL_QUERY_PLANS,
+    QUERY_PLAN_EXCLUDED,
+    QUERY_PLAN_LINKED,
+    QUERY_PLAN_PATIENT,
+    QUERY_PLAN_PATIENT_AND_DATE
 )
+from app.utils.date_range import DateRange
+from app.utils.instrumentation import STAGE_FETCH, STAGE_HYDRATION, STAGE_SQL, stage
+from app.utils.metrics import gauge
+from app.utils.query_budget import accounted_json_loads, record_statement
+from app.utils.query_deadline import cancellation_error, current_deadline
+from app.utils.slow_query_log import SLOW_QUERY_LOG
 
 #-----------------#
 # Declare objects #
@@ -32,6 +46,24 @@ Base = declarative_base()
 # Model registry to store all models
 MODEL_REGISTRY = {}
 
+# Read-only row classes, by model class
+_ROW_CLASSES = {}
+
+# Session factories bound to shared engines, by database type and credentials
+_SESSION_FACTORIES = {}
+
+# Connection pool metrics of the shared engines
+DB_POOL_CHECKED_OUT = gauge(
+    'db_pool_checked_out',
+    'Connections of the shared pool in use, by database',
+    ('pool',)
+)
+DB_POOL_CAPACITY = gauge(
+    'db_pool_capacity',
+    'Connections the shared pool can hand out (size plus overflow), by database',
+    ('pool',)
+)
+
 #------------------#
 # Define functions #
 #------------------#
@@ -73,7 +105,8 @@ def _init_engine(config, database_type):
             f"postgresql://{config['username']}:{quote_plus(config['password'])}@"
             f"{config['host']}:{config['port']}/{config['database_name']}"
         )
-        engine = create_engine(connection_string)
+        # JSON(B) columns are decoded by `accounted_json_loads`, which counts the bytes received
+        engine = create_engine(connection_string, json_deserializer=accounted_json_loads)
         return engine
     else:
         raise ValueError(f"Unsupported database type: {database_type}")
@@ -87,6 +120,116 @@ def init_db(config, database_type="postgresql"):
     Session = sessionmaker(bind=engine)
     return engine, Session
 
+def get_session_factory(config, database_type="postgresql"):
+    """
+    Return a session factory bound to a shared, pooled engine.
+    
+    Unlike `init_db`, which creates a new engine (and connection pool) on
+    every call, the engine is created once per set of credentials and reused
+    by every request of the process.
+    
+    Parameters
+    ----------
+    config : dict
+        Database credentials (see `_init_engine`)
+    database_type : str
+        The type of database for SQLAlchemy configuration
+        
+    Returns
+    -------
+    sqlalchemy.orm.sessionmaker
+        Session factory bound to the shared engine
+    """
+    cache_key = (database_type.lower(), tuple(sorted(config.items())))
+    session_factory = _SESSION_FACTORIES.get(cache_key)
+    if session_factory is None:
+        engine = _init_engine(config, database_type)
+        Base.metadata.create_all(engine)
+        _instrument_pool(engine, config.get('database_name') or database_type)
+        session_factory = _SESSION_FACTORIES.setdefault(cache_key, sessionmaker(bind=engine))
+    return session_factory
+
+def request_session(config, database_type="postgresql"):
+    """
+    Return a session of the shared engine (see `get_session_factory`) that is
+    closed, and its connection returned to the pool, when the current request
+    ends. Outside an application context the caller must close it.
+    """
+    session = get_session_factory(config, database_type)()
+    if has_app_context():
+        g.setdefault('db_sessions', []).append(session)
+    return session
+
+def close_request_sessions(exception=None):
+    """Close the sessions opened by `request_session` during the request (teardown handler)."""
+    for session in g.pop('db_sessions', []):
+        session.close()
+
+def _instrument_pool(engine, pool_name):
+    """Export the capacity of an engine's pool and the connections checked out of it."""
+    pool = engine.pool
+    if hasattr(pool, 'size'):
+        DB_POOL_CAPACITY.set(pool.size() + max(getattr(pool, '_max_overflow', 0), 0), pool=pool_name)
+
+    event.listen(pool, 'checkout', lambda *args: DB_POOL_CHECKED_OUT.inc(pool=pool_name))
+    event.listen(pool, 'checkin', lambda *args: DB_POOL_CHECKED_OUT.dec(pool=pool_name))
+
+@event.listens_for(Session, 'after_begin')
+def _apply_request_deadline(session, transaction, connection):
+    """
+    Apply the deadline of the current request, if any, to a new transaction.
+    
+    The request's timeout becomes the transaction's `statement_timeout`
+    (`set_config(..., true)` is the same as `SET LOCAL`, so the pooled
+    connection is reset at the end of the transaction), and the connection is
+    tracked so the watchdog can cancel its query.
+    """
+    deadline = current_deadline()
+    if deadline is None or connection.dialect.name != 'postgresql':
+        return
+    connection.execute(
+        text("SELECT set_config('statement_timeout', :timeout, true)"),
+        {'timeout': f"{deadline.statement_timeout_ms}ms"}
+    )
+    dbapi_connection = connection.connection.dbapi_connection
+    deadline.register_connection(dbapi_connection)
+    session.info['request_deadline'] = (deadline, dbapi_connection)
+
+@event.listens_for(Session, 'after_transaction_end')
+def _release_request_deadline(session, transaction):
+    """Stop tracking the connection of a finished transaction, which goes back to the pool."""
+    if transaction.parent is None and 'request_deadline' in session.info:
+        deadline, dbapi_connection = session.info.pop('request_deadline')
+        deadline.unregister_connection(dbapi_connection)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    """Time every statement, for the slow query log."""
+    conn.info.setdefault('statement_start_times', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _log_slow_statement(conn, cursor, statement, parameters, context, executemany):
+    """Record the statement in the slow query log if it ran longer than the threshold."""
+    start_times = conn.info.get('statement_start_times')
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+    if not executemany:
+        SLOW_QUERY_LOG.record(statement, parameters, duration, conn.engine)
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _account_statement(conn, cursor, statement, parameters, context, executemany):
+    """Count the statement and the rows it returned in the query budget of the current request."""
+    rows = cursor.rowcount if cursor.description is not None else 0
+    record_statement(statement, max(rows, 0))
+
+@event.listens_for(Engine, 'handle_error')
+def _discard_statement_timer(exception_context):
+    """Stop timing a statement that failed."""
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('statement_start_times'):
+        connection.info['statement_start_times'].pop()
+
 def _apply_date_range_filter(query, min_value, max_value, date_field):
     """
     Apply date range filter, always including both edges of the range.
@@ -95,9 +238,11 @@ def _apply_date_range_filter(query, min_value, max_value, date_field):
     ----------
     query : sqlalchemy.orm.query.Query
         The current query object.
-    min_value : str
+    min_value : str or DateRange
         Start date in format 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'.
         If only date is provided, time defaults to 00:00.
+        An already parsed DateRange may be passed instead, in which case
+        `max_value` is ignored.
     max_value : str
         End date in format 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'.
         If only date is provided, time defaults to 23:59.
@@ -114,30 +259,13 @@ def _apply_date_range_filter(query, min_value, max_value, date_field):
     ValueError
         If date format is incorrect.
     """
-    try:
-        # Try parsing with time first
-        try:
-            min_date = parse_dt_string(min_value, '%Y-%m-%d %H:%M')
-        except ValueError:
-            # If that fails, try date-only format and set time to 00:00
-            min_date = parse_dt_string(min_value, '%Y-%m-%d')
-            min_date = min_date.replace(hour=0, minute=0)
-
-        try:
-            max_date = parse_dt_string(max_value, '%Y-%m-%d %H:%M')
-        except ValueError:
-            # If that fails, try date-only format and set time to 23:59
-            max_date = parse_dt_string(max_value, '%Y-%m-%d')
-            max_date = max_date.replace(hour=23, minute=59)
-
-    except ValueError:
-        raise ValueError(INVALID_DATE_FORMAT_ERROR)
-
-    if min_date > max_date:
-        raise ValueError(INVALID_DATE_RANGE_ERROR)
+    if isinstance(min_value, DateRange):
+        date_range = min_value
+    else:
+        date_range = DateRange.from_strings(min_value, max_value)
 
     # Always include both edges of the range
-    query = query.filter(date_field >= min_date, date_field <= max_date)
+    query = query.filter(date_field >= date_range.start, date_field <= date_range.end)
     return query
 
 def filter_data(session_or_factory, request_data, model_class=None):
@@ -158,8 +286,8 @@ def filter_data(session_or_factory, request_data, model_class=None):
         
     Returns
     -------
-    List[BaseModel]
-        List of model instances matching the query
+    List[ModelRow]
+        List of read-only rows matching the query
     """
     try:
         if model_class is None:
@@ -190,6 +318,224 @@ def filter_data(session_or_factory, request_data, model_class=None):
             session.close()
         raise e
 
+def get_query_plan(model_class):
+    """
+    Get the query plan used for a model in the consolidated query.
+    
+    Operational tables have an explicit plan in `OPERATIONAL_QUERY_PLANS`.
+    For any other table the plan is derived from its field mapping.
+    
+    Parameters
+    ----------
+    model_class: Type[BaseModel]
+        SQLAlchemy model class
+        
+    Returns
+    -------
+    Dict
+        Dictionary with the 'strategy' key and, depending on it,
+        'link_table'/'link_field' or 'reason'
+    """
+    plan = OPERATIONAL_QUERY_PLANS.get(model_class.__tablename__)
+    if plan is not None:
+        return plan
+    if model_class.get_patient_id_field() is None:
+        return {'strategy': QUERY_PLAN_EXCLUDED, 'reason': 'no patient ID field'}
+    if model_class.get_date_field() is None:
+        return {'strategy': QUERY_PLAN_PATIENT}
+    return {'strategy': QUERY_PLAN_PATIENT_AND_DATE}
+
+def _patient_filter(id_field, patient_id):
+    """Filter a patient ID column on a single value or on an array parameter."""
+    if isinstance(patient_id, str):
+        return id_field == patient_id
+    return id_field == any_(patient_id)
+
+def _build_table_select(table_name, model_class, plan, patient_id, date_range, since=None, measurement_ids=None):
+    """
+    Build the UNION ALL branch of a single table according to its query plan.
+    
+    `patient_id` is either a single ID value or a bound parameter holding an
+    array of IDs, in which case the branch filters with `= ANY(...)`.
+    If `since` is given, only rows added or modified at or after it are selected,
+    and tables without any change timestamp are left out.
+    If `measurement_ids` is given, only the rows with these primary keys are
+    selected, sent as a single array parameter.
+    
+    Returns
+    -------
+    sqlalchemy.sql.Select or None
+        The select statement, or None if the table is excluded
+    """
+    strategy = plan['strategy']
+    if strategy == QUERY_PLAN_EXCLUDED:
+        return None
+    
+    change_time = model_class.get_change_time_expression()
+    if since is not None and change_time is None:
+        return None
+    
+    # Get the actual table for reflection
+    table = model_class.__table__
+    key_field = model_class.get_patient_id_field()
+    
+    # Select statement with all columns from this table and a source table name column
+    query = (
+        select(
+            literal_column(f"'{table_name}'").label('source_table'),
+            # Convert all columns to a JSON object
+            cast(text(f"row_to_json({table.name}.*)"), JSONB).label('data')
+        )
+        .select_from(table)
+    )
+    
+    if strategy == QUERY_PLAN_LINKED:
+        # Resolve the table's own IDs for this patient through the link table
+        link_model = MODEL_REGISTRY[plan['link_table']]
+        linked_ids = (
+            select(getattr(link_model, plan['link_field']))
+            .where(_patient_filter(link_model.get_patient_id_field(), patient_id))
+        )
+        query = query.where(key_field.in_(linked_ids))
+    else:
+        query = query.where(_patient_filter(key_field, patient_id))
+        
+    if strategy != QUERY_PLAN_PATIENT:
+        if date_range is None:
+            raise ValueError("Missing required date range in request data")
+        date_field = model_class.get_date_field()
+        query = query.where(date_field >= date_range.start).where(date_field <= date_range.end)
+        
+    if since is not None:
+        # Rows changed at the watermark itself are sent again: rows committed later with
+        # the same timestamp would be missed otherwise (clients match them by ID)
+        query = query.where(change_time >= since)
+        
+    if measurement_ids is not None:
+        primary_key = model_class.__mapper__.primary_key[0]
+        query = query.where(primary_key == any_(
+            bindparam(f'{table.name}_ids', value=list(measurement_ids), type_=ARRAY(primary_key.type))
+        ))
+        
+    return query
+
+def build_consolidated_query(request_data, table_names, model_registry):
+    """
+    Build the UNION ALL query for several tables without executing it.
+    
+    Parameters
+    ----------
+    request_data: Dict
+        Dictionary with query parameters (id_patient, date_range). The date range
+        can be a parsed DateRange or a dictionary with 'min_date' and 'max_date',
+        and is only required if any of the tables filters on dates.
+        Several patients can be queried at once with an 'id_patients' list
+        instead of 'id_patient': the whole list is then sent as a single array
+        parameter shared by every branch of the query.
+        An optional 'since' datetime restricts the query to the rows added or
+        modified at or after it, and an optional 'measurement_ids' dictionary to the
+        rows with the given primary keys, by table (tables without any are
+        left out).
+    table_names: List[str]
+        List of table names to query
+    model_registry: Dict
+        Dictionary mapping table names to model classes
+        
+    Returns
+    -------
+    sqlalchemy.sql.CompoundSelect or None
+        The consolidated query, or None if no table is queried
+        
+    Raises
+    ------
+    ValueError
+        If the patient ID is missing, or the date range is missing or invalid
+    """
+    # Extract common filter values
+    if 'id_patients' in request_data:
+        patient_id = bindparam('id_patients', value=list(request_data['id_patients']), type_=ARRAY(String))
+    elif 'id_patient' in request_data:
+        patient_id = request_data['id_patient']
+    else:
+        raise ValueError("Missing required ID field in request data")
+    
+    # Reuse the range parsed at the API edge, parsing legacy dictionaries only once here
+    date_range = None
+    if request_data.get('date_range'):
+        date_range = DateRange.coerce(request_data['date_range'])
+        
+    # Build individual selects for the UNION ALL
+    union_queries = []
+    measurement_ids = request_data.get('measurement_ids')
+    
+    for table_name in table_names:
+        if table_name not in model_registry:
+            continue
+        if measurement_ids is not None and not measurement_ids.get(table_name):
+            continue
+            
+        model_class = model_registry[table_name]
+        query = _build_table_select(
+            table_name,
+            model_class,
+            get_query_plan(model_class),
+            patient_id,
+            date_range,
+            request_data.get('since'),
+            measurement_ids.get(table_name) if measurement_ids is not None else None
+        )
+        if query is not None:
+            union_queries.append(query)
+    
+    # Combine all queries with UNION ALL
+    if not union_queries:
+        return None
+        
+    return union_all(*union_queries)
+
+def get_row_class(model_class):
+    """
+    Get the read-only row class of a model, generating it on first use.
+    
+    Row classes hold one slot per mapped column and share the model's
+    conversion methods (`to_hl7_v2`, `to_fhir_v5`, `get_change_time`...),
+    without the per-instance state and attribute instrumentation of the ORM.
+    
+    Parameters
+    ----------
+    model_class: Type[BaseModel]
+        SQLAlchemy model class
+        
+    Returns
+    -------
+    Type[ModelRow]
+        Row class of the model
+    """
+    row_class = _ROW_CLASSES.get(model_class)
+    if row_class is None:
+        row_class = ModelRow.for_model(model_class)
+        _ROW_CLASSES[model_class] = row_class
+    return row_class
+
+def hydrate_model(model_class, data):
+    """
+    Build a read-only row from a row serialised as JSON (`row_to_json`).
+    
+    Parameters
+    ----------
+    model_class: BaseModel
+        Model class of the row's table
+    data: Dict
+        Column names and values. Unknown keys are ignored and missing
+        columns are None.
+        
+    Returns
+    -------
+    ModelRow
+        Row of the model's row class (see `get_row_class`) holding the values
+    """
+    return get_row_class(model_class)(data)
+
 def filter_data_consolidated(session_or_factory, request_data, table_names, model_registry):
     """
     Filter data from multiple tables in a single consolidated query using UNION ALL.
@@ -200,12 +546,15 @@ def filter_data_consolidated(session_or_factory, request_data, table_names, mode
     3. Improves performance by eliminating multiple individual queries
     4. Reduces connection overhead when working with multiple tables
     
+    Each table is queried according to its plan (see `get_query_plan`).
+    
     Parameters
     ----------
     session_or_factory: Session or SessionFactory
         SQLAlchemy session or session factory
     request_data: Dict
-        Dictionary with query parameters (id_patient, date_range)
+        Dictionary with query parameters (id_patient, date_range). The date range
+        can be a parsed DateRange or a dictionary with 'min_date' and 'max_date'.
     table_names: List[str]
         List of table names to query
     model_registry: Dict
@@ -214,7 +563,8 @@ def filter_data_consolidated(session_or_factory, request_data, table_names, mode
     Returns
     -------
     Dict
-        Dictionary mapping table names to query results
+        Dictionary mapping table names to lists of read-only rows (see `hydrate_model`),
+        in the order of `table_names`, each list in primary key order
     """
     try:
         # Create session if factory is provided
@@ -223,109 +573,32 @@ def filter_data_consolidated(session_or_factory, request_data, table_names, mode
         else:
             session = session_or_factory
             
-        # Extract common filter values
-        if 'id_patient' not in request_data:
-            raise ValueError("Missing required ID field in request data")
-            
-        if 'date_range' not in request_data:
-            raise ValueError("Missing required date range in request data")
-            
-        patient_id = request_data['id_patient']
-        date_data = request_data['date_range']
-        
-        if not isinstance(date_data, dict) or 'min_date' not in date_data or 'max_date' not in date_data:
-            raise ValueError("invalid date range format in request data")
-            
-        min_value = date_data['min_date']
-        max_value = date_data['max_date']
-        
-        # Parse dates for all tables
-        try:
-            # Try parsing with time first
-            try:
-                min_date = parse_dt_string(min_value, '%Y-%m-%d %H:%M')
-            except ValueError:
-                # If that fails, try date-only format and set time to 00:00
-                min_date = parse_dt_string(min_value, '%Y-%m-%d')
-                min_date = min_date.replace(hour=0, minute=0)
-
-            try:
-                max_date = parse_dt_string(max_value, '%Y-%m-%d %H:%M')
-            except ValueError:
-                # If that fails, try date-only format and set time to 23:59
-                max_date = parse_dt_string(max_value, '%Y-%m-%d')
-                max_date = max_date.replace(hour=23, minute=59)
-
-        except ValueError:
-            raise ValueError(INVALID_DATE_FORMAT_ERROR)
-
-        if min_date > max_date:
-            raise ValueError(INVALID_DATE_RANGE_ERROR)
-            
-        # Build individual selects for the UNION ALL
-        union_queries = []
-        
-        for table_name in table_names:
-            if table_name not in model_registry:
-                continue
-                
-            model_class = model_registry[table_name]
-            
-            # Get field mappings for this table
-            id_field = model_class.get_patient_id_field()
-            date_field = model_class.get_date_field()
-            
-            if id_field is None or date_field is None:
-                continue
-            
-            # Get the actual table for reflection
-            table = model_class.__table__
-            
-            # Select statement with all columns from this table and a source table name column
-            query = (
-                select(
-                    literal_column(f"'{table_name}'").label('source_table'),
-                    # Convert all columns to a JSON object
-                    cast(text(f"row_to_json({table.name}.*)"), JSONB).label('data')
-                )
-                .select_from(table)
-                .where(id_field == patient_id)
-                .where(date_field >= min_date)
-                .where(date_field <= max_date)
-            )
-            
-            union_queries.append(query)
-        
-        # Combine all queries with UNION ALL
-        if not union_queries:
+        final_query = build_consolidated_query(request_data, table_names, model_registry)
+        if final_query is None:
             return {}
-            
-        final_query = union_all(*union_queries)
         
         # Execute the union all query
-        result_proxy = session.execute(final_query)
+        with stage(STAGE_SQL):
+            result_proxy = session.execute(final_query)
+        with stage(STAGE_FETCH):
+            rows = result_proxy.fetchall()
+        
+        # Group the JSON rows by table (UNION ALL returns them in no particular order)
+        table_rows = {}
+        for row in rows:
+            table_rows.setdefault(row.source_table, []).append(row.data)
         
-        # Process the results back into the expected format
+        # Build read-only rows of the model classes with the data, by table in the
+        # requested order and by primary key within a table, timed once per table
         results = {}
-        for row in result_proxy:
-            source_table = row.source_table
-            data = row.data
-            
-            # Initialize list for this table if it doesn't exist
-            if source_table not in results:
-                results[source_table] = []
-                
-            # Instantiate the model class with the data
-            model_class = model_registry[source_table]
-            model_instance = model_class()
-            
-            # Apply data to model instance
-            for key, value in data.items():
-                if hasattr(model_instance, key):
-                    setattr(model_instance, key, value)
-                    
-            # Add the model instance to the results
-            results[source_table].append(model_instance)
+        for table_name in table_names:
+            if table_name not in table_rows:
+                continue
+            model_class = model_registry[table_name]
+            primary_key = model_class.__mapper__.primary_key[0].name
+            with stage(STAGE_HYDRATION, table_name):
+                table_data = sorted(table_rows[table_name], key=itemgetter(primary_key))
+                results[table_name] = [hydrate_model(model_class, data) for data in table_data]
             
         return results
         
@@ -334,6 +607,12 @@ def filter_data_consolidated(session_or_factory, request_data, table_names, mode
         if callable(session_or_factory):
             session.rollback()
             session.close()
+        # Queries cancelled by the request deadline are reported as timeouts
+        cancelled = cancellation_error(e)
+        if cancelled is not None:
+            if not callable(session_or_factory):
+                session.rollback()
+            raise cancelled from e
         raise e
 
 # %% Main methods
@@ -412,6 +691,61 @@ class BaseModel(Base):
                 return getattr(cls, field_name)
         return None
 
+    @classmethod
+    def get_modified_field(cls):
+        """
+        Get the last-modification date field for this model.
+        
+        Returns
+        -------
+        sqlalchemy.Column
+            The modification date column, or None if the table has none.
+        """
+        from app.constants.table_mappings import TABLE_FIELD_MAPPING
+        if cls.__tablename__ in TABLE_FIELD_MAPPING:
+            field_name = TABLE_FIELD_MAPPING[cls.__tablename__].get('modified_field')
+            if field_name:
+                return getattr(cls, field_name)
+        return None
+    
+    @classmethod
+    def get_change_time_expression(cls):
+        """
+        Get the SQL expression of the time a row was added or last modified.
+        
+        Returns
+        -------
+        sqlalchemy.sql.ColumnElement
+            GREATEST of the date and modification fields (NULLs are ignored),
+            the date field alone, or None if the table has no date field.
+        """
+        date_field = cls.get_date_field()
+        modified_field = cls.get_modified_field()
+        if date_field is None:
+            return None
+        if modified_field is None:
+            return date_field
+        return func.greatest(date_field, modified_field)
+    
+    def get_change_time(self) -> Optional[datetime]:
+        """
+        Get the time this row was added or last modified.
+        
+        Returns
+        -------
+        Optional[datetime]
+            Latest of the date and modification fields, or None if unknown
+        """
+        change_times = []
+        for field in (self.get_date_field(), self.get_modified_field()):
+            value = getattr(self, field.key) if field is not None else None
+            if isinstance(value, str):
+                # Rows hydrated from row_to_json hold ISO 8601 strings
+                value = datetime.fromisoformat(value)
+            if isinstance(value, datetime):
+                change_times.append(value)
+        return max(change_times) if change_times else None
+
     @classmethod
     def register_model(cls, table_name: str):
         """
@@ -425,6 +759,84 @@ class BaseModel(Base):
         MODEL_REGISTRY[table_name] = cls
         return cls  # Return the class to allow for decorator-style usage if needed
 
+# Read-only rows #
+#----------------#
+
+class ModelRow:
+    """
+    Base class of the read-only rows returned by the read paths.
+    
+    Results are never modified nor written back, so instead of a full ORM
+    instance each row is a `__slots__` object generated per model by
+    `get_row_class`, holding one value per mapped column. The model's
+    methods are shared, so rows convert to HL7 and FHIR like the model.
+    """
+    __slots__ = ()
+    
+    # Model the row class was generated from, the model's column keys and its float column keys
+    _model_class = None
+    _columns = ()
+    _float_columns = ()
+    
+    def __init__(self, data: Dict):
+        for key in self._columns:
+            setattr(self, key, data.get(key))
+        # JSON writes integral floats as integers (72 for 72.0): restore the column type
+        for key in self._float_columns:
+            value = data.get(key)
+            if type(value) is int:
+                setattr(self, key, float(value))
+    
+    def __repr__(self) -> str:
+        values = ', '.join(f"{key}={getattr(self, key)!r}" for key in self._columns)
+        return f"{type(self).__name__}({values})"
+    
+    @classmethod
+    def for_model(cls, model_class):
+        """
+        Generate the row class of a model.
+        
+        Methods and properties of the model (and of its bases up to
+        `BaseModel`) are copied onto the row class. Class methods stay bound to the model,
+        since they read its mapped columns (e.g. `get_date_field`).
+        
+        Parameters
+        ----------
+        model_class: Type[BaseModel]
+            SQLAlchemy model class
+            
+        Returns
+        -------
+        Type[ModelRow]
+            Row class named after the model with a `Row` suffix
+        """
+        columns = tuple(column.key for column in model_class.__mapper__.column_attrs)
+        float_columns = tuple(
+            column.key for column in model_class.__mapper__.column_attrs
+            if isinstance(column.columns[0].type, Float)
+        )
+        namespace = {
+            '__slots__': columns,
+            '__tablename__': model_class.__tablename__,
+            '__table__': model_class.__table__,
+            '__module__': model_class.__module__,
+            '__doc__': f"Read-only row of the '{model_class.__tablename__}' table.",
+            '_model_class': model_class,
+            '_columns': columns,
+            '_float_columns': float_columns
+        }
+        for klass in model_class.__mro__:
+            if klass is Base or klass is object:
+                break
+            for name, attribute in vars(klass).items():
+                if name.startswith('__') or name in namespace:
+                    continue
+                if isinstance(attribute, classmethod):
+                    namespace[name] = getattr(model_class, name)
+                elif isinstance(attribute, (FunctionType, staticmethod, property)):
+                    namespace[name] = attribute
+        return type(f"{model_class.__name__}Row", (cls,), namespace)
+
 #--------------------------#
 
 # Switch dictionaries #
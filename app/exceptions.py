@@ -18,4 +18,23 @@ class ValidationError(PatientServiceError):
 
 class DatabaseError(PatientServiceError):
     """Database error in patient service"""
-    pass 
\ No newline at end of file
+    pass
+
+class RequestTimeoutError(PatientServiceError):
+    """Request could not be completed in time"""
+    pass
+
+class AdmissionRejectedError(PatientServiceError):
+    """Request rejected because its concurrency budget is exhausted"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class QueryCancelledError(RequestTimeoutError):
+    """Database query cancelled by its timeout, deadline or client disconnection"""
+    pass
+
+class ExportUnavailableError(PatientServiceError):
+    """Export format unavailable because its optional dependency is not installed"""
+    pass
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Batch service module.
+
+This module processes FHIR `batch` Bundles of search requests against the
+vital signs and operational data resources. Sub-queries are normalised and
+deduplicated, vital signs searches sharing a date range are merged into a
+single set-based UNION ALL query, and everything runs on the database
+session of the HTTP request, i.e. on a single pooled connection.
+"""
+
+# Import modules #
+#----------------#
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from sqlalchemy.orm import Session
+
+# Import project modules #
+#------------------------#
+
+from app.constants.operational_tables import OPERATIONAL_TABLES
+from app.exceptions import RequestTimeoutError, ValidationError
+from app.services.patient_service import PatientService
+from app.services.vital_signs_service import VitalSignsService
+from app.validators.request_validator import BatchPatientQuery, PatientQuery, RequestValidator
+
+# Define classes and methods #
+#----------------------------#
+
+class BatchSubQuery(NamedTuple):
+    """
+    Normalised search request of a batch entry.
+
+    Two entries with the same resource, patient and (parsed) date range are
+    the same sub-query, whatever the way their URLs were written.
+
+    Attributes
+    ----------
+    resource : str
+        Searched resource, 'vital_signs' or 'operational_data'
+    query : PatientQuery
+        Validated patient ID and date range
+    """
+    resource: str
+    query: PatientQuery
+
+
+class BatchService:
+    """
+    Service class for processing FHIR batch Bundles.
+    """
+
+    def __init__(self, db_session: Session):
+        """
+        Initialise the BatchService with a database session.
+
+        Parameters
+        ----------
+        db_session: Session
+            SQLAlchemy database session shared by every sub-query of a batch
+        """
+        self.patient_service = PatientService(db_session)
+        self.vital_signs_service = VitalSignsService(self.patient_service)
+
+    # Public Methods #
+    #----------------#
+
+    def process_batch(self, bundle: Dict, user_role: str) -> Dict:
+        """
+        Process a FHIR batch Bundle of search requests.
+
+        Parameters
+        ----------
+        bundle: Dict
+            FHIR Bundle of type 'batch'. Each entry has a 'request' with the
+            'GET' method and a relative URL, either
+            'vital_signs/<id_value>/<min_date>/<max_date>' or
+            'vital_signs?id_patient=<id_value>&min_date=<min_date>&max_date=<max_date>'
+            ('operational_data' is accepted in place of 'vital_signs'), optionally
+            with a '_since' query parameter
+        user_role: str
+            Role of the authenticated user, checked for every entry
+
+        Returns
+        -------
+        Dict
+            FHIR batch-response Bundle with one entry per request entry,
+            in the same order
+
+        Raises
+        ------
+        ValidationError
+            If the Bundle itself is not a valid batch Bundle
+        """
+        entries = self._validate_bundle(bundle)
+
+        # Normalise the entries, grouping identical sub-queries
+        response_entries: List[Optional[Dict]] = [None] * len(entries)
+        entry_indices: Dict[BatchSubQuery, List[int]] = {}
+        for index, entry in enumerate(entries):
+            sub_query, error_entry = self.parse_entry(entry, user_role)
+            if error_entry:
+                response_entries[index] = error_entry
+            else:
+                entry_indices.setdefault(sub_query, []).append(index)
+
+        # Execute every distinct sub-query once
+        results = self._execute(list(entry_indices))
+        for sub_query, indices in entry_indices.items():
+            for index in indices:
+                response_entries[index] = results[sub_query]
+
+        return {
+            'resourceType': 'Bundle',
+            'type': 'batch-response',
+            'entry': response_entries
+        }
+
+    def parse_entry(self, entry: Dict, user_role: str) -> Tuple[Optional[BatchSubQuery], Optional[Dict]]:
+        """
+        Parse, validate and authorise a single batch entry.
+
+        Parameters
+        ----------
+        entry: Dict
+            Entry of the batch Bundle
+        user_role: str
+            Role of the authenticated user
+
+        Returns
+        -------
+        Tuple[Optional[BatchSubQuery], Optional[Dict]]
+            The normalised sub-query and None if the entry is valid,
+            otherwise None and the batch-response entry reporting the error
+        """
+        request_data = entry.get('request') if isinstance(entry, dict) else None
+        if not isinstance(request_data, dict) or not isinstance(request_data.get('url'), str):
+            return None, _error_entry('400 Bad Request', 'invalid', "Entry must have a 'request' with a 'url'")
+        if request_data.get('method', 'GET').upper() != 'GET':
+            return None, _error_entry('405 Method Not Allowed', 'not-supported', "Only GET search requests are supported")
+
+        url_parts = _split_url(request_data['url'])
+        if url_parts is None:
+            return None, _error_entry(
+                '400 Bad Request',
+                'not-supported',
+                f"Unsupported request URL: {request_data['url']}"
+            )
+        resource, patient_id, min_date, max_date, since = url_parts
+
+        if user_role != BATCH_RESOURCE_ROLES[resource]:
+            return None, _error_entry(
+                '403 Forbidden',
+                'forbidden',
+                f"Insufficient permissions to access {resource} data"
+            )
+
+        query, validation_error = RequestValidator.validate(patient_id, min_date, max_date, since=since)
+        if validation_error:
+            return None, _error_entry(
+                '400 Bad Request',
+                'invalid',
+                f"{validation_error['field']}: {validation_error['error']}"
+            )
+
+        return BatchSubQuery(resource, query), None
+
+    # Internal Methods #
+    #------------------#
+
+    def _validate_bundle(self, bundle: Dict) -> List[Dict]:
+        """Check that the request body is a batch Bundle and return its entries."""
+        if not isinstance(bundle, dict) or bundle.get('resourceType') != 'Bundle':
+            raise ValidationError("Request body must be a FHIR Bundle")
+        if bundle.get('type') != 'batch':
+            raise ValidationError("Only Bundles of type 'batch' are supported")
+        entries = bundle.get('entry', [])
+        if not isinstance(entries, list):
+            raise ValidationError("Bundle 'entry' must be a list")
+        if len(entries) > MAX_BATCH_ENTRIES:
+            raise ValidationError(f"Too many entries in a single batch (maximum {MAX_BATCH_ENTRIES})")
+        return entries
+
+    def _execute(self, sub_queries: List[BatchSubQuery]) -> Dict[BatchSubQuery, Dict]:
+        """
+        Execute the distinct sub-queries of a batch.
+
+        Vital signs sub-queries sharing a date range are merged into a single
+        query for all their patients. Incremental (`_since`) and operational
+        data sub-queries are run one by one: the former each have their own
+        watermark, and the linked tables of the latter (e.g. 'monitor') are not
+        keyed on the patient ID, so their rows cannot be split between patients.
+        """
+        results = {}
+
+        # Merge vital signs sub-queries by date range
+        vital_signs_groups: Dict = {}
+        for sub_query in sub_queries:
+            if sub_query.resource == VITAL_SIGNS_RESOURCE and sub_query.query.since is None:
+                vital_signs_groups.setdefault(sub_query.query.date_range, []).append(sub_query)
+
+        for date_range, group in vital_signs_groups.items():
+            batch_query = BatchPatientQuery(
+                patient_ids=tuple(sub_query.query.patient_id for sub_query in group),
+                date_range=date_range
+            )
+            try:
+                bundles = self.vital_signs_service.retrieve_vital_signs_by_patient(batch_query)
+            except Exception as e:
+                error_entry = self._failed_entry(e)
+                for sub_query in group:
+                    results[sub_query] = error_entry
+                continue
+            for sub_query in group:
+                results[sub_query] = _success_entry(bundles[sub_query.query.patient_id])
+
+        for sub_query in sub_queries:
+            if sub_query in results:
+                continue
+            try:
+                if sub_query.resource == VITAL_SIGNS_RESOURCE:
+                    # Incremental vital signs searches each have their own watermark
+                    bundle = self.vital_signs_service.retrieve_all_vital_signs(
+                        patient_id=sub_query.query.patient_id,
+                        start_date=None,
+                        end_date=None,
+                        query=sub_query.query
+                    )
+                else:
+                    bundle = self.patient_service.get_patient_data_across_tables(
+                        patient_id=sub_query.query.patient_id,
+                        table_names=OPERATIONAL_TABLES,
+                        query=sub_query.query
+                    )
+            except Exception as e:
+                results[sub_query] = self._failed_entry(e)
+                continue
+            results[sub_query] = _success_entry(bundle)
+
+        return results
+
+    def _failed_entry(self, error: Exception) -> Dict:
+        """
+        Roll back the shared session after a failed sub-query and report its error.
+
+        A failed statement aborts the transaction of the session, which would
+        make every following sub-query of the batch fail as well.
+        """
+        self.patient_service.db_session.rollback()
+        if isinstance(error, RequestTimeoutError):
+            return _error_entry('504 Gateway Timeout', 'timeout', str(error))
+        return _error_entry('500 Internal Server Error', 'exception', str(error))
+
+# Define helper functions #
+#-------------------------#
+
+def _split_url(url: str) -> Optional[Tuple[str, str, str, str, Optional[str]]]:
+    """
+    Split a relative search URL into its resource, patient ID, date range
+    and optional `_since` watermark.
+
+    Returns None if the URL does not target a supported resource.
+    """
+    split_url = urlsplit(url)
+    params = parse_qs(split_url.query)
+    since = params.get('_since', [None])[0]
+    path_parts = [unquote(part) for part in split_url.path.strip('/').split('/') if part]
+    if path_parts[:1] == ['api']:
+        path_parts = path_parts[1:]
+    if not path_parts or path_parts[0] not in BATCH_RESOURCE_ROLES:
+        return None
+
+    if len(path_parts) == 4:
+        return (*path_parts, since)
+    if len(path_parts) == 1 and split_url.query:
+        values = [params.get(name, [None])[0] for name in ('id_patient', 'min_date', 'max_date')]
+        return (path_parts[0], *values, since)
+    return None
+
+def _success_entry(bundle: Dict) -> Dict:
+    """Build a batch-response entry for a successful search."""
+    return {
+        'resource': bundle,
+        'response': {'status': '200 OK'}
+    }
+
+def _error_entry(status: str, code: str, diagnostics: str) -> Dict:
+    """Build a batch-response entry reporting an error as an OperationOutcome."""
+    return {
+        'response': {
+            'status': status,
+            'outcome': {
+                'resourceType': 'OperationOutcome',
+                'issue': [{
+                    'severity': 'error',
+                    'code': code,
+                    'diagnostics': diagnostics
+                }]
+            }
+        }
+    }
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Searchable resources
+VITAL_SIGNS_RESOURCE = 'vital_signs'
+OPERATIONAL_DATA_RESOURCE = 'operational_data'
+
+# Role required to search each resource
+BATCH_RESOURCE_ROLES = {
+    VITAL_SIGNS_RESOURCE: 'medical',
+    OPERATIONAL_DATA_RESOURCE: 'admin'
+}
+
+# Maximum number of entries in a single batch Bundle
+MAX_BATCH_ENTRIES = 100
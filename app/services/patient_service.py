@@ -12,6 +12,7 @@ It handles all business logic, data validation, and error handling for the patie
 #----------------#
 
 from datetime import datetime
+from itertools import chain
 from typing import Dict, List, Optional, Type, Union
 
 from sqlalchemy.orm import Session
@@ -19,18 +20,21 @@ from sqlalchemy.orm import Session
 # Import project modules #
 #------------------------#
 
-from app.constants.operational_tables import OPERATIONAL_TABLES
-from app.constants.table_mappings import TABLE_FIELD_MAPPING
-from app.db import BaseModel, filter_data
-from app.exceptions import DatabaseError, ValidationError
+from app.constants.operational_tables import OPERATIONAL_TABLES, QUERY_PLAN_EXCLUDED
+from app.db import BaseModel, filter_data, filter_data_consolidated, get_query_plan
+from app.exceptions import DatabaseError, RequestTimeoutError, ValidationError
 from app.models.patient_models import TABLE_MODEL_MAP
 from app.utils.fhir_formatter import format_operational_data_fhir, format_vital_signs_fhir
 from app.utils.form_field_validations import (
     generate_json_validation_response,
     validate_date_field_support,
 )
+from app.utils.instrumentation import STAGE_FHIR_BUNDLE, STAGE_HL7_BUILD, STAGE_HL7_TO_FHIR, stage
 from app.utils.loinc_mappings import LOINC_MAPPINGS
+from app.utils.single_flight import SingleFlight
 from app.utils.time_formatters import dt_to_string, parse_dt_string
+from app.utils.watermark import add_watermark_to_bundle, next_watermark
+from app.validators.request_validator import PatientQuery, RequestValidator
 
 # Define classes and methods #
 #----------------------------#  
@@ -82,50 +86,24 @@ class PatientService:
         DatabaseError
             If database operation fails
         """
-        try:
-            # Validate request data
-            self._validate_request_data(request_data)
-            
-            # Get model class and table name
-            table_name = request_data.get('table_name')
-            if model_class is None:
-                model_class = self.get_model_for_table(table_name)
-            else:
-                # If model_class is provided, find the corresponding table name
-                table_name = next((name for name, model in TABLE_MODEL_MAP.items() if model == model_class), None)
-            
-            # Get filtered data
-            filtered_data = filter_data(
-                self.db_session,
-                request_data,
-                model_class=model_class
-            )
-
-            # Convert model instances to HL7 v2 messages
-            hl7_v2_messages = [item.to_hl7_v2() for item in filtered_data]
-            
-            # Convert HL7 v2 messages to FHIR resources
-            fhir_resources = [res for res in (self._convert_hl7_to_fhir(msg, table_name)
-                                              for msg in hl7_v2_messages) 
-                                              if res is not None]
-            
-            # Return as FHIR Bundle using the bundle creation method
-            return self.create_fhir_bundle(fhir_resources)
+        # Validate request data
+        self._validate_request_data(request_data)
         
-        except ValueError as e:
-            raise ValidationError(str(e))
-        except Exception as e:
-            raise DatabaseError(f"Database error: {str(e)}")
+        return self._retrieve_validated_data(request_data, model_class)
 
     def get_patient_data_across_tables(
         self,
         patient_id: str,
         table_names: Optional[List[str]] = None,
         start_date: Optional[Union[str, datetime]] = None,
-        end_date: Optional[Union[str, datetime]] = None
+        end_date: Optional[Union[str, datetime]] = None,
+        query: Optional[PatientQuery] = None
     ) -> Dict[str, List[Dict]]:
         """
-        Get patient data across multiple tables.
+        Get patient data across multiple tables with a single consolidated query.
+        
+        Each table is queried according to its plan (see `app.db.get_query_plan`);
+        tables that are not patient-scoped are skipped and reported.
         
         Parameters
         ----------
@@ -137,45 +115,55 @@ class PatientService:
             Optional start date for filtering
         end_date: Optional[Union[str, datetime]]
             Optional end date for filtering
+        query: Optional[PatientQuery]
+            Query already validated at the API edge. If provided, it is reused
+            for every table instead of validating the request again.
+            If its `since` watermark is set, only rows added or modified
+            afterwards are returned.
             
         Returns
         -------
             Dictionary mapping table names to lists of patient data
+            
+        Raises
+        ------
+        ValidationError
+            If the patient ID or the date range is invalid
+        RequestTimeoutError
+            If an identical request in progress takes too long
+            
+        Note
+        ----
+        Identical concurrent requests share a single computation and the
+        same (read-only) result.
         """
         if table_names is None:
             table_names = list(TABLE_MODEL_MAP.keys())
         
-        all_resources = []
+        # Validate the patient ID and date range once for all tables
+        if query is None:
+            query, validation_error = RequestValidator.validate(
+                patient_id,
+                start_date if isinstance(start_date, str) else start_date.strftime('%Y-%m-%d %H:%M') if start_date else None,
+                end_date if isinstance(end_date, str) else end_date.strftime('%Y-%m-%d %H:%M') if end_date else None
+            )
+            if validation_error:
+                raise ValidationError(f"{validation_error['field']}: {validation_error['error']}")
+        
+        # Leave out the tables that are never part of a patient query (see OPERATIONAL_QUERY_PLANS)
+        queried_tables = []
         for table_name in table_names:
-            try:
-                # Build request data for each table
-                request_data = {
-                    'table_name': table_name,
-                    'id_patient': patient_id
-                }
-                
-                # Only add date range if the table supports it
-                table_mapping = TABLE_FIELD_MAPPING.get(table_name)
-                if table_mapping and table_mapping['date_field'] is not None:
-                    request_data['date_range'] = {
-                        'min_date': start_date if isinstance(start_date, str) else start_date.isoformat() if start_date else None,
-                        'max_date': end_date if isinstance(end_date, str) else end_date.isoformat() if end_date else None
-                    }
-                
-                # Get data for the table
-                data = self.retrieve_patient_data(request_data)
-                if data and 'entry' in data:
-                    all_resources.extend(data['entry'])
-            except ValueError:
-                # Skip tables that don't have patient ID fields
-                continue
-            except ValidationError as e:
-                # Log validation errors but continue processing other tables
-                print(f"Validation error for table {table_name}: {str(e)}")
-                continue
-        
-        # Create a single FHIR bundle with all resources
-        return self.create_fhir_bundle(all_resources)
+            model_class = self.get_model_for_table(table_name)
+            if model_class is not None and get_query_plan(model_class)['strategy'] != QUERY_PLAN_EXCLUDED:
+                queried_tables.append(table_name)
+        
+        # Share the result with identical requests already in progress
+        key = (tuple(queried_tables), query)
+        return TABLES_FLIGHT.do(
+            key,
+            lambda: self._retrieve_across_tables(query, queried_tables),
+            timeout=COALESCED_REQUEST_TIMEOUT
+        )
 
     def handle_error(self, error: Exception) -> Dict:
         """
@@ -297,6 +285,109 @@ class PatientService:
             if result['error_msg']:
                 raise ValidationError(f"{field}: {result['error_msg']}")
 
+    def _retrieve_validated_data(
+        self,
+        request_data: Dict,
+        model_class: Optional[Type[BaseModel]] = None
+    ) -> Dict:
+        """
+        Retrieve and convert patient data for a request that is already validated.
+        
+        Parameters
+        ----------
+        request_data: Dict
+            Validated request data (see `retrieve_patient_data`)
+        model_class: Optional[Type[BaseModel]]
+            Optional SQLAlchemy model class to use. If not provided, will be determined from table_name.
+            
+        Returns
+        -------
+        Dict
+            FHIR Bundle containing the converted resources
+        """
+        try:
+            # Get model class and table name
+            table_name = request_data.get('table_name')
+            if model_class is None:
+                model_class = self.get_model_for_table(table_name)
+            else:
+                # If model_class is provided, find the corresponding table name
+                table_name = next((name for name, model in TABLE_MODEL_MAP.items() if model == model_class), None)
+            
+            # Get filtered data
+            filtered_data = filter_data(
+                self.db_session,
+                request_data,
+                model_class=model_class
+            )
+
+            # Convert model instances to HL7 v2 messages
+            hl7_v2_messages = [item.to_hl7_v2() for item in filtered_data]
+            
+            # Convert HL7 v2 messages to FHIR resources
+            fhir_resources = [res for res in (self._convert_hl7_to_fhir(msg, table_name)
+                                              for msg in hl7_v2_messages) 
+                                              if res is not None]
+            
+            # Return as FHIR Bundle using the bundle creation method
+            return self.create_fhir_bundle(fhir_resources)
+        
+        except RequestTimeoutError:
+            raise
+        except ValueError as e:
+            raise ValidationError(str(e))
+        except Exception as e:
+            raise DatabaseError(f"Database error: {str(e)}")
+
+    def _retrieve_across_tables(self, query: PatientQuery, table_names: List[str]) -> Dict:
+        """
+        Run the consolidated query of a validated request and build its FHIR Bundle.
+        
+        Parameters
+        ----------
+        query: PatientQuery
+            Validated query
+        table_names: List[str]
+            Tables to query, none of them excluded
+            
+        Returns
+        -------
+        Dict
+            FHIR Bundle containing the resources of every table,
+            with the next watermark in its `meta`
+        """
+        try:
+            # Retrieve every table in a single round trip
+            consolidated_results = filter_data_consolidated(
+                self.db_session,
+                query.to_request_data(),
+                table_names,
+                TABLE_MODEL_MAP
+            )
+        except RequestTimeoutError:
+            raise
+        except ValueError as e:
+            raise ValidationError(str(e))
+        except Exception as e:
+            raise DatabaseError(f"Database error: {str(e)}")
+        
+        # Convert the results keeping the order of the requested tables
+        all_resources = []
+        for table_name in table_names:
+            for item in consolidated_results.get(table_name, []):
+                with stage(STAGE_HL7_BUILD, table_name):
+                    hl7_message = item.to_hl7_v2()
+                with stage(STAGE_HL7_TO_FHIR, table_name):
+                    resource = self._convert_hl7_to_fhir(hl7_message, table_name)
+                if resource is not None:
+                    all_resources.append(resource)
+        
+        # Create a single FHIR bundle with all resources and the next watermark
+        with stage(STAGE_FHIR_BUNDLE):
+            bundle = self.create_fhir_bundle(all_resources)
+            watermark = next_watermark(chain.from_iterable(consolidated_results.values()), query.since)
+            return add_watermark_to_bundle(bundle, watermark)
+
     def _model_to_dict(self, model_instance: BaseModel) -> Dict:
         """
         Convert a model instance to a dictionary.
@@ -332,6 +423,26 @@ class PatientService:
         """
         Convert an HL7 v2 message to a FHIR v5 resource.
         """
+        observation = self._parse_hl7_observation(hl7_message)
+        if observation is None:
+            return None
+        return self._build_fhir_observation(observation, table_name)
+
+    def _parse_hl7_observation(self, hl7_message: str) -> Optional[Dict]:
+        """
+        Extract the observation fields of an HL7 v2 ORU^R01 message.
+        
+        Parameters
+        ----------
+        hl7_message: str
+            HL7 v2 message, as returned by `to_hl7_v2`
+            
+        Returns
+        -------
+        Optional[Dict]
+            Arguments of the FHIR formatters, or None if the message is not
+            an observation result or has no value
+        """
         # Parse the HL7 message
         segments = hl7_message.split('\r')
         
@@ -359,9 +470,6 @@ class PatientService:
         if not value or value.strip() == '':
             return None
         
-        # Get the LOINC mapping information for this table
-        loinc_info = LOINC_MAPPINGS[table_name]
-        
         # Prepare register_datetime and observation_datetime safely
         register_datetime = (
             self._format_fhir_dt(msh_segment[7])
@@ -381,30 +489,54 @@ class PatientService:
             else None
         )
         
+        return {
+            'patient_id': patient_id,
+            'measurement_id': obx_segment[1],
+            'value': value,
+            'units': unit,
+            'reference_range': ref_range,
+            'register_datetime': register_datetime,
+            'observation_datetime': observation_datetime,
+            'observation': observation_notes
+        }
+
+    def _build_fhir_observation(self, observation: Dict, table_name: str) -> Dict:
+        """
+        Build the FHIR v5 resource of a parsed HL7 observation.
+        
+        Parameters
+        ----------
+        observation: Dict
+            Observation fields, as returned by `_parse_hl7_observation`
+        table_name: str
+            Source table, which selects the LOINC code and the formatter
+            
+        Returns
+        -------
+        Dict
+            FHIR resource
+        """
+        # Get the LOINC mapping information for this table
+        loinc_info = LOINC_MAPPINGS[table_name]
+        
         # Use the appropriate formatter based on whether this is operational data
-        if table_name in OPERATIONAL_TABLES:
-            return format_operational_data_fhir(
-                patient_id=patient_id,
-                measurement_id=obx_segment[1],
-                value=value,
-                units=unit,
-                reference_range=ref_range,
-                register_datetime=register_datetime,
-                observation_datetime=observation_datetime,
-                observation=observation_notes,
-                loinc_code=loinc_info.loinc_code,
-                loinc_description=loinc_info.description
-            )
-        else:
-            return format_vital_signs_fhir(
-                patient_id=patient_id,
-                measurement_id=obx_segment[1],
-                value=value,
-                units=unit,
-                reference_range=ref_range,
-                register_datetime=register_datetime,
-                observation_datetime=observation_datetime,
-                observation=observation_notes,
-                loinc_code=loinc_info.loinc_code,
-                loinc_description=loinc_info.description
-            )
\ No newline at end of file
+        formatter = (
+            format_operational_data_fhir
+            if table_name in OPERATIONAL_TABLES
+            else format_vital_signs_fhir
+        )
+        return formatter(
+            loinc_code=loinc_info.loinc_code,
+            loinc_description=loinc_info.description,
+            **observation
+        )
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Coalescing of identical concurrent requests
+TABLES_FLIGHT = SingleFlight('patient_tables')
+
+# Maximum seconds a coalesced request waits for the one in progress, outside a request deadline
+COALESCED_REQUEST_TIMEOUT = 30.0
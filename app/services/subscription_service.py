@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Subscription service module.
+
+This module pushes newly inserted vital signs to live subscribers
+(Server-Sent Events, FHIR Subscription style) instead of having clients poll
+`/vital_signs/<id>/<min>/<max>`.
+
+A single `ObservationBroker` per process holds the subscriptions, grouped by
+patient. New rows are detected in one of two ways:
+1. LISTEN/NOTIFY: the triggers of `sql/create_observation_notify_triggers.sql`
+   send each inserted row on the 'observation_inserted' channel. One dedicated
+   connection listens to it and the rows are fanned out in-process to the
+   subscribers of the row's patient.
+2. Polling fallback, when the triggers are not installed or the listener
+   connection fails: every few seconds, one watermark query (`_since`) for
+   all the subscribed patients at once.
+
+Every notification carries the watermark of the rows it contains as its SSE
+event ID, so a client reconnecting with `Last-Event-ID` (or `_since`) first
+receives what it missed.
+
+Watermarks are read in the clock of the rows' change times, i.e. from the
+database, never from the application server's clock. Rows changed at a
+patient's watermark are told apart by their primary keys, so that rows
+committed later with the same timestamp are still notified, once.
+"""
+
+# Import modules #
+#----------------#
+
+import json
+import queue
+import select
+import threading
+import uuid
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import String, cast, func, literal, select, text, union_all
+from sqlalchemy.orm import sessionmaker
+
+# Import project modules #
+#------------------------#
+
+from app.constants.table_mappings import TABLE_FIELD_MAPPING
+from app.constants.vital_signs_tables import VITAL_SIGNS_TABLES
+from app.db import MODEL_REGISTRY, filter_data_consolidated, get_session_factory, hydrate_model
+from app.services.patient_service import PatientService
+from app.services.vital_signs_service import VitalSignsService
+from app.utils.date_range import DateRange
+from app.utils.metrics import counter, gauge
+from app.utils.watermark import next_watermark
+
+# Define classes and methods #
+#----------------------------#
+
+class Subscription:
+    """
+    Live subscription of one client to the vital signs of one patient.
+
+    Notifications are queued until the client's stream sends them. If the
+    client falls too far behind, the subscription is closed; the client then
+    reconnects with its last event ID and catches up with a watermark query.
+
+    Parameters
+    ----------
+    patient_id : str
+        Validated patient ID
+    max_pending : int
+        Maximum number of notifications waiting to be sent
+    """
+
+    def __init__(self, patient_id: str, max_pending: Optional[int] = None):
+        self.id = uuid.uuid4().hex
+        self.patient_id = patient_id
+        self.events_sent = 0
+        self.closed = threading.Event()
+        self._queue = queue.Queue(max_pending or MAX_PENDING_NOTIFICATIONS)
+
+    def put(self, bundle: Dict) -> None:
+        """Queue a notification Bundle, closing the subscription if the queue is full."""
+        if self.closed.is_set():
+            return
+        try:
+            self._queue.put_nowait(bundle)
+        except queue.Full:
+            self.closed.set()
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        """Return the next notification Bundle, or None after `timeout` seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class ObservationBroker:
+    """
+    Process-wide fan-out of new vital signs to their subscribers.
+
+    The listener (or poller) thread starts with the first subscription.
+
+    Parameters
+    ----------
+    config : Dict
+        Database credentials. Queries use the shared pooled engine (see
+        `get_session_factory`), created with the first subscription; the
+        LISTEN connection is opened apart from the pool.
+    poll_interval : float
+        Seconds between two queries of the polling fallback
+    autostart : bool
+        If False, the background thread is never started (notifications can
+        still be delivered through `handle_notification`)
+    """
+
+    def __init__(self, config: Dict, poll_interval: Optional[float] = None, autostart: bool = True):
+        self.config = config
+        self.poll_interval = poll_interval or POLL_INTERVAL
+        self.autostart = autostart
+        self.mode = None
+        self._subscribers: Dict[str, List[Subscription]] = {}
+        self._watermarks: Dict[str, datetime] = {}
+        # Rows changed at each patient's watermark already sent, by table and primary key
+        self._sent_at_watermark: Dict[str, Set[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+        # Only used to convert rows to FHIR resources
+        self._vital_signs_service = VitalSignsService(PatientService(None))
+
+    @property
+    def session_factory(self) -> sessionmaker:
+        """Session factory bound to the shared pooled engine."""
+        return get_session_factory(self.config)
+
+    # Subscriptions #
+    #---------------#
+
+    def subscribe(self, patient_id: str, since: Optional[datetime] = None) -> Subscription:
+        """
+        Subscribe to the new vital signs of a patient.
+
+        Parameters
+        ----------
+        patient_id : str
+            Validated patient ID
+        since : Optional[datetime]
+            Decoded watermark of the last notification received. If set, the
+            rows added or modified at or after it are queued first.
+
+        Returns
+        -------
+        Subscription
+            New subscription, to be passed to `stream`
+        """
+        subscription = Subscription(patient_id)
+        watermark, sent_at_watermark = self._initial_watermark(patient_id)
+        with self._lock:
+            self._subscribers.setdefault(patient_id, []).append(subscription)
+            if patient_id not in self._watermarks:
+                self._watermarks[patient_id] = watermark
+                self._sent_at_watermark[patient_id] = sent_at_watermark
+            SUBSCRIPTIONS.set(sum(map(len, self._subscribers.values())))
+
+        if self.autostart:
+            self._ensure_started()
+
+        if since is not None:
+            try:
+                rows_by_table = self._fetch({patient_id: since}).get(patient_id)
+            except Exception:
+                self.unsubscribe(subscription)
+                raise
+            if rows_by_table:
+                subscription.put(self._build_bundle(rows_by_table, since))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscription. The patient is no longer tracked once it has none."""
+        subscription.closed.set()
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.patient_id, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self._subscribers.pop(subscription.patient_id, None)
+                self._watermarks.pop(subscription.patient_id, None)
+                self._sent_at_watermark.pop(subscription.patient_id, None)
+            SUBSCRIPTIONS.set(sum(map(len, self._subscribers.values())))
+
+    def stream(self, subscription: Subscription, heartbeat_interval: Optional[float] = None) -> Iterator[str]:
+        """
+        Yield the Server-Sent Events of a subscription until it is closed.
+
+        The first event is a handshake. Comments are sent every
+        `heartbeat_interval` seconds without notifications, so proxies keep
+        the connection open and disconnected clients are detected.
+        The subscription is removed when the generator is closed.
+        """
+        heartbeat_interval = heartbeat_interval or HEARTBEAT_INTERVAL
+        try:
+            yield format_sse_event('handshake', build_notification(subscription))
+            while not subscription.closed.is_set():
+                bundle = subscription.get(heartbeat_interval)
+                if bundle is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                subscription.events_sent += 1
+                notification = build_notification(subscription, bundle)
+                yield format_sse_event('observation', notification, _watermark_token(bundle))
+        finally:
+            self.unsubscribe(subscription)
+
+    # Notifications #
+    #---------------#
+
+    def handle_notification(self, payload: str) -> None:
+        """
+        Fan out one NOTIFY payload of the observation triggers.
+
+        Parameters
+        ----------
+        payload : str
+            JSON object with the 'table', 'id_patient' and, unless the row
+            was too large for a NOTIFY payload, 'row' keys. Rows too large
+            are announced by their primary key, in 'id'.
+        """
+        notification = json.loads(payload)
+        table_name = notification.get('table')
+        patient_id = notification.get('id_patient')
+        if table_name not in VITAL_SIGNS_TABLES:
+            return
+
+        with self._lock:
+            watermark = self._watermarks.get(patient_id)
+        if watermark is None:
+            # Nobody is subscribed to this patient
+            return
+
+        # Announced rows are sent whatever their change time: a row inserted concurrently
+        # with an earlier timestamp than the watermark is new all the same
+        if 'row' in notification:
+            item = hydrate_model(MODEL_REGISTRY[table_name], notification['row'])
+            self._dispatch(patient_id, {table_name: [item]}, 'notify')
+        elif 'id' in notification:
+            rows_by_table = self._fetch_announced(patient_id, table_name, notification['id'])
+            if rows_by_table:
+                self._dispatch(patient_id, rows_by_table, 'notify')
+        else:
+            # Notification of triggers created before the primary key was announced
+            rows_by_table = self._fetch({patient_id: watermark}, self._sent_rows()).get(patient_id)
+            if rows_by_table:
+                self._dispatch(patient_id, rows_by_table, 'notify')
+
+    def poll(self) -> None:
+        """Query the changes of every subscribed patient at once and fan them out."""
+        with self._lock:
+            watermarks = dict(self._watermarks)
+        if not watermarks:
+            return
+        for patient_id, rows_by_table in self._fetch(watermarks, self._sent_rows()).items():
+            self._dispatch(patient_id, rows_by_table, 'poll')
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stopped.set()
+
+    # Internal Methods #
+    #------------------#
+
+    def _dispatch(self, patient_id: str, rows_by_table: Dict[str, List], source: str) -> None:
+        """Convert the new rows of a patient once and queue them for all its subscribers."""
+        with self._lock:
+            subscriptions = list(self._subscribers.get(patient_id, ()))
+            since = self._watermarks.get(patient_id)
+        if not subscriptions:
+            return
+
+        bundle = self._build_bundle(rows_by_table, since)
+        watermark = next_watermark(chain.from_iterable(rows_by_table.values()), since)
+        sent_at_watermark = {
+            _row_key(table_name, item)
+            for table_name, items in rows_by_table.items()
+            for item in items
+            if item.get_change_time() == watermark
+        }
+        with self._lock:
+            current = self._watermarks.get(patient_id)
+            if current is not None and watermark is not None:
+                if watermark > current:
+                    self._watermarks[patient_id] = watermark
+                    self._sent_at_watermark[patient_id] = sent_at_watermark
+                elif watermark == current:
+                    self._sent_at_watermark[patient_id] |= sent_at_watermark
+
+        for subscription in subscriptions:
+            subscription.put(bundle)
+        NOTIFICATIONS.inc(source=source)
+
+    def _build_bundle(self, rows_by_table: Dict[str, List], since: Optional[datetime]) -> Dict:
+        """Build the FHIR Bundle of new rows, with their watermark in its `meta`."""
+        return self._vital_signs_service._build_vital_signs_bundle(rows_by_table, since)
+
+    def _fetch(
+        self,
+        watermarks: Dict[str, datetime],
+        sent_rows: Optional[Dict[str, Set[Tuple[str, str]]]] = None
+    ) -> Dict[str, Dict[str, List]]:
+        """
+        Retrieve the rows added or modified at or after each patient's watermark.
+
+        A single consolidated query is run for all the patients, from the
+        oldest watermark; the rows each patient already received are then
+        discarded.
+
+        Parameters
+        ----------
+        watermarks : Dict[str, datetime]
+            Watermark of each patient
+        sent_rows : Optional[Dict[str, Set[Tuple[str, str]]]]
+            Keys of the rows changed at each patient's watermark that were
+            already sent (see `_row_key`). Without them, these rows are sent again.
+
+        Returns
+        -------
+        Dict[str, Dict[str, List]]
+            New rows by patient and table. Patients without new rows are omitted.
+        """
+        since = min(watermarks.values())
+        request_data = {
+            'id_patients': list(watermarks),
+            'date_range': DateRange(since - LIVE_LOOKBACK, datetime.max),
+            'since': since
+        }
+
+        session = self.session_factory()
+        try:
+            results = filter_data_consolidated(session, request_data, VITAL_SIGNS_TABLES, MODEL_REGISTRY)
+        finally:
+            session.close()
+
+        rows_by_patient = {}
+        for table_name, table_results in results.items():
+            id_field = TABLE_FIELD_MAPPING[table_name]['id_field']
+            for item in table_results:
+                patient_id = getattr(item, id_field)
+                watermark = watermarks.get(patient_id)
+                if watermark is None:
+                    continue
+                change_time = item.get_change_time()
+                if change_time is not None and change_time < watermark:
+                    continue
+                if change_time == watermark and _row_key(table_name, item) in (sent_rows or {}).get(patient_id, ()):
+                    continue
+                rows_by_patient.setdefault(patient_id, {}).setdefault(table_name, []).append(item)
+        return rows_by_patient
+
+    def _fetch_announced(self, patient_id: str, table_name: str, row_id) -> Dict[str, List]:
+        """Retrieve a row announced by its primary key, whatever its change time."""
+        request_data = {
+            'id_patient': patient_id,
+            'date_range': DateRange(datetime.min, datetime.max),
+            'measurement_ids': {table_name: [row_id]}
+        }
+        session = self.session_factory()
+        try:
+            return filter_data_consolidated(session, request_data, [table_name], MODEL_REGISTRY)
+        finally:
+            session.close()
+
+    def _initial_watermark(self, patient_id: str) -> Tuple[datetime, Set[Tuple[str, str]]]:
+        """
+        Read the watermark of a newly subscribed patient from the database.
+
+        Returns
+        -------
+        Tuple[datetime, Set[Tuple[str, str]]]
+            Latest change time of the patient's rows, or the database's
+            current time if it has none, and the keys of the rows changed at
+            that time (already recorded, so not notified)
+        """
+        branches = []
+        for table_name in VITAL_SIGNS_TABLES:
+            model_class = MODEL_REGISTRY[table_name]
+            change_time = model_class.get_change_time_expression()
+            if change_time is None:
+                continue
+            patient_filter = model_class.get_patient_id_field() == patient_id
+            latest_change = select(func.max(change_time)).where(patient_filter).scalar_subquery()
+            branches.append(
+                select(
+                    literal(table_name).label('source_table'),
+                    cast(model_class.__mapper__.primary_key[0], String).label('measurement_id'),
+                    change_time.label('changed_at')
+                ).where(patient_filter).where(change_time == latest_change)
+            )
+
+        session = self.session_factory()
+        try:
+            rows = session.execute(union_all(*branches)).fetchall()
+            if not rows:
+                return session.execute(select(func.localtimestamp())).scalar(), set()
+        finally:
+            session.close()
+
+        watermark = max(row.changed_at for row in rows)
+        return watermark, {(row.source_table, row.measurement_id) for row in rows if row.changed_at == watermark}
+
+    def _sent_rows(self) -> Dict[str, Set[Tuple[str, str]]]:
+        """Copy the keys of the rows already sent at each patient's watermark."""
+        with self._lock:
+            return {patient_id: set(keys) for patient_id, keys in self._sent_at_watermark.items()}
+
+    def _ensure_started(self) -> None:
+        """Start the background thread if it is not running yet."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='observation-broker', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Listen to the trigger notifications, or poll if they are unavailable."""
+        try:
+            if self._triggers_installed():
+                self._listen()
+                return
+            print("Observation triggers not installed, polling for new vital signs")
+        except Exception as e:
+            print(f"Observation listener unavailable, polling for new vital signs: {str(e)}")
+        self._poll_loop()
+
+    def _triggers_installed(self) -> bool:
+        """Whether the observation triggers exist in the database."""
+        session = self.session_factory()
+        try:
+            return bool(session.execute(text(
+                "SELECT count(*) FROM pg_trigger WHERE tgname LIKE 'trg\\_%\\_notify\\_observation'"
+            )).scalar())
+        finally:
+            session.close()
+
+    def _listen(self) -> None:
+        """Wait for notifications on a dedicated connection, outside the pool."""
+        engine = self.session_factory.kw['bind']
+        connection = psycopg2.connect(**engine.url.translate_connect_args(username='user', database='dbname'))
+        connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            self.mode = MODE_LISTEN
+            while not self._stopped.is_set():
+                if select.select([connection], [], [], LISTEN_TIMEOUT) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    payload = connection.notifies.pop(0).payload
+                    try:
+                        self.handle_notification(payload)
+                    except Exception as e:
+                        print(f"Error handling observation notification: {str(e)}")
+        finally:
+            connection.close()
+
+    def _poll_loop(self) -> None:
+        """Poll for new rows until stopped."""
+        self.mode = MODE_POLL
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error polling for new vital signs: {str(e)}")
+
+# Define helper functions #
+#-------------------------#
+
+def build_notification(subscription: Subscription, bundle: Optional[Dict] = None) -> Dict:
+    """
+    Wrap new resources in a FHIR `subscription-notification` Bundle.
+
+    Parameters
+    ----------
+    subscription : Subscription
+        Subscription being notified
+    bundle : Optional[Dict]
+        Bundle of new resources. If None, a handshake is built.
+
+    Returns
+    -------
+    Dict
+        Notification Bundle, whose first entry is the SubscriptionStatus
+    """
+    status = {
+        'resourceType': 'SubscriptionStatus',
+        'status': 'active',
+        'type': 'event-notification' if bundle is not None else 'handshake',
+        'eventsSinceSubscriptionStart': subscription.events_sent,
+        'subscription': {'reference': f"Subscription/{subscription.id}"},
+        'topic': SUBSCRIPTION_TOPIC,
+        'focus': {'reference': f"Patient/{subscription.patient_id}"}
+    }
+    notification = {
+        'resourceType': 'Bundle',
+        'type': 'subscription-notification',
+        'timestamp': datetime.now().isoformat(),
+        'entry': [{'resource': status}]
+    }
+    if bundle is not None:
+        notification['entry'].extend(bundle['entry'])
+        if 'meta' in bundle:
+            notification['meta'] = bundle['meta']
+    return notification
+
+def format_sse_event(event: str, data: Dict, event_id: Optional[str] = None) -> str:
+    """Format a Server-Sent Event with a JSON payload."""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return '\n'.join(lines) + '\n\n'
+
+def _row_key(table_name: str, item) -> Tuple[str, str]:
+    """Return the key of a row: its table and primary key (as text)."""
+    primary_key = MODEL_REGISTRY[table_name].__mapper__.primary_key[0].key
+    return table_name, str(getattr(item, primary_key))
+
+def _watermark_token(bundle: Dict) -> Optional[str]:
+    """Return the watermark token of a Bundle, if any."""
+    tags = bundle.get('meta', {}).get('tag', [])
+    return tags[0]['code'] if tags else None
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Channel of the observation triggers (see sql/create_observation_notify_triggers.sql)
+NOTIFY_CHANNEL = 'observation_inserted'
+
+# Detection modes
+MODE_LISTEN = 'listen'
+MODE_POLL = 'poll'
+
+# Seconds between two queries of the polling fallback
+POLL_INTERVAL = 5.0
+
+# Seconds the listener waits for a notification before checking whether it was stopped
+LISTEN_TIMEOUT = 5.0
+
+# Seconds without notifications before a keep-alive comment is sent
+HEARTBEAT_INTERVAL = 15.0
+
+# Notifications a subscriber may have pending before it is disconnected
+MAX_PENDING_NOTIFICATIONS = 100
+
+# How far before the watermark registration dates are searched, for late entries
+LIVE_LOOKBACK = timedelta(days=1)
+
+# Topic reported in the SubscriptionStatus of each notification
+SUBSCRIPTION_TOPIC = 'urn:patient-data-fhir-service:topic:vital-signs'
+
+# Subscription metrics
+SUBSCRIPTIONS = gauge(
+    'observation_subscriptions',
+    'Live vital signs subscriptions currently open'
+)
+NOTIFICATIONS = counter(
+    'observation_notifications_total',
+    'Notifications fanned out to the subscribers of a patient',
+    ('source',)
+)
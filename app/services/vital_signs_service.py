@@ -10,7 +10,13 @@ This module provides services for retrieving vital signs data across multiple ta
 # Import modules #
 #----------------#
 
+from datetime import datetime
+from itertools import chain, groupby
+from operator import itemgetter
 from typing import Dict, List, Optional
+
+from sqlalchemy import Float, cast, func, literal, select, union_all
+from sqlalchemy.sql.expression import null
  
 # Import project modules #
 #------------------------#
@@ -18,11 +24,32 @@ from typing import Dict, List, Optional
 from app.constants.operational_tables import OPERATIONAL_TABLES
 from app.constants.resource_prefixes import RESOURCE_ID_PREFIXES
 from app.constants.table_mappings import TABLE_FIELD_MAPPING
-from app.constants.vital_signs_tables import VITAL_SIGNS_TABLES
+from app.constants.vital_signs_tables import (
+    VITAL_SIGNS_MEASURED_FIELDS,
+    VITAL_SIGNS_TABLES,
+    VITAL_SIGNS_VALUE_FIELDS
+)
 from app.db import MODEL_REGISTRY, filter_data_consolidated
-from app.exceptions import ValidationError
+from app.exceptions import RequestTimeoutError, ValidationError
 from app.services.patient_service import PatientService
-from app.utils.form_field_validations import generate_json_validation_response
+from app.utils.downsampling import lttb_indices
+from app.utils.instrumentation import (
+    STAGE_DOWNSAMPLE,
+    STAGE_FETCH,
+    STAGE_FHIR_BUNDLE,
+    STAGE_HL7_BUILD,
+    STAGE_HL7_TO_FHIR,
+    STAGE_SQL,
+    stage
+)
+from app.utils.lazy_import import lazy_import
+from app.utils.query_deadline import cancellation_error
+from app.utils.single_flight import SingleFlight
+from app.utils.watermark import add_watermark_to_bundle, next_watermark
+from app.validators.request_validator import BatchPatientQuery, PatientQuery, RequestValidator
+
+# numpy is imported on first use (only downsampled requests need it)
+np = lazy_import('numpy')
 
 # Define classes and methods #
 #----------------------------#  
@@ -49,7 +76,8 @@ class VitalSignsService:
         start_date: str,
         end_date: str,
         table_names: Optional[List[str]] = None,
-        user_role: Optional[str] = None
+        user_role: Optional[str] = None,
+        query: Optional[PatientQuery] = None
     ) -> Dict:
         """
         Retrieve vital signs data from all relevant tables using a single consolidated query.
@@ -66,15 +94,26 @@ class VitalSignsService:
             Optional list of table names to query. If None, queries all vital sign tables.
         user_role: Optional[str]
             User's role for role-based filtering. If None, no role-based filtering is applied.
+        query: Optional[PatientQuery]
+            Query already validated at the API edge. If provided, the request is not validated again.
+            If its `since` watermark is set, only rows added or modified at or after it are returned.
+            If its `downsample` number of points is set, at most that many Observations are
+            returned per vital sign (see `select_downsampled_ids`).
             
         Returns
         -------
         Dict
-            FHIR Bundle containing all vital signs data
+            FHIR Bundle containing all vital signs data, with the next watermark in its `meta`
             
         Raises
         ------
             ValidationError: If any input validation fails
+            RequestTimeoutError: If an identical request in progress takes too long
+            
+        Note
+        ----
+        Identical concurrent requests share a single computation and the
+        same (read-only) result.
         """
         # If no specific tables are requested, use all vital signs tables
         if table_names is None:
@@ -95,126 +134,321 @@ class VitalSignsService:
                 # Other roles get no access
                 return self.patient_service.create_fhir_bundle([])
 
-        # Pre-validate inputs for all tables before querying
-        validation_errors = self._validate_input_for_all_tables(
-            patient_id, start_date, end_date, table_names
+        # Validate the request once for all tables, unless already done at the API edge
+        if query is None:
+            query, validation_error = RequestValidator.validate(patient_id, start_date, end_date)
+            if validation_error:
+                raise ValidationError(f"{validation_error['field']}: {validation_error['error']}")
+                
+        # Share the result with identical requests already in progress
+        key = (tuple(table_names), query)
+        return VITAL_SIGNS_FLIGHT.do(
+            key,
+            lambda: self._retrieve_vital_signs(query, table_names),
+            timeout=COALESCED_REQUEST_TIMEOUT
         )
+
+    def retrieve_vital_signs_batch(self, query: BatchPatientQuery) -> Dict:
+        """
+        Retrieve vital signs data for several patients with a single set-based query.
         
-        # If validation errors found, raise the first error
-        if validation_errors:
-            first_error = validation_errors[0]
-            raise ValidationError(f"{first_error['field']}: {first_error['error']}")
-                
-        # Prepare request data
-        request_data = {
-            'id_patient': patient_id,
-            'date_range': {
-                'min_date': start_date,
-                'max_date': end_date
-            }
+        Every branch of the consolidated query filters the patient ID with
+        `= ANY(:id_patients)`, so the whole batch costs one round trip.
+        
+        Parameters
+        ----------
+        query: BatchPatientQuery
+            Batch query already validated at the API edge
+            
+        Returns
+        -------
+        Dict
+            FHIR batch-response Bundle with one searchset Bundle per patient,
+            in the order of the requested IDs
+            
+        Raises
+        ------
+            ValidationError: If the data cannot be retrieved
+        """
+        bundles = self.retrieve_vital_signs_by_patient(query)
+        
+        date_range = query.date_range.to_dict()
+        entries = []
+        for patient_id, bundle in bundles.items():
+            bundle['link'] = [{
+                'relation': 'self',
+                'url': f"vital_signs/{patient_id}/{date_range['min_date']}/{date_range['max_date']}"
+            }]
+            entries.append({
+                'resource': bundle,
+                'response': {'status': '200 OK'}
+            })
+        
+        return {
+            'resourceType': 'Bundle',
+            'type': 'batch-response',
+            'entry': entries
         }
+
+    def retrieve_vital_signs_by_patient(self, query: BatchPatientQuery) -> Dict[str, Dict]:
+        """
+        Retrieve vital signs data for several patients and split it by patient.
         
+        Parameters
+        ----------
+        query: BatchPatientQuery
+            Batch query already validated at the API edge
+            
+        Returns
+        -------
+        Dict[str, Dict]
+            Dictionary mapping each requested patient ID to its FHIR Bundle,
+            in the order of the requested IDs
+            
+        Raises
+        ------
+            ValidationError: If the data cannot be retrieved
+        """
         try:
-            # Execute consolidated query across all tables
             consolidated_results = filter_data_consolidated(
                 self.patient_service.db_session,
-                request_data,
-                table_names,
+                query.to_request_data(),
+                VITAL_SIGNS_TABLES,
                 MODEL_REGISTRY
             )
             
-            # Collect all FHIR resources
-            all_resources = []
-            id_counters = {}  # Keep track of ID counts per table
-            
-            # Process results from each table
+            # Split the rows of each table by patient
+            results_by_patient = {patient_id: {} for patient_id in query.patient_ids}
             for table_name, table_results in consolidated_results.items():
-                # Get the prefix for this table
-                prefix = RESOURCE_ID_PREFIXES.get(table_name, "res")
-                
-                # Initialize counter for this table if not already done
-                if table_name not in id_counters:
-                    id_counters[table_name] = 1
-                
-                # Process each result from this table
+                id_field = TABLE_FIELD_MAPPING[table_name]['id_field']
                 for item in table_results:
-                    # Convert to HL7 and then FHIR
-                    hl7_message = item.to_hl7_v2()
-                    resource = self.patient_service._convert_hl7_to_fhir(hl7_message, table_name)
-                    
-                    if resource:
-                        # Update the ID using the appropriate prefix
-                        if "id" in resource:
-                            resource["id"] = f"{prefix}-{id_counters[table_name]}"
-                            id_counters[table_name] += 1
-                        
-                        all_resources.append(resource)
+                    patient_results = results_by_patient.get(getattr(item, id_field))
+                    if patient_results is not None:
+                        patient_results.setdefault(table_name, []).append(item)
             
-            # Create the combined FHIR Bundle using PatientService's method
-            return self.patient_service.create_fhir_bundle(all_resources)
+            return {
+                patient_id: self._build_vital_signs_bundle(patient_results)
+                for patient_id, patient_results in results_by_patient.items()
+            }
             
+        except RequestTimeoutError:
+            raise
         except Exception as e:
             raise ValidationError(f"Error retrieving vital signs data: {str(e)}")
+
+    def build_series_query(self, query: PatientQuery, table_names: List[str]):
+        """
+        Build the query of the time series of the vital signs, without executing it.
         
-    def _validate_input_for_all_tables(
-        self,
-        patient_id: str,
-        start_date: str,
-        end_date: str,
+        Each table with values is a branch of a UNION ALL selecting only its
+        primary key, the measurement time (seconds since the epoch) and its
+        values as typed columns (`value_1`, `value_2`... padded with NULL),
+        ordered by table and measurement time. Blood pressure rows hold both
+        components, as a paired series.
+        
+        Parameters
+        ----------
+        query: PatientQuery
+            Query already validated at the API edge
+        table_names: List[str]
+            Tables to query (tables without values, such as `constantes`, are left out)
+            
+        Returns
+        -------
+        sqlalchemy.sql.CompoundSelect or None
+            The series query, or None if no table is queried
+        """
+        branches = []
+        for table_name in table_names:
+            value_fields = VITAL_SIGNS_VALUE_FIELDS.get(table_name)
+            if value_fields is None:
+                continue
+            model_class = MODEL_REGISTRY[table_name]
+            change_time = model_class.get_change_time_expression()
+            if query.since is not None and change_time is None:
+                continue
+            id_field = model_class.get_patient_id_field()
+            date_field = model_class.get_date_field()
+            measured_field = getattr(model_class, VITAL_SIGNS_MEASURED_FIELDS[table_name])
+            values = [cast(getattr(model_class, value_field), Float) for _, value_field in value_fields]
+            padding = [cast(null(), Float)] * (SERIES_VALUE_COLUMNS - len(values))
+            
+            branch = (
+                select(
+                    literal(table_name).label('source_table'),
+                    model_class.__mapper__.primary_key[0].label('measurement_id'),
+                    cast(func.extract('epoch', measured_field), Float).label('measured_at'),
+                    *[value.label(f'value_{index}') for index, value in enumerate(values + padding, 1)]
+                )
+                .where(id_field == query.patient_id)
+                .where(date_field >= query.date_range.start)
+                .where(date_field <= query.date_range.end)
+                .where(measured_field.is_not(None))
+            )
+            for value in values:
+                branch = branch.where(value.is_not(None))
+            if query.since is not None:
+                branch = branch.where(change_time > query.since)
+            branches.append(branch)
+            
+        if not branches:
+            return None
+        return union_all(*branches).order_by('source_table', 'measured_at', 'measurement_id')
+
+    def select_downsampled_ids(self, query: PatientQuery, table_names: List[str]) -> Dict[str, List]:
+        """
+        Select the points of each vital sign to return for a downsampled request.
+        
+        The time series are fetched as typed columns (see `build_series_query`)
+        into NumPy arrays, and at most `query.downsample` points of each are
+        selected with the Largest-Triangle-Three-Buckets algorithm, which keeps
+        the peaks and dips of the series. The systolic and diastolic blood
+        pressure are downsampled as a paired series.
+        
+        Parameters
+        ----------
+        query: PatientQuery
+            Query already validated at the API edge, with its `downsample` number of points
         table_names: List[str]
-    ) -> List[Dict]:
+            Tables to query
+            
+        Returns
+        -------
+        Dict[str, List]
+            Primary keys of the selected rows, by table
+            
+        Raises
+        ------
+            RequestTimeoutError: If the query is cancelled by the request deadline
         """
-        Validate input data for all tables before starting threads.
+        series_query = self.build_series_query(query, table_names)
+        if series_query is None:
+            return {}
+        
+        session = self.patient_service.db_session
+        try:
+            with stage(STAGE_SQL):
+                result = session.execute(series_query)
+            with stage(STAGE_FETCH):
+                rows = result.fetchall()
+        except Exception as e:
+            session.rollback()
+            # Queries cancelled by the request deadline are reported as timeouts
+            cancelled = cancellation_error(e)
+            if cancelled is not None:
+                raise cancelled from e
+            raise
+        
+        measurement_ids = {}
+        for table_name, table_rows in groupby(rows, key=itemgetter(0)):
+            with stage(STAGE_DOWNSAMPLE, table_name):
+                table_rows = list(table_rows)
+                value_count = len(VITAL_SIGNS_VALUE_FIELDS[table_name])
+                ids = np.array([row[1] for row in table_rows])
+                series = np.array([row[2:3 + value_count] for row in table_rows], dtype=float)
+                selected = lttb_indices(series[:, 0], series[:, 1:], query.downsample)
+                measurement_ids[table_name] = ids[selected].tolist()
+        return measurement_ids
+
+    def _retrieve_vital_signs(self, query: PatientQuery, table_names: List[str]) -> Dict:
+        """
+        Run the consolidated query of a validated request and build its FHIR Bundle.
         
         Parameters
         ----------
-        patient_id: str
-            Patient ID to validate
-        start_date: str
-            Start date to validate
-        end_date: str
-            End date to validate
+        query: PatientQuery
+            Validated query
         table_names: List[str]
-            List of table names to validate against
+            Tables to query
             
         Returns
         -------
-        List[Dict]
-            List of validation errors, empty if no errors
+        Dict
+            FHIR Bundle containing all vital signs data
         """
-        errors = []
+        try:
+            request_data = query.to_request_data()
+            if query.downsample is not None:
+                # Select the points of each series first, then fetch the rows of these points only
+                request_data['measurement_ids'] = self.select_downsampled_ids(query, table_names)
+            
+            # Execute consolidated query across all tables
+            consolidated_results = filter_data_consolidated(
+                self.patient_service.db_session,
+                request_data,
+                table_names,
+                MODEL_REGISTRY
+            )
+            
+            return self._build_vital_signs_bundle(consolidated_results, query.since)
+            
+        except RequestTimeoutError:
+            raise
+        except Exception as e:
+            raise ValidationError(f"Error retrieving vital signs data: {str(e)}")
+
+    def _build_vital_signs_bundle(self, consolidated_results: Dict, since: Optional[datetime] = None) -> Dict:
+        """
+        Convert the consolidated query results of one patient to a FHIR Bundle.
         
-        # Validate patient ID and date range for each table
-        for table_name in table_names:
-            table_mapping = TABLE_FIELD_MAPPING.get(table_name)
-            if not table_mapping:
-                errors.append({
-                    'field': 'table_name',
-                    'error': f'Invalid table name: {table_name}'
-                })
-                continue
-                
-            id_field = table_mapping['id_field']
-            date_field = table_mapping['date_field']
-            
-            # Validate ID and date values
-            validation_data = {
-                id_field: patient_id,
-                date_field: {
-                    "min_date": start_date,
-                    "max_date": end_date
-                }
-            }
+        The ID of each Observation is the prefix of its table followed by the
+        primary key of its row (e.g. 'temp-1842'), so that a row keeps its ID
+        in every full, incremental or subscription response.
+        
+        Parameters
+        ----------
+        consolidated_results: Dict
+            Dictionary mapping table names to read-only rows
+        since: Optional[datetime]
+            Watermark of an incremental request, if any
+            
+        Returns
+        -------
+        Dict
+            FHIR Bundle containing all vital signs data, with the next
+            watermark in its `meta`
+        """
+        # Collect all FHIR resources
+        all_resources = []
+        
+        # Process results from each table
+        for table_name, table_results in consolidated_results.items():
+            # Get the prefix for this table
+            prefix = RESOURCE_ID_PREFIXES.get(table_name, "res")
             
-            # Generate validation response
-            validation_results = generate_json_validation_response(validation_data)
+            # IDs are derived from the primary key, so that they stay the same across responses
+            primary_key = MODEL_REGISTRY[table_name].__mapper__.primary_key[0].key
             
-            # Check for errors
-            for field, result in validation_results.items():
-                if result['error_msg']:
-                    errors.append({
-                        'field': field,
-                        'error': result['error_msg']
-                    })
+            # Process each result from this table
+            for item in table_results:
+                # Convert to HL7 and then FHIR
+                with stage(STAGE_HL7_BUILD, table_name):
+                    hl7_message = item.to_hl7_v2()
+                with stage(STAGE_HL7_TO_FHIR, table_name):
+                    resource = self.patient_service._convert_hl7_to_fhir(hl7_message, table_name)
+                
+                if resource:
+                    # Update the ID using the appropriate prefix
+                    if "id" in resource:
+                        resource["id"] = f"{prefix}-{getattr(item, primary_key)}"
+                    
+                    all_resources.append(resource)
         
-        return errors 
\ No newline at end of file
+        # Create the combined FHIR Bundle using PatientService's method
+        with stage(STAGE_FHIR_BUNDLE):
+            bundle = self.patient_service.create_fhir_bundle(all_resources)
+            watermark = next_watermark(chain.from_iterable(consolidated_results.values()), since)
+            return add_watermark_to_bundle(bundle, watermark)
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Coalescing of identical concurrent requests
+VITAL_SIGNS_FLIGHT = SingleFlight('vital_signs')
+
+# Maximum seconds a coalesced request waits for the one in progress, outside a request deadline
+COALESCED_REQUEST_TIMEOUT = 15.0
+
+# Value columns of the series query (the most values of a table: the blood pressure components)
+SERIES_VALUE_COLUMNS = max(len(value_fields) for value_fields in VITAL_SIGNS_VALUE_FIELDS.values())
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Vital Signs Export Service module.
+
+This module exports the raw vital signs of a set of patients as columnar
+data, for analyses that would otherwise parse FHIR Bundles back into tables.
+Rows are read from the database cursor into Apache Arrow record batches,
+without going through HL7 or FHIR, and written as an Arrow IPC stream or
+a Parquet file.
+
+Every vital signs table is exported with the same typed schema (see
+`EXPORT_SCHEMA_FIELDS`), as one record batch (one Parquet row group) per
+table. Blood pressure rows are exported once per component (systolic and
+diastolic), with the LOINC code of the component. The measurement names and
+LOINC codes come from `LOINC_MAPPINGS` and `VITAL_SIGNS_COMPONENT_CODES`;
+the unit is the one recorded with the row (`VITAL_SIGNS_UNIT_FIELDS`), or
+else the unit of `LOINC_MAPPINGS`. They are dictionary encoded.
+
+pyarrow is an optional dependency: without it, `require_pyarrow` and
+`export` raise `ExportUnavailableError`.
+"""
+
+# Import modules #
+#----------------#
+
+import importlib.util
+from io import BytesIO
+from itertools import chain, groupby
+from operator import itemgetter
+from typing import List
+
+from sqlalchemy import DateTime, Float, String, any_, bindparam, cast, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import null
+
+# Import project modules #
+#------------------------#
+
+from app.constants.vital_signs_tables import (
+    VITAL_SIGNS_COMPONENT_CODES,
+    VITAL_SIGNS_MEASURED_FIELDS,
+    VITAL_SIGNS_UNIT_FIELDS,
+    VITAL_SIGNS_VALUE_FIELDS
+)
+from app.db import MODEL_REGISTRY
+from app.exceptions import ExportUnavailableError, RequestTimeoutError, ValidationError
+from app.utils.instrumentation import STAGE_ARROW_ENCODE, STAGE_SQL, stage
+from app.utils.lazy_import import lazy_import
+from app.utils.loinc_mappings import LOINC_MAPPINGS
+from app.utils.query_deadline import cancellation_error
+from app.validators.request_validator import BatchPatientQuery
+
+# Check whether the optional `pyarrow` dependency is available, without importing it
+pyarrow_installed = importlib.util.find_spec('pyarrow') is not None
+if pyarrow_installed:
+    pa = lazy_import('pyarrow')
+    pq = lazy_import('pyarrow.parquet')
+
+# Define classes and methods #
+#----------------------------#
+
+class VitalsExportService:
+    """
+    Service class for exporting raw vital signs as Arrow or Parquet data.
+    """
+
+    def __init__(self, db_session: Session):
+        """
+        Initialise the VitalsExportService with a database session.
+
+        Parameters
+        ----------
+        db_session: Session
+            SQLAlchemy database session
+        """
+        self.db_session = db_session
+
+    def build_export_query(self, query: BatchPatientQuery):
+        """
+        Build the query of the rows to export, without executing it.
+
+        Each exported table (and each blood pressure component) is a branch
+        of a UNION ALL selecting the same typed columns, ordered by table so
+        that the rows of a table arrive together. The LOINC code of each
+        component and the unit of each row are selected with the values.
+
+        Parameters
+        ----------
+        query: BatchPatientQuery
+            Batch query already validated at the API edge
+
+        Returns
+        -------
+        sqlalchemy.sql.CompoundSelect
+            The export query
+        """
+        patient_ids = bindparam('id_patients', value=list(query.patient_ids), type_=ARRAY(String))
+        branches = []
+        for table_name, value_fields in VITAL_SIGNS_VALUE_FIELDS.items():
+            model_class = MODEL_REGISTRY[table_name]
+            id_field = model_class.get_patient_id_field()
+            date_field = model_class.get_date_field()
+            modified_field = model_class.get_modified_field()
+            measurement_id_field = model_class.__mapper__.primary_key[0]
+            measured_field = getattr(model_class, VITAL_SIGNS_MEASURED_FIELDS[table_name])
+            loinc_info = LOINC_MAPPINGS[table_name]
+            unit = literal(loinc_info.units) if loinc_info.units else cast(null(), String)
+            if table_name in VITAL_SIGNS_UNIT_FIELDS:
+                unit = func.coalesce(getattr(model_class, VITAL_SIGNS_UNIT_FIELDS[table_name]), unit)
+            for component, value_field in value_fields:
+                loinc_code = VITAL_SIGNS_COMPONENT_CODES[component][0] if component else loinc_info.loinc_code
+                branches.append(
+                    select(
+                        literal(table_name).label('source_table'),
+                        (literal(component) if component else cast(null(), String)).label('component'),
+                        literal(loinc_code).label('loinc_code'),
+                        cast(unit, String).label('unit'),
+                        id_field.label('patient_id'),
+                        measurement_id_field.label('measurement_id'),
+                        cast(getattr(model_class, value_field), Float).label('value'),
+                        measured_field.label('measured_at'),
+                        date_field.label('recorded_at'),
+                        (modified_field if modified_field is not None else cast(null(), DateTime)).label('modified_at')
+                    )
+                    .where(id_field == any_(patient_ids))
+                    .where(date_field >= query.date_range.start)
+                    .where(date_field <= query.date_range.end)
+                )
+        return union_all(*branches).order_by('source_table', 'patient_id', 'measured_at')
+
+    def export(self, query: BatchPatientQuery, export_format: str) -> bytes:
+        """
+        Export the vital signs of several patients within a date range.
+
+        Parameters
+        ----------
+        query: BatchPatientQuery
+            Batch query already validated at the API edge
+        export_format: str
+            One of `EXPORT_FORMATS` ('arrow' for an Arrow IPC stream,
+            'parquet' for a Parquet file)
+
+        Returns
+        -------
+        bytes
+            The Arrow IPC stream or Parquet file
+
+        Raises
+        ------
+            ExportUnavailableError: If pyarrow is not installed
+            ValidationError: If the data cannot be retrieved
+            RequestTimeoutError: If the query is cancelled by the request deadline
+        """
+        require_pyarrow()
+
+        try:
+            with stage(STAGE_SQL):
+                result = self.db_session.execute(
+                    self.build_export_query(query).execution_options(yield_per=EXPORT_FETCH_SIZE)
+                )
+
+            sink = BytesIO()
+            schema = export_schema()
+            if export_format == 'parquet':
+                writer = pq.ParquetWriter(sink, schema)
+            else:
+                writer = pa.ipc.new_stream(sink, schema)
+            with writer:
+                # Rows are fetched in chunks and arrive grouped by table
+                rows = chain.from_iterable(result.partitions())
+                for table_name, table_rows in groupby(rows, key=itemgetter(0)):
+                    table_rows = list(table_rows)
+                    with stage(STAGE_ARROW_ENCODE, table_name):
+                        writer.write_batch(build_record_batch(table_name, table_rows, schema))
+            return sink.getvalue()
+
+        except RequestTimeoutError:
+            raise
+        except Exception as e:
+            self.db_session.rollback()
+            # Queries cancelled by the request deadline are reported as timeouts
+            cancelled = cancellation_error(e)
+            if cancelled is not None:
+                raise cancelled from e
+            raise ValidationError(f"Error exporting vital signs data: {str(e)}")
+
+# Define functions #
+#------------------#
+
+def require_pyarrow() -> None:
+    """
+    Check that the exports can be written.
+
+    Raises
+    ------
+        ExportUnavailableError: If the optional pyarrow dependency is not installed
+    """
+    if not pyarrow_installed:
+        raise ExportUnavailableError("Arrow and Parquet exports require the optional 'pyarrow' dependency")
+
+def export_schema():
+    """
+    Build the Arrow schema of the exported vital signs.
+
+    Returns
+    -------
+    pyarrow.Schema
+        Schema with the fields of `EXPORT_SCHEMA_FIELDS`
+    """
+    types = {
+        'dictionary': pa.dictionary(pa.int8(), pa.string()),
+        'string': pa.string(),
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'timestamp': pa.timestamp('us')
+    }
+    return pa.schema([
+        pa.field(name, types[type_name], nullable=nullable)
+        for name, type_name, nullable in EXPORT_SCHEMA_FIELDS
+    ])
+
+def build_record_batch(table_name: str, rows: List, schema):
+    """
+    Build the record batch of the exported rows of a table.
+
+    Parameters
+    ----------
+    table_name: str
+        Table the rows come from
+    rows: List
+        Rows of the export query (source table, component, LOINC code, unit,
+        patient ID, measurement ID, value and the measured, recorded and
+        modified times)
+    schema: pyarrow.Schema
+        Schema of the export (see `export_schema`)
+
+    Returns
+    -------
+    pyarrow.RecordBatch
+        One row per exported measurement
+    """
+    (
+        _, components, loinc_codes, units, patient_ids, measurement_ids, values, measured_at, recorded_at, modified_at
+    ) = zip(*rows)
+    measurement = LOINC_MAPPINGS[table_name].english_name
+    columns = {
+        'component': components,
+        'loinc_code': loinc_codes,
+        'unit': units,
+        'patient_id': patient_ids,
+        'measurement_id': measurement_ids,
+        'value': values,
+        'measured_at': measured_at,
+        'recorded_at': recorded_at,
+        'modified_at': modified_at
+    }
+    arrays = []
+    for field in schema:
+        if field.name == 'measurement':
+            # Same value for the whole table: a single dictionary entry
+            arrays.append(pa.DictionaryArray.from_arrays(
+                pa.array([0] * len(rows), type=pa.int8()),
+                pa.array([measurement], type=pa.string())
+            ))
+        elif pa.types.is_dictionary(field.type):
+            # A few distinct values per table (e.g. the units of a temperature)
+            arrays.append(pa.array(columns[field.name], type=pa.string()).dictionary_encode().cast(field.type))
+        else:
+            arrays.append(pa.array(columns[field.name], type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Export formats and their media types
+EXPORT_FORMATS = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# File extensions of the export formats
+EXPORT_FILE_EXTENSIONS = {
+    'arrow': 'arrows',
+    'parquet': 'parquet'
+}
+
+# Rows fetched from the database cursor at a time
+EXPORT_FETCH_SIZE = 10000
+
+# Fields of the export schema: name, type and whether they may be null
+EXPORT_SCHEMA_FIELDS = [
+    ('measurement', 'dictionary', False),
+    ('component', 'string', True),
+    ('loinc_code', 'dictionary', False),
+    ('unit', 'dictionary', True),
+    ('patient_id', 'string', False),
+    ('measurement_id', 'int64', False),
+    ('value', 'float64', True),
+    ('measured_at', 'timestamp', True),
+    ('recorded_at', 'timestamp', True),
+    ('modified_at', 'timestamp', True)
+]
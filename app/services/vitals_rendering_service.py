@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Vital Signs Rendering Service module.
+
+This module is the SQL engine of the vital signs FHIR rendering. The Python
+engine has Postgres serialise each row with `row_to_json`, decodes it, builds
+an HL7 v2 message from it, parses the message back into a FHIR Observation
+and encodes the Bundle as JSON. Here, each table of the UNION ALL is a branch
+selecting the final Observation as JSON text, built by `json_build_object`
+around the constant category and LOINC blocks of the table (`LOINC_MAPPINGS`),
+which are sent as JSON literals. Python never parses the Observations: the
+text rows are streamed into the Bundle response as they are.
+
+The Bundles are the same as those of the Python engine (see
+`OBSERVATION_RENDERINGS`, which mirrors the HL7 messages built by each
+model's `to_hl7_v2`): the Observations are in the same order, by table and
+primary key, with the same IDs, derived from the primary key. JSON is built with the `json` type rather
+than `jsonb` to keep the keys in the order of the Python engine.
+"""
+
+# Import modules #
+#----------------#
+
+import json
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, Float, Text, any_, bindparam, case, cast, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import ARRAY, JSON
+from sqlalchemy.sql.elements import ClauseElement
+from sqlalchemy.sql.expression import null
+
+# Import project modules #
+#------------------------#
+
+from app.constants.resource_prefixes import RESOURCE_ID_PREFIXES
+from app.constants.table_names import (
+    CONSTANTES,
+    FRECUENCIA_CARDIACA,
+    FRECUENCIA_RESPIRATORIA,
+    GLUCOSA,
+    PESO,
+    PRESION_ARTERIAL,
+    SATURACION_OXIGENO,
+    TALLA,
+    TEMPERATURA
+)
+from app.constants.vital_signs_tables import (
+    VITAL_SIGNS_COMPONENT_CODES,
+    VITAL_SIGNS_TABLES,
+    VITAL_SIGNS_VALUE_FIELDS
+)
+from app.db import MODEL_REGISTRY
+from app.exceptions import RequestTimeoutError, ValidationError
+from app.services.patient_service import PatientService
+from app.services.vital_signs_service import VitalSignsService
+from app.utils.instrumentation import STAGE_FETCH, STAGE_SQL, stage
+from app.utils.loinc_mappings import LOINC_MAPPINGS
+from app.utils.query_deadline import cancellation_error
+from app.utils.single_flight import SingleFlight
+from app.utils.watermark import add_watermark_to_bundle
+from app.validators.request_validator import PatientQuery
+
+# Define classes and methods #
+#----------------------------#
+
+class ObservationRendering(NamedTuple):
+    """
+    Fields of the HL7 message of a table's rows rendered into its Observations.
+
+    Attributes
+    ----------
+    value : str, optional
+        Constant value of the rows, for tables without value fields
+        (the values are otherwise those of `VITAL_SIGNS_VALUE_FIELDS`)
+    units : str, optional
+        Constant units of the values
+    units_field : str, optional
+        Column holding the units of the values, instead of constant units
+    reference_range : str, optional
+        Reference range of the values ("low-high" or free text)
+    unit_reference_ranges : Tuple[Tuple[str, str], ...], optional
+        Reference ranges replacing `reference_range` for some values of `units_field`
+    """
+    value: str = ''
+    units: str = ''
+    units_field: Optional[str] = None
+    reference_range: Optional[str] = None
+    unit_reference_ranges: Tuple[Tuple[str, str], ...] = ()
+
+
+class VitalsRenderingService:
+    """
+    Service class for rendering the vital signs FHIR Bundles in the database.
+    """
+
+    def __init__(self, patient_service: PatientService):
+        """
+        Initialise the VitalsRenderingService with a PatientService instance.
+
+        Parameters
+        ----------
+        patient_service: PatientService
+            PatientService instance, whose session runs the query
+        """
+        self.patient_service = patient_service
+
+    def build_rendering_query(
+        self,
+        query: PatientQuery,
+        table_names: Optional[List[str]] = None,
+        measurement_ids: Optional[Dict[str, List]] = None
+    ):
+        """
+        Build the query of the rendered Observations, without executing it.
+
+        Each table is a branch of a UNION ALL selecting, for every row, the
+        position of the table in `table_names` (`table_index`), the
+        Observation as JSON text (`resource`), the primary key of the row
+        (`measurement_id`) and the time the row was added or last modified
+        (`changed_at`), ordered by table and primary key, as the Python
+        engine orders its rows (see `filter_data_consolidated`).
+
+        Parameters
+        ----------
+        query: PatientQuery
+            Query already validated at the API edge. If its `since` watermark
+            is set, tables without any change timestamp are left out.
+        table_names: Optional[List[str]]
+            Tables to query (all the vital signs tables by default)
+        measurement_ids: Optional[Dict[str, List]]
+            Primary keys of the rows to select, by table (tables without any
+            are left out), e.g. those of a downsampled request
+
+        Returns
+        -------
+        sqlalchemy.sql.CompoundSelect or None
+            The rendering query, or None if no table is queried
+        """
+        if table_names is None:
+            table_names = VITAL_SIGNS_TABLES
+
+        branches = []
+        for table_index, table_name in enumerate(table_names):
+            if table_name not in OBSERVATION_RENDERINGS:
+                continue
+            if measurement_ids is not None and not measurement_ids.get(table_name):
+                continue
+            model_class = MODEL_REGISTRY[table_name]
+            change_time = model_class.get_change_time_expression()
+            if query.since is not None and change_time is None:
+                continue
+            primary_key = model_class.__mapper__.primary_key[0]
+
+            branch = select(
+                literal(table_index).label('table_index'),
+                literal(table_name).label('source_table'),
+                primary_key.label('measurement_id'),
+                cast(_observation_json(table_name, model_class), Text).label('resource'),
+                (change_time if change_time is not None else cast(null(), DateTime)).label('changed_at')
+            ).where(model_class.get_patient_id_field() == query.patient_id)
+
+            date_field = model_class.get_date_field()
+            if date_field is not None:
+                branch = branch.where(date_field >= query.date_range.start).where(date_field <= query.date_range.end)
+            # Rows without a value have no Observation
+            value_fields = VITAL_SIGNS_VALUE_FIELDS.get(table_name, ())
+            if len(value_fields) == 1:
+                branch = branch.where(getattr(model_class, value_fields[0][1]).is_not(None))
+            if query.since is not None:
+                branch = branch.where(change_time >= query.since)
+            if measurement_ids is not None:
+                branch = branch.where(primary_key == any_(bindparam(
+                    f'{table_name}_ids',
+                    value=list(measurement_ids[table_name]),
+                    type_=ARRAY(primary_key.type)
+                )))
+            branches.append(branch)
+
+        if not branches:
+            return None
+        return union_all(*branches).order_by('table_index', 'measurement_id')
+
+    def render_vital_signs(self, query: PatientQuery, table_names: Optional[List[str]] = None) -> Iterator[str]:
+        """
+        Render the vital signs FHIR Bundle of a request in the database.
+
+        The query runs before this method returns, so that its errors can be
+        reported; the Bundle is then yielded in chunks of rendered
+        Observations, without parsing them.
+
+        Parameters
+        ----------
+        query: PatientQuery
+            Query already validated at the API edge. If its `downsample`
+            number of points is set, the points are selected first (see
+            `VitalSignsService.select_downsampled_ids`).
+        table_names: Optional[List[str]]
+            Tables to query (all the vital signs tables by default)
+
+        Returns
+        -------
+        Iterator[str]
+            Chunks of the FHIR Bundle's JSON text, with the next watermark in its `meta`
+
+        Raises
+        ------
+            ValidationError: If the data cannot be retrieved
+            RequestTimeoutError: If the query is cancelled by the request deadline,
+            or an identical request in progress takes too long
+
+        Note
+        ----
+        Identical concurrent requests share a single query and its (read-only) rows.
+        """
+        table_names = list(VITAL_SIGNS_TABLES if table_names is None else table_names)
+        rows = RENDERING_FLIGHT.do(
+            (tuple(table_names), query),
+            lambda: self._fetch_rendered_rows(query, table_names),
+            timeout=COALESCED_REQUEST_TIMEOUT
+        )
+
+        watermark = query.since
+        for row in rows:
+            if row.changed_at is not None and (watermark is None or row.changed_at > watermark):
+                watermark = row.changed_at
+        return rendered_bundle_chunks([row.resource for row in rows], watermark)
+
+    def _fetch_rendered_rows(self, query: PatientQuery, table_names: List[str]) -> List:
+        """Run the rendering query of a request and fetch its rows."""
+        session = self.patient_service.db_session
+        try:
+            measurement_ids = None
+            if query.downsample is not None:
+                vital_signs_service = VitalSignsService(self.patient_service)
+                measurement_ids = vital_signs_service.select_downsampled_ids(query, table_names)
+
+            rendering_query = self.build_rendering_query(query, table_names, measurement_ids)
+            if rendering_query is None:
+                return []
+            with stage(STAGE_SQL):
+                result = session.execute(rendering_query)
+            with stage(STAGE_FETCH):
+                return result.fetchall()
+        except RequestTimeoutError:
+            raise
+        except Exception as e:
+            session.rollback()
+            # Queries cancelled by the request deadline are reported as timeouts
+            cancelled = cancellation_error(e)
+            if cancelled is not None:
+                raise cancelled from e
+            raise ValidationError(f"Error retrieving vital signs data: {str(e)}")
+
+# Define functions #
+#------------------#
+
+def rendered_bundle_chunks(
+    resources: Sequence[str],
+    watermark: Optional[datetime] = None,
+    chunk_size: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Yield the JSON text of a searchset Bundle of rendered resources.
+
+    Parameters
+    ----------
+    resources: Sequence[str]
+        JSON text of each resource, included as it is
+    watermark: Optional[datetime]
+        Next watermark, added to the Bundle's `meta` if set
+    chunk_size: Optional[int]
+        Resources per chunk (`RENDERED_ENTRIES_PER_CHUNK` by default)
+
+    Yields
+    ------
+    str
+        Chunks of the Bundle, the same JSON as the Python engine's Bundle
+    """
+    if chunk_size is None:
+        chunk_size = RENDERED_ENTRIES_PER_CHUNK
+    head = json.dumps({'resourceType': 'Bundle', 'type': 'searchset', 'total': len(resources)})
+    yield head[:-1] + ', "entry": ['
+    for start in range(0, len(resources), chunk_size):
+        entries = ', '.join(f'{{"resource": {resource}}}' for resource in resources[start:start + chunk_size])
+        yield entries if start == 0 else ', ' + entries
+    meta = add_watermark_to_bundle({}, watermark).get('meta')
+    yield ']}' if meta is None else f'], "meta": {json.dumps(meta)}}}'
+
+# Define helper functions #
+#-------------------------#
+
+def _observation_json(table_name: str, model_class):
+    """
+    Build the SQL expression of the Observation of a table's rows.
+
+    The fields mirror the Python engine's `format_vital_signs_fhir` applied
+    to the HL7 message of the row (see `OBSERVATION_RENDERINGS`).
+    """
+    rendering = OBSERVATION_RENDERINGS[table_name]
+    loinc_info = LOINC_MAPPINGS[table_name]
+    prefix = RESOURCE_ID_PREFIXES.get(table_name, 'res')
+
+    if rendering.units_field is not None:
+        units = func.coalesce(getattr(model_class, rendering.units_field), '')
+    else:
+        units = rendering.units
+
+    resource = {
+        'resourceType': 'Observation',
+        'id': func.concat(f'{prefix}-', model_class.__mapper__.primary_key[0]),
+        'status': 'final',
+        'category': OBSERVATION_CATEGORY,
+        'code': {'coding': [{'system': loinc_info.system, 'code': loinc_info.loinc_code, 'display': loinc_info.description}]},
+        'subject': {'reference': func.concat('Patient/', model_class.get_patient_id_field())}
+    }
+
+    # Values are sent as text, as the HL7 message does
+    value_fields = VITAL_SIGNS_VALUE_FIELDS.get(table_name, ())
+    if len(value_fields) == 1:
+        value = cast(cast(getattr(model_class, value_fields[0][1]), Float), Text)
+        # Python writes integral floats with a fractional part (72.0), Postgres does not (72)
+        resource['valueString'] = case((value.regexp_match('^-?[0-9]+$'), func.concat(value, '.0')), else_=value)
+    elif not value_fields:
+        resource['valueString'] = rendering.value
+
+    if rendering.unit_reference_ranges:
+        reference_range = case(
+            *[
+                (units == unit, _json_expression(_reference_range(range_text, units)))
+                for unit, range_text in rendering.unit_reference_ranges
+            ],
+            else_=_json_expression(_reference_range(rendering.reference_range, units))
+        )
+        resource['referenceRange'] = [reference_range]
+    elif rendering.reference_range:
+        resource['referenceRange'] = [_reference_range(rendering.reference_range, units)]
+
+    # Values of several components (the blood pressure) are quantities
+    if len(value_fields) > 1:
+        resource['component'] = [
+            {
+                'code': {'coding': [{'system': 'http://loinc.org', 'code': code, 'display': display}]},
+                'valueQuantity': _quantity(cast(getattr(model_class, value_field), Float), units)
+            }
+            for component, value_field in value_fields
+            for code, display in [VITAL_SIGNS_COMPONENT_CODES[component]]
+        ]
+    return _json_expression(resource)
+
+def _reference_range(range_text: str, units) -> Dict:
+    """Build the reference range of a "low-high" range, or of free text."""
+    try:
+        low, high = range_text.split('-')
+        return {'low': _quantity(float(low), units), 'high': _quantity(float(high), units)}
+    except ValueError:
+        return {'text': range_text}
+
+def _quantity(value, units) -> Dict:
+    """Build a quantity in UCUM units."""
+    return {'value': value, 'unit': units, 'system': 'http://unitsofmeasure.org', 'code': units}
+
+def _json_expression(value):
+    """
+    Convert a JSON value whose parts may be SQL expressions into a SQL expression.
+
+    Constant parts are sent as a single JSON literal; objects and arrays
+    holding expressions are built with `json_build_object` and `json_build_array`.
+    """
+    if isinstance(value, ClauseElement):
+        return value
+    if not _has_expression(value):
+        return cast(literal(json.dumps(value, ensure_ascii=False)), JSON)
+    if isinstance(value, dict):
+        arguments = []
+        for key, item in value.items():
+            arguments += [literal(key), _json_argument(item)]
+        return func.json_build_object(*arguments, type_=JSON)
+    return func.json_build_array(*[_json_argument(item) for item in value], type_=JSON)
+
+def _json_argument(value):
+    """Convert a member of a JSON object or array into an argument of `json_build_object`."""
+    if isinstance(value, (dict, list, ClauseElement)):
+        return _json_expression(value)
+    return literal(value)
+
+def _has_expression(value) -> bool:
+    """Check whether a JSON value holds any SQL expression."""
+    if isinstance(value, ClauseElement):
+        return True
+    if isinstance(value, dict):
+        return any(_has_expression(item) for item in value.values())
+    if isinstance(value, list):
+        return any(_has_expression(item) for item in value)
+    return False
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Fields of the HL7 message of each table's rows (see each model's `to_hl7_v2`).
+# Only the first OBX segment of a message is rendered, as in the Python engine
+# (the glycated haemoglobin and the BMI are left out)
+OBSERVATION_RENDERINGS = {
+    SATURACION_OXIGENO: ObservationRendering(units='%', reference_range='95-100'),
+    TEMPERATURA: ObservationRendering(
+        units_field='escala_temp',
+        reference_range='96.8-104',
+        unit_reference_ranges=(('ºC', '36-40'),)
+    ),
+    PRESION_ARTERIAL: ObservationRendering(units='mmHg', reference_range='90-120/60-80'),
+    FRECUENCIA_CARDIACA: ObservationRendering(units='bpm', reference_range='60-100'),
+    FRECUENCIA_RESPIRATORIA: ObservationRendering(units='breaths/min', reference_range='12-20'),
+    CONSTANTES: ObservationRendering(value='COMPLETE'),
+    GLUCOSA: ObservationRendering(
+        units_field='escala',
+        reference_range='3.9-5.6',
+        unit_reference_ranges=(('mg/dL', '70-100'),)
+    ),
+    PESO: ObservationRendering(units_field='escala'),
+    TALLA: ObservationRendering(units='cm')
+}
+
+# Category of the vital signs Observations
+OBSERVATION_CATEGORY = [{
+    'coding': [{
+        'system': 'http://terminology.hl7.org/CodeSystem/observation-category',
+        'code': 'vital-signs',
+        'display': 'Vital Signs'
+    }]
+}]
+
+# Rendered Observations per chunk of a streamed Bundle
+RENDERED_ENTRIES_PER_CHUNK = 500
+
+# Coalescing of identical concurrent requests
+RENDERING_FLIGHT = SingleFlight('vital_signs_rendering')
+
+# Maximum seconds a coalesced request waits for the one in progress, outside a request deadline
+COALESCED_REQUEST_TIMEOUT = 15.0
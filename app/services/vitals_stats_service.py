@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Vital Signs Statistics Service module.
+
+This module implements a FHIR `$stats`-style operation for the vital signs:
+the count, minimum, maximum, mean and quartiles of each vital sign per time
+bucket (hour, shift or day), so that a chart of a week of minute-level
+readings needs a few hundred resources instead of tens of thousands.
+
+The statistics are computed by the database in a single query: each table
+(and each blood pressure component) is a branch of a UNION ALL grouping its
+values by `date_bin` of the measurement time and by unit, so that the
+temperatures recorded in ºC and ºF (or the glucose in mg/dL and mmol/L) are
+never mixed. Each group is returned as a compact Observation, in its unit,
+whose components are the statistics (see `format_vital_signs_statistics_fhir`).
+"""
+
+# Import modules #
+#----------------#
+
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import Float, Interval, String, cast, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.sql.expression import null
+
+# Import project modules #
+#------------------------#
+
+from app.config import STATS_SHIFT_HOURS, STATS_SHIFT_START_HOUR
+from app.constants.resource_prefixes import RESOURCE_ID_PREFIXES
+from app.constants.vital_signs_tables import (
+    VITAL_SIGNS_COMPONENT_CODES,
+    VITAL_SIGNS_MEASURED_FIELDS,
+    VITAL_SIGNS_UNIT_FIELDS,
+    VITAL_SIGNS_VALUE_FIELDS
+)
+from app.db import MODEL_REGISTRY
+from app.exceptions import RequestTimeoutError, ValidationError
+from app.services.patient_service import PatientService
+from app.utils.fhir_formatter import format_vital_signs_statistics_fhir
+from app.utils.instrumentation import STAGE_FETCH, STAGE_FHIR_BUNDLE, STAGE_SQL, stage
+from app.utils.loinc_mappings import LOINC_MAPPINGS
+from app.utils.query_deadline import cancellation_error
+from app.validators.request_validator import PatientQuery
+
+# Define classes and methods #
+#----------------------------#
+
+class VitalsStatsService:
+    """
+    Service class for computing statistics of the vital signs over time buckets.
+    """
+
+    def __init__(self, patient_service: PatientService):
+        """
+        Initialise the VitalsStatsService with a PatientService instance.
+
+        Parameters
+        ----------
+        patient_service: PatientService
+            PatientService instance, whose session runs the query
+        """
+        self.patient_service = patient_service
+
+    def build_stats_query(self, query: PatientQuery, bucket: str, table_names: Optional[List[str]] = None):
+        """
+        Build the statistics query without executing it.
+
+        Parameters
+        ----------
+        query: PatientQuery
+            Query already validated at the API edge
+        bucket: str
+            One of `STATS_BUCKETS`
+        table_names: Optional[List[str]]
+            Tables to compute the statistics of (default: every vital sign with values)
+
+        Returns
+        -------
+        sqlalchemy.sql.CompoundSelect or None
+            The statistics query, or None if no table is queried
+        """
+        width, origin = STATS_BUCKETS[bucket]
+        branches = []
+        for table_name, value_fields in VITAL_SIGNS_VALUE_FIELDS.items():
+            if table_names is not None and table_name not in table_names:
+                continue
+            model_class = MODEL_REGISTRY[table_name]
+            id_field = model_class.get_patient_id_field()
+            date_field = model_class.get_date_field()
+            measured_field = getattr(model_class, VITAL_SIGNS_MEASURED_FIELDS[table_name])
+            bucket_start = func.date_bin(literal(width, Interval), measured_field, literal(origin))
+            # Unit recorded with each row, if any, else the unit of the LOINC mapping
+            loinc_units = LOINC_MAPPINGS[table_name].units
+            unit = literal(loinc_units) if loinc_units else cast(null(), String)
+            if table_name in VITAL_SIGNS_UNIT_FIELDS:
+                unit = func.coalesce(getattr(model_class, VITAL_SIGNS_UNIT_FIELDS[table_name]), unit)
+            unit = cast(unit, String)
+            for component, value_field in value_fields:
+                value = cast(getattr(model_class, value_field), Float)
+                branches.append(
+                    select(
+                        literal(table_name).label('source_table'),
+                        (literal(component) if component else cast(null(), String)).label('component'),
+                        bucket_start.label('bucket_start'),
+                        unit.label('unit'),
+                        func.count(value).label('count'),
+                        func.min(value).label('minimum'),
+                        func.max(value).label('maximum'),
+                        func.avg(value).label('average'),
+                        func.percentile_cont(array(STATS_QUARTILES)).within_group(value).label('quartiles')
+                    )
+                    .where(id_field == query.patient_id)
+                    .where(date_field >= query.date_range.start)
+                    .where(date_field <= query.date_range.end)
+                    .where(measured_field.is_not(None))
+                    .where(value.is_not(None))
+                    .group_by(bucket_start, unit)
+                )
+        if not branches:
+            return None
+        return union_all(*branches).order_by('source_table', 'component', 'bucket_start', 'unit')
+
+    def retrieve_stats(self, query: PatientQuery, bucket: str, table_names: Optional[List[str]] = None) -> Dict:
+        """
+        Compute the statistics of the vital signs of a patient per time bucket.
+
+        Parameters
+        ----------
+        query: PatientQuery
+            Query already validated at the API edge
+        bucket: str
+            One of `STATS_BUCKETS`
+        table_names: Optional[List[str]]
+            Tables to compute the statistics of (default: every vital sign with values)
+
+        Returns
+        -------
+        Dict
+            FHIR Bundle with one Observation per table, component, bucket and unit
+
+        Raises
+        ------
+            ValidationError: If the statistics cannot be computed
+            RequestTimeoutError: If the query is cancelled by the request deadline
+        """
+        session = self.patient_service.db_session
+        try:
+            stats_query = self.build_stats_query(query, bucket, table_names)
+            if stats_query is None:
+                return self.patient_service.create_fhir_bundle([])
+            with stage(STAGE_SQL):
+                result = session.execute(stats_query)
+            with stage(STAGE_FETCH):
+                rows = result.fetchall()
+        except RequestTimeoutError:
+            raise
+        except Exception as e:
+            session.rollback()
+            # Queries cancelled by the request deadline are reported as timeouts
+            cancelled = cancellation_error(e)
+            if cancelled is not None:
+                raise cancelled from e
+            raise ValidationError(f"Error computing vital signs statistics: {str(e)}")
+
+        width = STATS_BUCKETS[bucket][0]
+        with stage(STAGE_FHIR_BUNDLE):
+            resources = [self._build_statistics_observation(query.patient_id, row, width) for row in rows]
+            return self.patient_service.create_fhir_bundle(resources)
+
+    def _build_statistics_observation(self, patient_id: str, row, width: timedelta) -> Dict:
+        """Build the Observation of one row of the statistics query."""
+        loinc_info = LOINC_MAPPINGS[row.source_table]
+        loinc_code, loinc_description = loinc_info.loinc_code, loinc_info.description
+        if row.component:
+            loinc_code, loinc_description = VITAL_SIGNS_COMPONENT_CODES[row.component]
+
+        lower_quartile, median, upper_quartile = row.quartiles or (None, None, None)
+        prefix = RESOURCE_ID_PREFIXES.get(row.source_table, 'res')
+        if row.component:
+            prefix = f"{prefix}-{row.component}"
+        measurement_id = f"{prefix}-stats-{row.bucket_start:%Y%m%d%H%M}"
+        if row.source_table in VITAL_SIGNS_UNIT_FIELDS and row.unit:
+            # A bucket has one Observation per recorded unit
+            measurement_id = f"{measurement_id}-{NON_ID_CHARACTERS.sub('', row.unit)}"
+        return format_vital_signs_statistics_fhir(
+            patient_id=patient_id,
+            measurement_id=measurement_id,
+            statistics={
+                'count': row.count,
+                'minimum': row.minimum,
+                'maximum': row.maximum,
+                'average': row.average,
+                '4-lower': lower_quartile,
+                'median': median,
+                '4-upper': upper_quartile
+            },
+            period_start=row.bucket_start,
+            period_end=row.bucket_start + width,
+            units=row.unit or None,
+            loinc_code=loinc_code,
+            loinc_description=loinc_description
+        )
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Time buckets: width and origin of the `date_bin` grid. Shifts start at
+# STATS_SHIFT_START_HOUR every STATS_SHIFT_HOURS hours.
+STATS_BUCKETS = {
+    'hour': (timedelta(hours=1), datetime(2000, 1, 1)),
+    'shift': (timedelta(hours=STATS_SHIFT_HOURS), datetime(2000, 1, 1, STATS_SHIFT_START_HOUR)),
+    'day': (timedelta(days=1), datetime(2000, 1, 1))
+}
+
+# Fractions computed by `percentile_cont`: the lower quartile, median and upper quartile
+STATS_QUARTILES = [0.25, 0.5, 0.75]
+
+# Characters of a unit left out of the Observation IDs (FHIR IDs are [A-Za-z0-9.-])
+NON_ID_CHARACTERS = re.compile(r'[^A-Za-z0-9.-]')
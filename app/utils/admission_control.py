@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Admission control module.
+
+This module bounds how many requests run at once, with a separate budget
+(concurrency limit, wait queue and maximum wait) for each role and endpoint,
+so that heavy operational data pulls cannot exhaust the database connection
+pool needed by the vital signs requests.
+
+A request finding its budget full waits in the budget's queue. It is
+rejected with a 429 response and a `Retry-After` header if the queue is full
+or if it waits longer than the budget allows.
+"""
+
+# Import modules #
+#----------------#
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Iterator, NamedTuple, Tuple
+
+from flask import request
+
+# Import project modules #
+#------------------------#
+
+from app.config import ADMISSION_LIMITS, DEFAULT_ADMISSION_LIMIT
+from app.constants.error_messages import ADMISSION_QUEUE_FULL_ERROR, ADMISSION_TIMEOUT_ERROR
+from app.exceptions import AdmissionRejectedError
+from app.utils.metrics import counter, gauge, histogram
+
+# Define classes #
+#----------------#
+
+class AdmissionLimit(NamedTuple):
+    """
+    Concurrency budget of a role and endpoint.
+
+    Attributes
+    ----------
+    max_concurrent : int
+        Requests running at once
+    max_queue : int
+        Requests allowed to wait for a free slot
+    max_wait : float
+        Seconds a request may wait before being rejected
+    """
+    max_concurrent: int
+    max_queue: int
+    max_wait: float
+
+
+class _Budget:
+    """Running and waiting requests of one role and endpoint."""
+
+    def __init__(self, limit: AdmissionLimit):
+        self.limit = limit
+        self.running = 0
+        self.waiting = 0
+        self.service_time = INITIAL_SERVICE_TIME
+        self.condition = threading.Condition()
+
+    def retry_after(self) -> int:
+        """Estimate the seconds until a new request would be admitted."""
+        backlog = (self.waiting + 1) / self.limit.max_concurrent
+        return max(MIN_RETRY_AFTER, math.ceil(self.service_time * backlog))
+
+    def record_service_time(self, seconds: float) -> None:
+        """Update the moving average of the time requests hold a slot."""
+        self.service_time += SERVICE_TIME_SMOOTHING * (seconds - self.service_time)
+
+
+class AdmissionController:
+    """
+    Per role and endpoint concurrency limits.
+
+    Parameters
+    ----------
+    limits : Dict[str, Dict[str, Dict]]
+        Budgets by role and endpoint (see `ADMISSION_LIMITS` in `app.config`)
+    default_limit : Dict
+        Budget of any other role and endpoint
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, Dict]], default_limit: Dict):
+        self.limits = {
+            (role, endpoint): AdmissionLimit(**limit)
+            for role, endpoints in limits.items()
+            for endpoint, limit in endpoints.items()
+        }
+        self.default_limit = AdmissionLimit(**default_limit)
+        self._budgets: Dict[Tuple[str, str], _Budget] = {}
+        self._lock = threading.Lock()
+
+    def _budget(self, role: str, endpoint: str) -> _Budget:
+        """Return the budget of a role and endpoint, creating it if needed."""
+        key = (role, endpoint)
+        with self._lock:
+            budget = self._budgets.get(key)
+            if budget is None:
+                budget = self._budgets[key] = _Budget(self.limits.get(key, self.default_limit))
+            return budget
+
+    @contextmanager
+    def admit(self, role: str, endpoint: str) -> Iterator[None]:
+        """
+        Hold a slot of the role and endpoint budget for the duration of the block.
+
+        Requests are admitted in arrival order: a new request queues as soon
+        as others are already waiting.
+
+        Raises
+        ------
+        AdmissionRejectedError
+            If the budget's queue is full or no slot frees up in time
+        """
+        budget = self._budget(role, endpoint)
+        limit = budget.limit
+        labels = {'role': role, 'endpoint': endpoint}
+        arrival = time.monotonic()
+
+        with budget.condition:
+            if budget.running >= limit.max_concurrent or budget.waiting:
+                if budget.waiting >= limit.max_queue:
+                    ADMISSION_REJECTED.inc(reason='queue_full', **labels)
+                    raise AdmissionRejectedError(ADMISSION_QUEUE_FULL_ERROR, budget.retry_after())
+
+                budget.waiting += 1
+                ADMISSION_QUEUE_DEPTH.set(budget.waiting, **labels)
+                deadline = arrival + limit.max_wait
+                try:
+                    while budget.running >= limit.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            ADMISSION_REJECTED.inc(reason='timeout', **labels)
+                            raise AdmissionRejectedError(ADMISSION_TIMEOUT_ERROR, budget.retry_after())
+                        budget.condition.wait(remaining)
+                finally:
+                    budget.waiting -= 1
+                    ADMISSION_QUEUE_DEPTH.set(budget.waiting, **labels)
+
+            budget.running += 1
+            ADMISSION_RUNNING.set(budget.running, **labels)
+
+        admitted = time.monotonic()
+        ADMISSION_WAIT_SECONDS.observe(admitted - arrival, **labels)
+        try:
+            yield
+        finally:
+            with budget.condition:
+                budget.running -= 1
+                budget.record_service_time(time.monotonic() - admitted)
+                ADMISSION_RUNNING.set(budget.running, **labels)
+                budget.condition.notify()
+
+# Define functions #
+#------------------#
+
+def admission_controlled(endpoint: str):
+    """
+    Run a route handler within the budget of the user's role and `endpoint`.
+
+    Must be applied below `token_required`, which sets the user's role.
+    Rejected requests get a 429 response with a `Retry-After` header.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            try:
+                with ADMISSION_CONTROLLER.admit(request.user['role'], endpoint):
+                    return f(*args, **kwargs)
+            except AdmissionRejectedError as e:
+                return (
+                    {'field': 'admission', 'error': str(e)},
+                    429,
+                    {'Retry-After': str(e.retry_after)}
+                )
+        return decorated
+    return decorator
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Seconds a request is assumed to hold a slot before any has been measured
+INITIAL_SERVICE_TIME = 1.0
+
+# Weight of the latest request in the moving average of the service time
+SERVICE_TIME_SMOOTHING = 0.2
+
+# Minimum Retry-After value, in seconds
+MIN_RETRY_AFTER = 1
+
+# Process-wide controller
+ADMISSION_CONTROLLER = AdmissionController(ADMISSION_LIMITS, DEFAULT_ADMISSION_LIMIT)
+
+# Admission metrics
+ADMISSION_RUNNING = gauge(
+    'admission_running_requests',
+    'Requests holding a slot of their budget',
+    ('role', 'endpoint')
+)
+ADMISSION_QUEUE_DEPTH = gauge(
+    'admission_queue_depth',
+    'Requests waiting for a slot of their budget',
+    ('role', 'endpoint')
+)
+ADMISSION_WAIT_SECONDS = histogram(
+    'admission_wait_seconds',
+    'Time admitted requests waited for a slot',
+    ('role', 'endpoint')
+)
+ADMISSION_REJECTED = counter(
+    'admission_rejected_total',
+    'Requests rejected with 429, by reason (queue_full or timeout)',
+    ('role', 'endpoint', 'reason')
+)
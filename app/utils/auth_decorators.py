@@ -27,4 +27,21 @@ def token_required(f):
             return {'message': 'Token is invalid or expired!'}, 401
         request.user = data  # Attach user info to request
         return f(*args, **kwargs)
-    return decorated 
\ No newline at end of file
+    return decorated
+
+def role_required(*roles, error=None):
+    """
+    Reject the requests of users without one of `roles` with a 403 response.
+
+    Must be applied below `token_required`, which sets the user's role, and
+    above `admission_controlled`, so that unauthorised requests never wait
+    for (or are rejected for lack of) an admission slot.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.user['role'] not in roles:
+                return error or {'message': 'Insufficient permissions.'}, 403
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
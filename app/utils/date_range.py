@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Date range module.
+
+This module provides the immutable `DateRange` value object. A date range is
+parsed once at the API edge from the 'YYYY-MM-DD' / 'YYYY-MM-DD HH:MM' strings
+sent by clients and is then passed as is to the services and to `app.db`,
+so no layer needs to parse the same strings again.
+"""
+
+# Import modules #
+#----------------#
+
+import re
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional
+
+# Import project modules #
+#------------------------#
+
+from app.constants.error_messages import (
+    INVALID_DATE_FORMAT_ERROR,
+    INVALID_DATE_RANGE_ERROR
+)
+
+# Define functions #
+#------------------#
+
+def parse_date_bound(value, is_max_date: bool = False) -> Optional[datetime]:
+    """
+    Parse one edge of a date range.
+
+    The format is detected with a precompiled pattern for the two canonical
+    forms ('YYYY-MM-DD HH:MM' and 'YYYY-MM-DD'). Non-canonical values
+    (e.g. non zero-padded fields) fall back to `datetime.strptime`, so the
+    set of accepted inputs is the same as with the try/fallback parsing.
+
+    Parameters
+    ----------
+    value : str
+        Date string in format 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+    is_max_date : bool
+        If True, date-only values default to 23:59 instead of 00:00
+
+    Returns
+    -------
+    Optional[datetime]
+        Parsed datetime, or None if the value is not a valid date
+    """
+    if not isinstance(value, str):
+        return None
+
+    match = DATETIME_REGEX.fullmatch(value)
+    if match is not None:
+        try:
+            return datetime(*map(int, match.groups()))
+        except ValueError:
+            return None
+
+    match = DATE_REGEX.fullmatch(value)
+    if match is not None:
+        try:
+            parsed = datetime(*map(int, match.groups()))
+        except ValueError:
+            return None
+        return parsed.replace(hour=23, minute=59) if is_max_date else parsed
+
+    # Non-canonical forms keep the original strptime semantics
+    try:
+        return datetime.strptime(value, DATETIME_FORMAT)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        return None
+    return parsed.replace(hour=23, minute=59) if is_max_date else parsed
+
+# Define classes #
+#----------------#
+
+class DateRange(NamedTuple):
+    """
+    Immutable, already parsed date range. Both edges are inclusive.
+
+    Attributes
+    ----------
+    start : datetime
+        Start of the range (date-only inputs default to 00:00)
+    end : datetime
+        End of the range (date-only inputs default to 23:59)
+    """
+    start: datetime
+    end: datetime
+
+    @classmethod
+    def from_strings(cls, min_date, max_date) -> 'DateRange':
+        """
+        Parse a date range from the client supplied strings.
+
+        Parameters
+        ----------
+        min_date : str
+            Start date in format 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+        max_date : str
+            End date in format 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+
+        Returns
+        -------
+        DateRange
+            The parsed date range
+
+        Raises
+        ------
+        ValueError
+            If any of the dates has an invalid format or min_date > max_date
+        """
+        start = parse_date_bound(min_date)
+        end = parse_date_bound(max_date, is_max_date=True)
+        if start is None or end is None:
+            raise ValueError(INVALID_DATE_FORMAT_ERROR)
+        return cls.from_datetimes(start, end)
+
+    @classmethod
+    def from_datetimes(cls, start: datetime, end: datetime) -> 'DateRange':
+        """
+        Build a date range from two datetimes.
+
+        Raises
+        ------
+        ValueError
+            If start > end
+        """
+        if start > end:
+            raise ValueError(INVALID_DATE_RANGE_ERROR)
+        return cls(start, end)
+
+    @classmethod
+    def coerce(cls, date_range) -> 'DateRange':
+        """
+        Return `date_range` as a DateRange, parsing it if it is still a
+        dictionary with 'min_date' and 'max_date' keys.
+
+        Raises
+        ------
+        ValueError
+            If the value cannot be converted to a valid date range
+        """
+        if isinstance(date_range, cls):
+            return date_range
+        if not isinstance(date_range, dict) or 'min_date' not in date_range or 'max_date' not in date_range:
+            raise ValueError("invalid date range format in request data")
+        return cls.from_strings(date_range['min_date'], date_range['max_date'])
+
+    @property
+    def cache_key(self) -> str:
+        """Compact, minute-resolution key identifying the range."""
+        return f"{self.start:%Y%m%d%H%M}-{self.end:%Y%m%d%H%M}"
+
+    @property
+    def duration(self) -> timedelta:
+        """Length of the range."""
+        return self.end - self.start
+
+    def contains(self, value: datetime) -> bool:
+        """Whether a datetime falls within the range (edges included)."""
+        return self.start <= value <= self.end
+
+    def covers(self, other: 'DateRange') -> bool:
+        """Whether another range is fully included in this one."""
+        return self.start <= other.start and other.end <= self.end
+
+    def overlaps(self, other: 'DateRange') -> bool:
+        """Whether both ranges share at least one instant."""
+        return self.start <= other.end and other.start <= self.end
+
+    def intersection(self, other: 'DateRange') -> Optional['DateRange']:
+        """Common part of both ranges, or None if they do not overlap."""
+        if not self.overlaps(other):
+            return None
+        return DateRange(max(self.start, other.start), min(self.end, other.end))
+
+    def to_dict(self) -> Dict[str, str]:
+        """Return the range in the 'min_date'/'max_date' request format."""
+        return {
+            'min_date': self.start.strftime(DATETIME_FORMAT),
+            'max_date': self.end.strftime(DATETIME_FORMAT)
+        }
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Accepted date formats
+DATETIME_FORMAT = '%Y-%m-%d %H:%M'
+DATE_FORMAT = '%Y-%m-%d'
+
+# Precompiled patterns for the canonical date formats
+DATETIME_REGEX = re.compile(r"(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2})")
+DATE_REGEX = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Downsampling module.
+
+This module implements the Largest-Triangle-Three-Buckets (LTTB) algorithm,
+which selects a fixed number of points of a time series for charting while
+keeping its visual shape: unlike averaging over buckets, the peaks and dips
+of the series are kept, and every selected point is an actual measurement.
+
+The first and last points are always kept. The other points are split into
+equal buckets, and the point of each bucket forming the largest triangle
+with the point selected in the previous bucket and the average of the next
+bucket is selected.
+
+Several series sharing the same times (e.g. the systolic and diastolic blood
+pressure) are downsampled as a paired series: the triangle areas of every
+series are added up, so that the same points are selected for all of them.
+"""
+
+# Import project modules #
+#------------------------#
+
+from app.utils.lazy_import import lazy_import
+
+# numpy is imported on first use
+np = lazy_import('numpy')
+
+# Define functions #
+#------------------#
+
+def lttb_indices(x, y, threshold: int):
+    """
+    Select the points of a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    Parameters
+    ----------
+    x : array_like
+        Times of the points, in increasing order, as numbers (e.g. seconds since the epoch)
+    y : array_like
+        Values of the points: a 1-D array, or a 2-D array with one column per
+        series of a paired series (the series should share the same unit)
+    threshold : int
+        Maximum number of points to select
+
+    Returns
+    -------
+    numpy.ndarray
+        Increasing indices of the selected points (every index if the series
+        has at most `threshold` points)
+
+    Raises
+    ------
+    ValueError
+        If `x` and `y` do not have the same number of points or `threshold` is less than 1
+    """
+    if threshold < 1:
+        raise ValueError("The number of points to select must be at least 1")
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if y.ndim == 1:
+        y = y[:, np.newaxis]
+    point_count = len(x)
+    if len(y) != point_count:
+        raise ValueError("The times and values must have the same number of points")
+
+    if point_count <= threshold:
+        return np.arange(point_count)
+    if threshold < 3:
+        return np.array([0, point_count - 1][:threshold])
+
+    # Times relative to the first point, to keep the areas accurate
+    x = x - x[0]
+
+    # Bounds of the buckets of the points between the first and the last one
+    bucket_size = (point_count - 2) / (threshold - 2)
+    bounds = (np.arange(threshold - 1) * bucket_size).astype(np.intp) + 1
+    bounds[-1] = point_count - 1
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = point_count - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        # Average point of the next bucket (the last point for the last bucket)
+        if bucket + 2 < len(bounds):
+            next_start, next_end = end, bounds[bucket + 2]
+        else:
+            next_start, next_end = point_count - 1, point_count
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean(axis=0)
+
+        # Twice the area of the triangle of each candidate, added up over the series
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end, np.newaxis]) * (next_y - y[previous])
+        ).sum(axis=1)
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+
+    return selected
@@ -15,13 +15,18 @@ It handles the conversion of different types of observations and measurements.
 from datetime import datetime, timezone
 from typing import Dict, Optional, Union
 
-# FHIR resources #
-from fhir.resources.codeableconcept import CodeableConcept
-from fhir.resources.coding import Coding
-from fhir.resources.observation import Observation
-from fhir.resources.period import Period
-from fhir.resources.quantity import Quantity
-from fhir.resources.reference import Reference
+# Import project modules #
+#------------------------#
+
+from app.utils.lazy_import import lazy_import
+
+# FHIR resources (imported on first use: the fhir.resources models take most of the startup time) #
+CodeableConcept = lazy_import('fhir.resources.codeableconcept', 'CodeableConcept')
+Coding = lazy_import('fhir.resources.coding', 'Coding')
+Observation = lazy_import('fhir.resources.observation', 'Observation')
+Period = lazy_import('fhir.resources.period', 'Period')
+Quantity = lazy_import('fhir.resources.quantity', 'Quantity')
+Reference = lazy_import('fhir.resources.reference', 'Reference')
 
 # Define functions #
 #------------------#
@@ -317,8 +322,123 @@ def format_operational_data_fhir(
     
     return resource
 
+def format_vital_signs_statistics_fhir(
+    patient_id: str,
+    measurement_id: str,
+    statistics: Dict[str, float],
+    period_start: datetime,
+    period_end: datetime,
+    units: Optional[str] = None,
+    loinc_code: Optional[str] = None,
+    loinc_description: Optional[str] = None
+) -> Dict:
+    """
+    Format statistics of a vital sign over a period as a FHIR Observation resource.
+    
+    Each statistic is a component coded with the HL7 observation-statistics
+    code system (e.g. 'average', 'median', '4-upper').
+    
+    Parameters
+    ----------
+    patient_id: str
+        Patient ID
+    measurement_id: str
+        ID of the resource
+    statistics: Dict[str, float]
+        Values by observation-statistics code. 'count' is an integer without units.
+    period_start: datetime
+        Start of the period the statistics cover
+    period_end: datetime
+        End of the period the statistics cover
+    units: Optional[str]
+        Units of the measured values
+    loinc_code: Optional[str]
+        LOINC code of the measurement
+    loinc_description: Optional[str]
+        LOINC description of the measurement
+        
+    Returns
+    -------
+    Dict
+        FHIR Observation resource
+    """
+    components = []
+    for code, value in statistics.items():
+        if value is None:
+            continue
+        component = {
+            "code": {
+                "coding": [
+                    {
+                        "system": "http://terminology.hl7.org/CodeSystem/observation-statistics",
+                        "code": code,
+                        "display": STATISTIC_DISPLAYS.get(code, code)
+                    }
+                ]
+            }
+        }
+        if code == "count":
+            component["valueInteger"] = int(value)
+        else:
+            component["valueQuantity"] = {
+                "value": float(value),
+                "unit": units,
+                "system": "http://unitsofmeasure.org",
+                "code": units
+            }
+        components.append(component)
+    
+    return {
+        "resourceType": "Observation",
+        "id": measurement_id,
+        "status": "final",
+        "category": [
+            {
+                "coding": [
+                    {
+                        "system": "http://terminology.hl7.org/CodeSystem/observation-category",
+                        "code": "vital-signs",
+                        "display": "Vital Signs"
+                    }
+                ]
+            }
+        ],
+        "code": {
+            "coding": [
+                {
+                    "system": "http://loinc.org",
+                    "code": loinc_code,
+                    "display": loinc_description
+                }
+            ]
+        },
+        "subject": {
+            "reference": f"Patient/{patient_id}"
+        },
+        "effectivePeriod": {
+            "start": _as_utc(period_start).isoformat(),
+            "end": _as_utc(period_end).isoformat()
+        },
+        "component": components
+    }
+
+def _as_utc(value: datetime) -> datetime:
+    """Mark a naive datetime as UTC, as the other formatters do."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
 # Parameters and constants #
 #--------------------------#
 
 # Timestamp format string #
-time_fmt_str = "%Y-%m-%dT%H:%M:%S%z"
\ No newline at end of file
+time_fmt_str = "%Y-%m-%dT%H:%M:%S%z"
+
+# Displays of the HL7 observation-statistics codes
+STATISTIC_DISPLAYS = {
+    "count": "Count",
+    "minimum": "Minimum",
+    "maximum": "Maximum",
+    "average": "Average",
+    "4-lower": "Lower Quartile",
+    "median": "Median",
+    "4-upper": "Upper Quartile"
+}
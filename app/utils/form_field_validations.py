@@ -7,7 +7,7 @@ Form Field Validation Module
 This module provides validation functionality for ID fields and date fields in a Flask application.
 It focuses on validating IDs and date ranges.
 
-The module uses regex pattern matching and type checking to ensure format validity.
+The module uses precompiled regex pattern matching and type checking to ensure format validity.
 It returns structured validation responses with specific error messages for invalid inputs.
 
 The fields validated in this module are derived from TABLE_FIELD_MAPPING in app.constants.table_mappings.
@@ -40,6 +40,12 @@ Other IDs:
 - idtarjeta
 """
 
+#----------------#
+# Import modules #
+#----------------#
+
+import re
+
 #------------------------#
 # Import project modules #
 #------------------------#
@@ -53,8 +59,7 @@ from app.constants.error_messages import (
 from app.constants.fields import DATE_FIELDS, ID_FIELDS
 from app.constants.table_mappings import TABLE_FIELD_MAPPING
 from app.exceptions import ValidationError
-from app.utils.string_handler import find_substring_index
-from app.utils.time_formatters import parse_dt_string
+from app.utils.date_range import DateRange, parse_date_bound
 
 #------------------#
 # Define functions #
@@ -96,8 +101,7 @@ def validate_id_field(value, invalid_val_err_str, empty_val_err_str):
         if not isinstance(value, str):
             return {"error_msg": empty_val_err_str}
         
-        pattern_match_index = find_substring_index(value, ID_PATTERN, advanced_search=True)
-        if pattern_match_index == -1:
+        if ID_REGEX.fullmatch(value) is None:
             return {"error_msg": invalid_val_err_str}
             
         return {"error_msg": ""}
@@ -120,29 +124,11 @@ def validate_date_range(min_date, max_date):
     Dict
         Dict with error message if validation fails, empty dict if validation passes
     """
-    min_date_error = False
-    max_date_error = False
-    
-    # Try parsing with time first
-    try:
-        min_datetime = parse_dt_string(min_date, '%Y-%m-%d %H:%M')
-    except ValueError:
-        try:
-            # If that fails, try date-only format
-            min_datetime = parse_dt_string(min_date, '%Y-%m-%d')
-            min_datetime = min_datetime.replace(hour=0, minute=0)
-        except ValueError:
-            min_date_error = True
-    
-    try:
-        max_datetime = parse_dt_string(max_date, '%Y-%m-%d %H:%M')
-    except ValueError:
-        try:
-            # If that fails, try date-only format
-            max_datetime = parse_dt_string(max_date, '%Y-%m-%d')
-            max_datetime = max_datetime.replace(hour=23, minute=59)
-        except ValueError:
-            max_date_error = True
+    # Parse both edges once (date-only values default to 00:00 and 23:59)
+    min_datetime = parse_date_bound(min_date)
+    max_datetime = parse_date_bound(max_date, is_max_date=True)
+    min_date_error = min_datetime is None
+    max_date_error = max_datetime is None
     
     if min_date_error and max_date_error:
         return {"error_msg": f"Invalid date format for min_date and max_date. {INVALID_DATE_FORMAT_ERROR}"}
@@ -183,6 +169,11 @@ def generate_json_validation_response(json_data):
             
         # Handle date range validation
         if field_name == 'date_range':
+            # Ranges parsed at the API edge are already valid
+            if isinstance(field_value, DateRange):
+                validation_results[field_name] = {"error_msg": ""}
+                continue
+                
             if not isinstance(field_value, dict):
                 validation_results[field_name] = {"error_msg": "Date range filtering requires a dictionary with 'min_date' and 'max_date' keys"}
                 continue
@@ -238,5 +229,8 @@ FIELD_NAME_LIST_PRETTY = ["HL7 v2.X"]
 # ID validation regex pattern
 ID_PATTERN = r"^[0-9]{10}$"
 
+# Precompiled ID pattern, matched against the whole value
+ID_REGEX = re.compile(r"[0-9]{10}")
+
 # Validation mapping
 FIELD_VALIDATORS = {field: lambda x: validate_id_field(x, INVALID_ID_FORMAT_ERROR, INVALID_ID_TYPE_ERROR) for field in ID_FIELDS}
\ No newline at end of file
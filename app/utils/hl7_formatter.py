@@ -16,17 +16,16 @@ from datetime import datetime
 from typing import Any
 from dateutil import parser
 
+# Import project modules #
+#------------------------#
+
 # IMPORTANT: Circular Import Prevention
 # When creating a Message with ORU_R01, hl7apy implicitly tries to load v2_5 module.
 # If this module isn't already loaded when Message is first accessed, it creates a 
 # circular import that fails on first run but succeeds on subsequent runs.
-# Explicitly importing v2_5 before any other hl7apy components prevents this issue.
-import hl7apy.v2_5
-from hl7apy.core import Message
-
-# Import project modules #
-#------------------------#
-
+# hl7apy is not imported here: `load_hl7apy` imports v2_5 before any other hl7apy
+# component, on the first message built, which prevents this issue.
+from app.utils.hl7_preload import load_hl7apy
 from app.utils.date_and_time_utils import get_current_datetime
 from app.utils.time_formatters import dt_to_string
 
@@ -73,7 +72,7 @@ def format_vital_signs_message(
     """
     try:
         # Create a new HL7 message
-        message = Message("ORU_R01")
+        message = load_hl7apy()("ORU_R01")
         
         # MSH - Message Header
         msh = message.msh
@@ -87,7 +86,7 @@ def format_vital_signs_message(
         msh.msh_11 = "P"
         # This version specification (2.5) must match the imported hl7apy.v2_5 module.
         # The Message("ORU_R01") constructor above implicitly requires v2_5,
-        # which is why we import hl7apy.v2_5 explicitly at the top of this file.
+        # which is why load_hl7apy imports hl7apy.v2_5 explicitly first.
         msh.msh_12 = "2.5"
         
         # PID - Patient Identification
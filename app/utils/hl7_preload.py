@@ -4,38 +4,69 @@
 """
 HL7 preloader module.
 
-This module preloads all necessary HL7 components to avoid circular imports
-when the application starts. Import this module early in the application
-startup sequence.
+This module loads the hl7apy components in the order that avoids circular
+imports. They are loaded on first use, by the first HL7 message built, rather
+than when the application starts (set `EAGER_IMPORTS` to load them at startup).
 """
 
+# Import modules #
+#----------------#
+
+import importlib
+import threading
+
 # IMPORTANT: Circular Import Prevention
-# This explicit import of hl7apy.v2_5 is crucial for preventing circular imports.
-# 
+# The explicit import of hl7apy.v2_5 before hl7apy.core is crucial for preventing circular imports.
+#
 # The issue occurs because:
 # 1. When creating a Message with ORU_R01, hl7apy tries to load the v2_5 module
-# 2. If this happens during application startup while other modules are still loading,
-#    it creates a circular dependency
+# 2. If this happens while other modules are still loading, it creates a circular dependency
 # 3. This fails on the first run but succeeds on subsequent runs (after the module is cached)
 #
-# By explicitly importing v2_5 first and having this module loaded early in the
-# application's __init__.py, we ensure the dependency is fully resolved before
-# any other component tries to use it.
-import hl7apy.v2_5
+# `load_hl7apy` imports v2_5 first, then hl7apy.core, and builds a first message, once and
+# under a lock: the dependency is fully resolved before any component uses it, even when the
+# first HL7 messages are built by concurrent requests.
+
+# Define functions #
+#------------------#
+
+def load_hl7apy():
+    """
+    Load the hl7apy components, once, and return the Message class.
+    """
+    message_class = _HL7_COMPONENTS.get('Message')
+    if message_class is not None:
+        return message_class
+
+    with _HL7_LOCK:
+        message_class = _HL7_COMPONENTS.get('Message')
+        if message_class is None:
+            importlib.import_module('hl7apy.v2_5')
+            message_class = importlib.import_module('hl7apy.core').Message
 
-# Import other commonly used HL7 components
-from hl7apy.core import Message
+            # Build a first message so that its structures are loaded too
+            test_message = message_class("ORU_R01")
+            test_message.msh.msh_12 = "2.5"
+            _HL7_COMPONENTS['Message'] = message_class
+    return message_class
 
 # Define a function to validate that preloading was successful
 def validate_hl7_preload():
     """
     Validate that HL7 modules were preloaded successfully.
     """
-    # Test creating a simple message to ensure everything is loaded
+    # Load the modules and create a simple message to ensure everything is loaded
     try:
-        test_message = Message("ORU_R01")
-        test_message.msh.msh_12 = "2.5"
+        load_hl7apy()
         return True
     except Exception as e:
         print(f"Error preloading HL7 modules: {e}")
-        return False 
\ No newline at end of file
+        return False
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Loaded hl7apy components
+_HL7_COMPONENTS = {}
+_HL7_LOCK = threading.Lock()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Request instrumentation module.
+
+This module times the stages of the request pipeline: validation, SQL
+execution, fetching and JSONB decoding, model hydration, `to_hl7_v2`,
+`_convert_hl7_to_fhir`, FHIR Bundle formatting and JSON encoding (Arrow
+encoding for the exports).
+
+Stages are timed with `stage(name, table)` blocks. Durations are accumulated
+per request in a context variable and only published when the request ends:
+- in a `Server-Timing` response header (per stage, all tables together)
+- in the `stage_duration_seconds` histogram (per endpoint, stage and table)
+  and the `request_duration_seconds` histogram (per endpoint)
+
+Outside a request a `stage` block does nothing but a context variable lookup,
+and within a request it costs two `perf_counter` calls and a dictionary
+update, so the instrumentation can stay enabled in production.
+
+The same blocks attribute the allocations of a request to its stages when
+the request is memory profiled (see `app.utils.memory_profiler`).
+"""
+
+# Import modules #
+#----------------#
+
+import contextvars
+import time
+from functools import wraps
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, request
+from flask_restx import Api
+
+# Import project modules #
+#------------------------#
+
+from app.utils.memory_profiler import MEMORY_PROFILE_HEADER, MEMORY_PROFILER
+from app.utils.metrics import histogram
+
+# Define classes #
+#----------------#
+
+class RequestTimings:
+    """
+    Stage durations of one request.
+
+    Parameters
+    ----------
+    endpoint : str
+        Endpoint (URL rule) of the request, used as metrics label
+    memory_profile : Optional[MemoryProfile]
+        Allocations of the request by stage, if it is memory profiled
+    """
+    __slots__ = ('endpoint', 'started', 'durations', 'memory_profile')
+
+    def __init__(self, endpoint: str, memory_profile=None):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.durations: Dict[Tuple[str, str], float] = {}
+        self.memory_profile = memory_profile
+
+    def add(self, stage_name: str, table: Optional[str], seconds: float) -> None:
+        """Add time spent in a stage, for a table if the stage is per table."""
+        key = (stage_name, table or '')
+        self.durations[key] = self.durations.get(key, 0.0) + seconds
+
+    def by_stage(self) -> Dict[str, float]:
+        """Return the seconds spent in each stage, all tables together, in pipeline order."""
+        totals: Dict[str, float] = {}
+        for (stage_name, _), seconds in self.durations.items():
+            totals[stage_name] = totals.get(stage_name, 0.0) + seconds
+        return dict(sorted(totals.items(), key=lambda item: _stage_order(item[0])))
+
+    def server_timing(self, total: float) -> str:
+        """Return the `Server-Timing` header value, in milliseconds."""
+        entries = [f"{stage_name};dur={seconds * 1000:.2f}" for stage_name, seconds in self.by_stage().items()]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ', '.join(entries)
+
+    def publish(self) -> float:
+        """Record the durations in the histograms and return the total duration."""
+        total = time.perf_counter() - self.started
+        for (stage_name, table), seconds in self.durations.items():
+            STAGE_DURATION.observe(seconds, endpoint=self.endpoint, stage=stage_name, table=table)
+        REQUEST_DURATION.observe(total, endpoint=self.endpoint)
+        return total
+
+
+class _Stage:
+    """Timer of one stage block (see `stage`)."""
+    __slots__ = ('name', 'table', 'timings', 'started')
+
+    def __init__(self, name: str, table: Optional[str]):
+        self.name = name
+        self.table = table
+
+    def __enter__(self):
+        self.timings = _CURRENT_TIMINGS.get()
+        if self.timings is not None:
+            if self.timings.memory_profile is not None:
+                self.timings.memory_profile.enter(self.name)
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.add(self.name, self.table, time.perf_counter() - self.started)
+            if self.timings.memory_profile is not None:
+                self.timings.memory_profile.exit(self.name)
+        return False
+
+# Define functions #
+#------------------#
+
+def stage(name: str, table: Optional[str] = None) -> _Stage:
+    """
+    Time a block as a pipeline stage of the current request.
+
+    Parameters
+    ----------
+    name : str
+        Stage name (see `STAGES`)
+    table : Optional[str]
+        Table the work is done for, if the stage is per table
+    """
+    return _Stage(name, table)
+
+def timed_stage(name: str):
+    """Decorator timing every call of a function as a pipeline stage."""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            with _Stage(name, None):
+                return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+def current_timings() -> Optional[RequestTimings]:
+    """Return the stage durations of the request being processed, if any."""
+    return _CURRENT_TIMINGS.get()
+
+def init_instrumentation(app: Flask, api: Api) -> None:
+    """
+    Time every request of the application.
+
+    Adds the `Server-Timing` header to the responses, times the JSON
+    encoding of the API's responses and starts the memory profile of the
+    requests selected by the profiler, whose ID is returned in the
+    `X-Memory-Profile` response header.
+
+    Parameters
+    ----------
+    app : Flask
+        Flask application
+    api : Api
+        Flask-RESTX API whose JSON representation is timed
+    """
+    @app.before_request
+    def start_request_timings():
+        rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        memory_profile = MEMORY_PROFILER.start(rule, request.method, request.headers)
+        _CURRENT_TIMINGS.set(RequestTimings(rule, memory_profile))
+
+    @app.after_request
+    def publish_request_timings(response):
+        timings = _CURRENT_TIMINGS.get()
+        if timings is not None:
+            response.headers['Server-Timing'] = timings.server_timing(timings.publish())
+            if timings.memory_profile is not None:
+                report = MEMORY_PROFILER.finish(timings.memory_profile, response.status_code)
+                timings.memory_profile = None
+                response.headers[MEMORY_PROFILE_HEADER] = report['id']
+        return response
+
+    @app.teardown_request
+    def clear_request_timings(exception=None):
+        timings = _CURRENT_TIMINGS.get()
+        if timings is not None and timings.memory_profile is not None:
+            # The request failed before its response was made
+            MEMORY_PROFILER.finish(timings.memory_profile)
+            timings.memory_profile = None
+        _CURRENT_TIMINGS.set(None)
+
+    json_representation = api.representations['application/json']
+
+    @wraps(json_representation)
+    def timed_json_representation(data, code, headers=None):
+        with _Stage(STAGE_JSON_ENCODE, None):
+            return json_representation(data, code, headers)
+
+    api.representations['application/json'] = timed_json_representation
+
+def _stage_order(stage_name: str) -> int:
+    """Position of a stage in the pipeline; unknown stages go last."""
+    try:
+        return STAGES.index(stage_name)
+    except ValueError:
+        return len(STAGES)
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Pipeline stages, in order
+STAGE_VALIDATION = 'validation'
+STAGE_SQL = 'sql'
+STAGE_FETCH = 'fetch'
+STAGE_DOWNSAMPLE = 'downsample'
+STAGE_HYDRATION = 'hydration'
+STAGE_HL7_BUILD = 'hl7_build'
+STAGE_HL7_TO_FHIR = 'hl7_to_fhir'
+STAGE_FHIR_BUNDLE = 'fhir_bundle'
+STAGE_JSON_ENCODE = 'json_encode'
+STAGE_COMPRESS = 'compress'
+STAGE_ARROW_ENCODE = 'arrow_encode'
+STAGES = [
+    STAGE_VALIDATION,
+    STAGE_SQL,
+    STAGE_FETCH,
+    STAGE_DOWNSAMPLE,
+    STAGE_HYDRATION,
+    STAGE_HL7_BUILD,
+    STAGE_HL7_TO_FHIR,
+    STAGE_FHIR_BUNDLE,
+    STAGE_JSON_ENCODE,
+    STAGE_COMPRESS,
+    STAGE_ARROW_ENCODE
+]
+
+# Stage durations of the request being processed
+_CURRENT_TIMINGS = contextvars.ContextVar('request_timings', default=None)
+
+# Bucket bounds of the stage durations, in seconds (stages of a single table are often sub-millisecond)
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Latency metrics
+STAGE_DURATION = histogram(
+    'stage_duration_seconds',
+    'Time spent per request in each pipeline stage, by endpoint, stage and table',
+    ('endpoint', 'stage', 'table'),
+    buckets=STAGE_BUCKETS
+)
+REQUEST_DURATION = histogram(
+    'request_duration_seconds',
+    'Request processing time, by endpoint',
+    ('endpoint',)
+)
@@ -38,4 +38,14 @@ def decode_token(token):
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
-        return None 
\ No newline at end of file
+        return None
+
+
+def decode_bearer_token(auth_header):
+    """
+    Decode the token of an Authorization header ("Bearer {token}").
+    Returns None if the header is missing or the token is invalid or expired.
+    """
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    return decode_token(auth_header.split(' ')[1])
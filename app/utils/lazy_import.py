@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Lazy import module.
+
+The heaviest dependencies of the service (the FHIR resource models, argon2,
+numpy) are only needed once a request uses them, so their modules are
+imported on first use instead of while the application boots:
+
+    Observation = lazy_import('fhir.resources.observation', 'Observation')
+    ...
+    Observation.model_construct(...)  # fhir.resources is imported here
+
+Every lazy import is registered, so that `preload_lazy_imports` can import
+them all at once, e.g. before a preforking server forks its workers
+(`EAGER_IMPORTS` in `app.config`). hl7apy is not imported through this
+module: its modules must be loaded in a given order (see
+`app.utils.hl7_preload.load_hl7apy`).
+"""
+
+# Import modules #
+#----------------#
+
+import importlib
+from typing import List, Optional
+
+# Define classes #
+#----------------#
+
+class LazyImport:
+    """
+    Module, or object of a module, imported on first attribute access or call.
+
+    Parameters
+    ----------
+    module_name : str
+        Module to import
+    attribute : Optional[str]
+        Object of the module to stand for, if not the module itself
+    """
+    __slots__ = ('_module_name', '_attribute', '_target')
+
+    def __init__(self, module_name: str, attribute: Optional[str] = None):
+        self._module_name = module_name
+        self._attribute = attribute
+        self._target = None
+
+    def resolve(self):
+        """Import the module (once) and return the module or object."""
+        target = self._target
+        if target is None:
+            target = importlib.import_module(self._module_name)
+            if self._attribute is not None:
+                target = getattr(target, self._attribute)
+            self._target = target
+        return target
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the module has been imported through this lazy import."""
+        return self._target is not None
+
+    def __getattr__(self, name: str):
+        return getattr(self.resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        name = self._module_name if self._attribute is None else f"{self._module_name}.{self._attribute}"
+        return f"<lazy import of {name}{'' if self.loaded else ' (not loaded)'}>"
+
+# Define functions #
+#------------------#
+
+def lazy_import(module_name: str, attribute: Optional[str] = None) -> LazyImport:
+    """
+    Return a module, or an object of it, to be imported on first use.
+
+    Parameters
+    ----------
+    module_name : str
+        Module to import
+    attribute : Optional[str]
+        Object of the module to stand for, if not the module itself
+    """
+    lazy = LazyImport(module_name, attribute)
+    LAZY_IMPORTS.append(lazy)
+    return lazy
+
+def preload_lazy_imports() -> List[str]:
+    """
+    Import every module registered as a lazy import, and hl7apy.
+
+    Returns
+    -------
+    List[str]
+        Names of the modules imported
+    """
+    from app.utils.hl7_preload import load_hl7apy
+
+    load_hl7apy()
+    for lazy in list(LAZY_IMPORTS):
+        lazy.resolve()
+    return sorted({lazy._module_name for lazy in LAZY_IMPORTS} | {'hl7apy.v2_5', 'hl7apy.core'})
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Lazy imports of the process
+LAZY_IMPORTS: List[LazyImport] = []
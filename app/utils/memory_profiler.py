@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Memory profiling module.
+
+This module attributes the memory allocated by a request to the stages of
+the pipeline (see `app.utils.instrumentation`), to tell whether the JSONB
+dictionaries, the hydrated rows, the hl7apy message trees or the FHIR
+resources dominate the footprint of a large pull.
+
+Profiling is opt-in and runs on one request at a time:
+- an admin sets the `X-Memory-Profile` header on a request, or
+- an admin arms the profiler for the next requests of the service
+  (`POST /admin/memory_profiling`), e.g. to profile a clinician's pull
+
+While a request is profiled, `tracemalloc` traces the allocations of the
+process and every stage block records, over all its invocations:
+- the peak bytes allocated above the memory in use when the stage started
+- the bytes still allocated when the stage ended (retained)
+- the top allocation sites, from snapshots taken around the first
+  `MEMORY_PROFILE_SITE_SAMPLES` invocations of the stage
+
+The reports are kept for the admin endpoints and optionally written to
+`MEMORY_PROFILE_DIR`. Tracing is process-wide, so the allocations of the
+requests served concurrently are counted too; the profile of a request is
+only exact on an otherwise idle worker.
+"""
+
+# Import modules #
+#----------------#
+
+import json
+import os
+import threading
+import tracemalloc
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Import project modules #
+#------------------------#
+
+from app.config import (
+    MEMORY_PROFILE_DIR,
+    MEMORY_PROFILE_FRAMES,
+    MEMORY_PROFILE_HISTORY,
+    MEMORY_PROFILE_SITE_SAMPLES,
+    MEMORY_PROFILE_TOP_SITES
+)
+from app.utils.jwt_handler import decode_bearer_token
+
+# Define classes #
+#----------------#
+
+class _Frame:
+    """Memory in use when a stage (or the request) started, and the peak since."""
+    __slots__ = ('name', 'start', 'peak', 'snapshot')
+
+    def __init__(self, name: str, start: int, snapshot=None):
+        self.name = name
+        self.start = start
+        self.peak = start
+        self.snapshot = snapshot
+
+
+class MemoryProfile:
+    """
+    Allocations of one request, by pipeline stage.
+
+    Parameters
+    ----------
+    endpoint : str
+        Endpoint (URL rule) of the request
+    method : str
+        HTTP method of the request
+    site_samples : int
+        Invocations of each stage bracketed by snapshots
+    top_sites : int
+        Allocation sites reported per stage
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        method: str,
+        site_samples: int = MEMORY_PROFILE_SITE_SAMPLES,
+        top_sites: int = MEMORY_PROFILE_TOP_SITES
+    ):
+        self.id = uuid.uuid4().hex[:12]
+        self.endpoint = endpoint
+        self.method = method
+        self.site_samples = site_samples
+        self.top_sites = top_sites
+        self.started = datetime.now()
+        self._stages: Dict[str, Dict] = {}
+        self._stack: List[_Frame] = []
+        self._started_tracing = False
+
+    def begin(self) -> None:
+        """Start tracing the allocations, unless they are already traced."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_PROFILE_FRAMES)
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._stack = [_Frame('request', tracemalloc.get_traced_memory()[0])]
+
+    def enter(self, name: str) -> None:
+        """Record the memory in use as a stage starts."""
+        current, peak = tracemalloc.get_traced_memory()
+        self._stack[-1].peak = max(self._stack[-1].peak, peak)
+
+        stats = self._stage_stats(name)
+        snapshot = None
+        if stats['sampled_calls'] < self.site_samples:
+            snapshot = _take_snapshot()
+            current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self._stack.append(_Frame(name, current, snapshot))
+
+    def exit(self, name: str) -> None:
+        """Record the peak and retained memory of a stage as it ends."""
+        if len(self._stack) < 2 or self._stack[-1].name != name:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        frame = self._stack.pop()
+        peak = max(frame.peak, peak)
+
+        stats = self._stages[name]
+        stats['calls'] += 1
+        stats['retained_bytes'] += current - frame.start
+        stats['peak_bytes'] = max(stats['peak_bytes'], peak - frame.start)
+        if frame.snapshot is not None:
+            stats['sampled_calls'] += 1
+            _add_allocation_sites(stats['sites'], frame.snapshot)
+            frame.snapshot = None
+
+        self._stack[-1].peak = max(self._stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+
+    def finish(self, status: Optional[int] = None) -> Dict:
+        """
+        Stop tracing and return the report of the request.
+
+        Parameters
+        ----------
+        status : Optional[int]
+            HTTP status of the response, if one was sent
+
+        Returns
+        -------
+        Dict
+            Peak and retained bytes of the request and of each stage, with
+            the top allocation sites of each stage
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        root = self._stack[0]
+        if self._started_tracing:
+            tracemalloc.stop()
+        self._stack = []
+
+        stages = []
+        for name, stats in self._stages.items():
+            sites = sorted(stats['sites'].values(), key=lambda site: site['size_bytes'], reverse=True)
+            stages.append({
+                'stage': name,
+                'calls': stats['calls'],
+                'peak_bytes': stats['peak_bytes'],
+                'retained_bytes': stats['retained_bytes'],
+                'sampled_calls': stats['sampled_calls'],
+                'top_sites': sites[:self.top_sites]
+            })
+        stages.sort(key=lambda stage_report: stage_report['peak_bytes'], reverse=True)
+
+        return {
+            'id': self.id,
+            'time': self.started.isoformat(timespec='seconds'),
+            'endpoint': self.endpoint,
+            'method': self.method,
+            'status': status,
+            'duration_ms': round((datetime.now() - self.started).total_seconds() * 1000, 1),
+            'peak_bytes': max(root.peak, peak) - root.start,
+            'retained_bytes': current - root.start,
+            'stages': stages
+        }
+
+    def _stage_stats(self, name: str) -> Dict:
+        """Return the accumulated figures of a stage."""
+        stats = self._stages.get(name)
+        if stats is None:
+            stats = {'calls': 0, 'peak_bytes': 0, 'retained_bytes': 0, 'sampled_calls': 0, 'sites': {}}
+            self._stages[name] = stats
+        return stats
+
+
+class MemoryProfiler:
+    """
+    Selection of the profiled requests and store of their reports.
+
+    Parameters
+    ----------
+    history : int
+        Reports kept in memory
+    profile_dir : Optional[str]
+        Directory the reports are also written to, if any
+    """
+
+    def __init__(self, history: int, profile_dir: Optional[str] = None):
+        self.profile_dir = profile_dir or None
+        self.reports = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._active = False
+        self._armed_requests = 0
+        self._armed_endpoint: Optional[str] = None
+
+    def arm(self, requests: int, endpoint: Optional[str] = None) -> Dict:
+        """
+        Profile the next requests of the service.
+
+        Parameters
+        ----------
+        requests : int
+            Number of requests profiled (0 disarms the profiler)
+        endpoint : Optional[str]
+            Only profile the requests whose endpoint starts with this prefix
+        """
+        with self._lock:
+            self._armed_requests = max(requests, 0)
+            self._armed_endpoint = endpoint or None
+        return self.state()
+
+    def state(self) -> Dict:
+        """Return the requests the profiler is armed for."""
+        return {
+            'armed_requests': self._armed_requests,
+            'endpoint': self._armed_endpoint,
+            'active': self._active,
+            'profile_dir': self.profile_dir
+        }
+
+    def start(self, endpoint: str, method: str, headers) -> Optional[MemoryProfile]:
+        """
+        Start profiling a request if it asks for it or the profiler is armed.
+
+        The `X-Memory-Profile` header is only honoured with an admin token,
+        and the diagnostic endpoints are never profiled by the armed profiler.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint (URL rule) of the request
+        method : str
+            HTTP method of the request
+        headers : Mapping
+            Headers of the request
+
+        Returns
+        -------
+        Optional[MemoryProfile]
+            The profile of the request, or None if it is not profiled
+        """
+        requested = (
+            headers.get(MEMORY_PROFILE_HEADER, '').lower() in ('1', 'true', 'yes')
+            and _is_admin(headers.get('Authorization'))
+        )
+        with self._lock:
+            if self._active:
+                return None
+            if not requested:
+                if self._armed_requests <= 0 or endpoint.startswith(UNPROFILED_ENDPOINTS):
+                    return None
+                if self._armed_endpoint is not None and not endpoint.startswith(self._armed_endpoint):
+                    return None
+                self._armed_requests -= 1
+            self._active = True
+
+        profile = MemoryProfile(endpoint, method)
+        try:
+            profile.begin()
+        except Exception:
+            self._release()
+            raise
+        return profile
+
+    def finish(self, profile: MemoryProfile, status: Optional[int] = None) -> Dict:
+        """Stop profiling a request, store its report and return it."""
+        try:
+            report = profile.finish(status)
+        finally:
+            self._release()
+        with self._lock:
+            self.reports.append(report)
+        self._write(report)
+        return report
+
+    def summaries(self) -> List[Dict]:
+        """Return the kept reports without their stages, most recent first."""
+        with self._lock:
+            reports = list(self.reports)
+        return [
+            {key: value for key, value in report.items() if key != 'stages'}
+            for report in reversed(reports)
+        ]
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        """Return a kept report by ID."""
+        with self._lock:
+            return next((report for report in self.reports if report['id'] == profile_id), None)
+
+    def _release(self) -> None:
+        """Let the next request be profiled."""
+        with self._lock:
+            self._active = False
+
+    def _write(self, report: Dict) -> None:
+        """Write a report to the profile directory, if any."""
+        if self.profile_dir is None:
+            return
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            file_name = f"{report['time'].replace(':', '')}_{report['id']}.json"
+            with open(os.path.join(self.profile_dir, file_name), 'w', encoding='utf-8') as profile_file:
+                json.dump(report, profile_file, indent=2)
+        except OSError as e:
+            print(f"Error writing the memory profile: {str(e)}")
+
+# Define helper functions #
+#-------------------------#
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    """Take a snapshot of the traced allocations, leaving out the profiler's own."""
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__)
+    ))
+
+def _add_allocation_sites(sites: Dict[str, Dict], before: tracemalloc.Snapshot) -> None:
+    """
+    Add the allocations since a snapshot to the sites of a stage.
+
+    A site is the line that allocated the memory, with the innermost line of
+    the service that led to it (the caller) when the allocation happened in
+    a library, e.g. in hl7apy or in the FHIR models.
+    """
+    for difference in _take_snapshot().compare_to(before, 'traceback'):
+        if difference.size_diff <= 0:
+            continue
+        allocation = difference.traceback[-1]
+        caller = next((frame for frame in reversed(difference.traceback) if _is_service_frame(frame)), None)
+        key = f"{allocation.filename}:{allocation.lineno}"
+        site = sites.get(key)
+        if site is None:
+            site = {
+                'site': key,
+                'caller': f"{caller.filename}:{caller.lineno}" if caller is not None and caller is not allocation else None,
+                'size_bytes': 0,
+                'count': 0
+            }
+            sites[key] = site
+        site['size_bytes'] += difference.size_diff
+        site['count'] += max(difference.count_diff, 0)
+
+def _is_service_frame(frame: tracemalloc.Frame) -> bool:
+    """Whether a traceback frame is in the service's own code."""
+    return frame.filename.startswith(SERVICE_ROOT)
+
+def _is_admin(auth_header: Optional[str]) -> bool:
+    """Whether an Authorization header carries a valid admin token."""
+    data = decode_bearer_token(auth_header)
+    return bool(data) and data.get('role') == 'admin'
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Request header asking for a profile (admins only)
+MEMORY_PROFILE_HEADER = 'X-Memory-Profile'
+
+# Endpoints never profiled by the armed profiler, so that polling the reports does not use it up
+UNPROFILED_ENDPOINTS = ('/api/admin', '/api/metrics')
+
+# Directory of the service's own code, used to find the caller of an allocation site
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Process-wide profiler
+MEMORY_PROFILER = MemoryProfiler(MEMORY_PROFILE_HISTORY, MEMORY_PROFILE_DIR)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+In-process metrics module.
+
+This module provides thread-safe counters, gauges and histograms, optionally
+labelled, kept in a process-wide registry. Metrics are created (or fetched,
+if they already exist) with `counter`, `gauge` and `histogram`, and the whole
+registry can be read back with `snapshot` or rendered in the Prometheus text
+exposition format with `render_prometheus`.
+"""
+
+# Import modules #
+#----------------#
+
+import bisect
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+# Define classes #
+#----------------#
+
+class Metric:
+    """
+    Base class for labelled metrics.
+
+    Attributes
+    ----------
+    name : str
+        Metric name
+    description : str
+        Human readable description
+    label_names : Tuple[str, ...]
+        Names of the labels identifying each sample
+    """
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Return the label values in the declared order."""
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def value(self, **labels) -> float:
+        """Return the current value of a sample (0 if it was never set)."""
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0)
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        """Return a copy of every sample, keyed by its label values."""
+        with self._lock:
+            return dict(self._values)
+
+
+class Counter(Metric):
+    """Monotonically increasing metric."""
+    metric_type = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Increase a sample by `amount`."""
+        if amount < 0:
+            raise ValueError("Counters can only be increased")
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Metric that can go up and down."""
+    metric_type = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        """Set a sample to `value`."""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Increase a sample by `amount`."""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        """Decrease a sample by `amount`."""
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values.
+
+    Each sample is a dictionary with the number of observations falling in
+    each bucket ('buckets', one more than the bucket bounds, the last one
+    being +Inf), their 'sum' and their 'count'.
+    """
+    metric_type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Optional[Sequence[float]] = None
+    ):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation."""
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                sample = self._values[key] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            sample['buckets'][index] += 1
+            sample['sum'] += value
+            sample['count'] += 1
+
+    def value(self, **labels) -> Dict:
+        """Return a copy of a sample (empty if never observed)."""
+        with self._lock:
+            sample = self._values.get(self._label_values(labels))
+            if sample is None:
+                return {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            return {'buckets': list(sample['buckets']), 'sum': sample['sum'], 'count': sample['count']}
+
+    def samples(self) -> Dict[Tuple[str, ...], Dict]:
+        """Return a copy of every sample, keyed by its label values."""
+        with self._lock:
+            return {
+                key: {'buckets': list(sample['buckets']), 'sum': sample['sum'], 'count': sample['count']}
+                for key, sample in self._values.items()
+            }
+
+# Define functions #
+#------------------#
+
+def _get_or_create(metric_class, name, description, label_names, **options):
+    """Return the registered metric with this name, creating it if needed."""
+    with _REGISTRY_LOCK:
+        metric = REGISTRY.get(name)
+        if metric is None:
+            metric = metric_class(name, description, label_names, **options)
+            REGISTRY[name] = metric
+        elif not isinstance(metric, metric_class) or metric.label_names != tuple(label_names):
+            raise ValueError(f"Metric {name} is already registered with a different type or labels")
+        return metric
+
+def counter(name: str, description: str, label_names: Tuple[str, ...] = ()) -> Counter:
+    """Return the counter registered with this name, creating it if needed."""
+    return _get_or_create(Counter, name, description, label_names)
+
+def gauge(name: str, description: str, label_names: Tuple[str, ...] = ()) -> Gauge:
+    """Return the gauge registered with this name, creating it if needed."""
+    return _get_or_create(Gauge, name, description, label_names)
+
+def histogram(
+    name: str,
+    description: str,
+    label_names: Tuple[str, ...] = (),
+    buckets: Optional[Sequence[float]] = None
+) -> Histogram:
+    """Return the histogram registered with this name, creating it if needed."""
+    return _get_or_create(Histogram, name, description, label_names, buckets=buckets)
+
+def snapshot() -> Dict[str, Dict]:
+    """
+    Return the current value of every registered metric.
+
+    Returns
+    -------
+    Dict[str, Dict]
+        Dictionary mapping metric names to their type, description, label
+        names and samples
+    """
+    with _REGISTRY_LOCK:
+        metrics = list(REGISTRY.values())
+    return {
+        metric.name: {
+            'type': metric.metric_type,
+            'description': metric.description,
+            'labels': metric.label_names,
+            'samples': metric.samples(),
+            **({'buckets': metric.buckets} if isinstance(metric, Histogram) else {})
+        }
+        for metric in metrics
+    }
+
+def render_prometheus() -> str:
+    """
+    Render every registered metric in the Prometheus text exposition format.
+
+    Returns
+    -------
+    str
+        Metrics text, as served on the `/metrics` endpoint
+    """
+    lines = []
+    for name, metric in snapshot().items():
+        lines.append(f"# HELP {name} {_escape(metric['description'], help_text=True)}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for label_values, sample in sorted(metric['samples'].items()):
+            labels = list(zip(metric['labels'], label_values))
+            if metric['type'] != 'histogram':
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(sample)}")
+                continue
+            cumulative = 0
+            bounds = [_format_value(bound) for bound in metric['buckets']] + ['+Inf']
+            for bound, bucket_count in zip(bounds, sample['buckets']):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels + [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(sample['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {sample['count']}")
+    return '\n'.join(lines) + '\n'
+
+def _format_labels(labels) -> str:
+    """Format label pairs as `{name="value",...}`, or nothing without labels."""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+def _format_value(value: float) -> str:
+    """Format a sample value, using integers where possible."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _escape(value: str, help_text: bool = False) -> str:
+    """Escape a label value or help text."""
+    value = str(value).replace('\\', '\\\\').replace('\n', '\\n')
+    return value if help_text else value.replace('"', '\\"')
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Process-wide metric registry
+REGISTRY: Dict[str, Metric] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+# Default histogram bucket bounds, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
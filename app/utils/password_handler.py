@@ -4,9 +4,16 @@
 # Import modules #
 #----------------#
 
-from argon2 import PasswordHasher
 from typing import List, Dict
 
+# Import project modules #
+#------------------------#
+
+from app.utils.lazy_import import lazy_import
+
+# argon2 is imported on first use (the first login)
+PasswordHasher = lazy_import('argon2', 'PasswordHasher')
+
 # Define classes and methods #
 #----------------------------#
 
@@ -15,7 +22,14 @@ class PasswordHandler:
     Utility class for password handling using argon2.
     """
     def __init__(self):
-        self.ph = PasswordHasher()
+        self._ph = None
+
+    @property
+    def ph(self):
+        """argon2 password hasher, created on first use."""
+        if self._ph is None:
+            self._ph = PasswordHasher()
+        return self._ph
 
     def hash_password(self, password: str) -> str:
         """
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Query budget module.
+
+This module accounts for the database work of each request, so that a
+change multiplying the queries of an endpoint does not go unnoticed:
+- the SQL statements issued and the rows they returned, counted by the
+  cursor execution hooks of `app.db`
+- the bytes of JSON received, counted by the JSON deserializer of the
+  engine (the consolidated queries send every row as a JSONB document)
+
+The counts of a request are compared with the budget of its endpoint
+(`QUERY_BUDGETS` in `app.config`) when it ends. A request over budget is
+logged with the statements it issued and counted in the
+`query_budget_exceeded_total` metric; it is not rejected.
+
+Tests pin the statements of a code path or endpoint with
+`assert_max_statements`, which uses the same accounting.
+"""
+
+# Import modules #
+#----------------#
+
+import contextvars
+import json
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from flask import Flask, request
+
+# Import project modules #
+#------------------------#
+
+from app.config import DEFAULT_QUERY_BUDGET, QUERY_BUDGETS
+from app.utils.metrics import counter, histogram
+
+# Define classes #
+#----------------#
+
+class QueryStats:
+    """
+    Database work of a request, or of a block counted by `count_queries`.
+
+    Parameters
+    ----------
+    parent : Optional[QueryStats]
+        Enclosing counts, updated too (e.g. a test counting the requests it sends)
+    """
+    __slots__ = ('statements', 'rows', 'bytes', 'sql', 'parent')
+
+    def __init__(self, parent: Optional['QueryStats'] = None):
+        self.statements = 0
+        self.rows = 0
+        self.bytes = 0
+        self.sql: List[str] = []
+        self.parent = parent
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return the counts by resource."""
+        return {'statements': self.statements, 'rows': self.rows, 'bytes': self.bytes}
+
+# Define functions #
+#------------------#
+
+def record_statement(statement: str, rows: int) -> None:
+    """
+    Count a statement issued in the current request.
+
+    Parameters
+    ----------
+    statement : str
+        SQL sent to the database
+    rows : int
+        Rows the statement returned (0 if unknown or not a query)
+    """
+    stats = _CURRENT_QUERY_STATS.get()
+    while stats is not None:
+        stats.statements += 1
+        stats.rows += rows
+        if len(stats.sql) < MAX_RECORDED_STATEMENTS:
+            stats.sql.append(statement)
+        stats = stats.parent
+
+def record_bytes(size: int) -> None:
+    """Count bytes received in the current request."""
+    stats = _CURRENT_QUERY_STATS.get()
+    while stats is not None:
+        stats.bytes += size
+        stats = stats.parent
+
+def accounted_json_loads(value):
+    """Decode a JSON column value, counting its size (JSON deserializer of the engines)."""
+    record_bytes(len(value))
+    return json.loads(value)
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Return the database work of the request being processed, if any."""
+    return _CURRENT_QUERY_STATS.get()
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """
+    Count the database work done within a block, including by the requests
+    it sends through the Flask test client.
+    """
+    stats = QueryStats(parent=_CURRENT_QUERY_STATS.get())
+    token = _CURRENT_QUERY_STATS.set(stats)
+    try:
+        yield stats
+    finally:
+        _CURRENT_QUERY_STATS.reset(token)
+
+@contextmanager
+def assert_max_statements(
+    max_statements: int,
+    max_rows: Optional[int] = None,
+    max_bytes: Optional[int] = None
+) -> Iterator[QueryStats]:
+    """
+    Fail if a block issues more statements (or rows or bytes) than expected.
+
+    Usage in a test:
+
+        with assert_max_statements(2):
+            client.get('/api/vital_signs/0000021561/2024-03-01/2024-03-31', headers=headers)
+
+    Raises
+    ------
+    AssertionError
+        If a count exceeds its maximum, listing the statements issued
+    """
+    with count_queries() as stats:
+        yield stats
+    exceeded = _exceeded(stats, {'statements': max_statements, 'rows': max_rows, 'bytes': max_bytes})
+    if exceeded:
+        statements = '\n'.join(f"  {index + 1}. {sql}" for index, sql in enumerate(stats.sql))
+        raise AssertionError(f"{'; '.join(exceeded)}. Statements issued:\n{statements}")
+
+def budget_for(endpoint: str) -> Optional[Dict[str, int]]:
+    """
+    Return the budget of an endpoint: that of the longest matching URL rule
+    prefix in `QUERY_BUDGETS`, `DEFAULT_QUERY_BUDGET` otherwise. None means
+    the endpoint is not checked.
+    """
+    matches = [prefix for prefix in QUERY_BUDGETS if endpoint.startswith(prefix)]
+    if not matches:
+        return DEFAULT_QUERY_BUDGET
+    return QUERY_BUDGETS[max(matches, key=len)]
+
+def check_budget(endpoint: str, stats: QueryStats) -> List[str]:
+    """
+    Compare the database work of a request with the budget of its endpoint.
+
+    Requests over budget are logged with the statements they issued and
+    counted by exceeded resource.
+
+    Returns
+    -------
+    List[str]
+        Description of each exceeded budget
+    """
+    budget = budget_for(endpoint)
+    if budget is None:
+        return []
+    exceeded = _exceeded(stats, budget)
+    if exceeded:
+        for resource, limit in budget.items():
+            if limit is not None and getattr(stats, resource) > limit:
+                QUERY_BUDGET_EXCEEDED.inc(endpoint=endpoint, resource=resource)
+        statements = ''.join(f"\n  {sql.strip().splitlines()[0][:200]}" for sql in stats.sql)
+        print(f"Warning: query budget exceeded on {endpoint}: {'; '.join(exceeded)}{statements}")
+    return exceeded
+
+def init_query_budgets(app: Flask) -> None:
+    """
+    Account for the database work of every request of the application and
+    check it against the budget of its endpoint.
+
+    Parameters
+    ----------
+    app : Flask
+        Flask application
+    """
+    @app.before_request
+    def start_query_accounting():
+        _CURRENT_QUERY_STATS.set(QueryStats(parent=_CURRENT_QUERY_STATS.get()))
+
+    @app.teardown_request
+    def check_query_budget(exception=None):
+        stats = _CURRENT_QUERY_STATS.get()
+        if stats is None:
+            return
+        _CURRENT_QUERY_STATS.set(stats.parent)
+        if request.url_rule is None:
+            return
+        endpoint = request.url_rule.rule
+        REQUEST_STATEMENTS.observe(stats.statements, endpoint=endpoint)
+        REQUEST_ROWS.observe(stats.rows, endpoint=endpoint)
+        check_budget(endpoint, stats)
+
+# Define helper functions #
+#-------------------------#
+
+def _exceeded(stats: QueryStats, limits: Dict[str, Optional[int]]) -> List[str]:
+    """Describe the counts above their limit (None means unlimited)."""
+    return [
+        f"{getattr(stats, resource)} {resource} (budget {limit})"
+        for resource, limit in limits.items()
+        if limit is not None and getattr(stats, resource) > limit
+    ]
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Statements kept per request for the budget warnings
+MAX_RECORDED_STATEMENTS = 50
+
+# Database work of the request being processed
+_CURRENT_QUERY_STATS = contextvars.ContextVar('query_stats', default=None)
+
+# Query accounting metrics
+QUERY_BUDGET_EXCEEDED = counter(
+    'query_budget_exceeded_total',
+    'Requests over their query budget, by endpoint and exceeded resource (statements, rows or bytes)',
+    ('endpoint', 'resource')
+)
+REQUEST_STATEMENTS = histogram(
+    'request_sql_statements',
+    'SQL statements issued per request, by endpoint',
+    ('endpoint',),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100)
+)
+REQUEST_ROWS = histogram(
+    'request_sql_rows',
+    'Rows returned by the SQL statements of a request, by endpoint',
+    ('endpoint',),
+    buckets=(10, 100, 1000, 10000, 100000, 1000000)
+)
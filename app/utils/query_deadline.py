@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Query deadline module.
+
+This module stops the database work of requests that can no longer be
+answered in time, so they do not keep running in Postgres while holding a
+pooled connection:
+1. The endpoint's timeout is set as the Postgres `statement_timeout` of every
+   transaction the request opens (see the `after_begin` hook in `app.db`).
+2. A single watchdog thread cancels the backend query of a request (psycopg2
+   `connection.cancel()`, i.e. a cancel request as `pg_cancel_backend` would
+   send) once the whole request has exceeded its deadline or as soon as the
+   client has disconnected.
+
+The deadline of the current request is kept in a context variable, so the
+services and `app.db` do not need to pass it around.
+"""
+
+# Import modules #
+#----------------#
+
+import contextvars
+import select
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Iterator, List, Optional
+
+from flask import request
+
+# Import project modules #
+#------------------------#
+
+from app.config import DEFAULT_QUERY_TIMEOUT, QUERY_DEADLINE_GRACE, QUERY_TIMEOUTS
+from app.constants.error_messages import QUERY_TIMEOUT_ERROR
+from app.exceptions import QueryCancelledError
+from app.utils.metrics import counter
+
+# Define classes #
+#----------------#
+
+class RequestDeadline:
+    """
+    Time limit of the database work of one request.
+
+    Parameters
+    ----------
+    endpoint : str
+        Endpoint name, used to look up the timeout and as metrics label
+    timeout : float
+        Seconds the request's queries may run
+    environ : Optional[Dict]
+        WSGI environment of the request, used to detect client disconnections
+    """
+
+    def __init__(self, endpoint: str, timeout: float, environ: Optional[Dict] = None):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout + QUERY_DEADLINE_GRACE
+        self.environ = environ
+        self.cancel_reason: Optional[str] = None
+        self._connections: List = []
+        self._lock = threading.Lock()
+
+    @property
+    def statement_timeout_ms(self) -> int:
+        """Postgres statement_timeout, in milliseconds."""
+        return max(1, int(self.timeout * 1000))
+
+    def register_connection(self, dbapi_connection) -> None:
+        """Track a DBAPI connection used by the request, to be able to cancel its query."""
+        with self._lock:
+            if self.cancel_reason is None:
+                self._connections.append(dbapi_connection)
+                return
+        # Already cancelled: stop the new query as well
+        _cancel_connection(dbapi_connection)
+
+    def unregister_connection(self, dbapi_connection) -> None:
+        """Stop tracking a DBAPI connection given back to the pool."""
+        with self._lock:
+            if dbapi_connection in self._connections:
+                self._connections.remove(dbapi_connection)
+
+    def cancel(self, reason: str) -> None:
+        """Cancel the running queries of the request. Only the first reason is kept."""
+        with self._lock:
+            if self.cancel_reason is not None:
+                return
+            self.cancel_reason = reason
+            connections = list(self._connections)
+        for dbapi_connection in connections:
+            _cancel_connection(dbapi_connection)
+
+    def client_disconnected(self) -> bool:
+        """Whether the client closed its connection."""
+        return self.environ is not None and client_disconnected(self.environ)
+
+
+class _Watchdog:
+    """Background thread cancelling the requests past their deadline or disconnected."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._deadlines: Dict[int, RequestDeadline] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, deadline: RequestDeadline) -> None:
+        """Start watching a request."""
+        with self._lock:
+            self._deadlines[id(deadline)] = deadline
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='query-deadline-watchdog', daemon=True)
+                self._thread.start()
+
+    def unwatch(self, deadline: RequestDeadline) -> None:
+        """Stop watching a request."""
+        with self._lock:
+            self._deadlines.pop(id(deadline), None)
+
+    def check(self) -> None:
+        """Cancel the watched requests past their deadline or whose client is gone."""
+        with self._lock:
+            deadlines = list(self._deadlines.values())
+        now = time.monotonic()
+        for deadline in deadlines:
+            if deadline.cancel_reason is not None:
+                continue
+            if now >= deadline.expires_at:
+                deadline.cancel(CANCEL_REASON_DEADLINE)
+            elif deadline.client_disconnected():
+                deadline.cancel(CANCEL_REASON_CLIENT_DISCONNECT)
+
+    def _run(self) -> None:
+        """Check the watched requests periodically."""
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Error checking query deadlines: {str(e)}")
+
+# Define functions #
+#------------------#
+
+def current_deadline() -> Optional[RequestDeadline]:
+    """Return the deadline of the request being processed, if any."""
+    return _CURRENT_DEADLINE.get()
+
+@contextmanager
+def request_deadline(
+    endpoint: str,
+    timeout: Optional[float] = None,
+    environ: Optional[Dict] = None
+) -> Iterator[RequestDeadline]:
+    """
+    Apply a deadline to the database work done within the block.
+
+    Parameters
+    ----------
+    endpoint : str
+        Endpoint name (see `QUERY_TIMEOUTS` in `app.config`)
+    timeout : Optional[float]
+        Seconds the queries may run. Defaults to the endpoint's timeout.
+    environ : Optional[Dict]
+        WSGI environment of the request, used to detect client disconnections
+    """
+    if timeout is None:
+        timeout = QUERY_TIMEOUTS.get(endpoint, DEFAULT_QUERY_TIMEOUT)
+    deadline = RequestDeadline(endpoint, timeout, environ)
+    token = _CURRENT_DEADLINE.set(deadline)
+    WATCHDOG.watch(deadline)
+    try:
+        yield deadline
+    finally:
+        WATCHDOG.unwatch(deadline)
+        _CURRENT_DEADLINE.reset(token)
+
+def query_deadline(endpoint: str):
+    """
+    Run a route handler with the query deadline of `endpoint`.
+
+    Applied below `admission_controlled`, so the time spent waiting for a
+    slot does not count.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            with request_deadline(endpoint, environ=request.environ):
+                return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+def cancellation_error(error: Exception) -> Optional[QueryCancelledError]:
+    """
+    Translate a database error caused by a query cancellation.
+
+    Parameters
+    ----------
+    error : Exception
+        Error raised while executing a statement (SQLAlchemy `DBAPIError`)
+
+    Returns
+    -------
+    Optional[QueryCancelledError]
+        Error to raise instead, or None if the query was not cancelled.
+        Cancellations are counted by endpoint and reason.
+    """
+    if getattr(getattr(error, 'orig', None), 'pgcode', None) != QUERY_CANCELED_SQLSTATE:
+        return None
+    deadline = current_deadline()
+    endpoint = deadline.endpoint if deadline is not None else 'none'
+    reason = (deadline.cancel_reason if deadline is not None else None) or CANCEL_REASON_STATEMENT_TIMEOUT
+    QUERY_CANCELLATIONS.inc(endpoint=endpoint, reason=reason)
+    return QueryCancelledError(QUERY_TIMEOUT_ERROR)
+
+def client_disconnected(environ: Dict) -> bool:
+    """
+    Whether the client of a request closed its connection.
+
+    The client socket is exposed by the Werkzeug and Gunicorn servers. Once
+    the request has been read, a readable socket with no pending data means
+    the peer has closed it.
+    """
+    client_socket = environ.get('gunicorn.socket') or environ.get('werkzeug.socket')
+    if client_socket is None:
+        return False
+    try:
+        readable, _, _ = select.select([client_socket], [], [], 0)
+        if not readable:
+            return False
+        return client_socket.recv(1, socket.MSG_PEEK) == b''
+    except (OSError, ValueError):
+        return True
+
+def _cancel_connection(dbapi_connection) -> None:
+    """Send a cancel request for the query running on a DBAPI connection."""
+    try:
+        dbapi_connection.cancel()
+    except Exception as e:
+        print(f"Error cancelling query: {str(e)}")
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# SQLSTATE of a cancelled statement (query_canceled)
+QUERY_CANCELED_SQLSTATE = '57014'
+
+# Cancellation reasons
+CANCEL_REASON_STATEMENT_TIMEOUT = 'statement_timeout'
+CANCEL_REASON_DEADLINE = 'deadline'
+CANCEL_REASON_CLIENT_DISCONNECT = 'client_disconnect'
+
+# Seconds between two checks of the watchdog
+WATCHDOG_INTERVAL = 0.25
+
+# Deadline of the request being processed
+_CURRENT_DEADLINE = contextvars.ContextVar('request_deadline', default=None)
+
+# Process-wide watchdog
+WATCHDOG = _Watchdog(WATCHDOG_INTERVAL)
+
+# Cancellation metrics
+QUERY_CANCELLATIONS = counter(
+    'query_cancellations_total',
+    'Database queries cancelled, by endpoint and reason (statement_timeout, deadline or client_disconnect)',
+    ('endpoint', 'reason')
+)
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Response compression module.
+
+FHIR Bundles are very repetitive JSON (the same `category`, `code` and
+`system` blocks in every Observation) and compress 10 to 20 times. This
+module compresses the responses of the application with the content coding
+negotiated from the client's `Accept-Encoding` header:
+- gzip, always available
+- br, with the optional `brotli` package
+- zstd, with the optional `zstandard` package
+
+The level of each coding is set per endpoint (`COMPRESSION_LEVELS` in
+`app.config`). Streamed responses (Server-Sent Events) are compressed chunk
+by chunk, each chunk being flushed so that events are not held back.
+
+Compressed bodies are kept in a cache keyed by a digest of the uncompressed
+body, its coding and level, so identical responses (coalesced requests,
+metadata, repeated chart requests) are compressed only once: a hit costs a
+hash of the body instead of its compression. As the key is the content,
+cached bodies never go stale.
+"""
+
+# Import modules #
+#----------------#
+
+import hashlib
+import importlib.util
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from flask import Flask, Response, request
+
+# Import project modules #
+#------------------------#
+
+from app.config import (
+    COMPRESSION_CACHE_BYTES,
+    COMPRESSION_LEVELS,
+    COMPRESSION_MIN_BYTES,
+    DEFAULT_COMPRESSION_LEVELS
+)
+from app.utils.instrumentation import STAGE_COMPRESS, stage
+from app.utils.lazy_import import lazy_import
+from app.utils.metrics import counter
+
+# Check whether the optional codecs are available, without importing them
+brotli_installed = importlib.util.find_spec('brotli') is not None
+zstandard_installed = importlib.util.find_spec('zstandard') is not None
+if brotli_installed:
+    brotli = lazy_import('brotli')
+if zstandard_installed:
+    zstandard = lazy_import('zstandard')
+
+# Define classes #
+#----------------#
+
+class CompressedCache:
+    """
+    Least recently used cache of compressed bodies, bounded in bytes.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Total size of the compressed bodies kept (0 disables the cache).
+        Bodies larger than a quarter of it are not kept.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: 'OrderedDict[Tuple[bytes, str, int], bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[bytes, str, int]) -> Optional[bytes]:
+        """Return the compressed body of a key, if cached."""
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+        COMPRESSION_CACHE_LOOKUPS.inc(result='miss' if body is None else 'hit')
+        return body
+
+    def put(self, key: Tuple[bytes, str, int], body: bytes) -> None:
+        """Keep a compressed body, evicting the least recently used ones."""
+        if len(body) * 4 > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self) -> None:
+        """Remove every cached body."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+# Define functions #
+#------------------#
+
+def available_encodings() -> Tuple[str, ...]:
+    """Return the content codings that can be produced, in order of preference."""
+    installed = {'gzip': True, 'br': brotli_installed, 'zstd': zstandard_installed}
+    return tuple(encoding for encoding in ENCODING_PREFERENCE if installed[encoding])
+
+def levels_for(endpoint: str) -> Optional[Dict[str, int]]:
+    """
+    Return the compression levels of an endpoint: those of the longest
+    matching URL rule prefix in `COMPRESSION_LEVELS`,
+    `DEFAULT_COMPRESSION_LEVELS` otherwise. None means the endpoint's
+    responses are not compressed.
+    """
+    matches = [prefix for prefix in COMPRESSION_LEVELS if endpoint.startswith(prefix)]
+    if not matches:
+        return DEFAULT_COMPRESSION_LEVELS
+    return COMPRESSION_LEVELS[max(matches, key=len)]
+
+def negotiate_encoding(accept_encoding: str, levels: Dict[str, int]) -> Optional[str]:
+    """
+    Choose the content coding of a response from the `Accept-Encoding` header.
+
+    Parameters
+    ----------
+    accept_encoding : str
+        Value of the request's `Accept-Encoding` header
+    levels : Dict[str, int]
+        Compression levels of the endpoint, by coding
+
+    Returns
+    -------
+    Optional[str]
+        The available coding with the highest quality value for the client
+        (ties broken by `ENCODING_PREFERENCE`), or None to send the response
+        uncompressed
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, _, parameters = item.partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        parameter, _, value = parameters.partition('=')
+        if parameter.strip().lower() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if coding:
+            qualities[coding] = quality
+
+    best_encoding, best_quality = None, 0.0
+    for encoding in available_encodings():
+        if encoding not in levels:
+            continue
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+    return best_encoding
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    """
+    Compress a whole body.
+
+    Parameters
+    ----------
+    body : bytes
+        Uncompressed body
+    encoding : str
+        Content coding ('gzip', 'br' or 'zstd')
+    level : int
+        Compression level of the coding
+
+    Returns
+    -------
+    bytes
+        Compressed body
+    """
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    return zlib.compress(body, level, wbits=GZIP_WBITS)
+
+def compress_cached(body: bytes, encoding: str, level: int) -> bytes:
+    """Compress a whole body, reusing the result for identical bodies (see `CompressedCache`)."""
+    if not COMPRESSED_CACHE.max_bytes:
+        return compress(body, encoding, level)
+    key = (hashlib.blake2b(body, digest_size=16).digest(), encoding, level)
+    compressed = COMPRESSED_CACHE.get(key)
+    if compressed is None:
+        compressed = compress(body, encoding, level)
+        COMPRESSED_CACHE.put(key, compressed)
+    return compressed
+
+def compress_stream(chunks: Iterable, encoding: str, level: int) -> Iterator[bytes]:
+    """
+    Compress a streamed body chunk by chunk.
+
+    Each chunk is flushed once compressed, so that the client can decode it
+    (e.g. a Server-Sent Event) without waiting for the next ones.
+
+    Parameters
+    ----------
+    chunks : Iterable
+        Chunks of the body (bytes or str)
+    encoding : str
+        Content coding ('gzip', 'br' or 'zstd')
+    level : int
+        Compression level of the coding
+
+    Yields
+    ------
+    bytes
+        Compressed chunks
+    """
+    compress_chunk, finish = _stream_compressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compress_chunk(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        # Close the original stream (e.g. to end a subscription) when the client goes away
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+def compress_response(response: Response, endpoint: str, accept_encoding: str) -> Response:
+    """
+    Compress a response with the coding negotiated for it, if worthwhile.
+
+    Responses already encoded, passed through (files), without a body, of a
+    media type that does not compress (e.g. Parquet) or marked
+    `Cache-Control: no-transform` are left as they are.
+
+    Parameters
+    ----------
+    response : Response
+        Response of the request
+    endpoint : str
+        URL rule of the request
+    accept_encoding : str
+        Value of the request's `Accept-Encoding` header
+
+    Returns
+    -------
+    Response
+        The response, compressed or not
+    """
+    if (
+        response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.cache_control.no_transform
+    ):
+        return response
+    levels = levels_for(endpoint)
+    if not levels:
+        return response
+
+    # The body depends on the request's Accept-Encoding header
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(accept_encoding, levels)
+    if encoding is None:
+        return response
+
+    level = levels[encoding]
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESSION_MIN_BYTES:
+            return response
+        with stage(STAGE_COMPRESS):
+            compressed = compress_cached(body, encoding, level)
+        response.set_data(compressed)
+        COMPRESSED_BYTES.inc(len(body), encoding=encoding, body='uncompressed')
+        COMPRESSED_BYTES.inc(len(compressed), encoding=encoding, body='compressed')
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_response_compression(app: Flask) -> None:
+    """
+    Compress the responses of the application according to the client's
+    `Accept-Encoding` header.
+
+    Parameters
+    ----------
+    app : Flask
+        Flask application
+    """
+    @app.after_request
+    def compress_negotiated_response(response):
+        accept_encoding = request.headers.get('Accept-Encoding', '')
+        if not accept_encoding or request.url_rule is None:
+            return response
+        return compress_response(response, request.url_rule.rule, accept_encoding)
+
+# Define helper functions #
+#-------------------------#
+
+def _stream_compressor(encoding: str, level: int) -> Tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    """Return the functions compressing and flushing a chunk, and ending the stream, of a coding."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        return (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        return (
+            lambda chunk: compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        ), compressor.flush
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    return (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Content codings produced, by order of preference when the client accepts several equally
+ENCODING_PREFERENCE = ('zstd', 'br', 'gzip')
+
+# zlib window bits writing a gzip header and trailer
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# Media types worth compressing
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/fhir+json',
+    'application/javascript',
+    'text/event-stream',
+    'text/css',
+    'text/html',
+    'text/plain'
+}
+
+# Compressed bodies, by digest of the uncompressed body, coding and level
+COMPRESSED_CACHE = CompressedCache(COMPRESSION_CACHE_BYTES)
+
+# Metrics of the compression
+COMPRESSION_CACHE_LOOKUPS = counter(
+    'compression_cache_lookups_total',
+    'Lookups of compressed bodies in the cache, by result (hit, miss)',
+    ('result',)
+)
+COMPRESSED_BYTES = counter(
+    'compressed_response_bytes_total',
+    'Bytes of the compressed (non-streamed) responses before and after compression, by coding',
+    ('encoding', 'body')
+)
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Sampling profiler module.
+
+This module finds the line-level hot spots of the production traffic, which
+the stage timers of `app.utils.instrumentation` are too coarse to show:
+1. A fraction of the requests (`SAMPLING_PROFILER_RATE`), optionally only
+   those of an endpoint or a role, is selected when the request starts.
+2. While a selected request runs, a single background thread samples the
+   call stack of its thread every `SAMPLING_PROFILER_INTERVAL` seconds.
+3. When the request ends, its stacks are merged into the profile of its
+   endpoint and appended to the endpoint's collapsed stack file in
+   `SAMPLING_PROFILER_DIR`, rotated past `SAMPLING_PROFILER_MAX_FILE_BYTES`.
+
+Stacks are written in the collapsed format of flamegraph.pl and speedscope,
+one `frame;frame;...;frame count` line per distinct stack, each frame being
+`file:function:line`. Requests that are not selected only pay for a random
+draw, and the sampler thread sleeps while no request is profiled.
+"""
+
+# Import modules #
+#----------------#
+
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from flask import Flask, request
+
+# Import project modules #
+#------------------------#
+
+from app.config import (
+    SAMPLING_PROFILER_BACKUPS,
+    SAMPLING_PROFILER_DIR,
+    SAMPLING_PROFILER_ENABLED,
+    SAMPLING_PROFILER_INTERVAL,
+    SAMPLING_PROFILER_MAX_FILE_BYTES,
+    SAMPLING_PROFILER_RATE
+)
+from app.utils.jwt_handler import decode_bearer_token
+from app.utils.memory_profiler import UNPROFILED_ENDPOINTS
+from app.utils.metrics import counter
+
+# Define classes #
+#----------------#
+
+class _ProfiledRequest:
+    """Stacks sampled from the thread of one request."""
+    __slots__ = ('endpoint', 'thread_id', 'stacks')
+
+    def __init__(self, endpoint: str, thread_id: int):
+        self.endpoint = endpoint
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler of a fraction of the requests.
+
+    Parameters
+    ----------
+    enabled : bool
+        Whether requests are profiled
+    sample_rate : float
+        Fraction of the eligible requests profiled
+    interval : float
+        Seconds between two samples of a profiled request's stack
+    profile_dir : Optional[str]
+        Directory of the collapsed stack files, if any
+    max_file_bytes : int
+        Size at which a collapsed stack file is rotated
+    backups : int
+        Rotated files kept per endpoint
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        sample_rate: float,
+        interval: float,
+        profile_dir: Optional[str] = None,
+        max_file_bytes: int = SAMPLING_PROFILER_MAX_FILE_BYTES,
+        backups: int = SAMPLING_PROFILER_BACKUPS
+    ):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.profile_dir = profile_dir or None
+        self.max_file_bytes = max_file_bytes
+        self.backups = backups
+        self.endpoint_filter: Optional[str] = None
+        self.role_filter: Optional[str] = None
+        self._profiles: Dict[str, Dict] = {}
+        self._active: Dict[int, _ProfiledRequest] = {}
+        self._lock = threading.Lock()
+        self._wake_up = threading.Condition(self._lock)
+        self._sampler = None
+        self._file_lock = threading.Lock()
+
+    def configure(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        endpoint: Optional[str] = None,
+        role: Optional[str] = None
+    ) -> Dict:
+        """
+        Change the requests profiled.
+
+        Parameters
+        ----------
+        enabled : Optional[bool]
+            Whether requests are profiled (unchanged if None)
+        sample_rate : Optional[float]
+            Fraction of the eligible requests profiled (unchanged if None)
+        endpoint : Optional[str]
+            Only profile the endpoints starting with this prefix ('' for all)
+        role : Optional[str]
+            Only profile the requests of this role ('' for all)
+        """
+        with self._lock:
+            if enabled is not None:
+                self.enabled = enabled
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            if endpoint is not None:
+                self.endpoint_filter = endpoint or None
+            if role is not None:
+                self.role_filter = role or None
+        return self.state()
+
+    def state(self) -> Dict:
+        """Return the settings of the profiler."""
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'interval_ms': self.interval * 1000,
+            'endpoint': self.endpoint_filter,
+            'role': self.role_filter,
+            'profiling': len(self._active),
+            'profile_dir': self.profile_dir
+        }
+
+    def should_profile(self, endpoint: str, headers) -> bool:
+        """
+        Whether a request is selected for profiling.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint (URL rule) of the request
+        headers : Mapping
+            Headers of the request, for the role filter
+        """
+        if not self.enabled or endpoint.startswith(UNPROFILED_ENDPOINTS):
+            return False
+        if self.endpoint_filter is not None and not endpoint.startswith(self.endpoint_filter):
+            return False
+        if random.random() >= self.sample_rate:
+            return False
+        if self.role_filter is not None:
+            token = decode_bearer_token(headers.get('Authorization'))
+            return bool(token) and token.get('role') == self.role_filter
+        return True
+
+    def start(self, endpoint: str) -> _ProfiledRequest:
+        """Start sampling the stack of the current thread for a request."""
+        profiled = _ProfiledRequest(endpoint, threading.get_ident())
+        with self._lock:
+            self._active[profiled.thread_id] = profiled
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+                self._sampler.start()
+            self._wake_up.notify()
+        return profiled
+
+    def stop(self, profiled: _ProfiledRequest) -> None:
+        """Stop sampling a request and merge its stacks into the profile of its endpoint."""
+        with self._lock:
+            self._active.pop(profiled.thread_id, None)
+            stacks = profiled.stacks
+            profile = self._profiles.setdefault(profiled.endpoint, {'requests': 0, 'samples': 0, 'stacks': Counter()})
+            profile['requests'] += 1
+            profile['samples'] += sum(stacks.values())
+            for stack, count in stacks.items():
+                if stack in profile['stacks'] or len(profile['stacks']) < MAX_STACKS_PER_ENDPOINT:
+                    profile['stacks'][stack] += count
+                else:
+                    profile['stacks'][TRUNCATED_STACK] += count
+        PROFILED_REQUESTS.inc(endpoint=profiled.endpoint)
+        self._write(profiled.endpoint, stacks)
+
+    def summaries(self) -> List[Dict]:
+        """Return the requests and samples profiled per endpoint, most sampled first."""
+        with self._lock:
+            summaries = [
+                {
+                    'endpoint': endpoint,
+                    'requests': profile['requests'],
+                    'samples': profile['samples'],
+                    'stacks': len(profile['stacks'])
+                }
+                for endpoint, profile in self._profiles.items()
+            ]
+        return sorted(summaries, key=lambda summary: summary['samples'], reverse=True)
+
+    def collapsed(self, endpoint: Optional[str] = None) -> str:
+        """
+        Return the merged profile of an endpoint in the collapsed stack format.
+
+        Parameters
+        ----------
+        endpoint : Optional[str]
+            Endpoint whose profile is returned. If None, the profiles of every
+            endpoint are returned together, each rooted in a frame named
+            after its endpoint
+        """
+        with self._lock:
+            if endpoint is not None:
+                profile = self._profiles.get(endpoint)
+                stacks = Counter(profile['stacks']) if profile is not None else Counter()
+            else:
+                stacks = Counter()
+                for name, profile in self._profiles.items():
+                    for stack, count in profile['stacks'].items():
+                        stacks[f"{_frame_name(name)};{stack}"] += count
+        return _format_collapsed(stacks)
+
+    def reset(self) -> None:
+        """Discard the merged profiles (the collapsed stack files are kept)."""
+        with self._lock:
+            self._profiles = {}
+
+    def _sample(self) -> None:
+        """Sample the stacks of the profiled requests until the process exits."""
+        while True:
+            with self._lock:
+                while not self._active:
+                    self._wake_up.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                for profiled in self._active.values():
+                    frame = frames.get(profiled.thread_id)
+                    if frame is not None:
+                        profiled.stacks[collapse_stack(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+    def _write(self, endpoint: str, stacks: Counter) -> None:
+        """Append the stacks of a request to the collapsed stack file of its endpoint."""
+        if self.profile_dir is None or not stacks:
+            return
+        path = os.path.join(self.profile_dir, f"{_file_name(endpoint)}.folded")
+        try:
+            with self._file_lock:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                if os.path.exists(path) and os.path.getsize(path) >= self.max_file_bytes:
+                    _rotate(path, self.backups)
+                with open(path, 'a', encoding='utf-8') as profile_file:
+                    profile_file.write(_format_collapsed(stacks))
+        except OSError as e:
+            print(f"Error writing the sampled profile: {str(e)}")
+
+# Define functions #
+#------------------#
+
+def collapse_stack(frame) -> str:
+    """
+    Return the stack of a frame in the collapsed format, outermost frame first.
+
+    Parameters
+    ----------
+    frame : frame
+        Innermost frame of the stack
+    """
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(f"{_short_path(frame.f_code.co_filename)}:{frame.f_code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+def init_sampling_profiler(app: Flask, profiler: Optional[SamplingProfiler] = None) -> None:
+    """
+    Profile the requests of the application selected by the sampling profiler.
+
+    Parameters
+    ----------
+    app : Flask
+        Flask application
+    profiler : Optional[SamplingProfiler]
+        Profiler to use (default: the process-wide `SAMPLING_PROFILER`)
+    """
+    profiler = profiler or SAMPLING_PROFILER
+
+    @app.before_request
+    def start_sampling():
+        rule = request.url_rule.rule if request.url_rule is not None else None
+        if rule is not None and profiler.should_profile(rule, request.headers):
+            request.sampling_profile = profiler.start(rule)
+
+    @app.teardown_request
+    def stop_sampling(exception=None):
+        profiled = getattr(request, 'sampling_profile', None)
+        if profiled is not None:
+            request.sampling_profile = None
+            profiler.stop(profiled)
+
+# Define helper functions #
+#-------------------------#
+
+def _short_path(filename: str) -> str:
+    """Return a source file path relative to the project or to site-packages, cached."""
+    short = _SHORT_PATHS.get(filename)
+    if short is None:
+        if filename.startswith(PROJECT_ROOT):
+            short = os.path.relpath(filename, PROJECT_ROOT)
+        elif 'site-packages' in filename:
+            short = filename.split('site-packages', 1)[1].lstrip(os.sep)
+        else:
+            short = os.path.basename(filename)
+        short = _frame_name(short)
+        _SHORT_PATHS[filename] = short
+    return short
+
+def _frame_name(name: str) -> str:
+    """Remove the separators of the collapsed format from a frame name."""
+    return name.replace(';', ':').replace(' ', '_')
+
+def _file_name(endpoint: str) -> str:
+    """Return the file name of an endpoint's collapsed stacks."""
+    return re.sub(r'[^A-Za-z0-9]+', '_', endpoint).strip('_') or 'root'
+
+def _format_collapsed(stacks: Counter) -> str:
+    """Format stacks and their sample counts as collapsed stack lines."""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+def _rotate(path: str, backups: int) -> None:
+    """Rotate a file: path becomes path.1, path.1 becomes path.2, and so on."""
+    if backups <= 0:
+        os.remove(path)
+        return
+    for index in range(backups - 1, 0, -1):
+        source = f"{path}.{index}"
+        if os.path.exists(source):
+            os.replace(source, f"{path}.{index + 1}")
+    os.replace(path, f"{path}.1")
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+
+# Frames kept per sampled stack, innermost first
+MAX_STACK_DEPTH = 128
+
+# Distinct stacks kept per endpoint; the samples of further stacks are counted together
+MAX_STACKS_PER_ENDPOINT = 20000
+TRUNCATED_STACK = '[truncated]'
+
+# Short paths of the source files seen in the stacks
+_SHORT_PATHS: Dict[str, str] = {}
+
+# Process-wide profiler
+SAMPLING_PROFILER = SamplingProfiler(
+    SAMPLING_PROFILER_ENABLED,
+    SAMPLING_PROFILER_RATE,
+    SAMPLING_PROFILER_INTERVAL,
+    SAMPLING_PROFILER_DIR
+)
+
+# Profiling metrics
+PROFILED_REQUESTS = counter(
+    'sampling_profiler_requests_total',
+    'Requests profiled by the sampling profiler, by endpoint',
+    ('endpoint',)
+)
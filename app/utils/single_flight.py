@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Single-flight module.
+
+This module coalesces identical concurrent computations: while a computation
+for a key is in flight, further calls with the same key wait for it and share
+its result (or its exception) instead of running it again. Nothing is cached
+once the computation finishes.
+
+Coalesced calls wait at most until the deadline of their own request (see
+`app.utils.query_deadline`). If the computation is cancelled because the
+client of the calling request disconnected, its error is not shared: one of
+the waiting calls takes over and runs the computation again.
+
+Shared results are returned to every caller as is, so they must be treated
+as read-only.
+"""
+
+# Import modules #
+#----------------#
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Import project modules #
+#------------------------#
+
+from app.exceptions import RequestTimeoutError
+from app.utils.metrics import counter, gauge
+from app.utils.query_deadline import CANCEL_REASON_CLIENT_DISCONNECT, current_deadline
+
+# Define classes #
+#----------------#
+
+class _Call:
+    """In-flight computation for one key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.abandoned = False
+
+
+class SingleFlight:
+    """
+    Group of coalesced computations.
+
+    Parameters
+    ----------
+    name : str
+        Name of the group, used as the 'group' label of the metrics
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run `function`, or wait for the identical computation already in flight.
+
+        Parameters
+        ----------
+        key : Hashable
+            Normalised key identifying the computation
+        function : Callable[[], Any]
+            Computation to run if none is in flight for `key`
+        timeout : Optional[float]
+            Maximum number of seconds a coalesced call waits for the
+            in-flight computation outside a request deadline. Within one,
+            it waits until the deadline. None waits indefinitely.
+
+        Returns
+        -------
+        Any
+            Result of the computation, shared by every coalesced call
+
+        Raises
+        ------
+        RequestTimeoutError
+            If a coalesced call waits longer than its deadline or `timeout`
+        Exception
+            Any exception raised by the computation is re-raised to every caller
+        """
+        deadline = current_deadline()
+        expires_at = deadline.expires_at if deadline is not None else (
+            None if timeout is None else time.monotonic() + timeout
+        )
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                is_leader = call is None
+                if is_leader:
+                    call = _Call()
+                    self._calls[key] = call
+
+            if is_leader:
+                SINGLE_FLIGHT_CALLS.inc(group=self.name, role='leader')
+                SINGLE_FLIGHT_IN_FLIGHT.inc(group=self.name)
+                try:
+                    call.result = function()
+                except BaseException as e:
+                    call.error = e
+                    # Cancelled for the leader's client only: the waiting calls run it again
+                    call.abandoned = (
+                        deadline is not None and deadline.cancel_reason == CANCEL_REASON_CLIENT_DISCONNECT
+                    )
+                finally:
+                    with self._lock:
+                        del self._calls[key]
+                    SINGLE_FLIGHT_IN_FLIGHT.dec(group=self.name)
+                    call.done.set()
+                break
+
+            SINGLE_FLIGHT_CALLS.inc(group=self.name, role='coalesced')
+            wait = None if expires_at is None else max(0.0, expires_at - time.monotonic())
+            if not call.done.wait(wait):
+                SINGLE_FLIGHT_CALLS.inc(group=self.name, role='timeout')
+                raise RequestTimeoutError(
+                    f"Timed out after {round(wait, 3)} s waiting for an identical request in progress"
+                )
+            if not call.abandoned:
+                break
+            SINGLE_FLIGHT_CALLS.inc(group=self.name, role='takeover')
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self) -> int:
+        """Return the number of keys currently being computed."""
+        with self._lock:
+            return len(self._calls)
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Metrics
+SINGLE_FLIGHT_CALLS = counter(
+    'single_flight_calls_total',
+    'Calls to coalesced computations, by role (leader, coalesced, timeout, takeover)',
+    ('group', 'role')
+)
+SINGLE_FLIGHT_IN_FLIGHT = gauge(
+    'single_flight_in_flight',
+    'Computations currently in flight',
+    ('group',)
+)
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Slow query log module.
+
+This module keeps the statements that ran longer than `SLOW_QUERY_THRESHOLD`
+(timed by the cursor execution hooks in `app.db`), so that the plan of a
+slow consolidated query can be inspected after the fact:
+1. Each slow statement is recorded with its duration, the tables it reads
+   and its bound parameters, with the patient IDs redacted.
+2. A sampled fraction of the slow SELECT statements is re-run with
+   `EXPLAIN (ANALYZE, BUFFERS)` on a background thread, one at a time, and
+   the plan is stored with the entry, with the patient IDs the driver
+   interpolated into its conditions redacted as well.
+3. Entries are kept in memory, aggregated by table set for the admin
+   endpoint, and optionally appended to a JSON lines file.
+"""
+
+# Import modules #
+#----------------#
+
+import json
+import random
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Import project modules #
+#------------------------#
+
+from app.config import (
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    SLOW_QUERY_EXPLAIN_TIMEOUT,
+    SLOW_QUERY_LOG_PATH,
+    SLOW_QUERY_LOG_SIZE,
+    SLOW_QUERY_THRESHOLD
+)
+from app.utils.metrics import counter
+
+# Define classes #
+#----------------#
+
+class SlowQueryLog:
+    """
+    Log of the slow statements.
+
+    Parameters
+    ----------
+    threshold : float
+        Seconds above which a statement is slow
+    explain_sample_rate : float
+        Fraction of the slow SELECT statements whose plan is captured
+    max_entries : int
+        Slow statements kept in memory
+    log_path : Optional[str]
+        JSON lines file the entries are appended to, if any
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        explain_sample_rate: float,
+        max_entries: int,
+        log_path: Optional[str] = None
+    ):
+        self.threshold = threshold
+        self.explain_sample_rate = explain_sample_rate
+        self.log_path = log_path or None
+        self.entries = deque(maxlen=max_entries)
+        self._offenders: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._explainer = None
+        self._explaining = False
+
+    def record(self, statement: str, parameters, duration: float, engine=None) -> Optional[Dict]:
+        """
+        Record a statement if it is slow.
+
+        Parameters
+        ----------
+        statement : str
+            SQL sent to the database
+        parameters : Dict or Sequence
+            Bound parameters of the statement
+        duration : float
+            Seconds the statement ran
+        engine : sqlalchemy.engine.Engine
+            Engine the statement ran on, used to capture its plan
+
+        Returns
+        -------
+        Optional[Dict]
+            The log entry, or None if the statement is not slow
+        """
+        if duration < self.threshold:
+            return None
+
+        tables = statement_tables(statement)
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'duration_ms': round(duration * 1000, 1),
+            'tables': tables,
+            'statement': statement,
+            'parameters': redact_parameters(parameters),
+            'plan': None
+        }
+        table_set = ','.join(tables)
+        with self._lock:
+            self.entries.append(entry)
+            offender = self._offenders.setdefault(
+                table_set,
+                {'tables': tables, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_entry': None}
+            )
+            offender['count'] += 1
+            offender['total_ms'] += entry['duration_ms']
+            offender['max_ms'] = max(offender['max_ms'], entry['duration_ms'])
+            offender['last_entry'] = entry
+        SLOW_QUERIES.inc(tables=table_set)
+
+        if (
+            engine is not None
+            and engine.dialect.name == 'postgresql'
+            and _is_select(statement)
+            and random.random() < self.explain_sample_rate
+        ):
+            self._schedule_explain(entry, engine, statement, parameters)
+        else:
+            self._write(entry)
+        return entry
+
+    def top_offenders(self, limit: int = 20, order_by: str = 'total_ms') -> List[Dict]:
+        """
+        Return the table sets of the slow statements, slowest first.
+
+        Parameters
+        ----------
+        limit : int
+            Number of table sets returned
+        order_by : {'total_ms', 'max_ms', 'count', 'mean_ms'}
+            Ranking of the table sets
+        """
+        with self._lock:
+            offenders = [
+                dict(
+                    offender,
+                    total_ms=round(offender['total_ms'], 1),
+                    mean_ms=round(offender['total_ms'] / offender['count'], 1)
+                )
+                for offender in self._offenders.values()
+            ]
+        offenders.sort(key=lambda offender: offender[order_by], reverse=True)
+        return offenders[:limit]
+
+    def _schedule_explain(self, entry: Dict, engine, statement: str, parameters) -> None:
+        """Capture the plan of a statement in the background, unless a capture is in progress."""
+        with self._lock:
+            busy = self._explaining
+            self._explaining = True
+            if self._explainer is None:
+                self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+        if busy:
+            self._write(entry)
+            return
+        self._explainer.submit(self._explain, entry, engine, statement, parameters)
+
+    def _explain(self, entry: Dict, engine, statement: str, parameters) -> None:
+        """Run EXPLAIN (ANALYZE, BUFFERS) on a pooled connection and store the plan with the entry."""
+        try:
+            entry['plan'] = redact_plan(explain_analyze(engine, statement, parameters), parameters)
+        except Exception as e:
+            entry['plan_error'] = redact_plan(str(e), parameters)
+        finally:
+            with self._lock:
+                self._explaining = False
+            self._write(entry)
+
+    def _write(self, entry: Dict) -> None:
+        """Append an entry to the log file, if any."""
+        if self.log_path is None:
+            return
+        try:
+            with self._lock, open(self.log_path, 'a', encoding='utf-8') as log_file:
+                log_file.write(json.dumps(entry, default=str) + '\n')
+        except OSError as e:
+            print(f"Error writing the slow query log: {str(e)}")
+
+# Define functions #
+#------------------#
+
+def explain_analyze(engine, statement: str, parameters) -> List:
+    """
+    Run a SELECT statement with EXPLAIN (ANALYZE, BUFFERS) and return its plan.
+
+    The DBAPI connection is used directly, so the statement is not timed
+    again by the execution hooks. It runs in its own transaction, rolled
+    back afterwards, with `SLOW_QUERY_EXPLAIN_TIMEOUT` as statement_timeout.
+    """
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"SET LOCAL statement_timeout = {int(SLOW_QUERY_EXPLAIN_TIMEOUT * 1000)}")
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+            plan = cursor.fetchone()[0]
+        finally:
+            cursor.close()
+            connection.rollback()
+    finally:
+        connection.close()
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+def statement_tables(statement: str) -> List[str]:
+    """Return the tables a statement reads or writes, sorted."""
+    return sorted({match.lower() for match in TABLE_REFERENCE.findall(statement)})
+
+def redact_parameters(parameters):
+    """
+    Return the bound parameters with the patient IDs redacted.
+
+    Parameters named after the patient ID columns and values shaped like a
+    patient ID are replaced, lists by their length only.
+    """
+    if isinstance(parameters, dict):
+        return {
+            name: _redact(value, force=PATIENT_PARAMETER.search(name) is not None)
+            for name, value in parameters.items()
+        }
+    if isinstance(parameters, (list, tuple)):
+        return [_redact(value) for value in parameters]
+    return parameters
+
+def redact_plan(plan, parameters):
+    """
+    Return an EXPLAIN plan with the patient IDs redacted.
+
+    psycopg2 interpolates the bound parameters on the client side, so the
+    conditions of the plan (`Index Cond`, `Filter`, ...) hold the patient
+    IDs as literals. The values redacted from the parameters and any text
+    shaped like a patient ID are replaced in every string of the plan.
+    """
+    if isinstance(plan, dict):
+        return {key: redact_plan(value, parameters) for key, value in plan.items()}
+    if isinstance(plan, list):
+        return [redact_plan(value, parameters) for value in plan]
+    if not isinstance(plan, str):
+        return plan
+    for value in sorted(_patient_values(parameters), key=len, reverse=True):
+        plan = plan.replace(value, REDACTED)
+    return PATIENT_ID_TEXT.sub(REDACTED, plan)
+
+# Define helper functions #
+#-------------------------#
+
+def _patient_values(parameters) -> set:
+    """Return the patient IDs among the bound parameters, as text."""
+    if isinstance(parameters, dict):
+        items = [(PATIENT_PARAMETER.search(name) is not None, value) for name, value in parameters.items()]
+    elif isinstance(parameters, (list, tuple)):
+        items = [(False, value) for value in parameters]
+    else:
+        return set()
+    values = set()
+    for force, value in items:
+        for item in value if isinstance(value, (list, tuple)) else [value]:
+            if (force and isinstance(item, str) and item) or _is_patient_id(item):
+                values.add(item)
+    return values
+
+def _redact(value, force: bool = False):
+    """Redact a parameter value if it is (or contains) a patient ID."""
+    if isinstance(value, (list, tuple)):
+        if force or any(_is_patient_id(item) for item in value):
+            return f"<{len(value)} redacted>"
+        return list(value)
+    if force or _is_patient_id(value):
+        return REDACTED
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+def _is_patient_id(value) -> bool:
+    """Whether a value is shaped like a patient ID."""
+    return isinstance(value, str) and PATIENT_ID_VALUE.match(value) is not None
+
+def _is_select(statement: str) -> bool:
+    """Whether a statement is a plain query, safe to run again."""
+    return statement.lstrip().upper().startswith('SELECT')
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Tables referenced by a statement
+TABLE_REFERENCE = re.compile(r'\b(?:FROM|JOIN|INTO|UPDATE)\s+"?(\w+)"?', re.IGNORECASE)
+
+# Parameters holding patient IDs, named after the patient ID columns
+PATIENT_PARAMETER = re.compile(r'pacien|patient', re.IGNORECASE)
+
+# Values shaped like a patient ID
+PATIENT_ID_VALUE = re.compile(r'^[0-9]{10}$')
+
+# Text shaped like a patient ID, within a plan condition
+PATIENT_ID_TEXT = re.compile(r'(?<![0-9])[0-9]{10}(?![0-9])')
+
+REDACTED = '<redacted>'
+
+# Process-wide log
+SLOW_QUERY_LOG = SlowQueryLog(
+    SLOW_QUERY_THRESHOLD,
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    SLOW_QUERY_LOG_SIZE,
+    SLOW_QUERY_LOG_PATH
+)
+
+# Slow statement metrics
+SLOW_QUERIES = counter(
+    'slow_queries_total',
+    'Statements slower than the slow query threshold, by table set',
+    ('tables',)
+)
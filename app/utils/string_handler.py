@@ -9,8 +9,6 @@ import os
 from pathlib import Path
 from sys import maxsize
 
-from numpy import array, vectorize, char
-
 import re
 
 #------------------------#
@@ -18,6 +16,12 @@ import re
 #------------------------#
 
 from app.utils.introspection_utils import get_type_str, get_caller_args
+from app.utils.lazy_import import lazy_import
+
+# numpy is imported on first use (only the list and array inputs need it)
+array = lazy_import('numpy', 'array')
+vectorize = lazy_import('numpy', 'vectorize')
+char = lazy_import('numpy', 'char')
 
 #------------------#
 # Define functions #
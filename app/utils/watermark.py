@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Watermark module.
+
+This module handles the tokens used for incremental synchronisation. A
+watermark is the latest registration or modification timestamp of the rows
+a client has already received. It is returned with every response, as an
+opaque token in the Bundle's `meta.tag`, and passed back in `_since` to get
+only the rows added or modified from then on. The rows changed at the
+watermark itself are sent again, since rows sharing its timestamp may be
+committed after the response: clients recognise them by their IDs, derived
+from the primary key.
+"""
+
+# Import modules #
+#----------------#
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+# Import project modules #
+#------------------------#
+
+from app.constants.error_messages import INVALID_WATERMARK_ERROR
+
+# Define functions #
+#------------------#
+
+def encode_watermark(timestamp: datetime) -> str:
+    """
+    Encode a timestamp as an opaque watermark token.
+
+    Parameters
+    ----------
+    timestamp : datetime
+        Latest change timestamp already seen by the client
+
+    Returns
+    -------
+    str
+        URL-safe watermark token
+    """
+    payload = f"{WATERMARK_VERSION}:{timestamp.isoformat()}".encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+def decode_watermark(value: str) -> datetime:
+    """
+    Decode a `_since` value.
+
+    Both the tokens returned by this service and plain ISO 8601 timestamps
+    (as in the FHIR `_since` search parameter) are accepted.
+
+    Parameters
+    ----------
+    value : str
+        Watermark token or ISO 8601 timestamp
+
+    Returns
+    -------
+    datetime
+        Timestamp after which rows were added or modified
+
+    Raises
+    ------
+    ValueError
+        If the value is neither a valid token nor an ISO 8601 timestamp
+    """
+    if not isinstance(value, str) or not value:
+        raise ValueError(INVALID_WATERMARK_ERROR)
+
+    try:
+        payload = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        version, timestamp = payload.split(':', 1)
+        if version == WATERMARK_VERSION:
+            return datetime.fromisoformat(timestamp)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        pass
+
+    try:
+        timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(INVALID_WATERMARK_ERROR)
+    # Stored timestamps are naive local times
+    return timestamp.replace(tzinfo=None)
+
+def next_watermark(items: Iterable, since: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Compute the watermark to return after sending a set of rows.
+
+    Parameters
+    ----------
+    items : Iterable[ModelRow]
+        Rows returned to the client
+    since : Optional[datetime]
+        Watermark received with the request, if any
+
+    Returns
+    -------
+    Optional[datetime]
+        Latest change timestamp among the rows and `since`,
+        or None if none is known
+    """
+    watermark = since
+    for item in items:
+        change_time = item.get_change_time()
+        if change_time is not None and (watermark is None or change_time > watermark):
+            watermark = change_time
+    return watermark
+
+def add_watermark_to_bundle(bundle: Dict, watermark: Optional[datetime]) -> Dict:
+    """
+    Add the next watermark to a FHIR Bundle's `meta`.
+
+    Parameters
+    ----------
+    bundle : Dict
+        FHIR Bundle
+    watermark : Optional[datetime]
+        Next watermark. Nothing is added if None.
+
+    Returns
+    -------
+    Dict
+        The same Bundle
+    """
+    if watermark is not None:
+        bundle['meta'] = {
+            'lastUpdated': watermark.isoformat(),
+            'tag': [{
+                'system': WATERMARK_TAG_SYSTEM,
+                'code': encode_watermark(watermark),
+                'display': 'Pass this value as _since to retrieve only later changes'
+            }]
+        }
+    return bundle
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Token format version
+WATERMARK_VERSION = 'w1'
+
+# Code system of the watermark tag in Bundle.meta
+WATERMARK_TAG_SYSTEM = 'urn:patient-data-fhir-service:watermark'
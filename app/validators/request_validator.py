@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compiled request validation module.
+
+This module validates a patient data request exactly once at the API edge
+and returns a typed, normalised query object that is then reused for every
+table involved in the request.
+
+All regular expressions are compiled at import time and the date format of
+each bound is detected with a single pattern match, so no frame inspection
+or regex dispatch happens on the request hot path. The error messages are
+the same ones produced by `app.utils.form_field_validations`.
+"""
+
+# Import modules #
+#----------------#
+
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Import project modules #
+#------------------------#
+
+from app.constants.error_messages import (
+    BATCH_SIZE_EXCEEDED_ERROR,
+    INVALID_DOWNSAMPLE_ERROR,
+    INVALID_DATE_FORMAT_ERROR,
+    INVALID_DATE_RANGE_ERROR,
+    INVALID_ID_FORMAT_ERROR,
+    INVALID_ID_LIST_ERROR,
+    INVALID_ID_TYPE_ERROR,
+)
+from app.utils.date_range import DateRange, parse_date_bound
+from app.utils.form_field_validations import ID_REGEX
+from app.utils.instrumentation import STAGE_VALIDATION, timed_stage
+from app.utils.watermark import decode_watermark
+
+# Define classes and methods #
+#----------------------------#
+
+class PatientQuery(NamedTuple):
+    """
+    Validated and normalised patient data query.
+
+    Attributes
+    ----------
+    patient_id : str
+        Validated patient ID value
+    date_range : DateRange
+        Parsed date range, shared by every table of the request
+    since : Optional[datetime]
+        Decoded `_since` watermark. If set, only rows added or modified
+        at or after it are requested.
+    downsample : Optional[int]
+        Maximum number of points per vital sign (`_downsample`). If set, the
+        points of each series are selected with LTTB.
+    """
+    patient_id: str
+    date_range: DateRange
+    since: Optional[datetime] = None
+    downsample: Optional[int] = None
+
+    def to_request_data(self) -> Dict:
+        """
+        Build the request data dictionary expected by `app.db` filters.
+
+        Returns
+        -------
+        Dict
+            Dictionary with the patient ID, the parsed date range and,
+            for incremental requests, the watermark
+        """
+        request_data = {
+            'id_patient': self.patient_id,
+            'date_range': self.date_range
+        }
+        if self.since is not None:
+            request_data['since'] = self.since
+        return request_data
+
+
+class BatchPatientQuery(NamedTuple):
+    """
+    Validated and normalised query for several patients sharing a date range.
+
+    Attributes
+    ----------
+    patient_ids : Tuple[str, ...]
+        Validated patient IDs, without duplicates and in request order
+    date_range : DateRange
+        Parsed date range, shared by every patient and table of the request
+    """
+    patient_ids: Tuple[str, ...]
+    date_range: DateRange
+
+    def to_request_data(self) -> Dict:
+        """
+        Build the request data dictionary expected by `app.db` filters.
+
+        Returns
+        -------
+        Dict
+            Dictionary with the list of patient IDs and the parsed date range
+        """
+        return {
+            'id_patients': list(self.patient_ids),
+            'date_range': self.date_range
+        }
+
+
+class RequestValidator:
+    """Single-pass validator for patient data requests."""
+
+    @staticmethod
+    def validate_id(patient_id) -> Optional[str]:
+        """
+        Validate a patient ID value.
+
+        Returns
+        -------
+        Optional[str]
+            Error message if the ID is invalid, None otherwise
+        """
+        if not isinstance(patient_id, str):
+            return INVALID_ID_TYPE_ERROR
+        if ID_REGEX.fullmatch(patient_id) is None:
+            return INVALID_ID_FORMAT_ERROR
+        return None
+
+    @staticmethod
+    def validate_date_range(min_date, max_date) -> Tuple[Optional[DateRange], Optional[Dict]]:
+        """
+        Parse and validate a date range.
+
+        Parameters
+        ----------
+        min_date : str
+            Start date in format 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+        max_date : str
+            End date in format 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+
+        Returns
+        -------
+        Tuple[Optional[DateRange], Optional[Dict]]
+            The parsed range and None if valid, otherwise None and
+            a dictionary with the 'field' and 'error' keys
+        """
+        start = parse_date_bound(min_date)
+        end = parse_date_bound(max_date, is_max_date=True)
+
+        if start is None and end is None:
+            return None, {
+                'field': 'max_date and min_date',
+                'error': f"Invalid date format for min_date and max_date. {INVALID_DATE_FORMAT_ERROR}"
+            }
+        if start is None:
+            return None, {
+                'field': 'min_date',
+                'error': f"Invalid date format for min_date. {INVALID_DATE_FORMAT_ERROR}"
+            }
+        if end is None:
+            return None, {
+                'field': 'max_date',
+                'error': f"Invalid date format for max_date. {INVALID_DATE_FORMAT_ERROR}"
+            }
+        if start > end:
+            return None, {'field': 'min_date', 'error': INVALID_DATE_RANGE_ERROR}
+
+        return DateRange(start, end), None
+
+    @classmethod
+    @timed_stage(STAGE_VALIDATION)
+    def validate(
+        cls,
+        patient_id,
+        min_date,
+        max_date,
+        since=None,
+        downsample=None
+    ) -> Tuple[Optional[PatientQuery], Optional[Dict]]:
+        """
+        Validate a patient data request once and normalise it.
+
+        Parameters
+        ----------
+        patient_id : str
+            Patient ID value
+        min_date : str
+            Start date in format 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+        max_date : str
+            End date in format 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+        since : Optional[str]
+            Optional `_since` watermark token or ISO 8601 timestamp
+        downsample : Optional[int]
+            Optional `_downsample` maximum number of points per vital sign
+            (as an integer or a string of digits)
+
+        Returns
+        -------
+        Tuple[Optional[PatientQuery], Optional[Dict]]
+            The normalised query and None if the request is valid,
+            otherwise None and a dictionary with the 'field' and 'error' keys
+        """
+        id_error = cls.validate_id(patient_id)
+        if id_error:
+            return None, {'field': 'id_field', 'error': id_error}
+
+        date_range, date_error = cls.validate_date_range(min_date, max_date)
+        if date_error:
+            return None, date_error
+
+        since_datetime = None
+        if since is not None:
+            try:
+                since_datetime = decode_watermark(since)
+            except ValueError as e:
+                return None, {'field': '_since', 'error': str(e)}
+
+        if downsample is not None:
+            downsample = _parse_point_count(downsample)
+            if downsample is None:
+                return None, {
+                    'field': '_downsample',
+                    'error': f"{INVALID_DOWNSAMPLE_ERROR} (between {MIN_DOWNSAMPLE_POINTS} and {MAX_DOWNSAMPLE_POINTS})"
+                }
+
+        return PatientQuery(
+            patient_id=patient_id,
+            date_range=date_range,
+            since=since_datetime,
+            downsample=downsample
+        ), None
+
+    @classmethod
+    @timed_stage(STAGE_VALIDATION)
+    def validate_many(
+        cls,
+        patient_ids,
+        min_date,
+        max_date
+    ) -> Tuple[Optional[BatchPatientQuery], Optional[Dict]]:
+        """
+        Validate a request for several patients at once.
+
+        The IDs are checked in a single pass over the list and the date
+        range is parsed once for the whole batch.
+
+        Parameters
+        ----------
+        patient_ids : List[str]
+            Patient ID values
+        min_date : str
+            Start date in format 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+        max_date : str
+            End date in format 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+
+        Returns
+        -------
+        Tuple[Optional[BatchPatientQuery], Optional[Dict]]
+            The normalised query and None if the request is valid,
+            otherwise None and a dictionary with the 'field' and 'error' keys.
+            Invalid IDs are reported with their position in the list.
+        """
+        if not isinstance(patient_ids, list) or not patient_ids:
+            return None, {'field': 'id_patients', 'error': INVALID_ID_LIST_ERROR}
+        if len(patient_ids) > MAX_BATCH_PATIENTS:
+            return None, {
+                'field': 'id_patients',
+                'error': f"{BATCH_SIZE_EXCEEDED_ERROR} (maximum {MAX_BATCH_PATIENTS})"
+            }
+
+        invalid_ids = _find_invalid_ids(patient_ids)
+        if invalid_ids:
+            index, id_error = invalid_ids[0]
+            return None, {'field': f'id_patients[{index}]', 'error': id_error}
+
+        date_range, date_error = cls.validate_date_range(min_date, max_date)
+        if date_error:
+            return None, date_error
+
+        return BatchPatientQuery(
+            patient_ids=tuple(dict.fromkeys(patient_ids)),
+            date_range=date_range
+        ), None
+
+# Define helper functions #
+#-------------------------#
+
+def _find_invalid_ids(patient_ids: List) -> List[Tuple[int, str]]:
+    """Return the position and error message of every invalid ID of a list."""
+    return [
+        (index, INVALID_ID_TYPE_ERROR if not isinstance(patient_id, str) else INVALID_ID_FORMAT_ERROR)
+        for index, patient_id in enumerate(patient_ids)
+        if not isinstance(patient_id, str) or ID_REGEX.fullmatch(patient_id) is None
+    ]
+
+def _parse_point_count(value) -> Optional[int]:
+    """Parse a number of downsampled points, returning None if it is invalid or out of bounds."""
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool):
+        return None
+    if not MIN_DOWNSAMPLE_POINTS <= value <= MAX_DOWNSAMPLE_POINTS:
+        return None
+    return value
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Maximum number of patients in a single batch request
+MAX_BATCH_PATIENTS = 100
+
+# Bounds of the number of points per vital sign of a downsampled request
+MIN_DOWNSAMPLE_POINTS = 3
+MAX_DOWNSAMPLE_POINTS = 10000
@@ -52,8 +52,13 @@ from flask_restx import Api
 # Import project modules #
 #------------------------#
 
-from app.config import DATABASE_CREDENTIALS
-from app.db import init_db
+from app.config import DATABASE_CREDENTIALS, EAGER_IMPORTS
+from app.db import close_request_sessions, init_db
+from app.utils.instrumentation import init_instrumentation
+from app.utils.lazy_import import preload_lazy_imports
+from app.utils.query_budget import init_query_budgets
+from app.utils.response_compression import init_response_compression
+from app.utils.sampling_profiler import init_sampling_profiler
 
 #------------------#
 # Define functions #
@@ -104,6 +109,9 @@ def create_app():
     from app.api.vital_signs_api import vital_signs_ns
     from app.api.operational_data_api import api as operational_data_ns
     from app.api.metadata_api import metadata_ns
+    from app.api.batch_api import batch_ns
+    from app.api.metrics_api import metrics_ns
+    from app.api.admin_api import admin_ns
 
     # Add the namespaces to the API
     api.add_namespace(auth_ns)
@@ -111,6 +119,29 @@ def create_app():
     api.add_namespace(vital_signs_ns)
     api.add_namespace(operational_data_ns)
     api.add_namespace(metadata_ns)
+    api.add_namespace(batch_ns)
+    api.add_namespace(metrics_ns)
+    api.add_namespace(admin_ns)
+
+    # Time the pipeline stages of every request (Server-Timing header and /api/metrics)
+    init_instrumentation(app, api)
+
+    # Compress the responses with the negotiated Accept-Encoding (registered after
+    # the instrumentation, so that the compression is timed in Server-Timing)
+    init_response_compression(app)
+
+    # Sample the call stacks of a fraction of the requests (see /api/admin/sampling_profiler)
+    init_sampling_profiler(app)
+
+    # Count the statements, rows and bytes of every request against its endpoint's budget
+    init_query_budgets(app)
+
+    # Return the connections of the request's sessions to the shared pool
+    app.teardown_appcontext(close_request_sessions)
+
+    # Heavy dependencies are imported on first use, unless requested at startup
+    if EAGER_IMPORTS:
+        preload_lazy_imports()
 
     return app
 
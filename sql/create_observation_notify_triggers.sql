@@ -0,0 +1,93 @@
+-- Triggers notifying newly inserted vital signs for live subscriptions
+--
+-- Each insert into a vital signs table sends a NOTIFY on the
+-- 'observation_inserted' channel with the table name, the patient ID and the
+-- row itself (as row_to_json). The service listens on a single dedicated
+-- connection and pushes the rows to the patient's subscribers
+-- (GET /api/vital_signs/<id>/subscribe).
+--
+-- NOTIFY payloads are limited to 8000 bytes; larger rows are sent without
+-- 'row' but with their primary key ('id'), and the service fetches them by
+-- primary key instead.
+-- Without these triggers the service falls back to polling.
+--
+-- The channel name must match NOTIFY_CHANNEL in
+-- app/services/subscription_service.py.
+
+CREATE OR REPLACE FUNCTION notify_observation_inserted() RETURNS trigger AS $$
+DECLARE
+    row_data text := row_to_json(NEW)::text;
+    payload json;
+BEGIN
+    -- TG_ARGV[0] is the patient ID column of the table, TG_ARGV[1] its primary key column
+    IF octet_length(row_data) < 7000 THEN
+        payload := json_build_object(
+            'table', TG_TABLE_NAME,
+            'id_patient', to_json(NEW) ->> TG_ARGV[0],
+            'row', row_data::json
+        );
+    ELSE
+        payload := json_build_object(
+            'table', TG_TABLE_NAME,
+            'id_patient', to_json(NEW) ->> TG_ARGV[0],
+            'id', to_json(NEW) -> TG_ARGV[1]
+        );
+    END IF;
+    PERFORM pg_notify('observation_inserted', payload::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- saturacion_oxigeno
+DROP TRIGGER IF EXISTS trg_saturacion_oxigeno_notify_observation ON saturacion_oxigeno;
+CREATE TRIGGER trg_saturacion_oxigeno_notify_observation
+    AFTER INSERT ON saturacion_oxigeno
+    FOR EACH ROW EXECUTE FUNCTION notify_observation_inserted('id_paciente_so', 'id_secuencia_so');
+
+-- temperatura
+DROP TRIGGER IF EXISTS trg_temperatura_notify_observation ON temperatura;
+CREATE TRIGGER trg_temperatura_notify_observation
+    AFTER INSERT ON temperatura
+    FOR EACH ROW EXECUTE FUNCTION notify_observation_inserted('id_paciente_temp', 'id_secuencia_temp');
+
+-- presion_arterial
+DROP TRIGGER IF EXISTS trg_presion_arterial_notify_observation ON presion_arterial;
+CREATE TRIGGER trg_presion_arterial_notify_observation
+    AFTER INSERT ON presion_arterial
+    FOR EACH ROW EXECUTE FUNCTION notify_observation_inserted('id_paciente_pa', 'id_secuencia_pa');
+
+-- frecuencia_cardiaca
+DROP TRIGGER IF EXISTS trg_frecuencia_cardiaca_notify_observation ON frecuencia_cardiaca;
+CREATE TRIGGER trg_frecuencia_cardiaca_notify_observation
+    AFTER INSERT ON frecuencia_cardiaca
+    FOR EACH ROW EXECUTE FUNCTION notify_observation_inserted('id_paciente_fc', 'id_secuencia_fc');
+
+-- frecuencia_respiratoria
+DROP TRIGGER IF EXISTS trg_frecuencia_respiratoria_notify_observation ON frecuencia_respiratoria;
+CREATE TRIGGER trg_frecuencia_respiratoria_notify_observation
+    AFTER INSERT ON frecuencia_respiratoria
+    FOR EACH ROW EXECUTE FUNCTION notify_observation_inserted('id_paciente_fr', 'id_secuencia_fr');
+
+-- constantes
+DROP TRIGGER IF EXISTS trg_constantes_notify_observation ON constantes;
+CREATE TRIGGER trg_constantes_notify_observation
+    AFTER INSERT ON constantes
+    FOR EACH ROW EXECUTE FUNCTION notify_observation_inserted('id_paciente', 'id_constantes');
+
+-- glucosa
+DROP TRIGGER IF EXISTS trg_glucosa_notify_observation ON glucosa;
+CREATE TRIGGER trg_glucosa_notify_observation
+    AFTER INSERT ON glucosa
+    FOR EACH ROW EXECUTE FUNCTION notify_observation_inserted('id_paciente', 'id_secuencia');
+
+-- peso
+DROP TRIGGER IF EXISTS trg_peso_notify_observation ON peso;
+CREATE TRIGGER trg_peso_notify_observation
+    AFTER INSERT ON peso
+    FOR EACH ROW EXECUTE FUNCTION notify_observation_inserted('id_paciente', 'id_secuencia');
+
+-- talla
+DROP TRIGGER IF EXISTS trg_talla_notify_observation ON talla;
+CREATE TRIGGER trg_talla_notify_observation
+    AFTER INSERT ON talla
+    FOR EACH ROW EXECUTE FUNCTION notify_observation_inserted('id_paciente', 'id_secuencia');
@@ -0,0 +1,95 @@
+-- Indexes for the consolidated patient queries and incremental (_since) synchronisation
+--
+-- The (patient, date) indexes serve the date range filter of every query.
+-- The (patient, GREATEST(date, modification)) indexes serve the _since delta
+-- filter; the expression must match BaseModel.get_change_time_expression.
+-- Staff tables, which are never queried per patient, are not indexed.
+
+-- saturacion_oxigeno
+CREATE INDEX IF NOT EXISTS idx_saturacion_oxigeno_patient_date ON saturacion_oxigeno(id_paciente_so, fecha_registro_so);
+CREATE INDEX IF NOT EXISTS idx_saturacion_oxigeno_patient_changed ON saturacion_oxigeno(id_paciente_so, GREATEST(fecha_registro_so, fecha_modifica_so));
+
+-- temperatura
+CREATE INDEX IF NOT EXISTS idx_temperatura_patient_date ON temperatura(id_paciente_temp, fecha_registro_temp);
+CREATE INDEX IF NOT EXISTS idx_temperatura_patient_changed ON temperatura(id_paciente_temp, GREATEST(fecha_registro_temp, fecha_modifica_temp));
+
+-- presion_arterial
+CREATE INDEX IF NOT EXISTS idx_presion_arterial_patient_date ON presion_arterial(id_paciente_pa, fecha_registro_pa);
+CREATE INDEX IF NOT EXISTS idx_presion_arterial_patient_changed ON presion_arterial(id_paciente_pa, GREATEST(fecha_registro_pa, fecha_modifica_pa));
+
+-- frecuencia_cardiaca
+CREATE INDEX IF NOT EXISTS idx_frecuencia_cardiaca_patient_date ON frecuencia_cardiaca(id_paciente_fc, fecha_registro_fc);
+CREATE INDEX IF NOT EXISTS idx_frecuencia_cardiaca_patient_changed ON frecuencia_cardiaca(id_paciente_fc, GREATEST(fecha_registro_fc, fecha_modifica_fc));
+
+-- frecuencia_respiratoria
+CREATE INDEX IF NOT EXISTS idx_frecuencia_respiratoria_patient_date ON frecuencia_respiratoria(id_paciente_fr, fecha_registro_fr);
+CREATE INDEX IF NOT EXISTS idx_frecuencia_respiratoria_patient_changed ON frecuencia_respiratoria(id_paciente_fr, GREATEST(fecha_registro_fr, fecha_modifica_fr));
+
+-- glucosa
+CREATE INDEX IF NOT EXISTS idx_glucosa_patient_date ON glucosa(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_glucosa_patient_changed ON glucosa(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- peso
+CREATE INDEX IF NOT EXISTS idx_peso_patient_date ON peso(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_peso_patient_changed ON peso(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- talla
+CREATE INDEX IF NOT EXISTS idx_talla_patient_date ON talla(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_talla_patient_changed ON talla(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- medicacion
+CREATE INDEX IF NOT EXISTS idx_medicacion_patient_date ON medicacion(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_medicacion_patient_changed ON medicacion(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- deposiciones
+CREATE INDEX IF NOT EXISTS idx_deposiciones_patient_date ON deposiciones(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_deposiciones_patient_changed ON deposiciones(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- diuresis
+CREATE INDEX IF NOT EXISTS idx_diuresis_patient_date ON diuresis(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_diuresis_patient_changed ON diuresis(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- electrocardiograma
+CREATE INDEX IF NOT EXISTS idx_electrocardiograma_patient_date ON electrocardiograma(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_electrocardiograma_patient_changed ON electrocardiograma(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- fotos_hospwin
+CREATE INDEX IF NOT EXISTS idx_fotos_hospwin_patient_date ON fotos_hospwin(id_paciente, f_actual);
+
+-- monitores_activos
+CREATE INDEX IF NOT EXISTS idx_monitores_activos_patient_date ON monitores_activos(id_paciente, fecha_conexion);
+
+-- cierre_ulcera
+CREATE INDEX IF NOT EXISTS idx_cierre_ulcera_patient_date ON cierre_ulcera(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_cierre_ulcera_patient_changed ON cierre_ulcera(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- constantes
+CREATE INDEX IF NOT EXISTS idx_constantes_patient_date ON constantes(id_paciente, fecha_medicion);
+
+-- contencion
+CREATE INDEX IF NOT EXISTS idx_contencion_patient_date ON contencion(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_contencion_patient_changed ON contencion(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- cuidado_ulcera
+CREATE INDEX IF NOT EXISTS idx_cuidado_ulcera_patient_date ON cuidado_ulcera(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_cuidado_ulcera_patient_changed ON cuidado_ulcera(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- menstruacion
+CREATE INDEX IF NOT EXISTS idx_menstruacion_patient_date ON menstruacion(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_menstruacion_patient_changed ON menstruacion(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- monitor
+CREATE INDEX IF NOT EXISTS idx_monitor_patient_date ON monitor(id_monitor, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_monitor_patient_changed ON monitor(id_monitor, GREATEST(fecha_registro, fecha_modifica));
+
+-- tipo_sonda
+CREATE INDEX IF NOT EXISTS idx_tipo_sonda_patient_date ON tipo_sonda(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_tipo_sonda_patient_changed ON tipo_sonda(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- tratamiento_ulcera
+CREATE INDEX IF NOT EXISTS idx_tratamiento_ulcera_patient_date ON tratamiento_ulcera(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_tratamiento_ulcera_patient_changed ON tratamiento_ulcera(id_paciente, GREATEST(fecha_registro, fecha_modifica));
+
+-- ulceras
+CREATE INDEX IF NOT EXISTS idx_ulceras_patient_date ON ulceras(id_paciente, fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_ulceras_patient_changed ON ulceras(id_paciente, GREATEST(fecha_registro, fecha_modifica));
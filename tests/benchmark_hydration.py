@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark module for row hydration.
+
+This module compares, on the real models of `app.models.patient_models`,
+the cost of turning the rows fetched by the consolidated query into objects:
+1. The original approach: a declarative ORM instance per row, with every
+   JSON key copied through `hasattr`/`setattr`
+2. The read-only `__slots__` rows of `hydrate_model`
+
+For each table it reports the hydration time per row and the memory held
+per row, measured with `tracemalloc` over a list of hydrated rows.
+No database connection is required: rows are built from the model columns.
+"""
+
+# Import modules #
+#----------------#
+
+import argparse
+import gc
+import timeit
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Integer
+
+# Import project modules #
+#------------------------#
+
+from app.db import hydrate_model
+from app.models.patient_models import TABLE_MODEL_MAP
+
+# Define helper functions #
+#-------------------------#
+
+def build_row_data(model_class, index):
+    """Build a row as returned by `row_to_json`, with a value for every column."""
+    data = {}
+    for column in model_class.__table__.columns:
+        if isinstance(column.type, Integer):
+            data[column.name] = index
+        elif isinstance(column.type, Float):
+            data[column.name] = 36.5 + index % 10
+        elif isinstance(column.type, DateTime):
+            data[column.name] = datetime(2025, 2, 13, 10, index % 60).isoformat()
+        else:
+            data[column.name] = f"value {index}"
+    return data
+
+def hydrate_orm(model_class, data):
+    """Build a declarative ORM instance, as the read path originally did."""
+    model_instance = model_class()
+    for key, value in data.items():
+        if hasattr(model_instance, key):
+            setattr(model_instance, key, value)
+    return model_instance
+
+def measure_memory(hydrate, model_class, rows):
+    """Return the bytes held per row by a list of hydrated rows."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        items = [hydrate(model_class, data) for data in rows]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del items
+    return (after - before) / len(rows)
+
+def benchmark(row_count, repeat, table_names):
+    """Run the benchmark for every table."""
+    print(f"Hydrating {row_count} rows per table, best of {repeat} runs...")
+    print(f"\n{'table':<28}{'ORM us/row':>12}{'rows us/row':>13}{'speed-up':>10}{'ORM B/row':>11}{'rows B/row':>12}")
+
+    for table_name in table_names:
+        model_class = TABLE_MODEL_MAP[table_name]
+        rows = [build_row_data(model_class, index) for index in range(row_count)]
+
+        # Generate the row class and configure the mappers outside the measurements
+        hydrate_model(model_class, rows[0])
+        hydrate_orm(model_class, rows[0])
+
+        orm_time = min(timeit.repeat(
+            lambda: [hydrate_orm(model_class, data) for data in rows], number=1, repeat=repeat
+        ))
+        row_time = min(timeit.repeat(
+            lambda: [hydrate_model(model_class, data) for data in rows], number=1, repeat=repeat
+        ))
+        orm_us = orm_time / row_count * 1e6
+        row_us = row_time / row_count * 1e6
+        orm_bytes = measure_memory(hydrate_orm, model_class, rows)
+        row_bytes = measure_memory(hydrate_model, model_class, rows)
+
+        print(
+            f"{table_name:<28}{orm_us:>12.2f}{row_us:>13.2f}{orm_us / row_us:>9.1f}x"
+            f"{orm_bytes:>11.0f}{row_bytes:>12.0f}"
+        )
+
+# Main execution #
+#----------------#
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Benchmark the hydration of fetched rows')
+    parser.add_argument('--rows', type=int, default=5000, help='Number of rows hydrated per table')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs per table')
+    parser.add_argument('--tables', nargs='*', help='Tables to benchmark (default: every table)')
+    args = parser.parse_args()
+
+    benchmark(args.rows, args.repeat, args.tables or sorted(TABLE_MODEL_MAP))
+
+if __name__ == '__main__':
+    main()
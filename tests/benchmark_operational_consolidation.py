@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark module for the operational data path.
+
+This module compares, for the 18 operational tables:
+1. The original per-table retrieval: one `filter_data` call (and therefore
+   one database round trip) for each table
+2. The consolidated retrieval: a single UNION ALL query built from the
+   explicit per-table query plans
+
+Round trips are counted with a SQLAlchemy `before_cursor_execute` listener,
+and latency is measured end to end, including the HL7 and FHIR conversion.
+Requires a database populated with the hospital schema.
+"""
+
+# Import modules #
+#----------------#
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import event
+
+# Import project modules #
+#------------------------#
+
+from app.config import DATABASE_CREDENTIALS
+from app.constants.operational_tables import OPERATIONAL_TABLES
+from app.constants.table_mappings import TABLE_FIELD_MAPPING
+from app.db import filter_data, init_db
+from app.exceptions import ValidationError
+from app.models.patient_models import TABLE_MODEL_MAP
+from app.services.patient_service import PatientService
+from app.validators.request_validator import RequestValidator
+
+# Define helper functions #
+#-------------------------#
+
+class StatementCounter:
+    """Count the statements sent to the database by an engine."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+def run_original_implementation(service, query):
+    """Run the original implementation, issuing one query per operational table."""
+    all_resources = []
+    for table_name in OPERATIONAL_TABLES:
+        request_data = {'table_name': table_name, 'id_patient': query.patient_id}
+        if TABLE_FIELD_MAPPING[table_name]['date_field'] is not None:
+            request_data['date_range'] = query.date_range.to_dict()
+        try:
+            items = filter_data(service.db_session, request_data, model_class=TABLE_MODEL_MAP[table_name])
+        except ValueError:
+            # Tables without a date field were skipped by the original code
+            continue
+        for item in items:
+            resource = service._convert_hl7_to_fhir(item.to_hl7_v2(), table_name)
+            if resource is not None:
+                all_resources.append(resource)
+    return service.create_fhir_bundle(all_resources)
+
+def run_consolidated_implementation(service, query):
+    """Run the consolidated implementation."""
+    return service.get_patient_data_across_tables(
+        patient_id=query.patient_id,
+        table_names=OPERATIONAL_TABLES,
+        query=query
+    )
+
+def measure(function, counter, iterations):
+    """Run a function several times, returning its timings and statements per call."""
+    timings = []
+    counter.count = 0
+    result = None
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start_time)
+    return timings, counter.count / iterations, result
+
+def benchmark(patient_id, min_date, max_date, iterations):
+    """Run the benchmark comparing both implementations."""
+    query, validation_error = RequestValidator.validate(patient_id, min_date, max_date)
+    if validation_error:
+        raise ValidationError(f"{validation_error['field']}: {validation_error['error']}")
+
+    engine, Session = init_db(DATABASE_CREDENTIALS)
+    counter = StatementCounter(engine)
+    session = Session()
+    service = PatientService(session)
+
+    try:
+        print(f"Running benchmark with {iterations} iterations for patient {patient_id}...")
+        implementations = {
+            'Original (per table)': lambda: run_original_implementation(service, query),
+            'Consolidated (UNION ALL)': lambda: run_consolidated_implementation(service, query),
+        }
+
+        summary = {}
+        for name, function in implementations.items():
+            # Warm up connection pool and caches
+            function()
+            timings, statements, bundle = measure(function, counter, iterations)
+            summary[name] = statistics.mean(timings)
+            print(f"\n{name}:")
+            print(f"  Round trips per request: {statements:.1f}")
+            print(f"  Mean latency: {statistics.mean(timings) * 1000:.2f} ms")
+            print(f"  Median latency: {statistics.median(timings) * 1000:.2f} ms")
+            print(f"  Resources returned: {bundle['total']}")
+
+        original, consolidated = summary.values()
+        print(f"\nImprovement: {(1 - consolidated / original) * 100:.2f}%")
+    finally:
+        session.close()
+        engine.dispose()
+
+# Main execution #
+#----------------#
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Benchmark per-table vs consolidated operational data retrieval')
+    parser.add_argument('--patient-id', default='0000021561', help='Patient ID to query')
+    parser.add_argument('--min-date', default='2025-02-13', help='Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM)')
+    parser.add_argument('--max-date', default='2025-02-20', help='End date (YYYY-MM-DD or YYYY-MM-DD HH:MM)')
+    parser.add_argument('--iterations', type=int, default=20, help='Number of benchmark iterations')
+    args = parser.parse_args()
+
+    benchmark(args.patient_id, args.min_date, args.max_date, args.iterations)
+
+if __name__ == '__main__':
+    main()
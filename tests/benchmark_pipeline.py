@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark module for the whole request pipeline.
+
+This module measures, on the real models of `app.models.patient_models`:
+1. Each stage of the pipeline, per table:
+   - query: SQL execution and fetching (`filter_data_consolidated`)
+   - hydration: building the model instances from the fetched rows
+   - hl7_build: `to_hl7_v2`
+   - hl7_parse: extracting the observation fields of the HL7 message
+   - fhir_build: building the FHIR resource
+   - serialization: JSON encoding of the table's Bundle
+2. The full `/vital_signs` and `/operational_data` endpoints, through the
+   Flask test client with tokens minted for the required roles
+
+For every stage and endpoint it reports rows per second and the p50/p99
+latency of a request. Each run is appended to a JSON history file and
+compared with the median of the previous runs: the run fails if a latency
+grows or a throughput drops beyond the regression thresholds.
+Requires a database populated with the hospital schema.
+"""
+
+# Import modules #
+#----------------#
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Import project modules #
+#------------------------#
+
+from app.config import DATABASE_CREDENTIALS
+from app.constants.operational_tables import OPERATIONAL_QUERY_PLANS, QUERY_PLAN_EXCLUDED
+from app.constants.vital_signs_tables import VITAL_SIGNS_TABLES
+from app.db import filter_data_consolidated, get_session_factory
+from app.exceptions import ValidationError
+from app.models.patient_models import TABLE_MODEL_MAP
+from app.services.patient_service import PatientService
+from app.utils.instrumentation import (
+    _CURRENT_TIMINGS,
+    STAGE_FETCH,
+    STAGE_HYDRATION,
+    STAGE_SQL,
+    RequestTimings
+)
+from app.utils.jwt_handler import generate_token
+from app.validators.request_validator import RequestValidator
+
+# Define helper functions #
+#-------------------------#
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+def summarize(timings, rows):
+    """
+    Summarize the timings of a stage.
+
+    Parameters
+    ----------
+    timings : List[float]
+        Seconds spent in the stage, one value per iteration
+    rows : int
+        Rows processed per iteration
+
+    Returns
+    -------
+    Dict
+        Rows per iteration, rows per second, p50 and p99 latency in milliseconds
+    """
+    total = sum(timings)
+    return {
+        'rows': rows,
+        'rows_per_sec': round(rows * len(timings) / total, 1) if total else None,
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 4),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 4)
+    }
+
+def benchmark_table(session_factory, service, query, table_name, iterations):
+    """
+    Measure each pipeline stage for one table.
+
+    The query and hydration stages are timed by the request instrumentation
+    of `app.db`; the other stages are timed here over all the rows.
+    """
+    request_data = query.to_request_data()
+    timings = {name: [] for name in STAGE_NAMES}
+    rows = 0
+
+    for _ in range(iterations):
+        request_timings = RequestTimings('benchmark')
+        token = _CURRENT_TIMINGS.set(request_timings)
+        try:
+            results = filter_data_consolidated(session_factory, request_data, [table_name], TABLE_MODEL_MAP)
+        finally:
+            _CURRENT_TIMINGS.reset(token)
+        durations = request_timings.durations
+        timings['query'].append(durations.get((STAGE_SQL, ''), 0.0) + durations.get((STAGE_FETCH, ''), 0.0))
+        timings['hydration'].append(durations.get((STAGE_HYDRATION, table_name), 0.0))
+
+        items = results.get(table_name, [])
+        rows = len(items)
+
+        start_time = time.perf_counter()
+        messages = [item.to_hl7_v2() for item in items]
+        timings['hl7_build'].append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        observations = [service._parse_hl7_observation(message) for message in messages]
+        timings['hl7_parse'].append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        resources = [
+            service._build_fhir_observation(observation, table_name)
+            for observation in observations
+            if observation is not None
+        ]
+        timings['fhir_build'].append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        json.dumps(service.create_fhir_bundle(resources))
+        timings['serialization'].append(time.perf_counter() - start_time)
+
+    return {name: summarize(stage_timings, rows) for name, stage_timings in timings.items()}
+
+def benchmark_endpoint(client, url, token, iterations):
+    """Measure a full endpoint through the Flask test client."""
+    headers = {'Authorization': f'Bearer {token}'}
+    timings = []
+    rows = 0
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append(time.perf_counter() - start_time)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}: {response.get_data(as_text=True)}")
+        rows = response.get_json().get('total', 0)
+    return summarize(timings, rows)
+
+def find_regressions(results, history, thresholds, window):
+    """
+    Compare a run with the median of the previous runs.
+
+    Parameters
+    ----------
+    results : Dict
+        Results of the run, by scope (table or endpoint) and stage
+    history : List[Dict]
+        Previous runs, oldest first
+    thresholds : Dict
+        Maximum relative increase of `p50_ms` and `p99_ms` and decrease of
+        `rows_per_sec`
+    window : int
+        Number of previous runs the baseline is computed on
+
+    Returns
+    -------
+    List[str]
+        Description of every regression found
+    """
+    regressions = []
+    previous_runs = history[-window:]
+    for scope, stages in results.items():
+        for stage_name, current in stages.items():
+            for metric, threshold in thresholds.items():
+                baseline_values = [
+                    run['results'][scope][stage_name][metric]
+                    for run in previous_runs
+                    if run['results'].get(scope, {}).get(stage_name, {}).get(metric)
+                ]
+                if not baseline_values or not current[metric]:
+                    continue
+                baseline = statistics.median(baseline_values)
+                change = current[metric] / baseline - 1
+                regressed = change < -threshold if metric == 'rows_per_sec' else change > threshold
+                if regressed:
+                    regressions.append(
+                        f"{scope}/{stage_name} {metric}: {current[metric]} vs baseline {baseline} "
+                        f"({change * 100:+.1f}%, threshold {threshold * 100:.0f}%)"
+                    )
+    return regressions
+
+def load_history(path):
+    """Load the previous runs from the history file."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as history_file:
+        return json.load(history_file)
+
+def save_history(path, history):
+    """Write the runs to the history file."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as history_file:
+        json.dump(history, history_file, indent=2)
+
+def current_commit():
+    """Return the git commit being benchmarked, if known."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results):
+    """Print the results as a table."""
+    print(f"\n{'Scope':<28}{'Stage':<15}{'Rows':>8}{'Rows/s':>14}{'p50 ms':>12}{'p99 ms':>12}")
+    for scope, stages in results.items():
+        for stage_name, summary in stages.items():
+            rows_per_sec = summary['rows_per_sec'] if summary['rows_per_sec'] is not None else '-'
+            print(
+                f"{scope:<28}{stage_name:<15}{summary['rows']:>8}{rows_per_sec:>14}"
+                f"{summary['p50_ms']:>12.3f}{summary['p99_ms']:>12.3f}"
+            )
+
+def benchmark(args):
+    """Run the benchmark and return the results by table and endpoint."""
+    query, validation_error = RequestValidator.validate(args.patient_id, args.min_date, args.max_date)
+    if validation_error:
+        raise ValidationError(f"{validation_error['field']}: {validation_error['error']}")
+
+    session_factory = get_session_factory(DATABASE_CREDENTIALS)
+    service = PatientService(None)
+    tables = args.tables or BENCHMARK_TABLES
+    results = {}
+
+    print(f"Running benchmark with {args.iterations} iterations for patient {args.patient_id}...")
+    for table_name in tables:
+        # Warm up connection pool and caches
+        benchmark_table(session_factory, service, query, table_name, 1)
+        results[f'table:{table_name}'] = benchmark_table(session_factory, service, query, table_name, args.iterations)
+
+    from main import create_app
+    client = create_app().test_client()
+    for endpoint, (path, role) in ENDPOINTS.items():
+        url = f"{path}/{args.patient_id}/{args.min_date}/{args.max_date}"
+        token = generate_token('benchmark', role)
+        benchmark_endpoint(client, url, token, 1)
+        results[f'endpoint:{endpoint}'] = {
+            'total': benchmark_endpoint(client, url, token, args.iterations)
+        }
+
+    return results
+
+# Main execution #
+#----------------#
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Benchmark every stage of the request pipeline')
+    parser.add_argument('--patient-id', default='0000021561', help='Patient ID to query')
+    parser.add_argument('--min-date', default='2025-02-13', help='Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM)')
+    parser.add_argument('--max-date', default='2025-02-20', help='End date (YYYY-MM-DD or YYYY-MM-DD HH:MM)')
+    parser.add_argument('--iterations', type=int, default=20, help='Number of benchmark iterations')
+    parser.add_argument('--tables', nargs='*', help='Tables to benchmark (default: every patient-scoped table)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY_PATH, help='JSON file the runs are appended to')
+    parser.add_argument('--window', type=int, default=5, help='Previous runs the baseline is computed on')
+    parser.add_argument('--p50-threshold', type=float, default=0.20, help='Maximum relative p50 increase')
+    parser.add_argument('--p99-threshold', type=float, default=0.50, help='Maximum relative p99 increase')
+    parser.add_argument('--throughput-threshold', type=float, default=0.20, help='Maximum relative rows/s decrease')
+    parser.add_argument('--no-save', action='store_true', help='Do not append the run to the history')
+    args = parser.parse_args()
+
+    results = benchmark(args)
+    print_results(results)
+
+    history = load_history(args.history)
+    thresholds = {
+        'p50_ms': args.p50_threshold,
+        'p99_ms': args.p99_threshold,
+        'rows_per_sec': args.throughput_threshold
+    }
+    regressions = find_regressions(results, history, thresholds, args.window)
+
+    if not args.no_save:
+        history.append({
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': current_commit(),
+            'parameters': {
+                'patient_id': args.patient_id,
+                'min_date': args.min_date,
+                'max_date': args.max_date,
+                'iterations': args.iterations
+            },
+            'results': results
+        })
+        save_history(args.history, history)
+        print(f"\nRun saved to {args.history}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against the last {args.window} runs:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions found.")
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+# Pipeline stages measured per table, in order
+STAGE_NAMES = ['query', 'hydration', 'hl7_build', 'hl7_parse', 'fhir_build', 'serialization']
+
+# Vital signs tables and the patient-scoped operational tables
+BENCHMARK_TABLES = list(VITAL_SIGNS_TABLES) + [
+    table_name
+    for table_name, plan in OPERATIONAL_QUERY_PLANS.items()
+    if plan['strategy'] != QUERY_PLAN_EXCLUDED
+]
+
+# Endpoints measured end to end, with the role they require
+ENDPOINTS = {
+    'vital_signs': ('/api/vital_signs', 'medical'),
+    'operational_data': ('/api/operational_data', 'admin')
+}
+
+# Default history file
+DEFAULT_HISTORY_PATH = os.path.join(os.path.dirname(__file__), 'benchmark_results', 'pipeline_history.json')
+
+if __name__ == '__main__':
+    main()
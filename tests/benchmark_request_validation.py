@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark module for request validation.
+
+This module contains microbenchmarks comparing the per-request validation cost of:
+1. The original approach: per-table validation through `find_substring_index`
+   (frame inspection and regex dispatch on every call) and repeated
+   `parse_dt_string` date parsing, once for each of the operational tables
+2. The compiled single-pass `RequestValidator`
+
+No database connection is required.
+"""
+
+# Import modules #
+#----------------#
+
+import argparse
+import timeit
+
+# Import project modules #
+#------------------------#
+
+from app.constants.operational_tables import OPERATIONAL_TABLES
+from app.constants.table_mappings import TABLE_FIELD_MAPPING
+from app.constants.vital_signs_tables import VITAL_SIGNS_TABLES
+from app.utils.form_field_validations import ID_PATTERN
+from app.utils.string_handler import find_substring_index
+from app.utils.time_formatters import parse_dt_string
+from app.validators.request_validator import RequestValidator
+
+# Define helper functions #
+#-------------------------#
+
+def _parse_date_original(value, is_max_date):
+    """Parse a date bound with the original try/fallback strategy."""
+    try:
+        return parse_dt_string(value, '%Y-%m-%d %H:%M')
+    except ValueError:
+        parsed = parse_dt_string(value, '%Y-%m-%d')
+        return parsed.replace(hour=23, minute=59) if is_max_date else parsed
+
+def run_original_validation(patient_id, min_date, max_date, table_names):
+    """Run the original validation, repeated for every table of the request."""
+    for table_name in table_names:
+        if TABLE_FIELD_MAPPING[table_name]['id_field'] is None:
+            continue
+        if find_substring_index(patient_id, ID_PATTERN, advanced_search=True) == -1:
+            return False
+        # Dates were parsed again for each table while building the query
+        min_datetime = _parse_date_original(min_date, False)
+        max_datetime = _parse_date_original(max_date, True)
+        if min_datetime > max_datetime:
+            return False
+    return True
+
+def run_compiled_validation(patient_id, min_date, max_date):
+    """Run the compiled validator once for the whole request."""
+    query, validation_error = RequestValidator.validate(patient_id, min_date, max_date)
+    return validation_error is None
+
+def benchmark(iterations):
+    """Run the benchmark for the vital signs and operational table sets."""
+    cases = {
+        'datetime range': ('0000021561', '2025-02-13 10:00', '2025-02-13 10:50'),
+        'date-only range': ('0000021561', '2025-02-13', '2025-02-20'),
+    }
+    table_sets = {
+        'vital_signs': VITAL_SIGNS_TABLES,
+        'operational_data': OPERATIONAL_TABLES,
+    }
+
+    print(f"Running validation benchmark with {iterations} iterations per case...")
+    for set_name, table_names in table_sets.items():
+        for case_name, (patient_id, min_date, max_date) in cases.items():
+            original_time = timeit.timeit(
+                lambda: run_original_validation(patient_id, min_date, max_date, table_names),
+                number=iterations
+            )
+            compiled_time = timeit.timeit(
+                lambda: run_compiled_validation(patient_id, min_date, max_date),
+                number=iterations
+            )
+            original_us = original_time / iterations * 1e6
+            compiled_us = compiled_time / iterations * 1e6
+
+            print(f"\n{set_name} ({len(table_names)} tables) - {case_name}:")
+            print(f"  Original validation: {original_us:10.2f} us/request")
+            print(f"  Compiled validation: {compiled_us:10.2f} us/request")
+            print(f"  Speed-up: {original_us / compiled_us:.1f}x")
+
+# Main execution #
+#----------------#
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Benchmark per-request validation cost')
+    parser.add_argument('--iterations', type=int, default=2000, help='Number of validations per case')
+    args = parser.parse_args()
+
+    benchmark(args.iterations)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark module for the application startup.
+
+This module measures the cold start of a worker in fresh interpreters:
+1. The time to import `main` and to run `create_app`, over several runs
+2. The heavy dependencies loaded by the boot, which should all be deferred
+   to their first use (see `app.utils.lazy_import`)
+3. An `-X importtime` report of the slowest imports, by module and by
+   top-level package
+
+The run fails if the median startup exceeds the budget, or if a deferred
+dependency is imported at startup again (unless `--eager` is given, which
+sets `EAGER_IMPORTS` to measure the eager boot instead).
+Does not require a database.
+"""
+
+# Import modules #
+#----------------#
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Define helper functions #
+#-------------------------#
+
+def run_child(code, eager=False, importtime=False):
+    """
+    Run Python code in a fresh interpreter from the project root.
+
+    Returns
+    -------
+    tuple
+        Standard output, standard error and wall-clock seconds of the process
+    """
+    env = dict(os.environ, EAGER_IMPORTS='1' if eager else '0')
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"Startup failed:\n{completed.stderr}")
+    return completed.stdout, completed.stderr, elapsed
+
+def measure_startup(runs, eager=False):
+    """
+    Measure the startup of the application in fresh interpreters.
+
+    Parameters
+    ----------
+    runs : int
+        Number of interpreters started
+    eager : bool
+        Whether the heavy dependencies are imported at startup
+
+    Returns
+    -------
+    dict
+        Median and worst import, create_app and process times in
+        milliseconds, and the deferred modules loaded by the boot
+    """
+    samples = []
+    for _ in range(runs):
+        stdout, _, process_seconds = run_child(STARTUP_CODE, eager)
+        sample = json.loads(stdout.strip().splitlines()[-1])
+        sample['process_s'] = process_seconds
+        samples.append(sample)
+
+    summary = {'runs': runs}
+    for key in ('import_s', 'create_app_s', 'total_s', 'process_s'):
+        values = [sample[key] * 1000 for sample in samples]
+        name = key[:-2]
+        summary[f'{name}_median_ms'] = round(statistics.median(values), 1)
+        summary[f'{name}_max_ms'] = round(max(values), 1)
+    summary['deferred_loaded'] = sorted({module for sample in samples for module in sample['deferred_loaded']})
+    return summary
+
+def parse_importtime(stderr):
+    """
+    Parse the `-X importtime` output of an interpreter.
+
+    Returns
+    -------
+    list
+        One dict per imported module with its self and cumulative
+        microseconds and its nesting depth
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append({
+            'module': name.strip(),
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'depth': (len(name) - len(name.lstrip())) // 2
+        })
+    return imports
+
+def importtime_report(imports, top):
+    """
+    Summarize the imports of a boot.
+
+    Parameters
+    ----------
+    imports : list
+        Parsed `-X importtime` output (see `parse_importtime`)
+    top : int
+        Number of modules and packages reported
+
+    Returns
+    -------
+    dict
+        Slowest modules by cumulative time, slowest top-level packages by
+        self time, and the project modules by cumulative time
+    """
+    packages = {}
+    for entry in imports:
+        package = entry['module'].split('.')[0]
+        packages[package] = packages.get(package, 0) + entry['self_us']
+
+    by_cumulative = sorted(imports, key=lambda entry: entry['cumulative_us'], reverse=True)
+    return {
+        'total_ms': round(sum(entry['self_us'] for entry in imports) / 1000, 1),
+        'modules': [
+            {'module': entry['module'], 'cumulative_ms': round(entry['cumulative_us'] / 1000, 1)}
+            for entry in by_cumulative[:top]
+        ],
+        'packages': [
+            {'package': package, 'self_ms': round(self_us / 1000, 1)}
+            for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+        'project_modules': [
+            {'module': entry['module'], 'cumulative_ms': round(entry['cumulative_us'] / 1000, 1)}
+            for entry in by_cumulative
+            if entry['module'].split('.')[0] in ('app', 'main')
+        ][:top]
+    }
+
+def print_report(summary, report):
+    """Print the startup times and the import report."""
+    print(f"\n{'Startup':<16}{'median ms':>12}{'max ms':>12}")
+    for name in ('import', 'create_app', 'total', 'process'):
+        print(f"{name:<16}{summary[f'{name}_median_ms']:>12.1f}{summary[f'{name}_max_ms']:>12.1f}")
+
+    print(f"\nSlowest imports (cumulative, {report['total_ms']:.1f} ms in all):")
+    for entry in report['modules']:
+        print(f"  {entry['module']:<52}{entry['cumulative_ms']:>10.1f} ms")
+    print("\nSlowest packages (self time):")
+    for entry in report['packages']:
+        print(f"  {entry['package']:<52}{entry['self_ms']:>10.1f} ms")
+    print("\nProject modules (cumulative):")
+    for entry in report['project_modules']:
+        print(f"  {entry['module']:<52}{entry['cumulative_ms']:>10.1f} ms")
+
+# Main execution #
+#----------------#
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Benchmark the cold start of the application')
+    parser.add_argument('--runs', type=int, default=5, help='Number of fresh interpreters started')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS, help='Maximum median startup in milliseconds')
+    parser.add_argument('--top', type=int, default=15, help='Number of modules and packages in the import report')
+    parser.add_argument('--eager', action='store_true', help='Measure the boot with EAGER_IMPORTS set')
+    parser.add_argument('--output', help='JSON file the results are written to')
+    args = parser.parse_args()
+
+    print(f"Starting the application in {args.runs} fresh interpreters{' (eager imports)' if args.eager else ''}...")
+    summary = measure_startup(args.runs, args.eager)
+    _, stderr, _ = run_child(STARTUP_CODE, args.eager, importtime=True)
+    report = importtime_report(parse_importtime(stderr), args.top)
+    print_report(summary, report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump({'startup': summary, 'importtime': report}, output_file, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    failures = []
+    if summary['total_median_ms'] > args.budget:
+        failures.append(f"median startup {summary['total_median_ms']:.1f} ms exceeds the budget of {args.budget:.1f} ms")
+    if summary['deferred_loaded'] and not args.eager:
+        failures.append(f"deferred modules imported at startup: {', '.join(summary['deferred_loaded'])}")
+    if failures:
+        print("\nStartup budget not met:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"\nStartup within the budget of {args.budget:.1f} ms.")
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy dependencies that must only be imported on first use
+DEFERRED_MODULES = ['fhir.resources', 'hl7apy.v2_5', 'hl7apy.core', 'argon2', 'numpy', 'pyarrow', 'brotli', 'zstandard']
+
+# Code timing the boot of a worker, run in each fresh interpreter
+STARTUP_CODE = f"""
+import json, sys, time
+started = time.perf_counter()
+from main import create_app
+imported = time.perf_counter()
+create_app()
+created = time.perf_counter()
+print(json.dumps({{
+    'import_s': imported - started,
+    'create_app_s': created - imported,
+    'total_s': created - started,
+    'deferred_loaded': [module for module in {DEFERRED_MODULES!r} if module in sys.modules]
+}}))
+"""
+
+# Default budget of the median startup (import of main and create_app), in milliseconds
+DEFAULT_BUDGET_MS = 1500.0
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Load testing module.
+
+This module replays a realistic mix of traffic against the service, to
+measure its capacity before a release:
+1. Tokens are minted with `generate_token` for the medical and admin roles,
+   and logins use the staff credentials given on the command line.
+2. Requests follow a configurable mix (vital signs GET and POST queries,
+   operational data GET and POST queries, logins). Patients are drawn from a
+   Zipf distribution (a few patients get most of the traffic) and date
+   ranges are mostly recent and short.
+3. Requests arrive as a Poisson process at the target rate (open loop), and
+   latency is measured from the scheduled arrival, so a slow server is not
+   hidden by a slower request rate. Without a target rate, every worker
+   sends its requests back to back (closed loop).
+4. The run reports throughput, latency percentiles, error and rejection
+   rates per request type, and the saturation of the database connection
+   pool (`db_pool_checked_out` / `db_pool_capacity`).
+
+The service runs in-process (Flask test client) or is reached over HTTP
+with `--url`. With `--find-max-rps` the target rate is raised until the p99
+latency or the error rate breaks the SLO, then refined by bisection.
+Requires a database populated with the hospital schema (see
+`tests/synthetic_data_generator.py`).
+"""
+
+# Import modules #
+#----------------#
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from urllib.parse import quote
+
+# Import project modules #
+#------------------------#
+
+from app.utils import metrics
+from app.utils.jwt_handler import generate_token
+from tests.benchmark_pipeline import percentile
+
+# Define classes #
+#----------------#
+
+class RequestSpec(NamedTuple):
+    """
+    Request to send.
+
+    Attributes
+    ----------
+    name : str
+        Request type, as named in the traffic mix
+    method : str
+        HTTP method
+    path : str
+        Path under the API root
+    role : Optional[str]
+        Role whose token is sent, if any
+    body : Optional[dict]
+        JSON body of POST requests
+    """
+    name: str
+    method: str
+    path: str
+    role: Optional[str] = None
+    body: Optional[dict] = None
+
+
+class RequestResult(NamedTuple):
+    """Outcome of one request."""
+    name: str
+    status: int
+    latency: float
+
+
+class TrafficMix:
+    """
+    Generator of requests following the traffic mix.
+
+    Parameters
+    ----------
+    weights : Dict[str, float]
+        Relative frequency of each request type (see `DEFAULT_MIX`)
+    patient_ids : List[str]
+        Patients to query, the first ones being the most frequent
+    now : datetime
+        End of the data, which the date ranges are relative to
+    zipf_exponent : float
+        Skew of the patient distribution
+    login : Optional[Dict]
+        Staff credentials for the login requests
+    """
+
+    def __init__(self, weights, patient_ids, now, zipf_exponent=1.1, login=None):
+        if login is None and weights.get('login'):
+            print("No --login credentials: login requests are left out of the mix")
+            weights = {name: weight for name, weight in weights.items() if name != 'login'}
+        self.names = list(weights)
+        self.cum_weights = _cumulative(weights.values())
+        self.patient_ids = patient_ids
+        self.patient_cum_weights = _cumulative(1 / rank ** zipf_exponent for rank in range(1, len(patient_ids) + 1))
+        self.now = now
+        self.login = login
+
+    def next_request(self, rng):
+        """Draw the next request."""
+        name = rng.choices(self.names, cum_weights=self.cum_weights)[0]
+        if name == 'login':
+            return RequestSpec(name, 'POST', '/auth/login', body=self.login)
+
+        patient_id = rng.choices(self.patient_ids, cum_weights=self.patient_cum_weights)[0]
+        min_date, max_date = self._date_range(rng)
+        resource, role = REQUEST_TYPES[name]
+        if name.endswith('_query'):
+            body = {'id_patient': patient_id, 'date_range': {'min_date': min_date, 'max_date': max_date}}
+            return RequestSpec(name, 'POST', f'/{resource}/query', role, body)
+        return RequestSpec(name, 'GET', f'/{resource}/{patient_id}/{quote(min_date)}/{quote(max_date)}', role)
+
+    def _date_range(self, rng):
+        """Draw a date range: mostly the last hours, ending shortly before the end of the data."""
+        hours = rng.choices(RANGE_HOURS, weights=RANGE_WEIGHTS)[0]
+        end = self.now - timedelta(hours=min(rng.expovariate(1 / MEAN_RANGE_END_OFFSET_HOURS), MAX_RANGE_END_OFFSET_HOURS))
+        start = end - timedelta(hours=hours)
+        return start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT)
+
+
+class InProcessClient:
+    """Client calling the application in-process, with one test client per thread."""
+
+    def __init__(self):
+        from main import create_app
+        self.app = create_app()
+        self._local = threading.local()
+
+    def send(self, method, path, headers, body):
+        """Send a request and return its status code."""
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(API_PREFIX + path, method=method, headers=headers, json=body)
+        response.close()
+        return response.status_code
+
+    def pool_usage(self):
+        """Return the connections checked out of the pool and its capacity."""
+        snapshot = metrics.snapshot()
+        return (
+            sum(snapshot.get('db_pool_checked_out', {}).get('samples', {}).values()),
+            sum(snapshot.get('db_pool_capacity', {}).get('samples', {}).values())
+        )
+
+
+class HttpClient:
+    """Client calling a running service over HTTP."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, method, path, headers, body):
+        """Send a request and return its status code."""
+        data = json.dumps(body).encode() if body is not None else None
+        headers = dict(headers, **({'Content-Type': 'application/json'} if data else {}))
+        request = urllib.request.Request(self.base_url + API_PREFIX + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def pool_usage(self):
+        """Return the connections checked out of the pool and its capacity, from the metrics endpoint."""
+        with urllib.request.urlopen(self.base_url + API_PREFIX + '/metrics', timeout=HTTP_TIMEOUT) as response:
+            text = response.read().decode()
+        values = {'db_pool_checked_out': 0.0, 'db_pool_capacity': 0.0}
+        for line in text.splitlines():
+            name = line.split('{', 1)[0].split(' ', 1)[0]
+            if name in values:
+                values[name] += float(line.rsplit(' ', 1)[1])
+        return values['db_pool_checked_out'], values['db_pool_capacity']
+
+
+class PoolSampler:
+    """Background sampling of the connection pool saturation."""
+
+    def __init__(self, client, interval=None):
+        self.client = client
+        self.interval = interval or POOL_SAMPLE_INTERVAL
+        self.samples = []
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                checked_out, capacity = self.client.pool_usage()
+            except Exception:
+                continue
+            if capacity:
+                self.samples.append(checked_out / capacity)
+
+# Define functions #
+#------------------#
+
+def run_load(client, mix, tokens, rps, duration, concurrency, seed=0):
+    """
+    Replay the traffic mix for a while.
+
+    Parameters
+    ----------
+    client : InProcessClient or HttpClient
+        Client sending the requests
+    mix : TrafficMix
+        Traffic mix
+    tokens : Dict[str, str]
+        Token of each role
+    rps : Optional[float]
+        Target request rate (open loop), or None to send back to back (closed loop)
+    duration : float
+        Seconds to run
+    concurrency : int
+        Worker threads sending the requests
+    seed : int
+        Seed of the request sequence
+
+    Returns
+    -------
+    Dict
+        Load report (see `summarize_results`)
+    """
+    rng = random.Random(seed)
+    results = []
+    results_lock = threading.Lock()
+
+    def send(spec, scheduled_at):
+        headers = {'Authorization': f'Bearer {tokens[spec.role]}'} if spec.role else {}
+        try:
+            status = client.send(spec.method, spec.path, headers, spec.body)
+        except Exception:
+            status = 0
+        with results_lock:
+            results.append(RequestResult(spec.name, status, time.perf_counter() - scheduled_at))
+
+    start_time = time.perf_counter()
+    end_time = start_time + duration
+    with PoolSampler(client) as sampler, ThreadPoolExecutor(concurrency) as executor:
+        if rps:
+            next_arrival = start_time
+            while next_arrival < end_time:
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(send, mix.next_request(rng), next_arrival)
+                next_arrival += rng.expovariate(rps)
+        else:
+            def worker(worker_seed):
+                worker_rng = random.Random(worker_seed)
+                while time.perf_counter() < end_time:
+                    send(mix.next_request(worker_rng), time.perf_counter())
+            for worker_index in range(concurrency):
+                executor.submit(worker, seed * concurrency + worker_index + 1)
+    elapsed = time.perf_counter() - start_time
+
+    return summarize_results(results, elapsed, rps, sampler.samples)
+
+def summarize_results(results, elapsed, target_rps, pool_samples):
+    """
+    Summarize the results of a run.
+
+    Requests are successful with a 2xx status, rejected with 429 (admission
+    control) and failed otherwise (including connection errors, status 0).
+    """
+    def summarize(group):
+        latencies = [result.latency for result in group]
+        rejected = sum(1 for result in group if result.status == 429)
+        errors = sum(1 for result in group if not 200 <= result.status < 300 and result.status != 429)
+        return {
+            'requests': len(group),
+            'throughput_rps': round(len(group) / elapsed, 2),
+            'error_rate': round(errors / len(group), 4),
+            'rejection_rate': round(rejected / len(group), 4),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+            'p90_ms': round(percentile(latencies, 0.90) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+            'max_ms': round(max(latencies) * 1000, 1)
+        }
+
+    by_type = {}
+    for result in results:
+        by_type.setdefault(result.name, []).append(result)
+    return {
+        'target_rps': target_rps,
+        'duration_s': round(elapsed, 1),
+        'overall': summarize(results) if results else None,
+        'by_type': {name: summarize(group) for name, group in sorted(by_type.items())},
+        'pool_saturation': {
+            'mean': round(sum(pool_samples) / len(pool_samples), 3) if pool_samples else None,
+            'max': round(max(pool_samples), 3) if pool_samples else None
+        }
+    }
+
+def meets_slo(report, slo_p99_ms, max_error_rate):
+    """Whether a run kept its p99 latency and its failures (errors and rejections) within the SLO."""
+    overall = report['overall']
+    if overall is None:
+        return False
+    failure_rate = overall['error_rate'] + overall['rejection_rate']
+    return overall['p99_ms'] <= slo_p99_ms and failure_rate <= max_error_rate
+
+def find_max_rps(run, start_rps, slo_p99_ms, max_error_rate, steps):
+    """
+    Find the highest request rate meeting the SLO.
+
+    The rate is doubled until a run breaks the SLO, then the highest passing
+    rate is refined by bisection.
+
+    Parameters
+    ----------
+    run : Callable[[float], Dict]
+        Runs the load at a rate and returns its report
+    start_rps : float
+        First rate tried
+    slo_p99_ms : float
+        Maximum p99 latency, in milliseconds
+    max_error_rate : float
+        Maximum fraction of failed or rejected requests
+    steps : int
+        Bisection steps
+
+    Returns
+    -------
+    Tuple[Optional[float], List[Dict]]
+        Highest passing rate (None if even the first rate fails) and the reports of every run
+    """
+    reports = []
+
+    def attempt(rps):
+        report = run(rps)
+        passed = meets_slo(report, slo_p99_ms, max_error_rate)
+        reports.append(dict(report, meets_slo=passed))
+        overall = report['overall'] or {}
+        print(f"  {rps:>8.1f} rps: p99 {overall.get('p99_ms')} ms, "
+              f"errors {overall.get('error_rate')}, rejected {overall.get('rejection_rate')} "
+              f"-> {'pass' if passed else 'fail'}")
+        return passed
+
+    low, high = None, start_rps
+    while attempt(high):
+        low, high = high, high * 2
+    if low is None:
+        return None, reports
+    for _ in range(steps):
+        middle = (low + high) / 2
+        if attempt(middle):
+            low = middle
+        else:
+            high = middle
+    return low, reports
+
+def print_report(report):
+    """Print a load report as a table."""
+    print(f"\nDuration: {report['duration_s']} s, target rate: {report['target_rps'] or 'closed loop'}")
+    print(f"{'Request':<22}{'Count':>8}{'RPS':>9}{'Errors':>9}{'429':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    rows = dict(report['by_type'], total=report['overall']) if report['overall'] else report['by_type']
+    for name, summary in rows.items():
+        print(
+            f"{name:<22}{summary['requests']:>8}{summary['throughput_rps']:>9}"
+            f"{summary['error_rate']:>9.2%}{summary['rejection_rate']:>8.2%}"
+            f"{summary['p50_ms']:>10}{summary['p90_ms']:>10}{summary['p99_ms']:>10}{summary['max_ms']:>10}"
+        )
+    saturation = report['pool_saturation']
+    if saturation['max'] is not None:
+        print(f"DB pool saturation: mean {saturation['mean']:.0%}, max {saturation['max']:.0%}")
+
+def parse_mix(values):
+    """Parse `request_type=weight` overrides of the traffic mix."""
+    weights = dict(DEFAULT_MIX)
+    for value in values or []:
+        name, _, weight = value.partition('=')
+        if name not in weights:
+            raise argparse.ArgumentTypeError(f"Unknown request type: {name}")
+        weights[name] = float(weight)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+# Define helper functions #
+#-------------------------#
+
+def _cumulative(weights):
+    """Cumulative weights, for `random.choices`."""
+    total = 0.0
+    cumulative = []
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return cumulative
+
+# Main execution #
+#----------------#
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Replay a realistic traffic mix against the service')
+    parser.add_argument('--url', help='Base URL of a running service (default: run the application in-process)')
+    parser.add_argument('--rps', type=float, help='Target request rate (default: closed loop)')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per run')
+    parser.add_argument('--concurrency', type=int, default=32, help='Worker threads')
+    parser.add_argument('--mix', action='append', metavar='TYPE=WEIGHT', help='Weight of a request type (repeatable)')
+    parser.add_argument('--first-patient', type=int, default=1000000, help='Number of the first patient ID')
+    parser.add_argument('--patients', type=int, default=1000, help='Number of patients queried')
+    parser.add_argument('--patient-ids', nargs='*', help='Explicit patient IDs (instead of a numbered range)')
+    parser.add_argument('--now', default=None, help='End of the data, YYYY-MM-DD HH:MM (default: current time)')
+    parser.add_argument('--zipf', type=float, default=1.1, help='Skew of the patient distribution')
+    parser.add_argument('--login', metavar='NAME:SURNAME:PASSWORD', help='Staff credentials for the login requests')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the request sequence')
+    parser.add_argument('--find-max-rps', action='store_true', help='Search the highest rate meeting the SLO')
+    parser.add_argument('--slo-p99-ms', type=float, default=500, help='SLO on the p99 latency, in milliseconds')
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help='SLO on the failed and rejected requests')
+    parser.add_argument('--search-steps', type=int, default=4, help='Bisection steps of the search')
+    parser.add_argument('--output', help='JSON file the report is written to')
+    args = parser.parse_args()
+
+    login = None
+    if args.login:
+        name, surname, password = args.login.split(':', 2)
+        login = {'username': name, 'usersurname': surname, 'password': password}
+    patient_ids = args.patient_ids or [f"{args.first_patient + index:010d}" for index in range(args.patients)]
+    now = datetime.strptime(args.now, DATE_FORMAT) if args.now else datetime.now()
+    mix = TrafficMix(parse_mix(args.mix), patient_ids, now, args.zipf, login)
+    tokens = {role: generate_token(f'loadtest-{role}', role) for role in ROLES}
+    client = HttpClient(args.url) if args.url else InProcessClient()
+
+    def run(rps):
+        return run_load(client, mix, tokens, rps, args.duration, args.concurrency, args.seed)
+
+    if args.find_max_rps:
+        print(f"Searching the highest rate with p99 <= {args.slo_p99_ms} ms "
+              f"and failures <= {args.max_error_rate:.1%}...")
+        max_rps, reports = find_max_rps(run, args.rps or 10, args.slo_p99_ms, args.max_error_rate, args.search_steps)
+        print(f"\nMaximum sustainable rate: {max_rps:.1f} rps" if max_rps else "\nNo rate tried meets the SLO")
+        output = {'max_rps': max_rps, 'runs': reports}
+    else:
+        output = run(args.rps)
+        print_report(output)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(output, output_file, indent=2)
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+API_PREFIX = '/api'
+
+# Request types: resource and role
+REQUEST_TYPES = {
+    'vital_signs_get': ('vital_signs', 'medical'),
+    'vital_signs_query': ('vital_signs', 'medical'),
+    'operational_get': ('operational_data', 'admin'),
+    'operational_query': ('operational_data', 'admin')
+}
+
+ROLES = ['medical', 'admin']
+
+# Default traffic mix: relative frequency of each request type
+DEFAULT_MIX = {
+    'vital_signs_get': 55,
+    'vital_signs_query': 20,
+    'operational_get': 10,
+    'operational_query': 5,
+    'login': 10
+}
+
+# Length of the requested date ranges, in hours, and their frequency
+RANGE_HOURS = [1, 8, 24, 24 * 7, 24 * 30]
+RANGE_WEIGHTS = [30, 25, 25, 15, 5]
+
+# Hours between the end of the data and the end of a requested range
+MEAN_RANGE_END_OFFSET_HOURS = 12
+MAX_RANGE_END_OFFSET_HOURS = 24 * 30
+
+DATE_FORMAT = '%Y-%m-%d %H:%M'
+
+# Seconds between two samples of the pool saturation
+POOL_SAMPLE_INTERVAL = 0.5
+
+# Seconds before an HTTP request is abandoned
+HTTP_TIMEOUT = 60
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic clinical data generator.
+
+This module loads plausible vital signs and operational data for N patients
+over M days into Postgres, to benchmark on volumes far beyond the sample dump
+in `sql/am01`:
+1. Rows are built from the SQLAlchemy models of `app.models.patient_models`
+   and `TABLE_FIELD_MAPPING`: every column gets a value of its type, with
+   clinically plausible values for the measurements.
+2. Each table is sampled at its own rate (events per patient and day). The
+   five vital signs are measured in rounds, and every round has a
+   `constantes` row linking the sequence IDs of its five measurements.
+3. Sequence IDs and measurement times are derived from the patient and the
+   round, so the work is split by table and patient range into independent
+   tasks, each loaded with `COPY ... FROM STDIN` by its own worker process.
+
+The staff tables (`usuario_hospwin`, `grupousu_hospwin`, `tarjeta`) are not
+generated. User triggers (such as the observation notifications) are disabled
+during the load unless `--keep-triggers` is given.
+"""
+
+# Import modules #
+#----------------#
+
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, Float, Integer, text
+
+# Import project modules #
+#------------------------#
+
+from app.config import DATABASE_CREDENTIALS
+from app.constants.table_mappings import TABLE_FIELD_MAPPING
+from app.constants.table_names import (
+    CIERRE_ULCERA,
+    CONSTANTES,
+    CONTENCION,
+    CUIDADO_ULCERA,
+    DEPOSICIONES,
+    DIURESIS,
+    ELECTROCARDIOGRAMA,
+    FOTOS_HOSPWIN,
+    FRECUENCIA_CARDIACA,
+    FRECUENCIA_RESPIRATORIA,
+    GLUCOSA,
+    MEDICACION,
+    MENSTRUACION,
+    MONITOR,
+    MONITORES_ACTIVOS,
+    PACIENTES_HOSPWIN,
+    PESO,
+    PRESION_ARTERIAL,
+    SATURACION_OXIGENO,
+    TALLA,
+    TEMPERATURA,
+    TIPO_SONDA,
+    TRATAMIENTO_ULCERA,
+    ULCERAS
+)
+from app.db import _init_engine, init_db
+from app.models.patient_models import TABLE_MODEL_MAP
+
+# Define classes #
+#----------------#
+
+class RowStream:
+    """
+    File-like object reading the COPY text of generated rows.
+
+    Parameters
+    ----------
+    rows : Iterator[str]
+        Rows in COPY text format, each ending with a newline
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = ''
+        self.count = 0
+
+    def read(self, size=-1):
+        """Return up to `size` characters of COPY text, or everything if negative."""
+        chunks = [self.buffer]
+        length = len(self.buffer)
+        for row in self.rows:
+            chunks.append(row)
+            length += len(row)
+            self.count += 1
+            if 0 <= size <= length:
+                break
+        data = ''.join(chunks)
+        if size < 0:
+            self.buffer = ''
+            return data
+        self.buffer = data[size:]
+        return data[:size]
+
+
+class GenerationPlan:
+    """
+    Shape of the generated dataset.
+
+    Parameters
+    ----------
+    patients : int
+        Number of patients
+    days : int
+        Number of days of data per patient
+    start : datetime
+        Start of the period
+    rates : Dict[str, float]
+        Events per patient and day, by table
+    first_patient : int
+        Number of the first patient ID
+    id_offsets : Dict[str, int]
+        Sequence IDs already used, by table
+    seed : int
+        Seed of the random values
+    """
+
+    def __init__(self, patients, days, start, rates, first_patient=None, id_offsets=None, seed=0):
+        self.patients = patients
+        self.days = days
+        self.start = start
+        self.rates = rates
+        self.first_patient = DEFAULT_FIRST_PATIENT if first_patient is None else first_patient
+        self.id_offsets = id_offsets or {}
+        self.seed = seed
+
+    def events_per_patient(self, table_name):
+        """Number of rows of a table per patient."""
+        if table_name in PER_PATIENT_TABLES:
+            return 1
+        if table_name == CONSTANTES:
+            table_name = TEMPERATURA
+        return math.floor(self.days * self.rates[table_name])
+
+    def event_time(self, table_name, patient_index, event_index):
+        """
+        Time of an event of a patient.
+
+        Events are evenly spaced with a phase that depends on the patient
+        only, so the vital signs of a round (and their `constantes` row)
+        share their measurement time.
+        """
+        phase = (patient_index * GOLDEN_RATIO) % 1
+        if table_name in PER_PATIENT_TABLES:
+            return self.start + timedelta(seconds=round(phase * SECONDS_PER_DAY))
+        if table_name == CONSTANTES:
+            table_name = TEMPERATURA
+        interval = SECONDS_PER_DAY / self.rates[table_name]
+        return self.start + timedelta(seconds=round((event_index + phase) * interval))
+
+    def sequence_id(self, table_name, patient_index, event_index):
+        """Sequence ID of an event, unique within the table."""
+        per_patient = self.events_per_patient(table_name)
+        return self.id_offsets.get(table_name, 0) + patient_index * per_patient + event_index + 1
+
+    def patient_id(self, patient_index):
+        """Patient ID, zero-padded to 10 digits."""
+        return f"{self.first_patient + patient_index:010d}"
+
+    def monitor_id(self, patient_index):
+        """ID of the monitor connected to a patient."""
+        return f"MON{self.first_patient + patient_index:07d}"
+
+    def total_rows(self, table_name):
+        """Number of rows of a table."""
+        return self.patients * self.events_per_patient(table_name)
+
+# Define functions #
+#------------------#
+
+def generate_rows(plan, table_name, patient_start, patient_stop):
+    """
+    Generate the rows of a table for a range of patients.
+
+    Parameters
+    ----------
+    plan : GenerationPlan
+        Shape of the dataset
+    table_name : str
+        Table to generate
+    patient_start : int
+        Index of the first patient
+    patient_stop : int
+        Index after the last patient
+
+    Yields
+    ------
+    str
+        Rows in COPY text format
+    """
+    columns = list(TABLE_MODEL_MAP[table_name].__table__.columns)
+    builders = [_column_builder(table_name, column) for column in columns]
+    events = plan.events_per_patient(table_name)
+
+    for patient_index in range(patient_start, patient_stop):
+        rng = random.Random(zlib.crc32(f"{plan.seed}:{table_name}:{patient_index}".encode()))
+        for event_index in range(events):
+            measured_at = plan.event_time(table_name, patient_index, event_index)
+            registered_at = measured_at + timedelta(minutes=rng.randint(0, MAX_REGISTRATION_DELAY))
+            modified_at = (
+                registered_at + timedelta(minutes=rng.randint(1, MAX_MODIFICATION_DELAY))
+                if rng.random() < MODIFIED_FRACTION
+                else None
+            )
+            context = {
+                'plan': plan,
+                'rng': rng,
+                'patient_index': patient_index,
+                'event_index': event_index,
+                'measured_at': measured_at,
+                'registered_at': registered_at,
+                'modified_at': modified_at
+            }
+            yield '\t'.join(_copy_text(build(context)) for build in builders) + '\n'
+
+def copy_columns(table_name):
+    """Columns of a table, in the order the rows are generated."""
+    return [column.name for column in TABLE_MODEL_MAP[table_name].__table__.columns]
+
+def load_task(task):
+    """
+    Load the rows of a table for a range of patients with `COPY FROM STDIN`.
+
+    Runs in a worker process, on a connection of its own.
+
+    Returns
+    -------
+    Tuple[str, int]
+        Table name and number of rows loaded
+    """
+    plan, table_name, patient_start, patient_stop = task
+    engine = _init_engine(DATABASE_CREDENTIALS, 'postgresql')
+    connection = engine.raw_connection()
+    try:
+        stream = RowStream(generate_rows(plan, table_name, patient_start, patient_stop))
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table_name} ({', '.join(copy_columns(table_name))}) FROM STDIN",
+                stream,
+                size=COPY_BUFFER_SIZE
+            )
+        connection.commit()
+        return table_name, stream.count
+    finally:
+        connection.close()
+        engine.dispose()
+
+def build_tasks(plan, tables, chunk_patients):
+    """Split the load into tasks of one table and a range of patients, largest first."""
+    tasks = [
+        (plan, table_name, start, min(start + chunk_patients, plan.patients))
+        for table_name in tables
+        for start in range(0, plan.patients, chunk_patients)
+    ]
+    return sorted(tasks, key=lambda task: -plan.events_per_patient(task[1]))
+
+def prepare_tables(engine, tables, truncate, disable_triggers):
+    """
+    Create the tables if needed, and return the sequence IDs already used.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        Database engine
+    tables : List[str]
+        Tables to load
+    truncate : bool
+        Empty the tables first
+    disable_triggers : bool
+        Disable the user triggers of the tables during the load
+    """
+    id_offsets = {}
+    with engine.begin() as connection:
+        for table_name in tables:
+            if truncate:
+                connection.execute(text(f"TRUNCATE {table_name}"))
+            if disable_triggers:
+                connection.execute(text(f"ALTER TABLE {table_name} DISABLE TRIGGER USER"))
+            primary_key = _integer_primary_key(table_name)
+            if primary_key is not None:
+                id_offsets[table_name] = connection.execute(
+                    text(f"SELECT COALESCE(MAX({primary_key}), 0) FROM {table_name}")
+                ).scalar()
+    return id_offsets
+
+def finish_tables(engine, tables, disable_triggers):
+    """Re-enable the triggers and refresh the planner statistics of the loaded tables."""
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        for table_name in tables:
+            if disable_triggers:
+                connection.execute(text(f"ALTER TABLE {table_name} ENABLE TRIGGER USER"))
+            connection.execute(text(f"ANALYZE {table_name}"))
+
+def parse_rates(values):
+    """Parse `table=events_per_day` overrides of the sampling rates."""
+    rates = dict(DEFAULT_RATES)
+    for value in values or []:
+        table_name, _, rate = value.partition('=')
+        if table_name not in rates:
+            raise argparse.ArgumentTypeError(f"Unknown table: {table_name}")
+        rates[table_name] = float(rate)
+    return rates
+
+# Define helper functions #
+#-------------------------#
+
+def _column_builder(table_name, column):
+    """
+    Return the function computing the value of a column from the event context.
+
+    Columns with an explicit generator in `VALUE_GENERATORS` use it; the
+    patient, date and modification fields of `TABLE_FIELD_MAPPING`, the
+    integer primary key and the measurement and user columns are derived
+    from the event; other columns get a random value of their type, or NULL
+    if they are nullable.
+    """
+    mapping = TABLE_FIELD_MAPPING[table_name]
+    name = column.name
+    generators = VALUE_GENERATORS.get(table_name, {})
+
+    if name in generators:
+        generator = generators[name]
+        return lambda context: generator(context['rng'])
+    if name in CONSTANTES_LINKS and table_name == CONSTANTES:
+        linked_table = CONSTANTES_LINKS[name]
+        return lambda context: context['plan'].sequence_id(
+            linked_table, context['patient_index'], context['event_index']
+        )
+    if column.primary_key and isinstance(column.type, Integer):
+        return lambda context: context['plan'].sequence_id(
+            table_name, context['patient_index'], context['event_index']
+        )
+    if name in ('id_monitor', 'idmonitor'):
+        return lambda context: context['plan'].monitor_id(context['patient_index'])
+    if name == mapping['id_field'] or name == 'id_paciente':
+        return lambda context: context['plan'].patient_id(context['patient_index'])
+    if name == mapping['modified_field']:
+        return lambda context: context['modified_at']
+    if name.startswith('usuario_modifica'):
+        return lambda context: context['rng'].choice(STAFF_USERS) if context['modified_at'] else None
+    if name.startswith('usuario'):
+        return lambda context: context['rng'].choice(STAFF_USERS)
+    if isinstance(column.type, DateTime):
+        if name.startswith('fecha_registro'):
+            return lambda context: context['registered_at']
+        return lambda context: context['measured_at']
+    if not column.nullable:
+        return _type_builder(column)
+    return lambda context: None
+
+def _type_builder(column):
+    """Random value of the column's type."""
+    if isinstance(column.type, Integer):
+        return lambda context: context['rng'].randint(0, 100)
+    if isinstance(column.type, Float):
+        return lambda context: round(context['rng'].uniform(0, 100), 1)
+    length = getattr(column.type, 'length', None) or 20
+    return lambda context: ''.join(context['rng'].choices(ALPHABET, k=min(length, 8)))
+
+def _integer_primary_key(table_name):
+    """Name of the table's integer primary key, if it has one."""
+    for column in TABLE_MODEL_MAP[table_name].__table__.columns:
+        if column.primary_key and isinstance(column.type, Integer):
+            return column.name
+    return None
+
+def _copy_text(value):
+    """Format a value for the COPY text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    value = str(value)
+    if '\\' in value or '\t' in value or '\n' in value or '\r' in value:
+        value = value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    return value
+
+# Main execution #
+#----------------#
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Load synthetic clinical data with COPY FROM STDIN')
+    parser.add_argument('--patients', type=int, default=1000, help='Number of patients')
+    parser.add_argument('--days', type=int, default=30, help='Days of data per patient')
+    parser.add_argument('--start', default='2025-01-01', help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--vitals-per-day', type=float, default=DEFAULT_RATES[TEMPERATURA],
+                        help='Vital signs rounds per patient and day')
+    parser.add_argument('--rate', action='append', metavar='TABLE=EVENTS_PER_DAY',
+                        help='Sampling rate of another table (repeatable)')
+    parser.add_argument('--tables', nargs='*', help='Tables to load (default: every patient-scoped table)')
+    parser.add_argument('--first-patient', type=int, default=DEFAULT_FIRST_PATIENT, help='Number of the first patient ID')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Parallel COPY streams')
+    parser.add_argument('--chunk-patients', type=int, default=100, help='Patients per COPY stream')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random values')
+    parser.add_argument('--truncate', action='store_true', help='Empty the tables before loading')
+    parser.add_argument('--keep-triggers', action='store_true', help='Keep the user triggers enabled during the load')
+    parser.add_argument('--dry-run', action='store_true', help='Only print the number of rows per table')
+    args = parser.parse_args()
+
+    rates = parse_rates(args.rate)
+    for table_name in VITAL_ROUND_TABLES:
+        rates[table_name] = args.vitals_per_day
+    tables = args.tables or GENERATED_TABLES
+    plan = GenerationPlan(
+        args.patients, args.days, datetime.fromisoformat(args.start), rates,
+        first_patient=args.first_patient, seed=args.seed
+    )
+
+    total = sum(plan.total_rows(table_name) for table_name in tables)
+    for table_name in tables:
+        print(f"  {table_name:<25}{plan.total_rows(table_name):>14,}")
+    print(f"  {'total':<25}{total:>14,}")
+    if args.dry_run:
+        return
+
+    engine, _ = init_db(DATABASE_CREDENTIALS)
+    disable_triggers = not args.keep_triggers
+    plan.id_offsets = prepare_tables(engine, tables, args.truncate, disable_triggers)
+
+    tasks = build_tasks(plan, tables, args.chunk_patients)
+    print(f"\nLoading {total:,} rows in {len(tasks)} COPY streams with {args.workers} workers...")
+    start_time = time.perf_counter()
+    loaded = 0
+    try:
+        with multiprocessing.Pool(args.workers) as pool:
+            for table_name, count in pool.imap_unordered(load_task, tasks):
+                loaded += count
+                elapsed = time.perf_counter() - start_time
+                print(f"  {loaded:>14,} rows ({loaded / elapsed:,.0f} rows/s) - {table_name}")
+    finally:
+        finish_tables(engine, tables, disable_triggers)
+        engine.dispose()
+
+    elapsed = time.perf_counter() - start_time
+    print(f"\nLoaded {loaded:,} rows in {elapsed:.1f} s ({loaded / elapsed:,.0f} rows/s)")
+
+#--------------------------#
+# Parameters and constants #
+#--------------------------#
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Spreads the phases of consecutive patients over the sampling interval
+GOLDEN_RATIO = (math.sqrt(5) - 1) / 2
+
+# Number of the first patient ID
+DEFAULT_FIRST_PATIENT = 1000000
+
+# Minutes between a measurement and its registration, and before a modification
+MAX_REGISTRATION_DELAY = 15
+MAX_MODIFICATION_DELAY = 240
+
+# Fraction of the rows modified after registration
+MODIFIED_FRACTION = 0.05
+
+# Characters of the COPY data read per request
+COPY_BUFFER_SIZE = 1 << 16
+
+# Users recording and modifying the rows
+STAFF_USERS = [f"ENF{number:04d}" for number in range(1, 41)]
+
+ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Tables measured in vital signs rounds, linked by the `constantes` rows
+VITAL_ROUND_TABLES = [TEMPERATURA, PRESION_ARTERIAL, FRECUENCIA_CARDIACA, FRECUENCIA_RESPIRATORIA, SATURACION_OXIGENO]
+
+# `constantes` columns and the table whose sequence ID they hold
+CONSTANTES_LINKS = {
+    'id_secuencia_temp': TEMPERATURA,
+    'id_secuencia_pa': PRESION_ARTERIAL,
+    'id_secuencia_fc': FRECUENCIA_CARDIACA,
+    'id_secuencia_fr': FRECUENCIA_RESPIRATORIA,
+    'id_secuencia_so': SATURACION_OXIGENO
+}
+
+# Tables with a single row per patient
+PER_PATIENT_TABLES = [PACIENTES_HOSPWIN, MONITORES_ACTIVOS, MONITOR, FOTOS_HOSPWIN]
+
+# Events per patient and day
+DEFAULT_RATES = {
+    TEMPERATURA: 24,
+    PRESION_ARTERIAL: 24,
+    FRECUENCIA_CARDIACA: 24,
+    FRECUENCIA_RESPIRATORIA: 24,
+    SATURACION_OXIGENO: 24,
+    GLUCOSA: 4,
+    PESO: 1 / 7,
+    TALLA: 1 / 30,
+    DIURESIS: 4,
+    DEPOSICIONES: 2,
+    MEDICACION: 6,
+    ELECTROCARDIOGRAMA: 1,
+    CONTENCION: 0.1,
+    TIPO_SONDA: 0.05,
+    ULCERAS: 0.05,
+    TRATAMIENTO_ULCERA: 0.5,
+    CUIDADO_ULCERA: 1,
+    CIERRE_ULCERA: 0.02,
+    MENSTRUACION: 1 / 28
+}
+
+# Every generated table: the vital signs, `constantes` and the patient-scoped operational tables
+GENERATED_TABLES = VITAL_ROUND_TABLES + [CONSTANTES] + [
+    table_name for table_name in DEFAULT_RATES if table_name not in VITAL_ROUND_TABLES
+] + PER_PATIENT_TABLES
+
+# Plausible values of the measurement columns
+VALUE_GENERATORS = {
+    TEMPERATURA: {
+        'valor_temp': lambda rng: round(rng.gauss(36.8, 0.5), 1),
+        'escala_temp': lambda rng: 'C'
+    },
+    PRESION_ARTERIAL: {
+        'sistolica_pa': lambda rng: int(rng.gauss(125, 15)),
+        'diastolica_pa': lambda rng: int(rng.gauss(78, 10))
+    },
+    FRECUENCIA_CARDIACA: {'valor_fc': lambda rng: round(rng.gauss(78, 12))},
+    FRECUENCIA_RESPIRATORIA: {'valor_fr': lambda rng: round(rng.gauss(16, 3))},
+    SATURACION_OXIGENO: {'valor_so': lambda rng: min(100, round(rng.gauss(96, 2)))},
+    GLUCOSA: {
+        'valor': lambda rng: round(rng.gauss(110, 25)),
+        'escala': lambda rng: 'mg/dL',
+        'hemoglob_glucosilada': lambda rng: round(rng.uniform(5.0, 8.5), 1) if rng.random() < 0.1 else None
+    },
+    PESO: {
+        'valor': lambda rng: round(rng.gauss(72, 12), 1),
+        'imc': lambda rng: round(rng.gauss(26, 4), 1),
+        'escala': lambda rng: 'kg'
+    },
+    TALLA: {'valor': lambda rng: round(rng.gauss(168, 9))},
+    DIURESIS: {
+        'valor': lambda rng: str(rng.randrange(100, 600, 50)),
+        'vaciado_bolsa': lambda rng: rng.choice(['S', 'N']),
+        'cambio_bolsa': lambda rng: rng.choice(['S', 'N']),
+        'total_diario': lambda rng: rng.randrange(800, 2500, 50)
+    },
+    DEPOSICIONES: {'valor': lambda rng: rng.choice(['Normal', 'Blanda', 'Liquida', 'Dura'])},
+    MEDICACION: {
+        'medicacion': lambda rng: rng.choice(['Paracetamol 1g', 'Omeprazol 20mg', 'Enoxaparina 40mg', 'Metformina 850mg']),
+        'hora_dispensacion': lambda rng: rng.choice(['0800', '1400', '2000', '2300'])
+    },
+    ELECTROCARDIOGRAMA: {
+        'unidad': lambda rng: rng.choice(['UCI', 'Cardiologia', 'Medicina Interna']),
+        'nombrearchivo': lambda rng: f"ecg_{rng.getrandbits(32):08x}.xml"
+    },
+    CONTENCION: {
+        'tipo_apoyo': lambda rng: rng.choice(['Mecanica', 'Farmacologica']),
+        'anyo': lambda rng: 2025,
+        'mes': lambda rng: f"{rng.randint(1, 12):02d}",
+        'tipo_contencion': lambda rng: rng.choice(['Parcial', 'Total']),
+        'numero_puntos': lambda rng: str(rng.randint(1, 5)),
+        'hora_inicio': lambda rng: rng.randint(0, 23),
+        'hora_fin': lambda rng: rng.randint(0, 23)
+    },
+    TIPO_SONDA: {'tipo_sonda': lambda rng: rng.choice(['Vesical', 'Nasogastrica', 'PEG'])},
+    ULCERAS: {
+        'localizacion': lambda rng: rng.choice(['Sacro', 'Talon', 'Trocanter', 'Maleolo']),
+        'tipo': lambda rng: rng.choice(['Presion', 'Vascular', 'Diabetica']),
+        'procedencia': lambda rng: rng.choice(['Domicilio', 'Residencia', 'Hospital'])
+    },
+    TRATAMIENTO_ULCERA: {
+        'estado': lambda rng: rng.choice(['Estadio I', 'Estadio II', 'Estadio III', 'Estadio IV']),
+        'descripccion': lambda rng: rng.choice(['Cura humeda', 'Desbridamiento', 'Aposito hidrocoloide'])
+    },
+    CUIDADO_ULCERA: {
+        'anyo': lambda rng: '2025',
+        'mes': lambda rng: f"{rng.randint(1, 12):02d}",
+        'dia': lambda rng: f"{rng.randint(1, 28):02d}"
+    },
+    MENSTRUACION: {
+        'anyo': lambda rng: '2025',
+        'mes': lambda rng: f"{rng.randint(1, 12):02d}",
+        'fecha_inicio': lambda rng: f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    },
+    PACIENTES_HOSPWIN: {
+        'nombre': lambda rng: rng.choice(['Ana', 'Jon', 'Maite', 'Iker', 'Lucia', 'Mikel', 'Carmen', 'Josu']),
+        'apellido1': lambda rng: rng.choice(['Garcia', 'Etxeberria', 'Lopez', 'Agirre', 'Martinez']),
+        'apellido2': lambda rng: rng.choice(['Fernandez', 'Urrutia', 'Sanchez', 'Zabala']),
+        'sexo': lambda rng: rng.choice(['H', 'M']),
+        'numecama': lambda rng: f"{rng.randint(100, 599)}"
+    },
+    MONITOR: {
+        'estado': lambda rng: 'A',
+        'descripcion': lambda rng: 'Monitor multiparametrico'
+    },
+    MONITORES_ACTIVOS: {'estado': lambda rng: 'A'},
+    FOTOS_HOSPWIN: {'tipo': lambda rng: 'JPG'}
+}
+
+if __name__ == '__main__':
+    main()
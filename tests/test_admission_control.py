@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for admission control.
+
+This module contains tests for:
+1. Concurrency limits and queueing within a budget
+2. Rejections when the queue is full or the wait is too long
+3. Isolation of the budgets of different roles
+4. The 429 response and its Retry-After header
+5. Authorisation of the role before admission
+"""
+
+# Import modules #
+#----------------#
+
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from flask import Flask, request
+
+# Import project modules #
+#------------------------#
+
+from app.exceptions import AdmissionRejectedError
+from app.utils.jwt_handler import generate_token
+from app.utils.admission_control import (
+    ADMISSION_REJECTED,
+    AdmissionController,
+    admission_controlled
+)
+
+# Define test cases #
+#-------------------#
+
+class TestAdmissionControl(unittest.TestCase):
+    """Test cases for admission control."""
+
+    def setUp(self):
+        self.controller = AdmissionController(
+            {
+                'medical': {'vital_signs': {'max_concurrent': 1, 'max_queue': 1, 'max_wait': 5.0}},
+                'admin': {'operational_data': {'max_concurrent': 1, 'max_queue': 0, 'max_wait': 0.05}}
+            },
+            {'max_concurrent': 1, 'max_queue': 0, 'max_wait': 0.05}
+        )
+
+    def test_queued_request_runs_when_slot_frees(self):
+        """Test that a request over the limit waits for a running one to finish."""
+        order = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def first():
+            with self.controller.admit('medical', 'vital_signs'):
+                order.append('first')
+                started.set()
+                release.wait(5)
+
+        def second():
+            with self.controller.admit('medical', 'vital_signs'):
+                order.append('second')
+
+        first_thread = threading.Thread(target=first)
+        first_thread.start()
+        started.wait(5)
+        second_thread = threading.Thread(target=second)
+        second_thread.start()
+        while not self.controller._budget('medical', 'vital_signs').waiting:
+            time.sleep(0.001)
+
+        self.assertEqual(order, ['first'])
+        release.set()
+        first_thread.join(5)
+        second_thread.join(5)
+        self.assertEqual(order, ['first', 'second'])
+
+    def test_rejections(self):
+        """Test that requests are rejected when the queue is full or the wait too long."""
+        with self.controller.admit('admin', 'operational_data'):
+            rejected = ADMISSION_REJECTED.value(role='admin', endpoint='operational_data', reason='queue_full')
+            with self.assertRaises(AdmissionRejectedError) as context:
+                with self.controller.admit('admin', 'operational_data'):
+                    pass
+            self.assertGreaterEqual(context.exception.retry_after, 1)
+            self.assertEqual(
+                ADMISSION_REJECTED.value(role='admin', endpoint='operational_data', reason='queue_full'),
+                rejected + 1
+            )
+
+        controller = AdmissionController({}, {'max_concurrent': 1, 'max_queue': 1, 'max_wait': 0.05})
+        with controller.admit('admin', 'batch'):
+            with self.assertRaises(AdmissionRejectedError):
+                with controller.admit('admin', 'batch'):
+                    pass
+
+    def test_roles_have_separate_budgets(self):
+        """Test that a saturated admin budget does not block medical requests."""
+        with self.controller.admit('admin', 'operational_data'):
+            with self.controller.admit('medical', 'vital_signs'):
+                pass
+
+    def test_429_response(self):
+        """Test that a rejected request gets a 429 response with Retry-After."""
+        app = Flask(__name__)
+
+        @admission_controlled('operational_data')
+        def handler():
+            return {'ok': True}, 200
+
+        with patch('app.utils.admission_control.ADMISSION_CONTROLLER', self.controller):
+            with app.test_request_context():
+                request.user = {'username': 'admin', 'role': 'admin'}
+                self.assertEqual(handler(), ({'ok': True}, 200))
+                with self.controller.admit('admin', 'operational_data'):
+                    body, status, headers = handler()
+
+        self.assertEqual(status, 429)
+        self.assertEqual(body['field'], 'admission')
+        self.assertGreaterEqual(int(headers['Retry-After']), 1)
+
+    def test_wrong_role_is_rejected_before_admission(self):
+        """Test that a user without access gets 403, not 429, when the budget of its role is saturated."""
+        from main import create_app
+
+        client = create_app().test_client()
+        requests = [
+            ('medical', 'operational_data', '/api/operational_data/0000021561/2025-02-13/2025-02-14'),
+            ('admin', 'vital_signs', '/api/vital_signs/0000021561/2025-02-13/2025-02-14'),
+        ]
+        with patch('app.utils.admission_control.ADMISSION_CONTROLLER', self.controller):
+            for role, endpoint, url in requests:
+                headers = {'Authorization': f"Bearer {generate_token(role, role)}"}
+                with self.controller.admit(role, endpoint):
+                    response = client.get(url, headers=headers)
+                self.assertEqual(response.status_code, 403, url)
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
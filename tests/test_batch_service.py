@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the FHIR batch service.
+
+This module contains tests for:
+1. Parsing and authorising batch entries
+2. Deduplication and merging of sub-queries
+3. The batch-response Bundle
+4. Recovery of the shared session after a failed sub-query
+"""
+
+# Import modules #
+#----------------#
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Import project modules #
+#------------------------#
+
+from app.exceptions import ValidationError
+from app.services.batch_service import BatchService
+
+# Define helper functions #
+#-------------------------#
+
+def batch_bundle(*urls):
+    """Build a batch Bundle with a GET entry for each URL."""
+    return {
+        'resourceType': 'Bundle',
+        'type': 'batch',
+        'entry': [{'request': {'method': 'GET', 'url': url}} for url in urls]
+    }
+
+def searchset(patient_id):
+    """Build an identifiable searchset Bundle for a patient."""
+    return {'resourceType': 'Bundle', 'type': 'searchset', 'total': 0, 'entry': [], 'id': patient_id}
+
+# Define test cases #
+#-------------------#
+
+class TestBatchService(unittest.TestCase):
+    """Test cases for the FHIR batch service."""
+
+    def setUp(self):
+        """Set up the service with mocked data retrieval."""
+        self.service = BatchService(MagicMock())
+        vital_signs_patcher = patch.object(
+            self.service.vital_signs_service,
+            'retrieve_vital_signs_by_patient',
+            side_effect=lambda query: {patient_id: searchset(patient_id) for patient_id in query.patient_ids}
+        )
+        operational_patcher = patch.object(
+            self.service.patient_service,
+            'get_patient_data_across_tables',
+            side_effect=lambda patient_id, table_names, query: searchset(patient_id)
+        )
+        self.mock_vital_signs = vital_signs_patcher.start()
+        self.mock_operational = operational_patcher.start()
+        self.addCleanup(patch.stopall)
+
+    def test_url_forms_are_normalised(self):
+        """Test that equivalent URLs are the same sub-query."""
+        urls = [
+            'vital_signs/0000021561/2025-02-13/2025-02-14',
+            '/api/vital_signs/0000021561/2025-02-13 00:00/2025-02-14',
+            'vital_signs/0000021561/2025-02-13%2000:00/2025-02-14%2023:59',
+            'vital_signs?id_patient=0000021561&min_date=2025-02-13&max_date=2025-02-14+23:59',
+        ]
+        sub_queries = {self.service.parse_entry({'request': {'url': url}}, 'medical')[0] for url in urls}
+        self.assertEqual(len(sub_queries), 1)
+
+    def test_duplicates_and_merging(self):
+        """Test that duplicates run once and vital signs share one query per date range."""
+        result = self.service.process_batch(batch_bundle(
+            'vital_signs/0000021561/2025-02-13/2025-02-14',
+            'vital_signs/0000021562/2025-02-13/2025-02-14',
+            'vital_signs/0000021561/2025-02-13 00:00/2025-02-14',
+            'vital_signs/0000021561/2025-02-01/2025-02-14',
+        ), 'medical')
+
+        self.assertEqual(result['type'], 'batch-response')
+        self.assertEqual(
+            [entry['resource']['id'] for entry in result['entry']],
+            ['0000021561', '0000021562', '0000021561', '0000021561']
+        )
+        self.assertEqual(self.mock_vital_signs.call_count, 2)
+        merged_query = self.mock_vital_signs.call_args_list[0].args[0]
+        self.assertEqual(merged_query.patient_ids, ('0000021561', '0000021562'))
+
+    def test_entry_errors(self):
+        """Test that invalid and unauthorised entries fail on their own."""
+        bundle = batch_bundle(
+            'vital_signs/0000021561/2025-02-13/2025-02-14',
+            'operational_data/0000021561/2025-02-13/2025-02-14',
+            'vital_signs/123/2025-02-13/2025-02-14',
+            'patients/0000021561',
+        )
+        bundle['entry'].append({'request': {'method': 'POST', 'url': 'vital_signs/0000021561/2025-02-13/2025-02-14'}})
+
+        result = self.service.process_batch(bundle, 'medical')
+
+        statuses = [entry['response']['status'] for entry in result['entry']]
+        self.assertEqual(statuses, [
+            '200 OK', '403 Forbidden', '400 Bad Request', '400 Bad Request', '405 Method Not Allowed'
+        ])
+        self.assertEqual(result['entry'][1]['response']['outcome']['resourceType'], 'OperationOutcome')
+        self.mock_operational.assert_not_called()
+
+    def test_operational_entries(self):
+        """Test that operational data entries are run per patient for admins."""
+        result = self.service.process_batch(batch_bundle(
+            'operational_data/0000021561/2025-02-13/2025-02-14',
+            'operational_data/0000021562/2025-02-13/2025-02-14',
+        ), 'admin')
+        self.assertEqual([entry['resource']['id'] for entry in result['entry']], ['0000021561', '0000021562'])
+        self.assertEqual(self.mock_operational.call_count, 2)
+
+    def test_failed_sub_query_is_rolled_back(self):
+        """Test that the sub-queries after a failed one still run on the shared session."""
+        session = self.service.patient_service.db_session
+        session.aborted = False
+        session.rollback.side_effect = lambda: setattr(session, 'aborted', False)
+
+        def retrieve(patient_id, table_names, query):
+            # The shared session rejects every statement until its failed transaction is rolled back
+            if session.aborted:
+                raise RuntimeError("current transaction is aborted")
+            if patient_id == '0000021562':
+                session.aborted = True
+                raise RuntimeError("division by zero")
+            return searchset(patient_id)
+
+        self.mock_operational.side_effect = retrieve
+        result = self.service.process_batch(batch_bundle(
+            'operational_data/0000021561/2025-02-13/2025-02-14',
+            'operational_data/0000021562/2025-02-13/2025-02-14',
+            'operational_data/0000021563/2025-02-13/2025-02-14',
+            'operational_data/0000021564/2025-02-13/2025-02-14',
+        ), 'admin')
+
+        statuses = [entry['response']['status'] for entry in result['entry']]
+        self.assertEqual(statuses, ['200 OK', '500 Internal Server Error', '200 OK', '200 OK'])
+        self.assertEqual([entry['resource']['id'] for entry in result['entry'][2:]], ['0000021563', '0000021564'])
+        session.rollback.assert_called_once()
+
+    def test_invalid_bundles(self):
+        """Test that requests that are not batch Bundles are rejected."""
+        for bundle in [None, {'resourceType': 'Patient'}, {'resourceType': 'Bundle', 'type': 'transaction'}]:
+            with self.assertRaises(ValidationError):
+                self.service.process_batch(bundle, 'medical')
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
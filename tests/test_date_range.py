@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the DateRange value object.
+
+This module contains tests for:
+1. Parsing date ranges from the supported string formats
+2. Range arithmetic used for caching and slicing
+"""
+
+# Import modules #
+#----------------#
+
+import unittest
+from datetime import datetime, timedelta
+
+# Import project modules #
+#------------------------#
+
+from app.constants.error_messages import INVALID_DATE_FORMAT_ERROR, INVALID_DATE_RANGE_ERROR
+from app.utils.date_range import DateRange
+
+# Define test cases #
+#-------------------#
+
+class TestDateRange(unittest.TestCase):
+    """Test cases for the DateRange value object."""
+
+    def test_from_strings(self):
+        """Test parsing of both supported formats."""
+        date_range = DateRange.from_strings('2025-02-13', '2025-02-13 10:50')
+        self.assertEqual(date_range.start, datetime(2025, 2, 13, 0, 0))
+        self.assertEqual(date_range.end, datetime(2025, 2, 13, 10, 50))
+
+        date_range = DateRange.from_strings('2025-02-13 10:00', '2025-02-14')
+        self.assertEqual(date_range.end, datetime(2025, 2, 14, 23, 59))
+
+    def test_invalid_ranges(self):
+        """Test that invalid formats and reversed ranges raise ValueError."""
+        with self.assertRaisesRegex(ValueError, INVALID_DATE_FORMAT_ERROR):
+            DateRange.from_strings('13/02/2025', '2025-02-14')
+        with self.assertRaises(ValueError) as context:
+            DateRange.from_strings('2025-02-15', '2025-02-14')
+        self.assertEqual(str(context.exception), INVALID_DATE_RANGE_ERROR)
+
+    def test_coerce(self):
+        """Test that legacy dictionaries are parsed and ranges passed through."""
+        date_range = DateRange.from_strings('2025-02-13', '2025-02-14')
+        self.assertIs(DateRange.coerce(date_range), date_range)
+        self.assertEqual(DateRange.coerce({'min_date': '2025-02-13', 'max_date': '2025-02-14'}), date_range)
+        with self.assertRaises(ValueError):
+            DateRange.coerce({'min_date': '2025-02-13'})
+
+    def test_range_arithmetic(self):
+        """Test cache keys and range comparisons."""
+        week = DateRange.from_strings('2025-02-10', '2025-02-16')
+        day = DateRange.from_strings('2025-02-13', '2025-02-13')
+        later = DateRange.from_strings('2025-02-16 12:00', '2025-02-20')
+
+        self.assertEqual(week.cache_key, '202502100000-202502162359')
+        self.assertEqual(day.duration, timedelta(hours=23, minutes=59))
+        self.assertTrue(week.covers(day))
+        self.assertFalse(day.covers(week))
+        self.assertTrue(week.contains(datetime(2025, 2, 13, 8, 0)))
+        self.assertEqual(week.intersection(later), DateRange(datetime(2025, 2, 16, 12, 0), datetime(2025, 2, 16, 23, 59)))
+        self.assertIsNone(day.intersection(later))
+        self.assertEqual(DateRange.coerce(week.to_dict()), week)
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the downsampled vital signs requests.
+
+This module contains tests for:
+1. The Largest-Triangle-Three-Buckets selection of the points of a series
+2. Validation of the `_downsample` number of points
+3. The series query and the selection of the rows fetched for each vital sign
+"""
+
+# Import modules #
+#----------------#
+
+import unittest
+from unittest.mock import NonCallableMagicMock
+
+import numpy as np
+from sqlalchemy.dialects import postgresql
+
+# Import project modules #
+#------------------------#
+
+import app.models.patient_models  # noqa: F401 (registers the models)
+from app.constants.table_names import CONSTANTES, PRESION_ARTERIAL, TEMPERATURA
+from app.services.patient_service import PatientService
+from app.services.vital_signs_service import VitalSignsService
+from app.utils.downsampling import lttb_indices
+from app.validators.request_validator import RequestValidator
+
+# Define test cases #
+#-------------------#
+
+class TestDownsampling(unittest.TestCase):
+    """Test cases for the LTTB downsampling of the vital signs."""
+
+    def setUp(self):
+        self.query, _ = RequestValidator.validate('0000021561', '2025-02-13', '2025-02-20', downsample='3')
+
+    def test_lttb_keeps_peaks(self):
+        """Test that the first and last points and the extremes of the series are selected."""
+        x = np.arange(1000) * 60.0
+        y = np.sin(x / 6000) * 5 + 70
+        y[[250, 700]] = [140, 30]
+
+        selected = lttb_indices(x, y, 50)
+        self.assertEqual(len(selected), 50)
+        self.assertEqual((selected[0], selected[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(selected) > 0))
+        self.assertIn(250, selected)
+        self.assertIn(700, selected)
+
+        # Short series are returned whole
+        self.assertEqual(lttb_indices(x[:10], y[:10], 50).tolist(), list(range(10)))
+
+    def test_lttb_paired_series(self):
+        """Test that a peak of either series of a paired series is selected."""
+        x = np.arange(100) * 60.0
+        systolic = np.full(100, 120.0)
+        diastolic = np.full(100, 80.0)
+        diastolic[40] = 110
+
+        selected = lttb_indices(x, np.column_stack([systolic, diastolic]), 3)
+        self.assertEqual(selected.tolist(), [0, 40, 99])
+
+    def test_validate_downsample(self):
+        """Test that the number of points is parsed from the query string and bounded."""
+        self.assertEqual(self.query.downsample, 3)
+        for downsample in ('abc', '2', 0, 100000, True):
+            query, error = RequestValidator.validate('0000021561', '2025-02-13', '2025-02-20', downsample=downsample)
+            self.assertIsNone(query)
+            self.assertEqual(error['field'], '_downsample')
+
+    def test_series_query(self):
+        """Test that the series are read as typed columns, blood pressure as a paired series."""
+        service = VitalSignsService(PatientService(None))
+        series_query = service.build_series_query(self.query, [PRESION_ARTERIAL, TEMPERATURA, CONSTANTES])
+        sql = str(series_query.compile(dialect=postgresql.dialect()))
+
+        self.assertEqual(sql.count('UNION ALL'), 1)
+        self.assertNotIn('row_to_json', sql)
+        self.assertIn('CAST(presion_arterial.sistolica_pa AS FLOAT) AS value_1', sql)
+        self.assertIn('CAST(presion_arterial.diastolica_pa AS FLOAT) AS value_2', sql)
+        self.assertIn('CAST(NULL AS FLOAT) AS value_2', sql)
+        self.assertTrue(sql.endswith('ORDER BY source_table, measured_at, measurement_id'))
+
+    def test_downsampled_rows(self):
+        """Test that only the rows of the selected points are fetched, for each vital sign."""
+        session = NonCallableMagicMock()
+        series_rows = [(PRESION_ARTERIAL, 100 + index, index * 60.0, 120.0, 110.0 if index == 4 else 80.0) for index in range(10)]
+        series_rows += [(TEMPERATURA, 200 + index, index * 60.0, 36.5 + (index == 7), None) for index in range(10)]
+        session.execute.return_value.fetchall.side_effect = [series_rows, []]
+
+        service = VitalSignsService(PatientService(session))
+        bundle = service.retrieve_all_vital_signs(
+            '0000021561', '2025-02-13', '2025-02-20',
+            table_names=[PRESION_ARTERIAL, TEMPERATURA, CONSTANTES],
+            query=self.query
+        )
+        self.assertEqual(bundle['total'], 0)
+
+        consolidated_query = session.execute.call_args_list[1][0][0]
+        params = consolidated_query.compile(dialect=postgresql.dialect()).params
+        self.assertEqual(params['presion_arterial_ids'], [100, 104, 109])
+        self.assertEqual(params['temperatura_ids'], [200, 207, 209])
+        self.assertNotIn(CONSTANTES, str(consolidated_query))
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the request instrumentation.
+
+This module contains tests for:
+1. Accumulation of stage durations within a request
+2. The Server-Timing header
+3. The Prometheus text exposition of the metrics
+4. The /metrics endpoint
+"""
+
+# Import modules #
+#----------------#
+
+import unittest
+
+# Import project modules #
+#------------------------#
+
+from app.utils.instrumentation import (
+    _CURRENT_TIMINGS,
+    STAGE_DURATION,
+    STAGE_FHIR_BUNDLE,
+    STAGE_HL7_BUILD,
+    STAGE_SQL,
+    RequestTimings,
+    current_timings,
+    stage,
+    timed_stage
+)
+from app.utils.metrics import counter, histogram, render_prometheus
+
+# Define test cases #
+#-------------------#
+
+class TestInstrumentation(unittest.TestCase):
+    """Test cases for the request instrumentation."""
+
+    def test_stages_are_accumulated_per_request(self):
+        """Test that stage durations add up per stage and table within a request."""
+        # Outside a request, nothing is recorded
+        self.assertIsNone(current_timings())
+        with stage(STAGE_SQL):
+            pass
+
+        timings = RequestTimings('/test')
+        token = _CURRENT_TIMINGS.set(timings)
+        try:
+            with stage(STAGE_HL7_BUILD, 'temperatura'):
+                pass
+            with stage(STAGE_HL7_BUILD, 'temperatura'):
+                pass
+            with stage(STAGE_HL7_BUILD, 'ecg'):
+                pass
+            timed_stage(STAGE_FHIR_BUNDLE)(lambda: None)()
+            with self.assertRaises(ValueError):
+                with stage(STAGE_SQL):
+                    raise ValueError
+        finally:
+            _CURRENT_TIMINGS.reset(token)
+
+        self.assertEqual(
+            set(timings.durations),
+            {(STAGE_HL7_BUILD, 'temperatura'), (STAGE_HL7_BUILD, 'ecg'), (STAGE_FHIR_BUNDLE, ''), (STAGE_SQL, '')}
+        )
+
+        # Stages are listed in pipeline order, then the total
+        header = timings.server_timing(timings.publish())
+        self.assertEqual(
+            [entry.split(';')[0] for entry in header.split(', ')],
+            [STAGE_SQL, STAGE_HL7_BUILD, STAGE_FHIR_BUNDLE, 'total']
+        )
+        self.assertEqual(STAGE_DURATION.value(endpoint='/test', stage=STAGE_HL7_BUILD, table='ecg')['count'], 1)
+
+    def test_render_prometheus(self):
+        """Test the Prometheus text exposition of counters and histograms."""
+        requests_counter = counter('test_render_requests_total', 'Test "requests"', ('endpoint',))
+        requests_counter.inc(2, endpoint='/a')
+        latency = histogram('test_render_seconds', 'Test latency', buckets=(0.1, 1.0))
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+
+        lines = render_prometheus().splitlines()
+        self.assertIn('# TYPE test_render_requests_total counter', lines)
+        self.assertIn('test_render_requests_total{endpoint="/a"} 2', lines)
+        self.assertIn('# TYPE test_render_seconds histogram', lines)
+        self.assertIn('test_render_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('test_render_seconds_bucket{le="1"} 2', lines)
+        self.assertIn('test_render_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn('test_render_seconds_sum 5.55', lines)
+        self.assertIn('test_render_seconds_count 3', lines)
+
+    def test_metrics_endpoint(self):
+        """Test that /metrics serves the metrics with a Server-Timing header."""
+        from main import create_app
+
+        client = create_app().test_client()
+        response = client.get('/api/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE request_duration_seconds histogram', response.get_data(as_text=True))
+        self.assertIn('total;dur=', response.headers['Server-Timing'])
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
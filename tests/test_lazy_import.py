@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the lazy imports.
+
+This module contains tests for:
+1. Import of a lazy module or object on first use
+2. Loading of the hl7apy components in order, once
+3. A boot of the application that leaves the heavy dependencies unimported
+"""
+
+# Import modules #
+#----------------#
+
+import importlib.util
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Import project modules #
+#------------------------#
+
+from app.utils.hl7_preload import load_hl7apy, validate_hl7_preload
+from app.utils.lazy_import import LazyImport
+from tests.benchmark_startup import DEFERRED_MODULES, STARTUP_CODE, run_child
+
+# Define test cases #
+#-------------------#
+
+class TestLazyImport(unittest.TestCase):
+    """Test cases for the lazy imports."""
+
+    def test_module_is_imported_on_first_use(self):
+        """Test that a lazy import resolves on attribute access or call."""
+        lazy_module = LazyImport('json')
+        lazy_function = LazyImport('json', 'dumps')
+        self.assertFalse(lazy_module.loaded)
+        self.assertIn('not loaded', repr(lazy_function))
+
+        self.assertEqual(lazy_module.loads('[1]'), [1])
+        self.assertEqual(lazy_function([1]), '[1]')
+        self.assertTrue(lazy_module.loaded)
+        self.assertIs(lazy_function.resolve(), json.dumps)
+
+    def test_hl7apy_is_loaded_once(self):
+        """Test that concurrent first uses of hl7apy share the same components."""
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            message_classes = list(executor.map(lambda _: load_hl7apy(), range(8)))
+        self.assertEqual(len(set(message_classes)), 1)
+        self.assertEqual(message_classes[0].__module__, 'hl7apy.core')
+        self.assertTrue(validate_hl7_preload())
+
+    def test_boot_defers_heavy_dependencies(self):
+        """Test that creating the application does not import the deferred modules."""
+        stdout, _, _ = run_child(STARTUP_CODE)
+        sample = json.loads(stdout.strip().splitlines()[-1])
+        self.assertEqual(sample['deferred_loaded'], [])
+
+        stdout, _, _ = run_child(STARTUP_CODE, eager=True)
+        sample = json.loads(stdout.strip().splitlines()[-1])
+        # pyarrow is optional, and only imported if installed (it imports numpy itself)
+        installed = {module for module in DEFERRED_MODULES if importlib.util.find_spec(module.split('.')[0])}
+        self.assertEqual(set(sample['deferred_loaded']) - {'numpy'}, installed - {'numpy'})
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the memory profiler.
+
+This module contains tests for:
+1. Attribution of the peak and retained bytes and allocation sites to the stages
+2. Selection of the profiled requests (header, armed profiler, one at a time)
+3. The admin endpoints arming the profiler and returning the profiles
+"""
+
+# Import modules #
+#----------------#
+
+import unittest
+
+# Import project modules #
+#------------------------#
+
+from app.utils.instrumentation import _CURRENT_TIMINGS, STAGE_FETCH, STAGE_HL7_BUILD, RequestTimings, stage
+from app.utils.jwt_handler import generate_token
+from app.utils.memory_profiler import MEMORY_PROFILER, MemoryProfile, MemoryProfiler
+
+# Define test cases #
+#-------------------#
+
+class TestMemoryProfiler(unittest.TestCase):
+    """Test cases for the memory profiler."""
+
+    def test_allocations_are_attributed_to_stages(self):
+        """Test that retained and transient allocations are told apart per stage."""
+        profile = MemoryProfile('/test', 'GET', site_samples=1)
+        profile.begin()
+        token = _CURRENT_TIMINGS.set(RequestTimings('/test', profile))
+        try:
+            with stage(STAGE_FETCH, 'temperatura'):
+                rows = [bytearray(1000) for _ in range(1000)]
+            for _ in range(3):
+                with stage(STAGE_HL7_BUILD, 'temperatura'):
+                    message = [bytearray(1000) for _ in range(2000)]
+                    del message
+        finally:
+            _CURRENT_TIMINGS.reset(token)
+        report = profile.finish(200)
+
+        stages = {stage_report['stage']: stage_report for stage_report in report['stages']}
+        self.assertEqual(stages[STAGE_FETCH]['calls'], 1)
+        self.assertGreaterEqual(stages[STAGE_FETCH]['retained_bytes'], 1000 * 1000)
+        self.assertIn(__file__, stages[STAGE_FETCH]['top_sites'][0]['site'])
+
+        self.assertEqual(stages[STAGE_HL7_BUILD]['calls'], 3)
+        self.assertEqual(stages[STAGE_HL7_BUILD]['sampled_calls'], 1)
+        self.assertGreaterEqual(stages[STAGE_HL7_BUILD]['peak_bytes'], 2000 * 1000)
+        self.assertLess(stages[STAGE_HL7_BUILD]['retained_bytes'], 100 * 1000)
+
+        self.assertGreaterEqual(report['peak_bytes'], 3000 * 1000)
+        self.assertGreaterEqual(report['retained_bytes'], 1000 * 1000)
+        self.assertEqual(report['status'], 200)
+        del rows
+
+    def test_request_selection(self):
+        """Test that requests are profiled on an admin's header or while armed, one at a time."""
+        profiler = MemoryProfiler(history=5)
+        admin = {'Authorization': f"Bearer {generate_token('admin', 'admin')}", 'X-Memory-Profile': '1'}
+        medical = {'Authorization': f"Bearer {generate_token('doctor', 'medical')}", 'X-Memory-Profile': '1'}
+
+        self.assertIsNone(profiler.start('/api/vital_signs', 'GET', medical))
+        profile = profiler.start('/api/operational_data', 'GET', admin)
+        self.assertIsNotNone(profile)
+        self.assertIsNone(profiler.start('/api/operational_data', 'GET', admin))
+        report = profiler.finish(profile, 200)
+        self.assertEqual(profiler.get(report['id']), report)
+
+        profiler.arm(1, '/api/vital_signs')
+        self.assertIsNone(profiler.start('/api/admin/memory_profiles', 'GET', {}))
+        self.assertIsNone(profiler.start('/api/batch', 'POST', {}))
+        profile = profiler.start('/api/vital_signs/<string:patient_id>', 'GET', {})
+        self.assertIsNotNone(profile)
+        profiler.finish(profile, 200)
+        self.assertEqual(profiler.state()['armed_requests'], 0)
+        self.assertIsNone(profiler.start('/api/vital_signs/<string:patient_id>', 'GET', {}))
+        self.assertEqual(len(profiler.summaries()), 2)
+        self.assertNotIn('stages', profiler.summaries()[0])
+
+    def test_admin_endpoints(self):
+        """Test that admins can profile a request and read its profile."""
+        from main import create_app
+
+        client = create_app().test_client()
+        admin_headers = {'Authorization': f"Bearer {generate_token('admin', 'admin')}"}
+        medical_headers = {'Authorization': f"Bearer {generate_token('doctor', 'medical')}"}
+
+        response = client.get('/api/admin/slow_queries', headers=dict(admin_headers, **{'X-Memory-Profile': '1'}))
+        self.assertEqual(response.status_code, 200)
+        profile_id = response.headers['X-Memory-Profile']
+
+        response = client.get(f"/api/admin/memory_profiles/{profile_id}", headers=admin_headers)
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual(report['endpoint'], '/api/admin/slow_queries')
+        self.assertIn('json_encode', [stage_report['stage'] for stage_report in report['stages']])
+        self.assertEqual(client.get('/api/admin/memory_profiles/missing', headers=admin_headers).status_code, 404)
+        self.assertEqual(client.get('/api/admin/memory_profiles', headers=medical_headers).status_code, 403)
+
+        response = client.post('/api/admin/memory_profiling', json={'requests': 2}, headers=admin_headers)
+        self.assertEqual(response.get_json()['armed_requests'], 2)
+        self.assertEqual(
+            client.post('/api/admin/memory_profiling', json={'requests': -1}, headers=admin_headers).status_code,
+            400
+        )
+        MEMORY_PROFILER.arm(0)
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
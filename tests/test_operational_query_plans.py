@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the operational data query plans.
+
+This module contains tests for:
+1. The explicit query plan of every operational table
+2. The consolidated UNION ALL query built from those plans
+"""
+
+# Import modules #
+#----------------#
+
+import unittest
+
+from sqlalchemy.dialects import postgresql
+
+# Import project modules #
+#------------------------#
+
+from app.constants.operational_tables import (
+    OPERATIONAL_QUERY_PLANS,
+    OPERATIONAL_TABLES,
+    QUERY_PLAN_EXCLUDED,
+    QUERY_PLAN_LINKED
+)
+from app.constants.table_names import (
+    DIURESIS,
+    GRUPOUSU_HOSPWIN,
+    MONITOR,
+    MONITORES_ACTIVOS,
+    PACIENTES_HOSPWIN,
+    TARJETA,
+    USUARIO_HOSPWIN
+)
+from app.db import MODEL_REGISTRY, build_consolidated_query
+from app.models.patient_models import TABLE_MODEL_MAP
+from app.utils.date_range import DateRange
+
+# Define test cases #
+#-------------------#
+
+class TestOperationalQueryPlans(unittest.TestCase):
+    """Test cases for the operational data query plans."""
+
+    def setUp(self):
+        """Set up the request data shared by the tests."""
+        self.request_data = {
+            'id_patient': '0000021561',
+            'date_range': DateRange.from_strings('2025-02-13', '2025-02-14')
+        }
+
+    def _compile(self, table_names):
+        """Build the consolidated query and render it as PostgreSQL SQL."""
+        query = build_consolidated_query(self.request_data, table_names, TABLE_MODEL_MAP)
+        return str(query.compile(dialect=postgresql.dialect()))
+
+    def test_every_operational_table_has_a_plan(self):
+        """Test that no operational table falls back to an implicit plan."""
+        self.assertEqual(set(OPERATIONAL_QUERY_PLANS), set(OPERATIONAL_TABLES))
+        for table_name, plan in OPERATIONAL_QUERY_PLANS.items():
+            if plan['strategy'] == QUERY_PLAN_EXCLUDED:
+                self.assertTrue(plan['reason'], table_name)
+            if plan['strategy'] == QUERY_PLAN_LINKED:
+                self.assertIn(plan['link_table'], MODEL_REGISTRY, table_name)
+
+    def test_single_query_for_all_tables(self):
+        """Test that all patient-scoped tables are part of one UNION ALL."""
+        sql = self._compile(OPERATIONAL_TABLES)
+        self.assertEqual(sql.count('UNION ALL'), len(OPERATIONAL_TABLES) - 3 - 1)
+        for table_name in (USUARIO_HOSPWIN, GRUPOUSU_HOSPWIN, TARJETA):
+            self.assertNotIn(f"'{table_name}'", sql)
+
+    def test_patient_only_plan(self):
+        """Test that tables without a date field are filtered on the patient only."""
+        sql = self._compile([PACIENTES_HOSPWIN])
+        self.assertIn('pacientes_hospwin.id_paciente =', sql)
+        self.assertNotIn('>=', sql)
+
+        # No date range is needed for such tables
+        del self.request_data['date_range']
+        self.assertIsNotNone(build_consolidated_query(self.request_data, [PACIENTES_HOSPWIN], TABLE_MODEL_MAP))
+        with self.assertRaises(ValueError):
+            build_consolidated_query(self.request_data, [DIURESIS], TABLE_MODEL_MAP)
+
+    def test_linked_plan(self):
+        """Test that monitors are resolved through the patient's active monitors."""
+        sql = self._compile([MONITOR])
+        self.assertIn(f'monitor.id_monitor IN (SELECT {MONITORES_ACTIVOS}.id_monitor', sql)
+        self.assertIn(f'{MONITORES_ACTIVOS}.id_paciente =', sql)
+        self.assertIn('monitor.fecha_registro >=', sql)
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
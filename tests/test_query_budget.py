@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the query budgets.
+
+This module contains tests for:
+1. Accounting of the statements and JSON bytes by the hooks of `app.db`
+2. The `assert_max_statements` test helper
+3. Resolution of the budget of an endpoint
+4. Checking of the budget at the end of a request
+"""
+
+# Import modules #
+#----------------#
+
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from flask import Flask
+from sqlalchemy import JSON, create_engine, text
+
+# Import project modules #
+#------------------------#
+
+import app.db  # noqa: F401 (registers the statement accounting hooks)
+from app.config import DEFAULT_QUERY_BUDGET, QUERY_BUDGETS
+from app.utils.query_budget import (
+    QUERY_BUDGET_EXCEEDED,
+    accounted_json_loads,
+    assert_max_statements,
+    budget_for,
+    count_queries,
+    init_query_budgets
+)
+
+# Define test cases #
+#-------------------#
+
+class TestQueryBudget(unittest.TestCase):
+    """Test cases for the query budgets."""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://', json_deserializer=accounted_json_loads)
+
+    def run_statements(self, count):
+        """Issue a number of statements, the first returning a JSON document."""
+        with self.engine.connect() as connection:
+            connection.execute(text('SELECT \'{"valor": 36.5}\' AS data').columns(data=JSON)).scalar()
+            for _ in range(count - 1):
+                connection.execute(text('SELECT 1'))
+
+    def test_statements_and_bytes_are_counted(self):
+        """Test that statements and JSON bytes are counted, also in enclosing blocks."""
+        with count_queries() as outer:
+            self.run_statements(2)
+            with count_queries() as inner:
+                self.run_statements(1)
+
+        self.assertEqual(inner.statements, 1)
+        self.assertEqual(inner.bytes, len('{"valor": 36.5}'))
+        self.assertEqual(outer.statements, 3)
+        self.assertEqual(outer.bytes, 2 * len('{"valor": 36.5}'))
+
+        # Outside a counted block nothing is recorded
+        self.run_statements(1)
+
+    def test_assert_max_statements(self):
+        """Test that the helper fails with the statements issued."""
+        with assert_max_statements(2):
+            self.run_statements(2)
+
+        with self.assertRaises(AssertionError) as context:
+            with assert_max_statements(2, max_bytes=1000):
+                self.run_statements(3)
+        self.assertIn('3 statements (budget 2)', str(context.exception))
+        self.assertIn('3. SELECT 1', str(context.exception))
+
+    def test_budget_for(self):
+        """Test that the longest matching URL rule prefix gives the budget."""
+        self.assertEqual(budget_for('/api/vital_signs/batch'), QUERY_BUDGETS['/api/vital_signs/batch'])
+        self.assertEqual(budget_for('/api/vital_signs/<id_value>/<min_date>/<max_date>'), QUERY_BUDGETS['/api/vital_signs'])
+        self.assertIsNone(budget_for('/api/vital_signs/<id_value>/subscribe'))
+        self.assertEqual(budget_for('/unknown'), DEFAULT_QUERY_BUDGET)
+
+    def test_budget_is_checked_per_request(self):
+        """Test that a request over its endpoint's budget is logged and counted."""
+        flask_app = Flask(__name__)
+        init_query_budgets(flask_app)
+
+        @flask_app.route('/api/metadata/test')
+        def metadata():
+            self.run_statements(2)
+            return 'ok'
+
+        client = flask_app.test_client()
+        exceeded_before = QUERY_BUDGET_EXCEEDED.value(endpoint='/api/metadata/test', resource='statements')
+        output = StringIO()
+        with redirect_stdout(output), count_queries() as stats:
+            self.assertEqual(client.get('/api/metadata/test').status_code, 200)
+
+        self.assertEqual(stats.statements, 2)
+        self.assertIn('query budget exceeded on /api/metadata/test: 2 statements (budget 0)', output.getvalue())
+        self.assertEqual(
+            QUERY_BUDGET_EXCEEDED.value(endpoint='/api/metadata/test', resource='statements'),
+            exceeded_before + 1
+        )
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for per-request query deadlines.
+
+This module contains tests for:
+1. The statement_timeout applied to the transactions of a request
+2. Cancellation of the backend query past the deadline
+3. Detection of client disconnections
+4. Translation of cancelled queries into timeout errors
+"""
+
+# Import modules #
+#----------------#
+
+import socket
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from sqlalchemy.exc import DBAPIError
+
+# Import project modules #
+#------------------------#
+
+from app.constants.table_names import TEMPERATURA
+from app.db import _apply_request_deadline, _release_request_deadline, filter_data_consolidated
+from app.exceptions import QueryCancelledError
+from app.models.patient_models import TABLE_MODEL_MAP
+from app.utils.date_range import DateRange
+from app.utils.query_deadline import (
+    QUERY_CANCELLATIONS,
+    WATCHDOG,
+    client_disconnected,
+    current_deadline,
+    request_deadline
+)
+
+# Define helper classes #
+#-----------------------#
+
+class QueryCanceled(Exception):
+    """Stand-in for psycopg2's QueryCanceled error."""
+    pgcode = '57014'
+
+# Define test cases #
+#-------------------#
+
+class TestQueryDeadline(unittest.TestCase):
+    """Test cases for per-request query deadlines."""
+
+    def test_statement_timeout_is_applied_to_transactions(self):
+        """Test that a new transaction gets the request's statement_timeout."""
+        session = MagicMock(info={})
+        connection = MagicMock()
+        connection.dialect.name = 'postgresql'
+
+        # Outside a request, nothing is done
+        _apply_request_deadline(session, MagicMock(), connection)
+        connection.execute.assert_not_called()
+
+        with request_deadline('vital_signs', timeout=2.5) as deadline:
+            self.assertIs(current_deadline(), deadline)
+            _apply_request_deadline(session, MagicMock(), connection)
+            statement, parameters = connection.execute.call_args[0]
+            self.assertIn("set_config('statement_timeout'", str(statement))
+            self.assertEqual(parameters, {'timeout': '2500ms'})
+            self.assertEqual(deadline._connections, [connection.connection.dbapi_connection])
+
+            _release_request_deadline(session, SimpleNamespace(parent=None))
+            self.assertEqual(deadline._connections, [])
+        self.assertIsNone(current_deadline())
+
+    def test_watchdog_cancels_expired_requests(self):
+        """Test that the queries of a request past its deadline are cancelled."""
+        dbapi_connection = MagicMock()
+        with request_deadline('operational_data', timeout=10) as deadline:
+            deadline.register_connection(dbapi_connection)
+            WATCHDOG.check()
+            dbapi_connection.cancel.assert_not_called()
+
+            deadline.expires_at = time.monotonic() - 1
+            WATCHDOG.check()
+            dbapi_connection.cancel.assert_called_once()
+            self.assertEqual(deadline.cancel_reason, 'deadline')
+
+            # Queries started afterwards are cancelled straight away
+            late_connection = MagicMock()
+            deadline.register_connection(late_connection)
+            late_connection.cancel.assert_called_once()
+
+    def test_client_disconnected(self):
+        """Test the detection of a closed client socket."""
+        server_socket, client_socket = socket.socketpair()
+        try:
+            environ = {'werkzeug.socket': server_socket}
+            self.assertFalse(client_disconnected(environ))
+            client_socket.close()
+            self.assertTrue(client_disconnected(environ))
+            self.assertFalse(client_disconnected({}))
+        finally:
+            server_socket.close()
+
+    def test_cancelled_query_raises_timeout(self):
+        """Test that a cancelled consolidated query raises QueryCancelledError."""
+        session_factory = MagicMock()
+        session_factory.return_value.execute.side_effect = DBAPIError('SELECT', {}, QueryCanceled())
+        request_data = {
+            'id_patient': '0000021561',
+            'date_range': DateRange.from_strings('2025-02-13', '2025-02-14')
+        }
+
+        with request_deadline('vital_signs', timeout=10):
+            cancellations = QUERY_CANCELLATIONS.value(endpoint='vital_signs', reason='statement_timeout')
+            with self.assertRaises(QueryCancelledError):
+                filter_data_consolidated(session_factory, request_data, [TEMPERATURA], TABLE_MODEL_MAP)
+            self.assertEqual(
+                QUERY_CANCELLATIONS.value(endpoint='vital_signs', reason='statement_timeout'),
+                cancellations + 1
+            )
+
+        session_factory.return_value.execute.side_effect = DBAPIError('SELECT', {}, Exception('other'))
+        with self.assertRaises(DBAPIError):
+            filter_data_consolidated(session_factory, request_data, [TEMPERATURA], TABLE_MODEL_MAP)
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
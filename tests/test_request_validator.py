@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the compiled request validator.
+
+This module contains tests for:
+1. Patient ID validation and its error messages
+2. Date format detection for both supported formats
+3. Date range validation and normalisation
+"""
+
+# Import modules #
+#----------------#
+
+import unittest
+from datetime import datetime
+
+# Import project modules #
+#------------------------#
+
+from app.constants.error_messages import (
+    INVALID_DATE_FORMAT_ERROR,
+    INVALID_DATE_RANGE_ERROR,
+    INVALID_ID_FORMAT_ERROR,
+    INVALID_ID_TYPE_ERROR,
+)
+from app.utils.date_range import DateRange, parse_date_bound
+from app.utils.form_field_validations import validate_date_range
+from app.validators.request_validator import PatientQuery, RequestValidator
+
+# Define test cases #
+#-------------------#
+
+class TestRequestValidator(unittest.TestCase):
+    """Test cases for the compiled request validator."""
+
+    def test_valid_request(self):
+        """Test that a valid request returns a normalised query."""
+        query, error = RequestValidator.validate('0000021561', '2025-02-13', '2025-02-14 10:30')
+        self.assertIsNone(error)
+        self.assertIsInstance(query, PatientQuery)
+        self.assertEqual(query.patient_id, '0000021561')
+        self.assertEqual(query.date_range, DateRange(datetime(2025, 2, 13, 0, 0), datetime(2025, 2, 14, 10, 30)))
+        self.assertEqual(query.to_request_data(), {
+            'id_patient': '0000021561',
+            'date_range': query.date_range
+        })
+
+    def test_date_only_max_date_defaults_to_end_of_day(self):
+        """Test that a date-only max_date defaults to 23:59."""
+        query, _ = RequestValidator.validate('0000021561', '2025-02-13', '2025-02-13')
+        self.assertEqual(query.date_range.end, datetime(2025, 2, 13, 23, 59))
+
+    def test_invalid_ids(self):
+        """Test the ID error messages."""
+        for patient_id in ['123', '00000215610', 'abcdefghij', '0000021561\n', '']:
+            _, error = RequestValidator.validate(patient_id, '2025-02-13', '2025-02-14')
+            self.assertEqual(error, {'field': 'id_field', 'error': INVALID_ID_FORMAT_ERROR})
+
+        _, error = RequestValidator.validate(21561, '2025-02-13', '2025-02-14')
+        self.assertEqual(error, {'field': 'id_field', 'error': INVALID_ID_TYPE_ERROR})
+
+    def test_invalid_date_formats(self):
+        """Test the date format error messages."""
+        _, error = RequestValidator.validate('0000021561', '13/02/2025', '2025-02-14')
+        self.assertEqual(error['field'], 'min_date')
+        self.assertEqual(error['error'], f"Invalid date format for min_date. {INVALID_DATE_FORMAT_ERROR}")
+
+        _, error = RequestValidator.validate('0000021561', '2025-02-13', '2025-02-30')
+        self.assertEqual(error['field'], 'max_date')
+
+        _, error = RequestValidator.validate('0000021561', 'x', 'y')
+        self.assertEqual(error['field'], 'max_date and min_date')
+
+    def test_invalid_date_range(self):
+        """Test that min_date greater than max_date is rejected."""
+        _, error = RequestValidator.validate('0000021561', '2025-02-14', '2025-02-13 10:00')
+        self.assertEqual(error, {'field': 'min_date', 'error': INVALID_DATE_RANGE_ERROR})
+
+    def test_date_detection_matches_strptime(self):
+        """Test that the compiled date detection accepts the same values as strptime."""
+        values = [
+            '2025-02-13 10:00', '2025-02-13', '2025-2-3 1:5', '2025-02-13  10:00',
+            '2025-02-13T10:00', '2025-13-01', '2025-02-13 24:00', '2025-02-13 10:00:00'
+        ]
+        for value in values:
+            for is_max_date in (False, True):
+                expected = None
+                try:
+                    expected = datetime.strptime(value, '%Y-%m-%d %H:%M')
+                except ValueError:
+                    try:
+                        expected = datetime.strptime(value, '%Y-%m-%d')
+                        if is_max_date:
+                            expected = expected.replace(hour=23, minute=59)
+                    except ValueError:
+                        pass
+                self.assertEqual(parse_date_bound(value, is_max_date), expected, value)
+
+    def test_messages_match_form_field_validations(self):
+        """Test that date errors reuse the form field validation messages."""
+        _, error = RequestValidator.validate('0000021561', 'x', '2025-02-14')
+        self.assertEqual(error['error'], validate_date_range('x', '2025-02-14')['error_msg'])
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the response compression.
+
+This module contains tests for:
+1. Negotiation of the content coding from the Accept-Encoding header
+2. Compression of the responses, according to the levels of their endpoint
+3. The cache of compressed bodies
+4. Streamed responses, compressed and flushed chunk by chunk
+"""
+
+# Import modules #
+#----------------#
+
+import json
+import unittest
+import zlib
+from unittest.mock import patch
+
+from flask import Flask, Response
+
+# Import project modules #
+#------------------------#
+
+from app.config import COMPRESSION_LEVELS, DEFAULT_COMPRESSION_LEVELS
+from app.utils.response_compression import (
+    COMPRESSED_CACHE,
+    COMPRESSION_CACHE_LOOKUPS,
+    GZIP_WBITS,
+    compress,
+    init_response_compression,
+    levels_for,
+    negotiate_encoding
+)
+
+# Define test cases #
+#-------------------#
+
+class TestResponseCompression(unittest.TestCase):
+    """Test cases for the response compression."""
+
+    def setUp(self):
+        COMPRESSED_CACHE.clear()
+        self.bundle = {
+            'resourceType': 'Bundle',
+            'entry': [
+                {'resource': {'resourceType': 'Observation', 'id': f'temp-{index}', 'code': {'coding': [{
+                    'system': 'http://loinc.org', 'code': '8310-5', 'display': 'Body temperature'
+                }]}}}
+                for index in range(200)
+            ]
+        }
+        self.closed = []
+
+        flask_app = Flask(__name__)
+        init_response_compression(flask_app)
+
+        @flask_app.route('/api/vital_signs/<id_value>/<min_date>/<max_date>')
+        def vital_signs(id_value, min_date, max_date):
+            return Response(json.dumps(self.bundle), mimetype='application/json')
+
+        @flask_app.route('/api/metadata/api')
+        def metadata():
+            return {'version': '3.4'}
+
+        @flask_app.route('/api/vital_signs/<id_value>/subscribe')
+        def subscribe(id_value):
+            def events():
+                try:
+                    for index in range(3):
+                        yield f"id: {index}\ndata: {json.dumps(self.bundle['entry'][index])}\n\n"
+                finally:
+                    self.closed.append(id_value)
+            return Response(events(), mimetype='text/event-stream')
+
+        self.client = flask_app.test_client()
+
+    def test_negotiate_encoding(self):
+        """Test that the client's preferred available coding is chosen."""
+        levels = DEFAULT_COMPRESSION_LEVELS
+        codecs = 'app.utils.response_compression'
+        with patch.multiple(codecs, brotli_installed=False, zstandard_installed=False):
+            self.assertEqual(negotiate_encoding('gzip, deflate', levels), 'gzip')
+            self.assertEqual(negotiate_encoding('GZIP;q=0.5, identity', levels), 'gzip')
+            self.assertEqual(negotiate_encoding('*', levels), 'gzip')
+            self.assertIsNone(negotiate_encoding('gzip;q=0, deflate', levels))
+            self.assertIsNone(negotiate_encoding('*;q=0', levels))
+        with patch.multiple(codecs, brotli_installed=False, zstandard_installed=True):
+            self.assertEqual(negotiate_encoding('gzip, zstd', levels), 'zstd')
+            self.assertEqual(negotiate_encoding('gzip, zstd;q=0.8', levels), 'gzip')
+            self.assertIsNone(negotiate_encoding('zstd', {'gzip': 6}))
+
+    def test_levels_for(self):
+        """Test that the longest matching URL rule prefix gives the levels."""
+        subscribe = '/api/vital_signs/<id_value>/subscribe'
+        self.assertEqual(levels_for(subscribe), COMPRESSION_LEVELS[subscribe])
+        self.assertEqual(levels_for('/api/vital_signs/<id_value>/<min_date>/<max_date>'), DEFAULT_COMPRESSION_LEVELS)
+
+    def test_compressed_response(self):
+        """Test that large responses are compressed and small or unaccepted ones are not."""
+        response = self.client.get('/api/vital_signs/0000021561/2025-02-13/2025-02-20', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        body = zlib.decompress(response.get_data(), GZIP_WBITS)
+        self.assertEqual(json.loads(body), self.bundle)
+        self.assertLess(int(response.headers['Content-Length']) * 10, len(body))
+
+        response = self.client.get('/api/vital_signs/0000021561/2025-02-13/2025-02-20')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.get_json(), self.bundle)
+
+        response = self.client.get('/api/metadata/api', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_cached_compressed_body(self):
+        """Test that identical bodies are compressed only once."""
+        hits_before = COMPRESSION_CACHE_LOOKUPS.value(result='hit')
+        with patch('app.utils.response_compression.compress', wraps=compress) as compress_body:
+            first = self.client.get('/api/vital_signs/0000021561/2025-02-13/2025-02-20', headers={'Accept-Encoding': 'gzip'})
+            second = self.client.get('/api/vital_signs/0000021561/2025-02-13/2025-02-20', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(compress_body.call_count, 1)
+        self.assertEqual(first.get_data(), second.get_data())
+        self.assertEqual(COMPRESSION_CACHE_LOOKUPS.value(result='hit'), hits_before + 1)
+
+    def test_streamed_response(self):
+        """Test that each chunk of a stream can be decoded as soon as it is received."""
+        response = self.client.get('/api/vital_signs/0000021561/subscribe', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        chunks = iter(response.response)
+        first_event = decompressor.decompress(next(chunks)).decode('utf-8')
+        self.assertTrue(first_event.startswith('id: 0\n') and first_event.endswith('\n\n'))
+
+        response.close()
+        self.assertEqual(self.closed, ['0000021561'])
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
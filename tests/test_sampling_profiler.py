@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the sampling profiler.
+
+This module contains tests for:
+1. The collapsed stack format
+2. Selection of the profiled requests by rate, endpoint and role
+3. Sampling of a request, merging per endpoint and rotation of the files
+4. The admin endpoints configuring the profiler and serving the profiles
+"""
+
+# Import modules #
+#----------------#
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# Import project modules #
+#------------------------#
+
+from app.utils.jwt_handler import generate_token
+from app.utils.sampling_profiler import SAMPLING_PROFILER, SamplingProfiler, collapse_stack
+
+# Define helper functions #
+#-------------------------#
+
+def busy_handler(seconds):
+    """Keep the current thread busy, as a request handler would."""
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+# Define test cases #
+#-------------------#
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Test cases for the sampling profiler."""
+
+    def test_collapse_stack(self):
+        """Test that stacks are collapsed outermost frame first, with file, function and line."""
+        stack = collapse_stack(sys._getframe()).split(';')
+        self.assertTrue(stack[-1].startswith('tests/test_sampling_profiler.py:test_collapse_stack:'))
+        self.assertNotIn(' ', ''.join(stack))
+
+    def test_request_selection(self):
+        """Test that requests are selected by rate, endpoint and role."""
+        profiler = SamplingProfiler(enabled=False, sample_rate=1.0, interval=0.001)
+        medical = {'Authorization': f"Bearer {generate_token('doctor', 'medical')}"}
+        admin = {'Authorization': f"Bearer {generate_token('admin', 'admin')}"}
+
+        self.assertFalse(profiler.should_profile('/api/vital_signs', medical))
+        profiler.configure(enabled=True)
+        self.assertTrue(profiler.should_profile('/api/vital_signs', medical))
+        self.assertFalse(profiler.should_profile('/api/admin/sampling_profiles', admin))
+
+        profiler.configure(endpoint='/api/operational_data', role='admin')
+        self.assertFalse(profiler.should_profile('/api/vital_signs', admin))
+        self.assertFalse(profiler.should_profile('/api/operational_data', medical))
+        self.assertTrue(profiler.should_profile('/api/operational_data', admin))
+
+        profiler.configure(endpoint='', role='', sample_rate=0.0)
+        self.assertFalse(profiler.should_profile('/api/vital_signs', medical))
+
+    def test_requests_are_sampled_and_merged(self):
+        """Test that sampled stacks are merged per endpoint and written with rotation."""
+        with tempfile.TemporaryDirectory() as profile_dir:
+            profiler = SamplingProfiler(True, 1.0, 0.001, profile_dir, max_file_bytes=1, backups=1)
+            for _ in range(3):
+                profiled = profiler.start('/api/vital_signs/<string:id_value>')
+                busy_handler(0.05)
+                profiler.stop(profiled)
+
+            summary = profiler.summaries()[0]
+            self.assertEqual(summary['endpoint'], '/api/vital_signs/<string:id_value>')
+            self.assertEqual(summary['requests'], 3)
+            self.assertGreater(summary['samples'], 0)
+
+            collapsed = profiler.collapsed('/api/vital_signs/<string:id_value>')
+            self.assertIn(':busy_handler:', collapsed)
+            stack, count = collapsed.splitlines()[0].rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+            self.assertTrue(profiler.collapsed().startswith('/api/vital_signs/<string:id_value>;'))
+
+            # Every write finds the previous file above 1 byte: one current file and one backup
+            self.assertEqual(
+                sorted(os.listdir(profile_dir)),
+                ['api_vital_signs_string_id_value.folded', 'api_vital_signs_string_id_value.folded.1']
+            )
+
+            profiler.reset()
+            self.assertEqual(profiler.summaries(), [])
+
+    def test_admin_endpoints(self):
+        """Test that admins can configure the profiler and download the profiles."""
+        from main import create_app
+
+        client = create_app().test_client()
+        admin_headers = {'Authorization': f"Bearer {generate_token('admin', 'admin')}"}
+        medical_headers = {'Authorization': f"Bearer {generate_token('doctor', 'medical')}"}
+
+        try:
+            response = client.post(
+                '/api/admin/sampling_profiler',
+                json={'enabled': True, 'sample_rate': 0.5, 'role': 'medical'},
+                headers=admin_headers
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['role'], 'medical')
+            self.assertEqual(
+                client.post('/api/admin/sampling_profiler', json={'sample_rate': 2}, headers=admin_headers).status_code,
+                400
+            )
+            self.assertEqual(client.get('/api/admin/sampling_profiler', headers=medical_headers).status_code, 403)
+
+            self.assertIn('endpoints', client.get('/api/admin/sampling_profiles', headers=admin_headers).get_json())
+            response = client.get('/api/admin/sampling_profiles/collapsed', headers=admin_headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.content_type.startswith('text/plain'))
+            self.assertEqual(client.delete('/api/admin/sampling_profiles', headers=admin_headers).status_code, 204)
+        finally:
+            SAMPLING_PROFILER.configure(enabled=False, sample_rate=0.01, endpoint='', role='')
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
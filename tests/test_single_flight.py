@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for request coalescing.
+
+This module contains tests for:
+1. Sharing one in-flight computation between identical concurrent calls
+2. Error propagation and timeouts of coalesced calls
+3. Takeover of a computation cancelled by the leader's client disconnection
+4. The coalescing metrics
+"""
+
+# Import modules #
+#----------------#
+
+import socket
+import threading
+import time
+import unittest
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from unittest.mock import MagicMock, patch
+
+# Import project modules #
+#------------------------#
+
+from app.exceptions import QueryCancelledError, RequestTimeoutError, ValidationError
+from app.utils.query_deadline import CANCEL_REASON_CLIENT_DISCONNECT, WATCHDOG, current_deadline, request_deadline
+from app.utils.single_flight import SINGLE_FLIGHT_CALLS, SingleFlight
+
+# Define test cases #
+#-------------------#
+
+class TestSingleFlight(unittest.TestCase):
+    """Test cases for request coalescing."""
+
+    def setUp(self):
+        """Create a fresh coalescing group for each test."""
+        self.flight = SingleFlight(self.id())
+        self.release = threading.Event()
+        self.runs = 0
+
+    def _slow_computation(self):
+        """Computation that blocks until the test releases it."""
+        self.runs += 1
+        self.release.wait(5)
+        return {'total': self.runs}
+
+    def _run_concurrently(self, key, callers, timeout=None):
+        """Start concurrent identical calls and release the computation once all wait on it."""
+        executor = ThreadPoolExecutor(max_workers=callers)
+        futures = [executor.submit(self.flight.do, key, self._slow_computation, timeout) for _ in range(callers)]
+        deadline = time.monotonic() + 5
+        while SINGLE_FLIGHT_CALLS.value(group=self.id(), role='coalesced') < callers - 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        return executor, futures
+
+    def test_identical_calls_share_one_computation(self):
+        """Test that concurrent calls with the same key run the computation once."""
+        executor, futures = self._run_concurrently('key', 8)
+        self.release.set()
+        results = [future.result(5) for future in futures]
+        executor.shutdown()
+
+        self.assertEqual(self.runs, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(SINGLE_FLIGHT_CALLS.value(group=self.id(), role='leader'), 1)
+        self.assertEqual(SINGLE_FLIGHT_CALLS.value(group=self.id(), role='coalesced'), 7)
+        self.assertEqual(self.flight.in_flight(), 0)
+
+    def test_distinct_keys_and_later_calls_are_not_coalesced(self):
+        """Test that only calls in flight at the same time with the same key are shared."""
+        self.release.set()
+        self.flight.do('a', self._slow_computation)
+        self.flight.do('a', self._slow_computation)
+        self.flight.do('b', self._slow_computation)
+        self.assertEqual(self.runs, 3)
+
+    def test_errors_are_shared(self):
+        """Test that the exception of the computation reaches every caller."""
+        def failing_computation():
+            self.release.wait(5)
+            raise ValidationError("boom")
+
+        executor = ThreadPoolExecutor(max_workers=3)
+        futures = [executor.submit(self.flight.do, 'key', failing_computation) for _ in range(3)]
+        time.sleep(0.05)
+        self.release.set()
+        for future in futures:
+            with self.assertRaises(ValidationError):
+                future.result(5)
+        executor.shutdown()
+
+    def test_coalesced_call_timeout(self):
+        """Test that coalesced calls stop waiting after their timeout."""
+        executor, futures = self._run_concurrently('key', 2, timeout=0.05)
+        done, _ = wait(futures, timeout=5, return_when=FIRST_COMPLETED)
+        with self.assertRaises(RequestTimeoutError):
+            done.pop().result()
+        self.release.set()
+        executor.shutdown()
+        self.assertEqual(SINGLE_FLIGHT_CALLS.value(group=self.id(), role='timeout'), 1)
+
+    def test_coalesced_call_waits_until_its_deadline(self):
+        """Test that within a request, coalesced calls wait until the request deadline, not `timeout`."""
+        def coalesced_call():
+            with patch('app.utils.query_deadline.QUERY_DEADLINE_GRACE', 0), request_deadline('vital_signs', 0.05):
+                return self.flight.do('key', self._slow_computation, timeout=30)
+
+        executor = ThreadPoolExecutor(max_workers=2)
+        leader = executor.submit(self.flight.do, 'key', self._slow_computation)
+        while self.flight.in_flight() == 0:
+            time.sleep(0.001)
+        started = time.monotonic()
+        with self.assertRaises(RequestTimeoutError):
+            executor.submit(coalesced_call).result(5)
+        self.assertLess(time.monotonic() - started, 1)
+        self.release.set()
+        self.assertEqual(leader.result(5), {'total': 1})
+        executor.shutdown()
+
+    def test_leader_disconnect_is_taken_over(self):
+        """Test that a coalesced call runs the computation again when the leader's client disconnects."""
+        leader_socket, client_socket = socket.socketpair()
+        self.addCleanup(leader_socket.close)
+        connection = MagicMock()
+        connection.cancel.side_effect = self.release.set
+
+        def computation():
+            # Query of the leader until its connection is cancelled, then of the coalesced call
+            self.runs += 1
+            deadline = current_deadline()
+            if self.runs == 1:
+                deadline.register_connection(connection)
+                self.release.wait(5)
+                raise QueryCancelledError("cancelled")
+            return {'total': self.runs}
+
+        def call(environ=None):
+            with request_deadline('vital_signs', environ=environ):
+                return self.flight.do('key', computation)
+
+        executor = ThreadPoolExecutor(max_workers=2)
+        leader = executor.submit(call, {'werkzeug.socket': leader_socket})
+        while self.flight.in_flight() == 0:
+            time.sleep(0.001)
+        follower = executor.submit(call)
+        while SINGLE_FLIGHT_CALLS.value(group=self.id(), role='coalesced') < 1:
+            time.sleep(0.001)
+
+        # The watchdog cancels the leader's query once its client is gone
+        client_socket.close()
+        WATCHDOG.check()
+        with self.assertRaises(QueryCancelledError):
+            leader.result(5)
+        self.assertEqual(follower.result(5), {'total': 2})
+        executor.shutdown()
+
+        connection.cancel.assert_called_once()
+        self.assertEqual(SINGLE_FLIGHT_CALLS.value(group=self.id(), role='takeover'), 1)
+        self.assertEqual(SINGLE_FLIGHT_CALLS.value(group=self.id(), role='leader'), 2)
+        self.assertEqual(self.flight.in_flight(), 0)
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
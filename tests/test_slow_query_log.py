@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the slow query log.
+
+This module contains tests for:
+1. Redaction of the patient IDs in the bound parameters
+2. Recording of the slow statements and their aggregation by table set
+3. Sampled capture of the EXPLAIN (ANALYZE, BUFFERS) plan, with the
+   patient IDs redacted from it
+4. The statement timing hooks of `app.db`
+5. The admin endpoint listing the top offenders
+"""
+
+# Import modules #
+#----------------#
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import create_engine, text
+
+# Import project modules #
+#------------------------#
+
+import app.db  # noqa: F401 (registers the statement timing hooks)
+from app.utils.jwt_handler import generate_token
+from app.utils.slow_query_log import SLOW_QUERY_LOG, SlowQueryLog, redact_parameters, statement_tables
+
+# Define test cases #
+#-------------------#
+
+class TestSlowQueryLog(unittest.TestCase):
+    """Test cases for the slow query log."""
+
+    def test_redact_parameters(self):
+        """Test that patient IDs are redacted by parameter name and by shape."""
+        parameters = {
+            'id_paciente_temp_1': '0000021561',
+            'id_patients': ['0000021561', '0000021562'],
+            'fecha_registro_temp_1': '2025-02-13 00:00:00',
+            'param_1': '0000021563',
+            'param_2': 5
+        }
+        self.assertEqual(redact_parameters(parameters), {
+            'id_paciente_temp_1': '<redacted>',
+            'id_patients': '<2 redacted>',
+            'fecha_registro_temp_1': '2025-02-13 00:00:00',
+            'param_1': '<redacted>',
+            'param_2': 5
+        })
+        self.assertEqual(redact_parameters(('0000021561', 'x')), ['<redacted>', 'x'])
+
+    def test_slow_statements_are_aggregated_by_table_set(self):
+        """Test that only slow statements are kept, ranked by table set."""
+        log = SlowQueryLog(threshold=0.1, explain_sample_rate=0, max_entries=10)
+        union = "SELECT 'temperatura' FROM temperatura WHERE x UNION ALL SELECT 'peso' FROM peso WHERE y"
+
+        self.assertIsNone(log.record(union, {}, 0.05))
+        log.record(union, {}, 0.3)
+        log.record(union, {}, 0.5)
+        log.record('SELECT * FROM monitor JOIN monitores_activos ON true', {}, 0.6)
+
+        self.assertEqual(statement_tables(union), ['peso', 'temperatura'])
+        by_total = log.top_offenders()
+        self.assertEqual([offender['tables'] for offender in by_total], [['peso', 'temperatura'], ['monitor', 'monitores_activos']])
+        self.assertEqual(by_total[0]['count'], 2)
+        self.assertEqual(by_total[0]['mean_ms'], 400.0)
+        self.assertEqual(log.top_offenders(order_by='max_ms', limit=1)[0]['tables'], ['monitor', 'monitores_activos'])
+        self.assertEqual(len(log.entries), 3)
+
+    def test_sampled_explain(self):
+        """Test that a sampled slow SELECT is re-run with EXPLAIN and its plan stored."""
+        log = SlowQueryLog(threshold=0, explain_sample_rate=1, max_entries=10)
+        engine = MagicMock()
+        engine.dialect.name = 'postgresql'
+        cursor = engine.raw_connection.return_value.cursor.return_value
+        cursor.fetchone.return_value = ([{'Plan': {'Node Type': 'Append'}}],)
+
+        entry = log.record('SELECT 1 FROM temperatura', {'id_paciente_temp_1': '0000021561'}, 1.0, engine)
+        log._explainer.shutdown(wait=True)
+
+        self.assertEqual(entry['plan'], [{'Plan': {'Node Type': 'Append'}}])
+        statement, parameters = cursor.execute.call_args[0]
+        self.assertTrue(statement.startswith('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT 1'))
+        self.assertEqual(parameters, {'id_paciente_temp_1': '0000021561'})
+        engine.raw_connection.return_value.rollback.assert_called_once()
+
+        # Statements other than SELECT are never run again
+        log = SlowQueryLog(threshold=0, explain_sample_rate=1, max_entries=10)
+        log.record('UPDATE temperatura SET valor_temp = 1', {}, 1.0, engine)
+        self.assertIsNone(log._explainer)
+
+    def test_logged_entries_hold_no_patient_id(self):
+        """Test that the patient IDs interpolated into the plan are redacted from the logged entry."""
+        log_file, log_path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(log_file)
+        self.addCleanup(os.remove, log_path)
+        log = SlowQueryLog(threshold=0, explain_sample_rate=1, max_entries=10, log_path=log_path)
+        engine = MagicMock()
+        engine.dialect.name = 'postgresql'
+        cursor = engine.raw_connection.return_value.cursor.return_value
+        cursor.fetchone.return_value = (json.dumps([{'Plan': {
+            'Node Type': 'Index Scan',
+            'Index Cond': "(id_paciente = ANY ('{0000021561,P-42}'::text[]))",
+            'Plans': [{'Node Type': 'Seq Scan', 'Filter': "((id_paciente)::text = '0000021562'::text)"}]
+        }}]),)
+
+        entry = log.record(
+            'SELECT 1 FROM temperatura WHERE id_paciente = ANY(%(id_patients)s) OR id_paciente = %(param_1)s',
+            {'id_patients': ['0000021561', 'P-42'], 'param_1': '0000021562'},
+            1.0,
+            engine
+        )
+        log._explainer.shutdown(wait=True)
+
+        with open(log_path, encoding='utf-8') as log_lines:
+            logged = log_lines.read()
+        self.assertIn('Index Scan', logged)
+        for logged_entry in (json.dumps(entry), logged):
+            for patient_id in ('0000021561', '0000021562', 'P-42'):
+                self.assertNotIn(patient_id, logged_entry)
+
+        # Patient IDs are redacted from the plan errors too
+        cursor.execute.side_effect = [None, Exception("invalid input: '0000021561'")]
+        log = SlowQueryLog(threshold=0, explain_sample_rate=1, max_entries=10)
+        entry = log.record('SELECT 1 FROM temperatura', {'id_paciente_1': '0000021561'}, 1.0, engine)
+        log._explainer.shutdown(wait=True)
+        self.assertEqual(entry['plan_error'], "invalid input: '<redacted>'")
+
+    def test_statements_are_timed(self):
+        """Test that the hooks of app.db record the statements above the threshold."""
+        engine = create_engine('sqlite://')
+        with patch.object(SLOW_QUERY_LOG, 'threshold', 0):
+            with engine.connect() as connection:
+                connection.execute(text('SELECT :id_paciente_1'), {'id_paciente_1': '0000021561'})
+                with self.assertRaises(Exception):
+                    connection.execute(text('SELECT * FROM missing_table'))
+                self.assertEqual(connection.info['statement_start_times'], [])
+
+        entry = next(entry for entry in reversed(SLOW_QUERY_LOG.entries) if entry['statement'] == 'SELECT ?')
+        self.assertEqual(entry['parameters'], ['<redacted>'])
+
+    def test_admin_endpoint(self):
+        """Test that the top offenders are listed for admins only."""
+        from main import create_app
+
+        client = create_app().test_client()
+        admin_headers = {'Authorization': f"Bearer {generate_token('admin', 'admin')}"}
+        medical_headers = {'Authorization': f"Bearer {generate_token('doctor', 'medical')}"}
+
+        response = client.get('/api/admin/slow_queries?limit=5&order_by=max_ms', headers=admin_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('offenders', response.get_json())
+        self.assertEqual(client.get('/api/admin/slow_queries', headers=medical_headers).status_code, 403)
+        self.assertEqual(
+            client.get('/api/admin/slow_queries?order_by=name', headers=admin_headers).status_code,
+            400
+        )
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
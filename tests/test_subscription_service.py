@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for live vital signs subscriptions.
+
+This module contains tests for:
+1. Fan-out of trigger notifications to the subscribers of a patient
+2. The Server-Sent Events stream and its watermark event IDs
+3. The polling fallback, run as one query for all subscribed patients
+4. Disconnection of subscribers falling too far behind
+5. The watermarks, read from the database, and the rows changed at them
+"""
+
+# Import modules #
+#----------------#
+
+import json
+import unittest
+from collections import namedtuple
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+# Import project modules #
+#------------------------#
+
+from app.constants.table_names import TEMPERATURA
+from app.models.patient_models import Temperatura
+from app.services.subscription_service import (
+    MAX_PENDING_NOTIFICATIONS,
+    ObservationBroker,
+    format_sse_event
+)
+from app.utils.watermark import decode_watermark
+
+# Define helper functions #
+#-------------------------#
+
+def temperature_row(patient_id, sequence, registered):
+    """Return a temperatura row as serialised by row_to_json."""
+    return {
+        'id_secuencia_temp': sequence,
+        'id_paciente_temp': patient_id,
+        'valor_temp': 36.5,
+        'escala_temp': 'ºC',
+        'fecha_medicion_temp': '2025-02-13T10:00:00',
+        'usuario_graba_temp': 'nurse',
+        'fecha_registro_temp': registered,
+        'fecha_modifica_temp': None
+    }
+
+def notification_payload(patient_id, sequence, registered):
+    """Return a NOTIFY payload of the observation triggers."""
+    return json.dumps({
+        'table': TEMPERATURA,
+        'id_patient': patient_id,
+        'row': temperature_row(patient_id, sequence, registered)
+    })
+
+WatermarkRow = namedtuple('WatermarkRow', 'source_table measurement_id changed_at')
+
+def parse_sse_event(event):
+    """Return the fields of a Server-Sent Event."""
+    fields = dict(line.split(': ', 1) for line in event.strip().split('\n'))
+    fields['data'] = json.loads(fields['data'])
+    return fields
+
+# Define test cases #
+#-------------------#
+
+class TestSubscriptionService(unittest.TestCase):
+    """Test cases for live vital signs subscriptions."""
+
+    def setUp(self):
+        self.broker = ObservationBroker({}, autostart=False)
+        # Watermarks are otherwise read from the database
+        self.initial_watermark = patch.object(
+            ObservationBroker, '_initial_watermark', return_value=(datetime(2025, 2, 13, 9, 0), set())
+        )
+        self.initial_watermark.start()
+        self.addCleanup(self.initial_watermark.stop)
+
+    def test_notifications_fan_out_by_patient(self):
+        """Test that a notification reaches every subscriber of its patient only."""
+        first = self.broker.subscribe('0000021561')
+        second = self.broker.subscribe('0000021561')
+        other = self.broker.subscribe('0000021562')
+
+        self.broker.handle_notification(notification_payload('0000021561', 1, '2025-02-13T10:05:00'))
+        self.broker.handle_notification(json.dumps({'table': 'usuario_hospwin', 'id_patient': '0000021561'}))
+        self.broker.handle_notification(notification_payload('0000021563', 2, '2025-02-13T10:05:00'))
+
+        bundle = first.get(0)
+        self.assertIs(second.get(0), bundle)
+        self.assertIsNone(first.get(0))
+        self.assertIsNone(other.get(0))
+        self.assertEqual(bundle['total'], 1)
+        self.assertEqual(bundle['entry'][0]['resource']['subject']['reference'], 'Patient/0000021561')
+
+    def test_stream(self):
+        """Test the handshake, the observation events and the unsubscription on close."""
+        subscription = self.broker.subscribe('0000021561')
+        stream = self.broker.stream(subscription, heartbeat_interval=0.01)
+
+        handshake = parse_sse_event(next(stream))
+        self.assertEqual(handshake['event'], 'handshake')
+        self.assertEqual(handshake['data']['type'], 'subscription-notification')
+        self.assertEqual(handshake['data']['entry'][0]['resource']['type'], 'handshake')
+
+        self.assertEqual(next(stream), ': keep-alive\n\n')
+
+        self.broker.handle_notification(notification_payload('0000021561', 1, '2099-02-13T10:05:00'))
+        event = parse_sse_event(next(stream))
+        self.assertEqual(event['event'], 'observation')
+        self.assertEqual(decode_watermark(event['id']), datetime(2099, 2, 13, 10, 5))
+        status, observation = [entry['resource'] for entry in event['data']['entry']]
+        self.assertEqual(status['eventsSinceSubscriptionStart'], 1)
+        self.assertEqual(observation['resourceType'], 'Observation')
+
+        stream.close()
+        self.assertTrue(subscription.closed.is_set())
+        self.assertEqual(self.broker._subscribers, {})
+
+    @patch('app.services.subscription_service.get_session_factory')
+    @patch('app.services.subscription_service.filter_data_consolidated')
+    def test_poll(self, mock_filter_data_consolidated, mock_get_session_factory):
+        """Test that the polling fallback runs one query and skips rows already sent."""
+        first = self.broker.subscribe('0000021561')
+        second = self.broker.subscribe('0000021562')
+        self.broker._watermarks['0000021561'] = datetime(2025, 2, 13, 10, 0)
+        self.broker._watermarks['0000021562'] = datetime(2025, 2, 13, 11, 0)
+
+        mock_filter_data_consolidated.return_value = {TEMPERATURA: [
+            Temperatura(id_paciente_temp='0000021561', fecha_registro_temp='2025-02-13T10:30:00'),
+            Temperatura(id_paciente_temp='0000021562', fecha_registro_temp='2025-02-13T10:30:00')
+        ]}
+        self.broker.poll()
+
+        mock_filter_data_consolidated.assert_called_once()
+        request_data = mock_filter_data_consolidated.call_args[0][1]
+        self.assertEqual(request_data['id_patients'], ['0000021561', '0000021562'])
+        self.assertEqual(request_data['since'], datetime(2025, 2, 13, 10, 0))
+        self.assertEqual(first.get(0)['total'], 1)
+        self.assertIsNone(second.get(0))
+        self.assertEqual(self.broker._watermarks['0000021561'], datetime(2025, 2, 13, 10, 30))
+
+    @patch('app.services.subscription_service.get_session_factory')
+    @patch('app.services.subscription_service.filter_data_consolidated')
+    def test_poll_sends_rows_at_watermark_once(self, mock_filter_data_consolidated, mock_get_session_factory):
+        """Test that rows committed later with the watermark's timestamp are sent, once."""
+        subscription = self.broker.subscribe('0000021561')
+        self.broker._watermarks['0000021561'] = datetime(2025, 2, 13, 10, 30)
+        self.broker._sent_at_watermark['0000021561'] = {(TEMPERATURA, '1')}
+
+        mock_filter_data_consolidated.return_value = {TEMPERATURA: [
+            Temperatura(id_secuencia_temp=sequence, id_paciente_temp='0000021561', fecha_registro_temp='2025-02-13T10:30:00')
+            for sequence in (1, 2)
+        ]}
+        self.broker.poll()
+        bundle = subscription.get(0)
+        self.assertEqual([entry['resource']['id'] for entry in bundle['entry']], ['temp-2'])
+        self.assertEqual(self.broker._sent_at_watermark['0000021561'], {(TEMPERATURA, '1'), (TEMPERATURA, '2')})
+
+        self.broker.poll()
+        self.assertIsNone(subscription.get(0))
+
+    @patch('app.services.subscription_service.get_session_factory')
+    @patch('app.services.subscription_service.filter_data_consolidated')
+    def test_announced_row_is_not_filtered(self, mock_filter_data_consolidated, mock_get_session_factory):
+        """Test that a row announced by its primary key is sent even if older than the watermark."""
+        subscription = self.broker.subscribe('0000021561')
+        self.broker._watermarks['0000021561'] = datetime(2025, 2, 13, 11, 0)
+
+        mock_filter_data_consolidated.return_value = {TEMPERATURA: [
+            Temperatura(id_secuencia_temp=7, id_paciente_temp='0000021561', fecha_registro_temp='2025-02-13T10:30:00')
+        ]}
+        self.broker.handle_notification(json.dumps({'table': TEMPERATURA, 'id_patient': '0000021561', 'id': 7}))
+
+        request_data = mock_filter_data_consolidated.call_args[0][1]
+        self.assertEqual(request_data['measurement_ids'], {TEMPERATURA: [7]})
+        self.assertNotIn('since', request_data)
+        self.assertEqual(subscription.get(0)['entry'][0]['resource']['id'], 'temp-7')
+        self.assertEqual(self.broker._watermarks['0000021561'], datetime(2025, 2, 13, 11, 0))
+
+    @patch('app.services.subscription_service.get_session_factory')
+    def test_initial_watermark_from_database(self, mock_get_session_factory):
+        """Test that a new patient's watermark is its latest change time in the database."""
+        session = mock_get_session_factory.return_value.return_value
+        session.execute.return_value.fetchall.return_value = [
+            WatermarkRow(TEMPERATURA, '3', datetime(2025, 2, 13, 10, 5)),
+            WatermarkRow(TEMPERATURA, '4', datetime(2025, 2, 13, 10, 5)),
+            WatermarkRow('glucosa', '8', datetime(2025, 2, 13, 8, 0))
+        ]
+        self.initial_watermark.stop()
+        watermark, sent_at_watermark = self.broker._initial_watermark('0000021561')
+        self.assertEqual(watermark, datetime(2025, 2, 13, 10, 5))
+        self.assertEqual(sent_at_watermark, {(TEMPERATURA, '3'), (TEMPERATURA, '4')})
+        sql = str(session.execute.call_args[0][0])
+        self.assertEqual(sql.count('UNION ALL'), 8)
+        self.assertIn('max(greatest(temperatura.fecha_registro_temp, temperatura.fecha_modifica_temp))', sql)
+
+        # The database's clock is used for patients without rows
+        session.execute.return_value.fetchall.return_value = []
+        session.execute.return_value.scalar.return_value = datetime(2025, 2, 13, 12, 0)
+        self.assertEqual(self.broker._initial_watermark('0000021561'), (datetime(2025, 2, 13, 12, 0), set()))
+
+    def test_slow_subscriber_is_disconnected(self):
+        """Test that a subscriber with too many pending notifications is closed."""
+        subscription = self.broker.subscribe('0000021561')
+        for sequence in range(MAX_PENDING_NOTIFICATIONS + 1):
+            self.broker.handle_notification(notification_payload('0000021561', sequence, '2025-02-13T10:05:00'))
+        self.assertTrue(subscription.closed.is_set())
+
+    def test_format_sse_event(self):
+        """Test the Server-Sent Event format."""
+        self.assertEqual(
+            format_sse_event('observation', {'a': 1}, 'token'),
+            'id: token\nevent: observation\ndata: {"a": 1}\n\n'
+        )
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
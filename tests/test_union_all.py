@@ -14,12 +14,13 @@ which implements a UNION ALL approach for querying multiple tables.
 from datetime import datetime
 import unittest
 from sqlalchemy import Column, Integer, String, DateTime
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, NonCallableMagicMock, patch
 
 # Import project modules #
 #------------------------#
 
-from app.db import filter_data_consolidated, BaseModel
+from app.db import filter_data_consolidated, get_row_class, BaseModel
+from app.utils.instrumentation import STAGE_HYDRATION, stage
 
 # Define test models #
 #--------------------#
@@ -66,8 +67,8 @@ class TestUnionAll(unittest.TestCase):
     
     def setUp(self):
         """Set up test environment."""
-        # Create a mock session
-        self.session = MagicMock()
+        # Create a mock session (not callable, so it is not taken for a session factory)
+        self.session = NonCallableMagicMock()
         
         # Create model registry
         self.model_registry = {
@@ -107,19 +108,12 @@ class TestUnionAll(unittest.TestCase):
             'fecha_registro': datetime(2023, 1, 15, 14, 0, 0)
         }
         
-        self.mock_result_proxy.__iter__.return_value = [row_a, row_b]
+        self.mock_result_proxy.fetchall.return_value = [row_a, row_b]
     
-    @patch('app.db.parse_dt_string')
     @patch('app.db.union_all')
     @patch('app.db.select')
-    def test_filter_data_consolidated(self, mock_select, mock_union_all, mock_parse_dt_string):
+    def test_filter_data_consolidated(self, mock_select, mock_union_all):
         """Test the filter_data_consolidated function."""
-        # Configure parse_dt_string mock to return valid datetime objects
-        mock_parse_dt_string.side_effect = [
-            datetime(2023, 1, 1, 0, 0, 0),  # min_date
-            datetime(2023, 1, 31, 23, 59, 0)  # max_date
-        ]
-        
         # Configure select mock
         mock_select.return_value.select_from.return_value.where.return_value.where.return_value.where.return_value = "SELECT QUERY"
         
@@ -144,14 +138,64 @@ class TestUnionAll(unittest.TestCase):
         self.assertIn('test_table_a', results)
         self.assertIn('test_table_b', results)
         
-        # Check instance types
-        self.assertIsInstance(results['test_table_a'][0], TestModelA)
-        self.assertIsInstance(results['test_table_b'][0], TestModelB)
+        # Check rows are read-only rows of each model
+        self.assertIsInstance(results['test_table_a'][0], get_row_class(TestModelA))
+        self.assertIsInstance(results['test_table_b'][0], get_row_class(TestModelB))
+        self.assertFalse(hasattr(results['test_table_a'][0], '__dict__'))
+        self.assertEqual(results['test_table_a'][0].get_date_field(), TestModelA.recorded_at)
         
         # Check values were correctly transferred
         self.assertEqual(results['test_table_a'][0].value, 42)
         self.assertEqual(results['test_table_b'][0].measurement, 120)
 
+    @patch('app.db.build_consolidated_query', return_value="UNION ALL QUERY")
+    def test_hydration_is_timed_per_table(self, mock_build_query):
+        """Test that the hydration stage is entered once per table, not once per row."""
+        row_a, row_b = self.mock_result_proxy.fetchall.return_value
+        self.mock_result_proxy.fetchall.return_value = [row_a, row_b, row_a, row_a]
+
+        with patch('app.db.stage', wraps=stage) as mock_stage:
+            results = filter_data_consolidated(
+                self.session,
+                self.request_data,
+                ['test_table_a', 'test_table_b'],
+                self.model_registry
+            )
+
+        self.assertEqual({table: len(rows) for table, rows in results.items()}, {'test_table_a': 3, 'test_table_b': 1})
+        hydration_calls = [call.args for call in mock_stage.call_args_list if call.args[0] == STAGE_HYDRATION]
+        self.assertEqual(hydration_calls, [(STAGE_HYDRATION, 'test_table_a'), (STAGE_HYDRATION, 'test_table_b')])
+
+    def test_rows_convert_like_models(self):
+        """Test that read-only rows build the same HL7 message as the model."""
+        from app.db import hydrate_model
+        from app.models.patient_models import TABLE_MODEL_MAP
+
+        model_class = TABLE_MODEL_MAP['saturacion_oxigeno']
+        data = {
+            'id_secuencia_so': 7,
+            'id_paciente_so': '0000021561',
+            'valor_so': 97.0,
+            'fecha_medicion_so': datetime(2023, 1, 15, 12, 0, 0),
+            'usuario_graba_so': 'nurse',
+            'fecha_registro_so': datetime(2023, 1, 15, 12, 5, 0),
+            'unknown_key': 'ignored'
+        }
+        model_instance = model_class(**{key: value for key, value in data.items() if key != 'unknown_key'})
+        row = hydrate_model(model_class, data)
+
+        # The MSH segment holds the time the message was built
+        self.assertEqual(
+            row.to_hl7_v2().split('\r')[1:],
+            model_instance.to_hl7_v2().split('\r')[1:]
+        )
+        self.assertEqual(row.get_change_time(), model_instance.get_change_time())
+        self.assertIsNone(row.observaciones_so)
+
+        # Float columns decoded from JSON as integers are floats again
+        row = hydrate_model(model_class, {**data, 'valor_so': 97})
+        self.assertEqual(repr(row.valor_so), '97.0')
+
 # Main execution #
 #----------------#
 
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for multi-patient vital signs retrieval.
+
+This module contains tests for:
+1. Validation of the patient ID list
+2. The set-based consolidated query
+3. Splitting the results into per-patient Bundles
+"""
+
+# Import modules #
+#----------------#
+
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+# Import project modules #
+#------------------------#
+
+from app.constants.error_messages import INVALID_ID_FORMAT_ERROR, INVALID_ID_LIST_ERROR, INVALID_ID_TYPE_ERROR
+from app.constants.table_names import TEMPERATURA
+from app.constants.vital_signs_tables import VITAL_SIGNS_TABLES
+from app.db import build_consolidated_query
+from app.models.patient_models import TABLE_MODEL_MAP, Temperatura
+from app.services.patient_service import PatientService
+from app.services.vital_signs_service import VitalSignsService
+from app.validators.request_validator import MAX_BATCH_PATIENTS, BatchPatientQuery, RequestValidator
+
+# Define test cases #
+#-------------------#
+
+class TestVitalSignsBatch(unittest.TestCase):
+    """Test cases for multi-patient vital signs retrieval."""
+
+    def test_validate_many(self):
+        """Test that the ID list is validated and deduplicated in one pass."""
+        query, error = RequestValidator.validate_many(
+            ['0000021561', '0000021562', '0000021561'], '2025-02-13', '2025-02-14'
+        )
+        self.assertIsNone(error)
+        self.assertIsInstance(query, BatchPatientQuery)
+        self.assertEqual(query.patient_ids, ('0000021561', '0000021562'))
+
+    def test_validate_many_errors(self):
+        """Test the errors reported for invalid ID lists."""
+        for patient_ids in [None, [], '0000021561']:
+            _, error = RequestValidator.validate_many(patient_ids, '2025-02-13', '2025-02-14')
+            self.assertEqual(error, {'field': 'id_patients', 'error': INVALID_ID_LIST_ERROR})
+
+        _, error = RequestValidator.validate_many(['0000021561', '123', 5], '2025-02-13', '2025-02-14')
+        self.assertEqual(error, {'field': 'id_patients[1]', 'error': INVALID_ID_FORMAT_ERROR})
+
+        _, error = RequestValidator.validate_many(['0000021561', 5], '2025-02-13', '2025-02-14')
+        self.assertEqual(error, {'field': 'id_patients[1]', 'error': INVALID_ID_TYPE_ERROR})
+
+        _, error = RequestValidator.validate_many(['0000021561'] * (MAX_BATCH_PATIENTS + 1), '2025-02-13', '2025-02-14')
+        self.assertEqual(error['field'], 'id_patients')
+
+        _, error = RequestValidator.validate_many(['0000021561'], '2025-02-14', '2025-02-13')
+        self.assertEqual(error['field'], 'min_date')
+
+    def test_set_based_query(self):
+        """Test that every branch filters on the same array parameter."""
+        query, _ = RequestValidator.validate_many(['0000021561', '0000021562'], '2025-02-13', '2025-02-14')
+        compiled = build_consolidated_query(
+            query.to_request_data(), VITAL_SIGNS_TABLES, TABLE_MODEL_MAP
+        ).compile(dialect=postgresql.dialect())
+
+        self.assertEqual(str(compiled).count('= ANY (%(id_patients)s'), len(VITAL_SIGNS_TABLES))
+        self.assertEqual(compiled.params['id_patients'], ['0000021561', '0000021562'])
+
+    @patch('app.services.vital_signs_service.filter_data_consolidated')
+    def test_per_patient_bundles(self, mock_filter_data_consolidated):
+        """Test that the rows are split into one Bundle per requested patient."""
+        def temperature(patient_id, sequence):
+            return Temperatura(
+                id_secuencia_temp=sequence,
+                id_paciente_temp=patient_id,
+                valor_temp=36.5,
+                escala_temp='ºC',
+                fecha_medicion_temp=datetime(2025, 2, 13, 10, 0),
+                usuario_graba_temp='nurse',
+                fecha_registro_temp=datetime(2025, 2, 13, 10, 5)
+            )
+
+        mock_filter_data_consolidated.return_value = {
+            TEMPERATURA: [temperature('0000021562', 1), temperature('0000021561', 2), temperature('0000021562', 3)]
+        }
+        service = VitalSignsService(PatientService(MagicMock()))
+        query, _ = RequestValidator.validate_many(
+            ['0000021561', '0000021562', '0000021563'], '2025-02-13', '2025-02-14'
+        )
+
+        result = service.retrieve_vital_signs_batch(query)
+
+        mock_filter_data_consolidated.assert_called_once()
+        self.assertEqual(result['type'], 'batch-response')
+        bundles = [entry['resource'] for entry in result['entry']]
+        self.assertEqual([bundle['total'] for bundle in bundles], [1, 2, 0])
+        self.assertTrue(bundles[0]['link'][0]['url'].startswith('vital_signs/0000021561/'))
+        for bundle, patient_id in zip(bundles, query.patient_ids):
+            for entry in bundle['entry']:
+                self.assertEqual(entry['resource']['subject']['reference'], f'Patient/{patient_id}')
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the Arrow/Parquet vital signs export.
+
+This module contains tests for:
+1. The export query: one typed branch per table and blood pressure component
+2. Record batches built from the rows of the cursor, in both formats
+3. The export endpoint, with and without the optional pyarrow dependency
+"""
+
+# Import modules #
+#----------------#
+
+import importlib.util
+import unittest
+from datetime import datetime
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+# Import project modules #
+#------------------------#
+
+import app.models.patient_models  # noqa: F401 (registers the models)
+from app.constants.vital_signs_tables import VITAL_SIGNS_VALUE_FIELDS
+from app.exceptions import ExportUnavailableError
+from app.services.vitals_export_service import VitalsExportService
+from app.utils.jwt_handler import generate_token
+from app.validators.request_validator import RequestValidator
+
+# Define test cases #
+#-------------------#
+
+class TestVitalsExport(unittest.TestCase):
+    """Test cases for the vital signs export."""
+
+    def setUp(self):
+        self.query, _ = RequestValidator.validate_many(['0000021561', '0000021562'], '2025-02-13', '2025-02-20')
+        self.rows = [
+            ('presion_arterial', 'systolic', '8480-6', 'mmHg', '0000021561', 1, 120.0, datetime(2025, 2, 13, 10), datetime(2025, 2, 13, 10, 5), None),
+            ('presion_arterial', 'diastolic', '8462-4', 'mmHg', '0000021561', 1, 80.0, datetime(2025, 2, 13, 10), datetime(2025, 2, 13, 10, 5), None),
+            ('temperatura', None, '8310-5', 'ºC', '0000021562', 7, 36.6, datetime(2025, 2, 14, 8), datetime(2025, 2, 14, 8, 2), datetime(2025, 2, 14, 9)),
+            ('temperatura', None, '8310-5', 'ºF', '0000021562', 8, 98.24, datetime(2025, 2, 14, 9), datetime(2025, 2, 14, 9, 2), None)
+        ]
+
+    def export_rows(self, export_format):
+        """Export the test rows through a session returning them in one chunk."""
+        session = MagicMock()
+        session.execute.return_value.partitions.return_value = [self.rows]
+        return VitalsExportService(session).export(self.query, export_format)
+
+    def test_export_query(self):
+        """Test that every table is read with the same typed columns in a single query."""
+        sql = str(VitalsExportService(None).build_export_query(self.query).compile(dialect=postgresql.dialect()))
+        self.assertEqual(sql.count('UNION ALL') + 1, sum(len(fields) for fields in VITAL_SIGNS_VALUE_FIELDS.values()))
+        self.assertIn('presion_arterial.sistolica_pa AS FLOAT', sql)
+        self.assertIn('= ANY (%(id_patients)s::VARCHAR[])', sql)
+        self.assertNotIn('row_to_json', sql)
+        self.assertTrue(sql.endswith('ORDER BY source_table, patient_id, measured_at'))
+
+    def test_export_query_codes_and_units(self):
+        """Test that each blood pressure component has its own LOINC code and each row its recorded unit."""
+        sql = str(VitalsExportService(None).build_export_query(self.query).compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={'literal_binds': True}
+        ))
+        self.assertIn("'systolic' AS component, '8480-6' AS loinc_code", sql)
+        self.assertIn("'diastolic' AS component, '8462-4' AS loinc_code", sql)
+        self.assertNotIn('85354-9', sql)
+        self.assertIn("coalesce(temperatura.escala_temp, 'Cel') AS VARCHAR) AS unit", sql)
+        self.assertIn("coalesce(glucosa.escala, 'mg/dL') AS VARCHAR) AS unit", sql)
+        self.assertIn("CAST('/min' AS VARCHAR) AS unit", sql)
+
+    def test_export_requires_pyarrow(self):
+        """Test that the export is reported unavailable without pyarrow."""
+        with patch('app.services.vitals_export_service.pyarrow_installed', False):
+            with self.assertRaises(ExportUnavailableError):
+                self.export_rows('arrow')
+
+            from main import create_app
+            client = create_app().test_client()
+            headers = {'Authorization': f"Bearer {generate_token('doctor', 'medical')}"}
+            body = {'id_patients': ['0000021561'], 'date_range': {'min_date': '2025-02-13', 'max_date': '2025-02-20'}}
+            self.assertEqual(client.post('/api/vital_signs/export', json=dict(body, format='csv'), headers=headers).status_code, 400)
+            response = client.post('/api/vital_signs/export', json=body, headers=headers)
+            self.assertEqual(response.status_code, 501)
+            self.assertEqual(response.get_json()['field'], 'format')
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_arrow_stream(self):
+        """Test that each table is one record batch of typed columns with its LOINC code and unit."""
+        import pyarrow as pa
+
+        batches = list(pa.ipc.open_stream(self.export_rows('arrow')))
+        self.assertEqual([batch.num_rows for batch in batches], [2, 2])
+
+        blood_pressure = batches[0].to_pydict()
+        self.assertEqual(blood_pressure['component'], ['systolic', 'diastolic'])
+        self.assertEqual(blood_pressure['value'], [120.0, 80.0])
+        self.assertEqual(blood_pressure['loinc_code'], ['8480-6', '8462-4'])
+        self.assertEqual(blood_pressure['unit'], ['mmHg', 'mmHg'])
+        self.assertEqual(batches[0].schema.field('measured_at').type, pa.timestamp('us'))
+
+        temperature = batches[1].to_pydict()
+        self.assertEqual(temperature['loinc_code'], ['8310-5', '8310-5'])
+        self.assertEqual(temperature['unit'], ['ºC', 'ºF'])
+        self.assertEqual(temperature['modified_at'], [datetime(2025, 2, 14, 9), None])
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_parquet_file(self):
+        """Test that each table is one row group of the Parquet file."""
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(BytesIO(self.export_rows('parquet')))
+        self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+        temperature = parquet_file.read_row_group(1, use_threads=False).to_pydict()
+        self.assertEqual(temperature['measurement'], ['TEMPERATURE', 'TEMPERATURE'])
+        self.assertEqual(temperature['patient_id'], ['0000021562', '0000021562'])
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
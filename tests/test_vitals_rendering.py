@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the SQL engine of the vital signs FHIR rendering.
+
+This module contains tests for:
+1. The rendering query, building each Observation with `json_build_object`
+2. The Bundle streamed from the rendered Observations, without parsing them
+3. Conformance with the Python engine, on a PostgreSQL database (skipped
+   if the database of `DATABASE_CREDENTIALS` cannot be reached)
+"""
+
+# Import modules #
+#----------------#
+
+import json
+import unittest
+from collections import namedtuple
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+# Import project modules #
+#------------------------#
+
+from app.config import DATABASE_CREDENTIALS, QUERY_BUDGETS
+from app.constants.table_names import CONSTANTES, PRESION_ARTERIAL, TEMPERATURA
+from app.constants.vital_signs_tables import VITAL_SIGNS_TABLES
+from app.db import MODEL_REGISTRY, Base
+from app.models.patient_models import (
+    Constantes,
+    FrecuenciaCardiaca,
+    FrecuenciaRespiratoria,
+    Glucosa,
+    Peso,
+    PresionArterial,
+    SaturacionOxigeno,
+    Talla,
+    Temperatura
+)
+from app.services.patient_service import PatientService
+from app.services.vital_signs_service import VitalSignsService
+from app.services.vitals_rendering_service import VitalsRenderingService, rendered_bundle_chunks
+from app.utils.jwt_handler import generate_token
+from app.utils.query_budget import assert_max_statements
+from app.utils.query_deadline import request_deadline
+from app.utils.watermark import WATERMARK_TAG_SYSTEM, encode_watermark
+from app.validators.request_validator import RequestValidator
+
+# Define helper objects #
+#-----------------------#
+
+RenderedRow = namedtuple('RenderedRow', 'table_index source_table measurement_id resource changed_at')
+
+def _normalised(bundle):
+    """Return a Bundle with its integral numbers as floats (Postgres writes 128.0 as 128)."""
+    return json.loads(json.dumps(bundle), parse_int=float)
+
+# Define test cases #
+#-------------------#
+
+class TestVitalsRendering(unittest.TestCase):
+    """Test cases for the vital signs Observations rendered by the database."""
+
+    def setUp(self):
+        self.query, _ = RequestValidator.validate('0000021561', '2025-02-13', '2025-02-20')
+
+    def test_rendering_query(self):
+        """Test that each table renders its Observations with json_build_object, in a single query."""
+        rendering_query = VitalsRenderingService(None).build_rendering_query(
+            self.query, [TEMPERATURA, PRESION_ARTERIAL, CONSTANTES]
+        )
+        sql = str(rendering_query.compile(dialect=postgresql.dialect()))
+
+        self.assertEqual(sql.count('UNION ALL'), 2)
+        self.assertNotIn('row_to_json', sql)
+        self.assertNotIn('jsonb', sql.lower())
+        self.assertIn('CAST(json_build_object(', sql)
+        self.assertIn('concat(%(concat_1)s, temperatura.id_secuencia_temp)', sql)
+        self.assertIn('CAST(CAST(temperatura.valor_temp AS FLOAT) AS TEXT)', sql)
+        self.assertIn('CASE WHEN (coalesce(temperatura.escala_temp', sql)
+        self.assertIn('CAST(presion_arterial.sistolica_pa AS FLOAT)', sql)
+        self.assertTrue(sql.endswith('ORDER BY table_index, measurement_id'))
+
+        # The constant LOINC block is sent as a single JSON literal
+        params = rendering_query.compile(dialect=postgresql.dialect()).params
+        self.assertIn(
+            '{"coding": [{"system": "http://loinc.org", "code": "8310-5", "display": "Body temperature"}]}',
+            params.values()
+        )
+
+    def test_rendered_bundle(self):
+        """Test that the rendered Observations are streamed into the Bundle as they are."""
+        resources = ['{"resourceType" : "Observation", "id" : "temp-%d"}' % index for index in range(1, 6)]
+        chunks = list(rendered_bundle_chunks(resources, datetime(2025, 2, 14, 9, 30), chunk_size=2))
+        self.assertEqual(len(chunks), 5)
+        self.assertIn(resources[4], chunks[3])
+
+        bundle = json.loads(''.join(chunks))
+        self.assertEqual(list(bundle), ['resourceType', 'type', 'total', 'entry', 'meta'])
+        self.assertEqual(bundle['total'], 5)
+        self.assertEqual([entry['resource']['id'] for entry in bundle['entry']], [f'temp-{index}' for index in range(1, 6)])
+        self.assertEqual(bundle['meta']['tag'][0]['system'], WATERMARK_TAG_SYSTEM)
+
+        empty_bundle = json.loads(''.join(rendered_bundle_chunks([])))
+        self.assertEqual(empty_bundle, {'resourceType': 'Bundle', 'type': 'searchset', 'total': 0, 'entry': []})
+
+    def test_render_vital_signs(self):
+        """Test that the watermark is the latest change of the rendered rows."""
+        session = MagicMock()
+        session.execute.return_value.fetchall.return_value = [
+            RenderedRow(1, TEMPERATURA, 1, '{"id": "temp-1"}', datetime(2025, 2, 14, 9, 30)),
+            RenderedRow(5, CONSTANTES, 1, '{"id": "vitals-1"}', None)
+        ]
+        bundle = json.loads(''.join(VitalsRenderingService(PatientService(session)).render_vital_signs(self.query)))
+        self.assertEqual(bundle['total'], 2)
+        self.assertEqual(bundle['meta']['tag'][0]['code'], encode_watermark(datetime(2025, 2, 14, 9, 30)))
+
+    def test_endpoint_streams_rendered_bundle(self):
+        """Test that the vital signs endpoint streams the rendered Bundle with the SQL engine."""
+        from main import create_app
+
+        client = create_app().test_client()
+        headers = {'Authorization': f"Bearer {generate_token('doctor', 'medical')}"}
+        chunks = list(rendered_bundle_chunks(['{"resourceType" : "Observation", "id" : "temp-1"}']))
+        with patch('app.api.vital_signs_api.FHIR_RENDERING_ENGINE', 'sql'), \
+                patch('app.api.vital_signs_api.request_session'), \
+                patch.object(VitalsRenderingService, 'render_vital_signs', return_value=iter(chunks)) as render:
+            response = client.get('/api/vital_signs/0000021561/2025-02-13/2025-02-20?_downsample=200', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.get_json()['entry'][0]['resource']['id'], 'temp-1')
+        self.assertEqual(render.call_args[0][0].downsample, 200)
+
+
+class TestVitalsRenderingConformance(unittest.TestCase):
+    """Test that both engines render the same Bundles, on a PostgreSQL database."""
+
+    schema = 'fhir_rendering_conformance'
+
+    @classmethod
+    def setUpClass(cls):
+        credentials = DATABASE_CREDENTIALS
+        url = (
+            f"postgresql://{credentials['username']}:{credentials['password']}@"
+            f"{credentials['host']}:{credentials['port']}/{credentials['database_name']}"
+        )
+        # Tables are created in a schema of their own, dropped afterwards
+        cls.engine = create_engine(url, connect_args={'options': f'-csearch_path={cls.schema}'})
+        try:
+            with cls.engine.begin() as connection:
+                connection.execute(text(f'DROP SCHEMA IF EXISTS {cls.schema} CASCADE'))
+                connection.execute(text(f'CREATE SCHEMA {cls.schema}'))
+        except OperationalError:
+            cls.engine.dispose()
+            raise unittest.SkipTest('PostgreSQL database is not available')
+
+        tables = [MODEL_REGISTRY[table_name].__table__ for table_name in VITAL_SIGNS_TABLES]
+        Base.metadata.create_all(cls.engine, tables=tables)
+        cls.Session = sessionmaker(bind=cls.engine)
+
+        patient_id = '0000021561'
+        recorded = {'usuario_graba': 'nurse', 'fecha_registro': datetime(2025, 2, 14, 8, 5)}
+        session = cls.Session()
+        session.add_all([
+            SaturacionOxigeno(
+                id_secuencia_so=2, id_paciente_so=patient_id, valor_so=97.0, fecha_medicion_so=datetime(2025, 2, 14, 8),
+                usuario_graba_so='nurse', fecha_registro_so=datetime(2025, 2, 14, 8, 5)
+            ),
+            SaturacionOxigeno(
+                id_secuencia_so=1, id_paciente_so=patient_id, valor_so=94.5, fecha_medicion_so=datetime(2025, 2, 14, 9),
+                usuario_graba_so='nurse', fecha_registro_so=datetime(2025, 2, 14, 9, 5),
+                usuario_modifica_so='doctor', fecha_modifica_so=datetime(2025, 2, 15, 10)
+            ),
+            Temperatura(
+                id_secuencia_temp=1, id_paciente_temp=patient_id, valor_temp=36.6, escala_temp='ºC',
+                fecha_medicion_temp=datetime(2025, 2, 14, 8), usuario_graba_temp='nurse',
+                fecha_registro_temp=datetime(2025, 2, 14, 8, 5), observaciones_temp='Axillary'
+            ),
+            Temperatura(
+                id_secuencia_temp=2, id_paciente_temp=patient_id, valor_temp=98.24, escala_temp='ºF',
+                fecha_medicion_temp=datetime(2025, 2, 14, 9), usuario_graba_temp='nurse',
+                fecha_registro_temp=datetime(2025, 2, 14, 9, 5)
+            ),
+            PresionArterial(
+                id_secuencia_pa=1, id_paciente_pa=patient_id, sistolica_pa=128, diastolica_pa=82,
+                fecha_medicion_pa=datetime(2025, 2, 14, 8), usuario_graba_pa='nurse',
+                fecha_registro_pa=datetime(2025, 2, 14, 8, 5)
+            ),
+            FrecuenciaCardiaca(
+                id_secuencia_fc=1, id_paciente_fc=patient_id, valor_fc=72.0, fecha_medicion_fc=datetime(2025, 2, 14, 8),
+                usuario_graba_fc='nurse', fecha_registro_fc=datetime(2025, 2, 14, 8, 5)
+            ),
+            FrecuenciaRespiratoria(
+                id_secuencia_fr=1, id_paciente_fr=patient_id, valor_fr=0.1 + 0.2, fecha_medicion_fr=datetime(2025, 2, 14, 8),
+                usuario_graba_fr='nurse', fecha_registro_fr=datetime(2025, 2, 14, 8, 5)
+            ),
+            Constantes(
+                id_constantes=1, id_secuencia_temp=1, id_secuencia_pa=1, id_secuencia_fc=1, id_secuencia_fr=1,
+                id_secuencia_so=2, id_paciente=patient_id, fecha_medicion=datetime(2025, 2, 14, 8)
+            ),
+            Glucosa(
+                id_secuencia=1, id_paciente=patient_id, valor=92.0, escala='mg/dL',
+                fecha_medicion=datetime(2025, 2, 14, 8), hemoglob_glucosilada=5.4, **recorded
+            ),
+            Glucosa(id_secuencia=2, id_paciente=patient_id, valor=5.1, escala='mmol/L', fecha_medicion=datetime(2025, 2, 14, 9), **recorded),
+            Peso(id_secuencia=1, id_paciente=patient_id, valor=70.25, imc=22.9, escala='kg', fecha_medicion=datetime(2025, 2, 14, 8), **recorded),
+            Talla(id_secuencia=1, id_paciente=patient_id, valor=172.0, fecha_medicion=datetime(2025, 2, 14, 8), **recorded),
+            # Another patient, and a row outside of the date range
+            FrecuenciaCardiaca(
+                id_secuencia_fc=2, id_paciente_fc='0000021562', valor_fc=80.0, fecha_medicion_fc=datetime(2025, 2, 14, 8),
+                usuario_graba_fc='nurse', fecha_registro_fc=datetime(2025, 2, 14, 8, 5)
+            ),
+            FrecuenciaCardiaca(
+                id_secuencia_fc=3, id_paciente_fc=patient_id, valor_fc=64.0, fecha_medicion_fc=datetime(2025, 3, 1, 8),
+                usuario_graba_fc='nurse', fecha_registro_fc=datetime(2025, 3, 1, 8, 5)
+            )
+        ])
+        session.commit()
+        session.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        with cls.engine.begin() as connection:
+            connection.execute(text(f'DROP SCHEMA IF EXISTS {cls.schema} CASCADE'))
+        cls.engine.dispose()
+
+    def setUp(self):
+        self.session = self.Session()
+
+    def tearDown(self):
+        self.session.close()
+
+    def assert_same_bundles(self, query):
+        """Render the Bundle of a request with both engines and compare them."""
+        patient_service = PatientService(self.session)
+        python_bundle = VitalSignsService(patient_service)._retrieve_vital_signs(query, VITAL_SIGNS_TABLES)
+        sql_bundle = json.loads(''.join(VitalsRenderingService(patient_service).render_vital_signs(query)))
+
+        self.assertEqual(list(sql_bundle), list(python_bundle))
+        self.assertEqual(sql_bundle['total'], python_bundle['total'])
+        self.assertEqual(sql_bundle.get('meta'), python_bundle.get('meta'))
+        # Same Observations, IDs included, in the same order and with their keys in the same order
+        for sql_entry, python_entry in zip(_normalised(sql_bundle)['entry'], _normalised(python_bundle)['entry']):
+            self.assertEqual(sql_entry, python_entry)
+            self.assertEqual(list(sql_entry['resource']), list(python_entry['resource']))
+        return sql_bundle
+
+    def test_same_bundle(self):
+        """Test that both engines render the same Observations and watermark."""
+        bundle = self.assert_same_bundles(self.query_for())
+        self.assertEqual(bundle['total'], 12)
+
+        # Observations are ordered by table, then by primary key
+        ids = [entry['resource']['id'] for entry in bundle['entry']]
+        self.assertEqual(ids[:4], ['oxsat-1', 'oxsat-2', 'temp-1', 'temp-2'])
+
+        # Integral values are written as Python writes floats
+        values = {entry['resource']['id']: entry['resource'].get('valueString') for entry in bundle['entry']}
+        self.assertEqual((values['hr-1'], values['oxsat-2'], values['temp-1']), ('72.0', '97.0', '36.6'))
+
+    def test_same_incremental_bundle(self):
+        """Test that both engines render the same Observations changed from a watermark on."""
+        bundle = self.assert_same_bundles(self.query_for(since=datetime(2025, 2, 14, 9).isoformat()))
+        self.assertEqual(bundle['total'], 2)
+
+    def test_incremental_bundle_keeps_ids(self):
+        """Test that rows changed at the watermark are sent again, with the IDs of the full Bundle."""
+        full_bundle = self.assert_same_bundles(self.query_for())
+        full_resources = {entry['resource']['id']: entry['resource'] for entry in full_bundle['entry']}
+
+        bundle = self.assert_same_bundles(self.query_for(since=datetime(2025, 2, 14, 9, 5).isoformat()))
+        ids = [entry['resource']['id'] for entry in bundle['entry']]
+        self.assertEqual(ids, ['oxsat-1', 'temp-2'])
+        for entry in bundle['entry']:
+            self.assertEqual(entry['resource'], full_resources[entry['resource']['id']])
+
+    def test_same_downsampled_bundle(self):
+        """Test that both engines render the same downsampled Observations."""
+        self.assert_same_bundles(self.query_for(downsample='3'))
+
+    def test_downsampled_request_within_budget(self):
+        """Test that both engines answer a downsampled request within the statement budget."""
+        patient_service = PatientService(self.session)
+        budget = QUERY_BUDGETS['/api/vital_signs']['statements']
+        for retrieve in (
+            lambda query: VitalSignsService(patient_service)._retrieve_vital_signs(query, VITAL_SIGNS_TABLES),
+            lambda query: ''.join(VitalsRenderingService(patient_service).render_vital_signs(query))
+        ):
+            with request_deadline('vital_signs'), assert_max_statements(budget) as stats:
+                retrieve(self.query_for(downsample='3'))
+            self.session.rollback()
+            self.assertEqual(stats.statements, 3)
+
+    def query_for(self, **options):
+        """Validate a request for the patient of the test rows."""
+        query, _ = RequestValidator.validate('0000021561', '2025-02-13', '2025-02-20', **options)
+        return query
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the vital signs `$stats` operation.
+
+This module contains tests for:
+1. The statistics query, aggregated by the database per `date_bin` bucket
+   and unit
+2. The statistics Observations built from its rows
+3. Validation of the bucket by the endpoint
+"""
+
+# Import modules #
+#----------------#
+
+import unittest
+from collections import namedtuple
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+# Import project modules #
+#------------------------#
+
+import app.models.patient_models  # noqa: F401 (registers the models)
+from app.constants.table_names import PRESION_ARTERIAL, TEMPERATURA
+from app.services.patient_service import PatientService
+from app.services.vitals_stats_service import STATS_BUCKETS, VitalsStatsService
+from app.utils.jwt_handler import generate_token
+from app.validators.request_validator import RequestValidator
+
+# Define helper objects #
+#-----------------------#
+
+StatsRow = namedtuple(
+    'StatsRow',
+    'source_table component bucket_start unit count minimum maximum average quartiles'
+)
+
+# Define test cases #
+#-------------------#
+
+class TestVitalsStats(unittest.TestCase):
+    """Test cases for the vital signs statistics."""
+
+    def setUp(self):
+        self.query, _ = RequestValidator.validate('0000021561', '2025-02-13', '2025-02-20')
+
+    def test_stats_query(self):
+        """Test that the statistics are grouped by bucket in the database, in a single query."""
+        stats_query = VitalsStatsService(None).build_stats_query(self.query, 'shift', [PRESION_ARTERIAL, TEMPERATURA])
+        sql = str(stats_query.compile(dialect=postgresql.dialect()))
+
+        # One branch per blood pressure component and one for the temperature
+        self.assertEqual(sql.count('UNION ALL'), 2)
+        self.assertEqual(sql.count('GROUP BY date_bin('), 3)
+        self.assertIn('CAST(coalesce(temperatura.escala_temp, %(param_', sql)
+        self.assertRegex(sql, r'GROUP BY date_bin\(.*?temperatura\.fecha_medicion_temp.*?\), CAST\(coalesce\(temperatura\.escala_temp')
+        self.assertIn('percentile_cont(ARRAY[', sql)
+        self.assertIn('WITHIN GROUP (ORDER BY CAST(temperatura.valor_temp AS FLOAT))', sql)
+        params = list(stats_query.compile().params.values())
+        width, origin = STATS_BUCKETS['shift']
+        self.assertIn(width, params)
+        self.assertEqual(origin.hour, 7)
+        self.assertIn(origin, params)
+        self.assertIsNone(VitalsStatsService(None).build_stats_query(self.query, 'day', []))
+
+    def test_statistics_observations(self):
+        """Test that each row becomes an Observation with the statistics as components."""
+        session = MagicMock()
+        session.execute.return_value.fetchall.return_value = [
+            StatsRow(PRESION_ARTERIAL, 'systolic', datetime(2025, 2, 13, 7), 'mmHg', 16, 110.0, 150.0, 128.5, [120.0, 127.0, 136.0]),
+            StatsRow(TEMPERATURA, None, datetime(2025, 2, 13, 7), 'ºC', 1, 36.6, 36.6, 36.6, [36.6, 36.6, 36.6]),
+            StatsRow(TEMPERATURA, None, datetime(2025, 2, 13, 7), 'ºF', 1, 98.24, 98.24, 98.24, [98.24, 98.24, 98.24])
+        ]
+        bundle = VitalsStatsService(PatientService(session)).retrieve_stats(self.query, 'shift')
+        self.assertEqual(bundle['total'], 3)
+
+        systolic = bundle['entry'][0]['resource']
+        self.assertEqual(systolic['id'], 'bp-systolic-stats-202502130700')
+        self.assertEqual(systolic['code']['coding'][0]['code'], '8480-6')
+        self.assertEqual(systolic['effectivePeriod']['end'], '2025-02-13T15:00:00+00:00')
+        statistics = {
+            component['code']['coding'][0]['code']: component.get('valueInteger', component.get('valueQuantity', {}).get('value'))
+            for component in systolic['component']
+        }
+        self.assertEqual(statistics, {
+            'count': 16, 'minimum': 110.0, 'maximum': 150.0, 'average': 128.5,
+            '4-lower': 120.0, 'median': 127.0, '4-upper': 136.0
+        })
+        self.assertEqual(systolic['component'][1]['valueQuantity']['unit'], 'mmHg')
+
+        # Temperatures in ºC and ºF are separate Observations, each in its unit
+        celsius, fahrenheit = (bundle['entry'][index]['resource'] for index in (1, 2))
+        self.assertEqual(celsius['code']['coding'][0]['code'], '8310-5')
+        self.assertEqual((celsius['id'], fahrenheit['id']), ('temp-stats-202502130700-C', 'temp-stats-202502130700-F'))
+        self.assertEqual(celsius['component'][1]['valueQuantity']['unit'], 'ºC')
+        self.assertEqual(fahrenheit['component'][1]['valueQuantity']['unit'], 'ºF')
+
+    def test_endpoint_validates_bucket(self):
+        """Test that unknown buckets are rejected before querying the database."""
+        from main import create_app
+
+        client = create_app().test_client()
+        headers = {'Authorization': f"Bearer {generate_token('doctor', 'medical')}"}
+        response = client.get('/api/vital_signs/0000021561/2025-02-13/2025-02-20/$stats?bucket=week', headers=headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['field'], 'bucket')
+
+        headers = {'Authorization': f"Bearer {generate_token('admin', 'admin')}"}
+        response = client.get('/api/vital_signs/0000021561/2025-02-13/2025-02-20/$stats', headers=headers)
+        self.assertEqual(response.status_code, 403)
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()
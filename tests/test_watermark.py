@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test module for incremental synchronisation watermarks.
+
+This module contains tests for:
+1. Encoding and decoding watermark tokens
+2. Computing the next watermark from the returned rows
+3. The delta query built for `_since` requests
+"""
+
+# Import modules #
+#----------------#
+
+import unittest
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+
+# Import project modules #
+#------------------------#
+
+from app.constants.error_messages import INVALID_WATERMARK_ERROR
+from app.constants.operational_tables import OPERATIONAL_TABLES
+from app.constants.table_names import PACIENTES_HOSPWIN, TEMPERATURA
+from app.db import build_consolidated_query
+from app.models.patient_models import TABLE_MODEL_MAP, Temperatura
+from app.utils.watermark import (
+    WATERMARK_TAG_SYSTEM,
+    add_watermark_to_bundle,
+    decode_watermark,
+    encode_watermark,
+    next_watermark
+)
+from app.validators.request_validator import RequestValidator
+
+# Define test cases #
+#-------------------#
+
+class TestWatermark(unittest.TestCase):
+    """Test cases for incremental synchronisation watermarks."""
+
+    def test_token_round_trip(self):
+        """Test that tokens decode to the encoded timestamp."""
+        timestamp = datetime(2025, 2, 13, 10, 5, 30, 123456)
+        token = encode_watermark(timestamp)
+        self.assertNotIn('=', token)
+        self.assertEqual(decode_watermark(token), timestamp)
+
+    def test_iso_timestamps_are_accepted(self):
+        """Test that FHIR-style _since instants are accepted."""
+        self.assertEqual(decode_watermark('2025-02-13T10:05:00'), datetime(2025, 2, 13, 10, 5))
+        self.assertEqual(decode_watermark('2025-02-13T10:05:00Z'), datetime(2025, 2, 13, 10, 5))
+
+    def test_invalid_values(self):
+        """Test that invalid values are rejected by the validator."""
+        for value in ['', 'not-a-token', 'dzI6MjAyNQ']:
+            with self.assertRaises(ValueError):
+                decode_watermark(value)
+
+        _, error = RequestValidator.validate('0000021561', '2025-02-13', '2025-02-14', since='garbage')
+        self.assertEqual(error, {'field': '_since', 'error': INVALID_WATERMARK_ERROR})
+
+    def test_next_watermark(self):
+        """Test that the next watermark is the latest registration or modification time."""
+        registered = Temperatura(fecha_registro_temp=datetime(2025, 2, 13, 10, 0))
+        modified = Temperatura(
+            fecha_registro_temp='2025-02-13T09:00:00',
+            fecha_modifica_temp='2025-02-13T11:30:00'
+        )
+        since = datetime(2025, 2, 13, 8, 0)
+
+        self.assertEqual(next_watermark([registered, modified], since), datetime(2025, 2, 13, 11, 30))
+        self.assertEqual(next_watermark([], since), since)
+        self.assertIsNone(next_watermark([]))
+
+        bundle = add_watermark_to_bundle({'resourceType': 'Bundle'}, datetime(2025, 2, 13, 11, 30))
+        tag = bundle['meta']['tag'][0]
+        self.assertEqual(tag['system'], WATERMARK_TAG_SYSTEM)
+        self.assertEqual(decode_watermark(tag['code']), datetime(2025, 2, 13, 11, 30))
+
+    def test_delta_query(self):
+        """Test that _since requests only select rows added or modified from the watermark on."""
+        token = encode_watermark(datetime(2025, 2, 13, 10, 0))
+        query, _ = RequestValidator.validate('0000021561', '2025-02-13', '2025-02-14', since=token)
+        request_data = query.to_request_data()
+
+        sql = str(build_consolidated_query(request_data, [TEMPERATURA], TABLE_MODEL_MAP).compile(
+            dialect=postgresql.dialect()
+        ))
+        self.assertIn('greatest(temperatura.fecha_registro_temp, temperatura.fecha_modifica_temp) >=', sql)
+
+        # Tables without change timestamps cannot be synchronised incrementally
+        sql = str(build_consolidated_query(request_data, OPERATIONAL_TABLES, TABLE_MODEL_MAP).compile(
+            dialect=postgresql.dialect()
+        ))
+        self.assertNotIn(f"'{PACIENTES_HOSPWIN}'", sql)
+
+# Main execution #
+#----------------#
+
+if __name__ == '__main__':
+    unittest.main()